@@ -1,8 +1,13 @@
 from python_a2a import A2AServer, skill, agent, run_server, TaskStatus, TaskState
 import os
+import sys
 from flask import Flask, jsonify
 from openai import OpenAI
 
+# The agent services share the pipeline's model routing from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from model_router import ModelRouter  # noqa: E402
+
 @agent(
     name="Financial Modeling Agent",
     description="Performs financial modeling, valuation, and cash flow analysis for real estate investment deals",
@@ -25,6 +30,9 @@ class FinancialModelingAgent(A2AServer):
         else:
             self.client = None
         
+        # Same tiers, pins and escalation as the pipeline (MODEL_* settings)
+        self.model_router = ModelRouter()
+        
         @self.app.route('/health')
         def health_check():
             return jsonify({
@@ -98,16 +106,12 @@ IMPORTANT: Return your response as plain text only. Do NOT use markdown formatti
 Provide detailed financial analysis with calculations, assumptions, and clear explanations of methodologies used."""
         
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Perform financial modeling and valuation analysis for the following real estate investment deal:\n\n{deal_document}"}
-                ],
-                temperature=0.7
+            return self.model_router.complete(
+                self.client,
+                "financial_modeling",
+                system_prompt,
+                f"Perform financial modeling and valuation analysis for the following real estate investment deal:\n\n{deal_document}"
             )
-            
-            return response.choices[0].message.content
         except Exception as e:
             return f"Error performing financial modeling: {str(e)}"
     
@@ -1,11 +1,27 @@
-from flask import Flask, request, jsonify, send_file, send_from_directory
+from flask import Flask, request, jsonify, send_file
 from flask_cors import CORS
 import os
 from dotenv import load_dotenv
 from werkzeug.utils import secure_filename
 import json
+import functools
+import re
+import hashlib
+import hmac
+import uuid
 from datetime import datetime
-from investment_pipeline import InvestmentAnalysisPipeline
+from investment_pipeline import InvestmentAnalysisPipeline, preload_dependencies
+from file_processor import build_package
+from request_dedup import SingleFlight, IdempotencyStore, IdempotencyConflict
+from fair_scheduler import get_scheduler, PRIORITY_LANES
+from cancellation import CancellationRegistry, CancelledError, DisconnectWatcher
+from upload_sessions import UploadSessionStore, UploadSessionNotFound, UploadError
+from http_cache import ResponseCompressor, StaticAssets, content_etag
+from request_profiler import SamplingProfiler, ProfileStore
+from report_storage import (
+    UPLOAD_FOLDER, REPORTS_FOLDER, DATA_FOLDER, search_index, similarity_index, stage_store, job_queue,
+    save_upload, save_reports, save_late_report, build_response, rerun_analysis
+)
 
 load_dotenv()
 
@@ -13,122 +29,663 @@ app = Flask(__name__, static_folder='static')
 CORS(app)
 
 # Configuration
-UPLOAD_FOLDER = 'uploads'
-REPORTS_FOLDER = 'reports'
-ALLOWED_EXTENSIONS = {'txt', 'pdf', 'doc', 'docx', 'md'}
+ALLOWED_EXTENSIONS = {'txt', 'pdf', 'doc', 'docx', 'md', 'csv', 'xlsx', 'zip'}
 
-# Create necessary directories
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-os.makedirs(REPORTS_FOLDER, exist_ok=True)
+# Files /reports/<filename> serves: the report files of an analysis and saved /compare rankings
+REPORT_FILENAME_PATTERN = re.compile(r"^(report_\d{8}_\d{6}(_\w+)?|comparison_\d{8}_\d{6}_[0-9a-f]+)\.txt$")
+
+# File name of the ZIP package built from a multi-file upload
+PACKAGE_FILENAME = 'deal_package.zip'
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['REPORTS_FOLDER'] = REPORTS_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
+# gzip/brotli compression of text responses and content fingerprints for static assets
+compressor = ResponseCompressor()
+static_assets = StaticAssets(app.static_folder)
+
+# Duplicate /analyze submissions: in-flight coalescing by document and settings, and Idempotency-Key replay
+analysis_flights = SingleFlight()
+idempotency_store = IdempotencyStore(os.environ.get("IDEMPOTENCY_DB_PATH", os.path.join(DATA_FOLDER, 'idempotency.db')))
+
+# Cancel tokens of running /analyze requests, cancelled when the client disconnects or calls the cancel endpoint
+cancellations = CancellationRegistry()
+
+# Chunked, resumable uploads for documents larger than MAX_CONTENT_LENGTH
+upload_sessions = UploadSessionStore(
+    os.environ.get("UPLOAD_SESSION_DB", os.path.join(DATA_FOLDER, 'uploads.db')),
+    os.environ.get("UPLOAD_CHUNK_DIR", os.path.join(UPLOAD_FOLDER, 'sessions'))
+)
+
+# Most analyses one /compare request may rank
+COMPARE_MAX_DEALS = int(os.environ.get("COMPARE_MAX_DEALS", 50))
+
+# Shortest X-Deadline-Seconds accepted; shorter budgets cannot fit a specialist and the orchestrator
+MIN_DEADLINE_SECONDS = float(os.environ.get("MIN_DEADLINE_SECONDS", 20))
+
+# Longest a retry without a deadline waits for the original request with the same Idempotency-Key
+IDEMPOTENCY_WAIT_SECONDS = float(os.environ.get("IDEMPOTENCY_WAIT_SECONDS", 60))
+
+# Admin endpoints (/admin/...) require this token in the X-Admin-Token header; unset disables them
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+
+# Opt-in sampling profiles of single requests (X-Profile: true), viewed through /admin/profiles.
+# Only requests carrying the admin token are profiled unless PROFILE_REQUESTS is true.
+PROFILE_REQUESTS = os.environ.get("PROFILE_REQUESTS", "false").lower() == "true"
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", 5))
+PROFILE_MAX_SECONDS = float(os.environ.get("PROFILE_MAX_SECONDS", 900))
+profile_store = ProfileStore(
+    os.environ.get("PROFILES_DIR", os.path.join(DATA_FOLDER, 'profiles')),
+    keep=int(os.environ.get("PROFILES_KEEP", 50))
+)
+
+def preload():
+    """
+    Load heavy dependencies and index data before serving. Used by forking servers
+    (see gunicorn.conf.py) so that workers start with everything already imported.
+    """
+    preload_dependencies()
+    len(similarity_index)
+    print("Preloaded pipeline dependencies")
+
+def parse_deadline(value):
+    """
+    Deadline in seconds from an X-Deadline-Seconds header or deadline_seconds form field.
+
+    Returns:
+        The deadline, or None when none was sent (0 also means no deadline)
+
+    Raises:
+        ValueError: if the value is not a number or is shorter than MIN_DEADLINE_SECONDS
+    """
+    if not value:
+        return None
+    try:
+        deadline_seconds = float(value)
+    except ValueError:
+        raise ValueError(f"Invalid deadline '{value}': expected a number of seconds")
+    if deadline_seconds == 0:
+        return 0
+    if deadline_seconds < MIN_DEADLINE_SECONDS:
+        raise ValueError(f"Deadline of {deadline_seconds:g}s is too short; the minimum is {MIN_DEADLINE_SECONDS:g}s")
+    return deadline_seconds
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def read_upload_files():
+    """
+    Read the document(s) of an /analyze or /jobs upload: a single file, a ZIP package, or several
+    files sent as repeated "file" fields, which are bundled into one ZIP package and analysed together.
+    
+    Returns:
+        Tuple of (file name, file bytes, error message or None)
+    """
+    files = [file for file in request.files.getlist('file') if file.filename != '']
+    if not files:
+        return None, None, "No file provided" if 'file' not in request.files else "No file selected"
+    for file in files:
+        if not allowed_file(file.filename):
+            return None, None, f"File type not allowed: {file.filename}. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
+    if len(files) == 1:
+        return secure_filename(files[0].filename), files[0].read(), None
+    return PACKAGE_FILENAME, build_package([(secure_filename(file.filename), file.read()) for file in files]), None
+
+def admin_authorized():
+    """Whether the request carries the admin token in the X-Admin-Token header (never the URL, which ends up in logs)"""
+    token = request.headers.get('X-Admin-Token')
+    return bool(ADMIN_TOKEN) and token is not None and hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+def requested_profiler():
+    """SamplingProfiler for the current request when it asks to be profiled (X-Profile: true) and may be, else None"""
+    if request.headers.get('X-Profile', '').lower() not in ('1', 'true', 'yes'):
+        return None
+    if not (PROFILE_REQUESTS or admin_authorized()):
+        print("Warning: Ignoring X-Profile on a request without a valid X-Admin-Token")
+        return None
+    return SamplingProfiler(interval=PROFILE_INTERVAL_MS / 1000, max_seconds=PROFILE_MAX_SECONDS)
+
+def profiled(view):
+    """
+    Run a view under the sampling profiler when the request asks for it (see requested_profiler)
+    and save the profile. Other requests only pay for the header lookup.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        profiler = requested_profiler()
+        if profiler is None:
+            return view(*args, **kwargs)
+        with profiler:
+            reply = app.make_response(view(*args, **kwargs))
+        body = reply.get_json(silent=True) or {}
+        try:
+            profile_id = profile_store.save(profiler, {
+                "path": request.path,
+                "status": reply.status_code,
+                "report_id": body.get("report_id") if isinstance(body, dict) else None,
+                "request_id": request.headers.get('X-Request-ID'),
+                "tenant": request.headers.get('X-Tenant-ID') or 'default'
+            })
+        except Exception as e:
+            print(f"Warning: Could not save request profile: {e}")
+            return reply
+        reply.headers['X-Profile-ID'] = profile_id
+        print(f"Saved request profile {profile_id} ({profiler.wall_seconds:.2f}s, {profiler.samples} samples)")
+        return reply
+    return wrapper
+
+@app.after_request
+def finalize_response(response):
+    """Long-lived caching for fingerprinted static assets, then response compression"""
+    if request.endpoint == 'static':
+        static_assets.apply_cache_headers(response, request.view_args.get('filename'), request.args.get('v'))
+    return compressor.compress(request, response)
+
 @app.route('/')
 def index():
-    """Serve the frontend"""
-    return send_from_directory(app.static_folder, 'index.html')
+    """Serve the frontend, with fingerprinted asset URLs so the assets can be cached indefinitely"""
+    page, etag = static_assets.render('index.html')
+    response = app.response_class(page, mimetype='text/html')
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 @app.route('/health', methods=['GET'])
 def health():
     return jsonify({"status": "healthy"}), 200
 
 @app.route('/analyze', methods=['POST'])
+@profiled
 def analyze_deal():
     """
     Main endpoint to analyze an investment deal file.
-    Expects a file upload with the investment deal document.
+    Expects a file upload with the investment deal document, a ZIP deal package, or several
+    documents of one deal (OM, rent roll, T-12, ...) as repeated "file" fields.
     """
     try:
-        # Check if file is present
-        if 'file' not in request.files:
-            return jsonify({"error": "No file provided"}), 400
-        
-        file = request.files['file']
+        # Read the upload once so duplicates can be recognised by content before anything runs
+        filename, file_bytes, error = read_upload_files()
+        if error:
+            return jsonify({"error": error}), 400
+        return start_analysis(filename, hashlib.sha256(file_bytes).hexdigest(), file_bytes=file_bytes)
         
-        if file.filename == '':
-            return jsonify({"error": "No file selected"}), 400
-        
-        if not allowed_file(file.filename):
-            return jsonify({"error": f"File type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"}), 400
-        
-        # Save uploaded file
-        filename = secure_filename(file.filename)
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], f"{timestamp}_{filename}")
-        file.save(filepath)
-        
-        # Initialize pipeline
-        pipeline = InvestmentAnalysisPipeline()
-        
-        # Run analysis
-        results = pipeline.analyze(filepath)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def tenant_key(tenant, key):
+    """Scope a client-supplied key (Idempotency-Key, X-Request-ID, document fingerprint) to one tenant"""
+    return f"{tenant}:{key}"
+
+def start_analysis(filename, content_sha256, file_bytes=None, source_path=None):
+    """
+    Run the analysis of an uploaded document for the current request and build the HTTP reply.
+    Handles the request headers (deadline, tenant, priority, Idempotency-Key, X-Request-ID,
+    X-Revision-Of), duplicate coalescing and cancellation. Used by /analyze and chunked upload completion.
+    
+    Args:
+        filename: Sanitised file name
+        content_sha256: Hex SHA-256 of the document, used to recognise duplicates
+        file_bytes: Document content, or None when source_path is given
+        source_path: Path of a document already on disk (e.g. an assembled chunked upload)
+    """
+    try:
+        deadline_seconds = parse_deadline(request.headers.get('X-Deadline-Seconds') or request.form.get('deadline_seconds'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    # LLM calls are scheduled fairly per tenant; UI requests are interactive, bulk clients send X-Priority: batch
+    tenant = request.headers.get('X-Tenant-ID') or 'default'
+    priority = (request.headers.get('X-Priority') or 'interactive').lower()
+    if priority not in PRIORITY_LANES:
+        return jsonify({"error": f"Invalid X-Priority. Allowed values: {', '.join(PRIORITY_LANES)}"}), 400
+    
+    # A revised version of an analysed deal only re-runs the agents whose sections changed
+    revision_of = request.headers.get('X-Revision-Of') or request.form.get('revision_of')
+    previous_results = None
+    if revision_of:
+        previous_results = stage_store.load(revision_of)
+        if previous_results is None:
+            return jsonify({"error": f"No stored analysis {revision_of} to revise"}), 404
+    
+    # Initialize pipeline
+    pipeline = InvestmentAnalysisPipeline(similarity_index=similarity_index, tenant=tenant, priority=priority)
+    fingerprint = content_sha256 + "|" + (revision_of or "") + "|" + hashlib.sha256(
+        pipeline.settings_fingerprint(deadline_seconds).encode("utf-8")).hexdigest()
+    
+    # A retry with the same Idempotency-Key returns the stored response, or waits for the original request
+    # within its own deadline and otherwise answers 409 so the client retries later
+    idempotency_key = request.headers.get('Idempotency-Key')
+    if idempotency_key:
+        try:
+            stored = idempotency_store.claim(tenant_key(tenant, idempotency_key), fingerprint,
+                                             timeout=deadline_seconds or IDEMPOTENCY_WAIT_SECONDS)
+        except IdempotencyConflict as e:
+            return jsonify({"error": str(e)}), 422
+        except TimeoutError as e:
+            reply = jsonify({"status": "in_progress", "error": str(e)})
+            reply.headers['Retry-After'] = '10'
+            return reply, 409
+        if stored is not None:
+            status_code, response = stored
+            reply = jsonify(response)
+            reply.headers['Idempotent-Replayed'] = 'true'
+            return reply, status_code
+    
+    # Concurrent submissions of the same document and settings by one tenant share one pipeline run and its
+    # cancel token. The flight is keyed by the token too: once every waiter has gone the token is cancelled and a
+    # new submission gets a fresh token, so it starts a new run instead of joining the one being torn down.
+    request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+    cancel_token = cancellations.register(tenant_key(tenant, request_id), tenant_key(tenant, fingerprint))
+    try:
+        with DisconnectWatcher(request.environ, lambda: cancellations.cancel(tenant_key(tenant, request_id), "client disconnected")):
+            response, shared = analysis_flights.do(
+                (tenant, fingerprint, cancel_token),
+                lambda: run_analysis(pipeline, filename, file_bytes, deadline_seconds, cancel_token, source_path, previous_results)
+            )
+    except CancelledError as e:
+        if idempotency_key:
+            idempotency_store.release(tenant_key(tenant, idempotency_key))
+        # 499: client closed request (nginx convention); usually nobody is left to read it
+        return jsonify({"status": "cancelled", "request_id": request_id, "reason": str(e)}), 499
+    except Exception:
+        if idempotency_key:
+            idempotency_store.release(tenant_key(tenant, idempotency_key))
+        raise
+    finally:
+        cancellations.release(tenant_key(tenant, request_id))
+    if shared:
+        print(f"Coalesced duplicate submission of {filename} into {response['report_id']}")
+    if idempotency_key:
+        idempotency_store.complete(tenant_key(tenant, idempotency_key), 200, response)
+    
+    # Return results
+    reply = jsonify(response)
+    if shared:
+        reply.headers['X-Coalesced'] = 'true'
+    return reply, 200
+
+@app.route('/analyze/<request_id>/cancel', methods=['POST'])
+def cancel_analysis(request_id):
+    """
+    Cancel a running /analyze request, identified by the X-Request-ID header it was sent with.
+    The analysis itself only stops once every request coalesced onto it has been cancelled.
+    """
+    tenant = request.headers.get('X-Tenant-ID') or 'default'
+    if not cancellations.cancel(tenant_key(tenant, request_id), "cancelled by client"):
+        return jsonify({"error": "No running analysis for this request id"}), 404
+    return jsonify({"status": "cancelling", "request_id": request_id}), 202
+
+def run_analysis(pipeline, filename, file_bytes, deadline_seconds=None, cancel_token=None, source_path=None,
+                 previous_results=None):
+    """
+    Save an uploaded document, run the pipeline on it and save the reports. Returns the /analyze response.
+    previous_results are the stored results of the version this upload revises, if any.
+    """
+    report_id, filepath = save_upload(filename, file_bytes, source_path)
+    
+    # Run analysis (optionally within a per-request deadline, e.g. X-Deadline-Seconds: 120)
+    results = pipeline.analyze(
+        filepath,
+        deadline_seconds=deadline_seconds,
+        on_late_result=lambda agent_id, report: save_late_report(report_id, agent_id, report),
+        cancel_token=cancel_token,
+        previous_results=previous_results
+    )
+    
+    # Save and index reports
+    save_reports(report_id, results)
+    return build_response(report_id, results)
+
+@app.route('/reports/<filename>', methods=['GET'])
+def get_report(filename):
+    """
+    Download a specific report file.
+    Responses carry a strong ETag of the content and answer If-None-Match with 304 Not Modified.
+    """
+    try:
+        if not REPORT_FILENAME_PATTERN.match(filename):
+            return jsonify({"error": "Report not found"}), 404
+        filepath = os.path.join(app.config['REPORTS_FOLDER'], filename)
+        if not os.path.isfile(filepath):
+            return jsonify({"error": "Report not found"}), 404
+        with open(filepath, 'rb') as f:
+            data = f.read()
+        response = app.response_class(data, mimetype='text/plain')
+        response.headers.set('Content-Disposition', 'attachment', filename=filename)
+        response.set_etag(content_etag(data))
+        # Report files are rewritten by late results and stage re-runs, so browsers always revalidate;
+        # an unchanged report costs only a 304 thanks to the content ETag
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/reports/<report_id>/rerun', methods=['POST'])
+def rerun_report(report_id):
+    """
+    Re-run selected stages of a stored analysis and reuse the stored outputs of the others.
+    JSON body (all optional): stages (agent ids and/or "orchestrator"; default: the stages without
+    a usable report plus the orchestrator), include_dependents (bool), use_cache (bool, default true).
+    Accepts the X-Tenant-ID, X-Priority and X-Deadline-Seconds headers of /analyze.
+    """
+    try:
+        stored = stage_store.load(report_id)
+        if stored is None:
+            return jsonify({"error": f"No stored stages for {report_id}"}), 404
+        options = request.get_json(silent=True) or {}
+        stages = options.get("stages")
+        if isinstance(stages, str):
+            stages = [stage.strip() for stage in stages.split(",") if stage.strip()]
         
-        # Save reports
-        report_id = f"report_{timestamp}"
-        real_estate_path = os.path.join(app.config['REPORTS_FOLDER'], f"{report_id}_real_estate.txt")
-        financial_path = os.path.join(app.config['REPORTS_FOLDER'], f"{report_id}_financial.txt")
-        market_path = os.path.join(app.config['REPORTS_FOLDER'], f"{report_id}_market.txt")
-        legal_path = os.path.join(app.config['REPORTS_FOLDER'], f"{report_id}_legal.txt")
-        orchestrator_path = os.path.join(app.config['REPORTS_FOLDER'], f"{report_id}_orchestrator.txt")
+        tenant = request.headers.get('X-Tenant-ID') or 'default'
+        priority = (request.headers.get('X-Priority') or 'interactive').lower()
+        if priority not in PRIORITY_LANES:
+            return jsonify({"error": f"Invalid X-Priority. Allowed values: {', '.join(PRIORITY_LANES)}"}), 400
+        deadline_seconds = parse_deadline(request.headers.get('X-Deadline-Seconds'))
         
-        # Write reports to files
-        with open(real_estate_path, 'w') as f:
-            f.write(results['real_estate_report'])
+        pipeline = InvestmentAnalysisPipeline(similarity_index=similarity_index, tenant=tenant, priority=priority)
+        response = rerun_analysis(
+            pipeline, report_id, stored, stages,
+            include_dependents=bool(options.get("include_dependents")),
+            use_cache=options.get("use_cache", True) is not False,
+            deadline_seconds=deadline_seconds
+        )
+        return jsonify(response), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/reports/<report_id>/stages', methods=['GET'])
+def list_stage_runs(report_id):
+    """Every stored execution of each stage of an analysis (status, model, time), oldest first"""
+    runs = stage_store.runs(report_id)
+    if not runs:
+        return jsonify({"error": f"No stored stages for {report_id}"}), 404
+    return jsonify({"report_id": report_id, "runs": runs}), 200
+
+@app.route('/reports/<report_id>/stages/<stage>', methods=['GET'])
+def get_stage_run(report_id, stage):
+    """Inputs (system and user prompt) and output of a stage's latest run, or of ?run=N"""
+    run = request.args.get('run')
+    entry = stage_store.stage_run(report_id, stage, int(run) if run and run.isdigit() else None)
+    if entry is None:
+        return jsonify({"error": f"No stored run of {stage} for {report_id}"}), 404
+    return jsonify(entry), 200
+
+@app.route('/compare', methods=['POST'])
+def compare_deals():
+    """
+    Rank several analysed deals in one pass, from their stored facts and conclusions.
+    JSON body: report_ids (list, or a comma-separated string) of at least two stored analyses.
+    No agent is re-run: the metrics table is computed locally and one synthesis call writes the
+    ranking. Accepts the X-Tenant-ID and X-Priority headers of /analyze.
+    """
+    try:
+        options = request.get_json(silent=True) or {}
+        report_ids = options.get("report_ids") or request.form.get("report_ids") or []
+        if isinstance(report_ids, str):
+            report_ids = [report_id.strip() for report_id in report_ids.split(",") if report_id.strip()]
+        report_ids = list(dict.fromkeys(report_ids))
+        if len(report_ids) < 2:
+            return jsonify({"error": "Give at least two report_ids to compare"}), 400
+        if len(report_ids) > COMPARE_MAX_DEALS:
+            return jsonify({"error": f"At most {COMPARE_MAX_DEALS} deals can be compared at once"}), 400
         
-        with open(financial_path, 'w') as f:
-            f.write(results['financial_modeling_report'])
+        tenant = request.headers.get('X-Tenant-ID') or 'default'
+        priority = (request.headers.get('X-Priority') or 'interactive').lower()
+        if priority not in PRIORITY_LANES:
+            return jsonify({"error": f"Invalid X-Priority. Allowed values: {', '.join(PRIORITY_LANES)}"}), 400
         
-        with open(market_path, 'w') as f:
-            f.write(results['market_analysis_report'])
+        analyses = stage_store.load_many(report_ids)
+        missing = [report_id for report_id in report_ids if report_id not in analyses]
+        if missing:
+            return jsonify({"error": f"No stored analysis for {', '.join(missing)}", "missing": missing}), 404
         
-        with open(legal_path, 'w') as f:
-            f.write(results['legal_report'])
+        pipeline = InvestmentAnalysisPipeline(similarity_index=similarity_index, tenant=tenant, priority=priority)
+        comparison = pipeline.compare([analyses[report_id] for report_id in report_ids])
         
-        with open(orchestrator_path, 'w') as f:
-            f.write(results['orchestrator_report'])
+        # Keep the comparison as a downloadable report next to the analyses
+        comparison_id = f"comparison_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+        with open(os.path.join(app.config['REPORTS_FOLDER'], f"{comparison_id}.txt"), 'w') as f:
+            f.write(f"PORTFOLIO COMPARISON OF {len(report_ids)} DEALS\n\n{comparison['metrics_table']}\n\n{comparison['ranking_report']}")
         
-        # Return results
         return jsonify({
             "status": "success",
-            "report_id": report_id,
-            "real_estate_report": results['real_estate_report'],
-            "financial_modeling_report": results['financial_modeling_report'],
-            "market_analysis_report": results['market_analysis_report'],
-            "legal_report": results['legal_report'],
-            "orchestrator_report": results['orchestrator_report'],
-            "reports": {
-                "real_estate": f"/reports/{report_id}_real_estate.txt",
-                "financial": f"/reports/{report_id}_financial.txt",
-                "market": f"/reports/{report_id}_market.txt",
-                "legal": f"/reports/{report_id}_legal.txt",
-                "orchestrator": f"/reports/{report_id}_orchestrator.txt"
-            }
+            "comparison_id": comparison_id,
+            "report_ids": report_ids,
+            "report": f"/reports/{comparison_id}.txt",
+            **comparison
         }), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/uploads', methods=['POST'])
+def create_upload():
+    """
+    Start a chunked upload. Expects JSON with filename, size and optionally the file's sha256.
+    Returns the upload id and the chunk size; send the chunks with PUT /uploads/<upload_id>/chunks/<index>.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        filename = data.get('filename') or ''
+        if not filename:
+            return jsonify({"error": "No filename provided"}), 400
+        if not allowed_file(filename):
+            return jsonify({"error": f"File type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"}), 400
+        session = upload_sessions.create(
+            secure_filename(filename), data.get('size') or 0, sha256=data.get('sha256'),
+            tenant=request.headers.get('X-Tenant-ID') or 'default'
+        )
+        return jsonify(upload_status(session)), 201
+    except (UploadError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def tenant_upload(upload_id):
+    """The upload session for the request's X-Tenant-ID; raises UploadSessionNotFound for other tenants' sessions"""
+    return upload_sessions.get(upload_id, tenant=request.headers.get('X-Tenant-ID') or 'default')
+
+@app.route('/uploads/<upload_id>', methods=['GET'])
+def get_upload(upload_id):
+    """Status of a chunked upload; a client resuming after a lost connection re-sends the missing chunks"""
+    try:
+        return jsonify(upload_status(tenant_upload(upload_id)))
+    except UploadSessionNotFound as e:
+        return jsonify({"error": str(e)}), 404
+
+@app.route('/uploads/<upload_id>', methods=['DELETE'])
+def delete_upload(upload_id):
+    """Abandon a chunked upload and delete its chunks"""
+    try:
+        tenant_upload(upload_id)
+        upload_sessions.delete(upload_id)
+        return jsonify({"status": "deleted", "upload_id": upload_id})
+    except UploadSessionNotFound as e:
+        return jsonify({"error": str(e)}), 404
+
+@app.route('/uploads/<upload_id>/chunks/<int:index>', methods=['PUT'])
+def put_upload_chunk(upload_id, index):
+    """
+    Store one chunk of a chunked upload. The body is the raw chunk; send its SHA-256 in the
+    X-Chunk-SHA256 header to have it verified. Chunks may be sent in parallel and in any order.
+    """
+    try:
+        tenant_upload(upload_id)
+        chunk = upload_sessions.write_chunk(upload_id, index, request.stream, request.headers.get('X-Chunk-SHA256'))
+        return jsonify(chunk)
+    except UploadSessionNotFound as e:
+        return jsonify({"error": str(e)}), 404
+    except UploadError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/uploads/<upload_id>/complete', methods=['POST'])
+@profiled
+def complete_upload(upload_id):
+    """
+    Assemble a chunked upload and analyse it. Accepts the same headers as /analyze and returns
+    the same response; the upload session is deleted once the analysis has succeeded.
+    """
+    try:
+        session = tenant_upload(upload_id)
+        filepath, sha256 = upload_sessions.assemble(upload_id)
+        reply, status_code = start_analysis(session["filename"], sha256, source_path=filepath)
+        if status_code == 200:
+            upload_sessions.delete(upload_id)
+        return reply, status_code
+    except UploadSessionNotFound as e:
+        return jsonify({"error": str(e)}), 404
+    except UploadError as e:
+        return jsonify({"error": str(e)}), 409
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def upload_status(session):
+    """JSON view of an upload session"""
+    return {
+        "upload_id": session["id"],
+        "filename": session["filename"],
+        "size": session["size"],
+        "chunk_size": session["chunk_size"],
+        "total_chunks": session["total_chunks"],
+        "status": session["status"],
+        "received_chunks": session["received_chunks"],
+        "missing_chunks": session["missing_chunks"],
+        "bytes_received": session["bytes_received"]
+    }
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """
+    Queue an investment deal file for analysis by a worker process (python worker.py).
+    The job survives server and worker restarts; poll GET /jobs/<job_id> for the result.
+    """
+    try:
+        filename, file_bytes, error = read_upload_files()
+        if error:
+            return jsonify({"error": error}), 400
         
+        # Queued jobs default to the batch lane so they never delay interactive analyses
+        tenant = request.headers.get('X-Tenant-ID') or 'default'
+        priority = (request.headers.get('X-Priority') or 'batch').lower()
+        if priority not in PRIORITY_LANES:
+            return jsonify({"error": f"Invalid X-Priority. Allowed values: {', '.join(PRIORITY_LANES)}"}), 400
+        try:
+            deadline_seconds = parse_deadline(request.headers.get('X-Deadline-Seconds') or request.form.get('deadline_seconds'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        report_id, filepath = save_upload(filename, file_bytes)
+        job_id = job_queue.enqueue(
+            report_id, filepath, filename, tenant=tenant, priority=priority,
+            deadline_seconds=deadline_seconds
+        )
+        return jsonify({
+            "status": "queued",
+            "job_id": job_id,
+            "report_id": report_id,
+            "status_url": f"/jobs/{job_id}"
+        }), 202
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route('/reports/<filename>', methods=['GET'])
-def get_report(filename):
-    """Download a specific report file"""
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status of a queued analysis job, the agents completed so far and, once completed, the /analyze response"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify({
+        "job_id": job["id"],
+        "report_id": job["report_id"],
+        "filename": job["filename"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "lease_owner": job["lease_owner"],
+        "completed_agents": job["completed_agents"],
+        "error": job["error"],
+        "result": job["result"]
+    }), 200
+
+@app.route('/scheduler/stats', methods=['GET'])
+def scheduler_stats():
+    """Per-tenant LLM queue wait times and current load, for capacity planning"""
+    return jsonify(get_scheduler().stats()), 200
+
+@app.route('/search', methods=['GET'])
+def search_reports():
+    """
+    Full-text search over historical reports and deal documents.
+    Query parameters: q (required), agent (repeatable), since, until (YYYY-MM-DD), limit
+    """
     try:
-        filepath = os.path.join(app.config['REPORTS_FOLDER'], filename)
-        if os.path.exists(filepath):
-            return send_file(filepath, as_attachment=True)
-        else:
-            return jsonify({"error": "Report not found"}), 404
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({"error": "Missing query parameter 'q'"}), 400
+        try:
+            limit = int(request.args.get('limit', 20))
+        except ValueError:
+            return jsonify({"error": f"Invalid limit '{request.args.get('limit')}': expected a whole number"}), 400
+        
+        results = search_index.search(
+            query,
+            agent=request.args.getlist('agent') or None,
+            since=request.args.get('since'),
+            until=request.args.get('until'),
+            limit=max(1, min(limit, 100))
+        )
+        return jsonify({"query": query, "count": len(results), "results": results}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/admin/profiles', methods=['GET'])
+def list_profiles():
+    """Saved request profiles, newest first (requires the admin token)"""
+    if not admin_authorized():
+        return jsonify({"error": "Admin token required" if ADMIN_TOKEN else "Admin endpoints are disabled (ADMIN_TOKEN is not set)"}), 403
+    profiles = profile_store.list()
+    for profile in profiles:
+        profile["links"] = {name: f"/admin/profiles/{profile['id']}/{name}" for name in ("flamegraph.svg", "stacks.folded")}
+    return jsonify({"count": len(profiles), "profiles": profiles}), 200
+
+@app.route('/admin/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """Wall-clock and CPU breakdown of a saved request profile (requires the admin token)"""
+    if not admin_authorized():
+        return jsonify({"error": "Admin token required"}), 403
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        return jsonify({"error": "Profile not found"}), 404
+    return jsonify(profile), 200
+
+@app.route('/admin/profiles/<profile_id>/<name>', methods=['GET'])
+def get_profile_file(profile_id, name):
+    """Flame graph (flamegraph.svg) or collapsed stacks (stacks.folded) of a saved profile (requires the admin token)"""
+    if not admin_authorized():
+        return jsonify({"error": "Admin token required"}), 403
+    path = profile_store.path(profile_id, name)
+    if path is None:
+        return jsonify({"error": "Profile file not found"}), 404
+    return send_file(os.path.abspath(path), mimetype='image/svg+xml' if name.endswith('.svg') else 'text/plain')
+
 if __name__ == '__main__':
+    # Pick up any reports written before the search index existed
+    indexed = search_index.index_reports_folder(REPORTS_FOLDER)
+    if indexed:
+        print(f"Indexed {indexed} existing report files for search")
+    indexed = similarity_index.add_reports_folder(REPORTS_FOLDER)
+    if indexed:
+        print(f"Added {indexed} existing deals to the similarity index")
+    
     port = int(os.environ.get('PORT', 5001))  # Changed default to 5001 to avoid macOS AirPlay conflict
     print(f"Starting Investment Deal Analysis Server on http://localhost:{port}")
     print(f"Health check: http://localhost:{port}/health")
     print(f"Analyze endpoint: http://localhost:{port}/analyze")
+    print(f"Search endpoint: http://localhost:{port}/search?q=easement")
     app.run(host='0.0.0.0', port=port, debug=True)
 
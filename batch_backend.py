@@ -0,0 +1,300 @@
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# Endpoint of every request line in a batch file
+BATCH_ENDPOINT = "/v1/chat/completions"
+
+# Batch states after which nothing more will complete
+TERMINAL_STATES = ("completed", "failed", "expired", "cancelled")
+
+# USD per million prompt / completion tokens for interactive calls, overridable with MODEL_PRICES
+# (a JSON object of model -> [prompt, completion]). Batch calls are billed at BATCH_DISCOUNT of these.
+DEFAULT_MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+}
+
+
+def model_prices():
+    prices = dict(DEFAULT_MODEL_PRICES)
+    override = os.environ.get("MODEL_PRICES")
+    if override:
+        try:
+            prices.update({model: tuple(value) for model, value in json.loads(override).items()})
+        except (ValueError, TypeError) as e:
+            print(f"Warning: Ignoring invalid MODEL_PRICES: {e}")
+    return prices
+
+
+def estimate_cost(model, prompt_tokens, completion_tokens, batch=False, prices=None):
+    """
+    Cost of a call in USD, or None when the model has no known price.
+
+    Args:
+        model: Model name
+        prompt_tokens: Prompt tokens
+        completion_tokens: Completion tokens
+        batch: Bill at the batch discount (BATCH_DISCOUNT, default 0.5)
+        prices: Optional prices from model_prices()
+    """
+    price = (prices or model_prices()).get(model)
+    if price is None:
+        return None
+    cost = ((prompt_tokens or 0) * price[0] + (completion_tokens or 0) * price[1]) / 1_000_000
+    if batch:
+        cost *= float(os.environ.get("BATCH_DISCOUNT", 0.5))
+    return cost
+
+
+def write_batch_file(path, requests):
+    """
+    Write chat completion requests as a batch input JSONL file.
+
+    Args:
+        path: File to write
+        requests: Iterable of (custom_id, request body) pairs
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    count = 0
+    with open(path, 'w') as f:
+        for custom_id, body in requests:
+            f.write(json.dumps({"custom_id": custom_id, "method": "POST", "url": BATCH_ENDPOINT, "body": body}) + "\n")
+            count += 1
+    return count
+
+
+def parse_batch_output(lines):
+    """
+    Read batch output (or error) JSONL lines.
+
+    Returns:
+        Dictionary by custom_id of {text, finish_reason, model, usage, error}; usage is a
+        dictionary with prompt_tokens and completion_tokens, text is None for failed requests
+    """
+    results = {}
+    for line in lines:
+        if not line.strip():
+            continue
+        entry = json.loads(line)
+        response = entry.get("response") or {}
+        body = response.get("body") or {}
+        error = entry.get("error")
+        if not error and response.get("status_code", 200) >= 400:
+            error = body.get("error") or f"HTTP {response.get('status_code')}"
+        choice = (body.get("choices") or [{}])[0]
+        results[entry["custom_id"]] = {
+            "text": None if error else (choice.get("message") or {}).get("content"),
+            "finish_reason": choice.get("finish_reason"),
+            "model": body.get("model"),
+            "usage": body.get("usage") or {},
+            "error": (error.get("message") if isinstance(error, dict) else error) or None,
+        }
+    return results
+
+
+class BatchBackend:
+    """
+    Where deferred requests are run: submit a batch input file, poll it, read the results.
+    Subclasses implement submit, status and results.
+    """
+
+    name = "base"
+    # Whether calls through this backend are billed at the batch discount
+    discounted = False
+
+    def submit(self, path, metadata=None):
+        """Submit a batch input file. Returns the batch id."""
+        raise NotImplementedError
+
+    def status(self, batch_id):
+        """Progress of a batch: dictionary with status, total, completed and failed"""
+        raise NotImplementedError
+
+    def results(self, batch_id):
+        """Results of a finished batch by custom_id (see parse_batch_output)"""
+        raise NotImplementedError
+
+    def cancel(self, batch_id):
+        """Stop a batch that is no longer waited for; the requests that finished keep their results"""
+
+    def wait(self, batch_id, poll_seconds=30, max_wait_seconds=None):
+        """
+        Poll until the batch reaches a terminal state or max_wait_seconds pass.
+
+        Returns:
+            The last status
+        """
+        start = time.monotonic()
+        while True:
+            status = self.status(batch_id)
+            if status["status"] in TERMINAL_STATES:
+                return status
+            if max_wait_seconds is not None and time.monotonic() - start >= max_wait_seconds:
+                print(f"Warning: Batch {batch_id} still {status['status']} after {max_wait_seconds:.0f}s")
+                return status
+            print(f"Batch {batch_id}: {status['status']}, {status['completed']}/{status['total']} done")
+            time.sleep(poll_seconds)
+
+
+class OpenAIBatchBackend(BatchBackend):
+    """The OpenAI Batch API: discounted prices and a separate rate limit, results within the completion window"""
+
+    name = "openai"
+    discounted = True
+
+    def __init__(self, client, completion_window=None):
+        self.client = client
+        self.completion_window = completion_window or os.environ.get("BATCH_COMPLETION_WINDOW", "24h")
+
+    def submit(self, path, metadata=None):
+        with open(path, 'rb') as f:
+            input_file = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=self.completion_window,
+            metadata=metadata or {}
+        )
+        return batch.id
+
+    def status(self, batch_id):
+        batch = self.client.batches.retrieve(batch_id)
+        counts = batch.request_counts
+        return {
+            "status": batch.status,
+            "total": getattr(counts, "total", 0) if counts else 0,
+            "completed": getattr(counts, "completed", 0) if counts else 0,
+            "failed": getattr(counts, "failed", 0) if counts else 0,
+        }
+
+    def cancel(self, batch_id):
+        try:
+            self.client.batches.cancel(batch_id)
+        except Exception as e:
+            print(f"Warning: Could not cancel batch {batch_id}: {e}")
+
+    def results(self, batch_id):
+        batch = self.client.batches.retrieve(batch_id)
+        results = {}
+        # An expired batch still returns the requests that finished in time
+        for file_id in (batch.error_file_id, batch.output_file_id):
+            if file_id:
+                results.update(parse_batch_output(self.client.files.content(file_id).text.splitlines()))
+        return results
+
+
+class LocalBatchBackend(BatchBackend):
+    """
+    Stand-in for a batch API that runs the requests of a batch file in background threads with
+    the given client and writes output in the same format. For tests and for running deferred
+    mode without batch API access (no discount applies). Output lines are written as requests
+    finish, so a batch that is waited on no longer keeps the results it already has.
+    """
+
+    name = "local"
+
+    def __init__(self, client, directory=None, workers=None):
+        self.client = client
+        self.directory = directory or os.environ.get("BATCH_DIR", os.path.join("data", "batches"))
+        self.workers = int(workers or os.environ.get("LOCAL_BATCH_WORKERS", 4))
+        self._progress = {}
+        self._executors = {}
+        self._lock = threading.Lock()
+
+    def _output_path(self, batch_id):
+        return os.path.join(self.directory, f"{batch_id}_output.jsonl")
+
+    def submit(self, path, metadata=None):
+        batch_id = f"batch_local_{uuid.uuid4().hex[:12]}"
+        with open(path, 'r') as f:
+            lines = [json.loads(line) for line in f if line.strip()]
+        os.makedirs(self.directory, exist_ok=True)
+        open(self._output_path(batch_id), 'w').close()
+        executor = ThreadPoolExecutor(max_workers=max(self.workers, 1), thread_name_prefix="batch")
+        with self._lock:
+            self._progress[batch_id] = {"status": "in_progress", "total": len(lines), "completed": 0, "failed": 0}
+            self._executors[batch_id] = executor
+        futures = [executor.submit(self._run_one, batch_id, line) for line in lines]
+        threading.Thread(target=self._finish, args=(batch_id, executor, futures), daemon=True).start()
+        return batch_id
+
+    def _run_one(self, batch_id, line):
+        try:
+            response = self.client.chat.completions.create(**line["body"])
+            choice = response.choices[0]
+            usage = getattr(response, "usage", None)
+            output = {"id": uuid.uuid4().hex, "custom_id": line["custom_id"], "error": None, "response": {
+                "status_code": 200,
+                "body": {
+                    "model": getattr(response, "model", None) or line["body"].get("model"),
+                    "choices": [{"message": {"role": "assistant", "content": choice.message.content},
+                                 "finish_reason": getattr(choice, "finish_reason", None)}],
+                    "usage": {"prompt_tokens": getattr(usage, "prompt_tokens", None),
+                              "completion_tokens": getattr(usage, "completion_tokens", None)},
+                }
+            }}
+            failed = False
+        except Exception as e:
+            output = {"id": uuid.uuid4().hex, "custom_id": line["custom_id"], "response": None,
+                      "error": {"code": type(e).__name__, "message": str(e)}}
+            failed = True
+        # Whole lines under the lock, so results() never reads half a line
+        with self._lock:
+            self._progress[batch_id]["failed" if failed else "completed"] += 1
+            with open(self._output_path(batch_id), 'a') as f:
+                f.write(json.dumps(output) + "\n")
+
+    def _finish(self, batch_id, executor, futures):
+        wait(futures)
+        executor.shutdown()
+        with self._lock:
+            self._executors.pop(batch_id, None)
+            if self._progress[batch_id]["status"] == "in_progress":
+                self._progress[batch_id]["status"] = "completed"
+
+    def cancel(self, batch_id):
+        """Drop the requests that have not started and wait for the running ones, whose results are kept"""
+        with self._lock:
+            executor = self._executors.get(batch_id)
+            progress = self._progress.get(batch_id)
+            if executor is None or progress is None or progress["status"] != "in_progress":
+                return
+            progress["status"] = "cancelling"
+        executor.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            progress["status"] = "cancelled"
+
+    def status(self, batch_id):
+        with self._lock:
+            progress = self._progress.get(batch_id)
+            if progress is not None:
+                return dict(progress)
+        if os.path.exists(self._output_path(batch_id)):
+            return {"status": "completed", "total": 0, "completed": 0, "failed": 0}
+        return {"status": "failed", "total": 0, "completed": 0, "failed": 0}
+
+    def results(self, batch_id):
+        path = self._output_path(batch_id)
+        with self._lock:
+            if not os.path.exists(path):
+                return {}
+            with open(path, 'r') as f:
+                return parse_batch_output(f)
+
+
+def get_batch_backend(client, name=None):
+    """The batch backend selected by name or BATCH_BACKEND (openai, the default, or local)"""
+    name = (name or os.environ.get("BATCH_BACKEND", "openai")).lower()
+    if name == "openai":
+        return OpenAIBatchBackend(client)
+    if name == "local":
+        return LocalBatchBackend(client)
+    raise ValueError(f"Unknown batch backend {name}. Available: openai, local")
@@ -0,0 +1,103 @@
+"""
+Local cost of preparing a deferred (batch) run and the modelled LLM cost per deal.
+
+Prepares --deals copies of example_deal.txt as InvestmentAnalysisPipeline.analyze_deferred does
+(extraction, preprocessing and the specialist prompts), writes the batch request file, parses a
+batch output file of the same shape, and prices the calls at interactive and batch rates with an
+assumed report length. No LLM is called.
+
+    python benchmarks/batch_cost.py
+    python benchmarks/batch_cost.py --deals 200 --completion-tokens 1500
+    python benchmarks/batch_cost.py --history data/batch_cost.jsonl
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+# The pipeline needs a key to start; nothing is sent
+os.environ.setdefault("OPENAI_API_KEY", "unused")
+
+from batch_backend import write_batch_file, parse_batch_output, estimate_cost  # noqa: E402
+from investment_pipeline import InvestmentAnalysisPipeline  # noqa: E402
+from model_router import estimate_tokens  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure deferred-mode preparation and modelled cost per deal")
+    parser.add_argument("--deals", type=int, default=50, help="Deals in the run")
+    parser.add_argument("--completion-tokens", type=int, default=1200, help="Assumed tokens per specialist report")
+    parser.add_argument("--orchestrator-tokens", type=int, default=2500, help="Assumed tokens per final report")
+    parser.add_argument("--history", help="JSONL file to append results to")
+    args = parser.parse_args()
+
+    pipeline = InvestmentAnalysisPipeline()
+    pipeline.node_cache = None
+    source = os.path.join(REPO_ROOT, "example_deal.txt")
+
+    start = time.perf_counter()
+    requests = []
+    orchestrator_prompt_tokens = 0
+    for index in range(args.deals):
+        prepared = pipeline._prepare(source)
+        for spec in pipeline.agent_specs:
+            user_prompt = spec.build_prompt(prepared["context"], {})
+            body, _ = pipeline.model_router.batch_request(spec.agent_id, spec.system_prompt, user_prompt)
+            requests.append((f"deal{index:05d}:{spec.agent_id}", body))
+        # The orchestrator reads the document and every report
+        orchestrator_prompt_tokens += estimate_tokens(prepared["deal_content"]) + len(pipeline.agent_specs) * args.completion_tokens
+    prepare_s = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = os.path.join(work_dir, "requests.jsonl")
+        start = time.perf_counter()
+        write_batch_file(path, requests)
+        write_s = time.perf_counter() - start
+        file_mb = os.path.getsize(path) / 1024 / 1024
+        output_lines = [json.dumps({"custom_id": custom_id, "error": None, "response": {"status_code": 200, "body": {
+            "model": body["model"], "choices": [{"message": {"content": "x" * args.completion_tokens * 4}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": estimate_tokens(body["messages"][1]["content"]), "completion_tokens": args.completion_tokens}
+        }}}) for custom_id, body in requests]
+        start = time.perf_counter()
+        parse_batch_output(output_lines)
+        parse_s = time.perf_counter() - start
+
+    orchestrator_model = pipeline.model_router.select_model("orchestrator", orchestrator_prompt_tokens // args.deals)[0]
+    orchestrator_cost = estimate_cost(orchestrator_model, orchestrator_prompt_tokens, args.orchestrator_tokens * args.deals) or 0
+    specialist_tokens = [(body["model"], estimate_tokens(body["messages"][0]["content"]) + estimate_tokens(body["messages"][1]["content"]))
+                         for _, body in requests]
+    interactive = sum(estimate_cost(model, tokens, args.completion_tokens) or 0 for model, tokens in specialist_tokens)
+    batch = sum(estimate_cost(model, tokens, args.completion_tokens, batch=True) or 0 for model, tokens in specialist_tokens)
+
+    result = {
+        "deals": args.deals,
+        "requests": len(requests),
+        "prepare_ms_per_deal": round(prepare_s / args.deals * 1000, 2),
+        "batch_file_mb": round(file_mb, 2),
+        "write_ms": round(write_s * 1000, 1),
+        "parse_ms": round(parse_s * 1000, 1),
+        "prompt_tokens_per_deal": sum(tokens for _, tokens in specialist_tokens) // args.deals,
+        "interactive_cost_per_deal_usd": round((interactive + orchestrator_cost) / args.deals, 4),
+        "deferred_cost_per_deal_usd": round((batch + orchestrator_cost) / args.deals, 4),
+    }
+    print(f"{args.deals} deals, {len(requests)} batch requests ({result['batch_file_mb']} MB): "
+          f"prepare {result['prepare_ms_per_deal']} ms/deal, write {result['write_ms']} ms, parse {result['parse_ms']} ms")
+    print(f"{result['prompt_tokens_per_deal']} specialist prompt tokens per deal; cost per deal "
+          f"${result['interactive_cost_per_deal_usd']:.4f} interactive vs ${result['deferred_cost_per_deal_usd']:.4f} deferred "
+          f"(orchestrator stays interactive)")
+
+    if args.history:
+        history_dir = os.path.dirname(args.history)
+        if history_dir:
+            os.makedirs(history_dir, exist_ok=True)
+        with open(args.history, 'a') as f:
+            f.write(json.dumps({"timestamp": datetime.now().isoformat(timespec="seconds"), **result}) + "\n")
+
+
+if __name__ == '__main__':
+    main()
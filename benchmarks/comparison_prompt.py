@@ -0,0 +1,103 @@
+"""
+Size of the portfolio comparison prompt and the local work before its single LLM call.
+
+Builds synthetic stored analyses (facts varied around example_deal.txt, an orchestrator report
+of typical length with recommendation and risk sections) and, for each deal count, reports the
+time to compute the metrics table, rank the deals and build the prompt, and the prompt size
+against the tokens of the deal documents and reports a comparison from scratch would read.
+
+    python benchmarks/comparison_prompt.py
+    python benchmarks/comparison_prompt.py --deals 5 20 50 --report-chars 12000
+    python benchmarks/comparison_prompt.py --history data/comparison_prompt.jsonl
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from deal_facts import extract_deal_facts  # noqa: E402
+from model_router import estimate_tokens  # noqa: E402
+from portfolio_compare import deal_metrics, rank_deals, build_comparison_prompt  # noqa: E402
+
+
+def synthetic_analyses(source, count, report_chars, seed=7):
+    """Stored results of count analysed deals whose facts vary around those of source"""
+    rng = random.Random(seed)
+    base = extract_deal_facts(source)
+    paragraph = "The property shows stable occupancy and in-place rents below market, with moderate rollover risk. "
+    body = (paragraph * (report_chars // len(paragraph) + 1))[:report_chars // 4]
+    report = "\n\n".join(f"{heading}\n{body}" for heading in
+                         ("EXECUTIVE SUMMARY", "FINANCIAL ANALYSIS SUMMARY", "INVESTMENT RECOMMENDATION", "RISK ASSESSMENT"))
+    analyses = []
+    for index in range(count):
+        facts = dict(base)
+        for key in ("price", "noi", "loan_amount", "gross_income", "operating_expenses"):
+            if facts.get(key):
+                facts[key] = facts[key] * rng.uniform(0.6, 1.6)
+        for key in ("irr", "occupancy"):
+            if facts.get(key):
+                facts[key] = min(facts[key] * rng.uniform(0.8, 1.1), 1.0)
+        facts["cap_rate"] = facts["noi"] / facts["price"]
+        facts["ltv"] = facts["loan_amount"] / facts["price"]
+        analyses.append({
+            "report_id": f"report_20250101_{index:06d}",
+            "deal_facts": facts,
+            "deal_content": source,
+            "orchestrator_report": report,
+            "agent_status": {"orchestrator": "completed"},
+            "agents": [],
+        })
+    return analyses
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the portfolio comparison prompt size and local time")
+    parser.add_argument("--deals", type=int, nargs="+", default=[5, 20, 50], help="Deal counts to compare")
+    parser.add_argument("--report-chars", type=int, default=9000, help="Characters per stored orchestrator report")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per deal count (median is reported)")
+    parser.add_argument("--history", help="JSONL file to append results to")
+    args = parser.parse_args()
+
+    with open(os.path.join(REPO_ROOT, "example_deal.txt"), 'r', errors='ignore') as f:
+        source = f.read()
+
+    results = []
+    for count in args.deals:
+        analyses = synthetic_analyses(source, count, args.report_chars)
+        by_id = {results["report_id"]: results for results in analyses}
+        timings = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            ranked = rank_deals([deal_metrics(results) for results in analyses])
+            prompt, excerpt_chars = build_comparison_prompt(ranked, by_id)
+            timings.append(time.perf_counter() - start)
+        from_scratch = sum(estimate_tokens(results["deal_content"]) + estimate_tokens(results["orchestrator_report"])
+                           for results in analyses)
+        result = {"deals": count, "local_ms": round(statistics.median(timings) * 1000, 2),
+                  "prompt_tokens": estimate_tokens(prompt), "excerpt_chars": excerpt_chars,
+                  "documents_tokens": from_scratch}
+        results.append(result)
+        print(f"{count:>4} deals: prompt {result['prompt_tokens']:>6} tokens ({excerpt_chars} chars of conclusion each) "
+              f"vs {from_scratch:>7} tokens of documents and reports; local work {result['local_ms']} ms")
+
+    if args.history:
+        history_dir = os.path.dirname(args.history)
+        if history_dir:
+            os.makedirs(history_dir, exist_ok=True)
+        with open(args.history, 'a') as f:
+            f.write(json.dumps({
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "report_chars": args.report_chars,
+                "results": results
+            }) + "\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+"""
+Bytes-on-the-wire benchmark for the web UI, report downloads and the /analyze response.
+
+Runs the Flask app in-process (test client) from a temporary working directory and measures:
+  - a first visit (index.html and its assets) and a repeat visit, where fingerprinted assets
+    come from the browser cache and the page is revalidated with If-None-Match
+  - downloading the reports of an analysis, and re-downloading them with If-None-Match
+  - the /analyze JSON response of that analysis, rebuilt from its report files
+for each Accept-Encoding the server supports, and models the load time over a given link.
+
+    python benchmarks/http_transfer.py
+    python benchmarks/http_transfer.py --report-id report_20250101_120000 --bandwidth-mbps 5 --rtt-ms 80
+    python benchmarks/http_transfer.py --history data/http_transfer.jsonl
+"""
+import argparse
+import glob
+import gzip
+import json
+import os
+import re
+import sys
+import tempfile
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ASSET_REFERENCE = re.compile(r'(?:href|src)="(/static/[^"]+)"')
+
+
+def wire_bytes(response):
+    """Approximate bytes on the wire: status line, headers and body"""
+    headers = sum(len(key) + len(value) + 4 for key, value in response.headers.items())
+    return len("HTTP/1.1 200 OK\r\n") + headers + 2 + len(response.get_data())
+
+
+def decoded_text(response):
+    """Response body as text, decompressed if needed"""
+    data = response.get_data()
+    encoding = response.headers.get("Content-Encoding")
+    if encoding == "gzip":
+        data = gzip.decompress(data)
+    elif encoding == "br":
+        import brotli
+        data = brotli.decompress(data)
+    return data.decode("utf-8")
+
+
+def cacheable(response):
+    """True when a browser may reuse the response without revalidating it"""
+    return bool(response.cache_control.max_age) and not response.cache_control.no_cache
+
+
+def load_time(waves, bandwidth_mbps, rtt_ms):
+    """Model a page load: each wave of parallel requests costs one round trip plus its transfer time"""
+    return sum((rtt_ms / 1000.0 if count else 0.0) + size * 8 / (bandwidth_mbps * 1e6) for count, size in waves)
+
+
+def measure_visits(client, encoding):
+    """
+    First and repeat visit to the UI.
+
+    Returns:
+        Dictionary with requests and bytes of both visits, and the request waves for load time modelling
+    """
+    headers = {"Accept-Encoding": encoding} if encoding else {}
+    page = client.get("/", headers=headers)
+    assets = {url: client.get(url, headers=headers) for url in ASSET_REFERENCE.findall(decoded_text(page))}
+    first_assets = sum(wire_bytes(response) for response in assets.values())
+
+    repeat_page = client.get("/", headers=dict(headers, **{"If-None-Match": page.headers.get("ETag", "")}))
+    repeat_assets = [
+        client.get(url, headers=dict(headers, **{"If-None-Match": response.headers.get("ETag", "")}))
+        for url, response in assets.items() if not cacheable(response)
+    ]
+    repeat_asset_bytes = sum(wire_bytes(response) for response in repeat_assets)
+    return {
+        "first_visit": {"requests": 1 + len(assets), "bytes": wire_bytes(page) + first_assets,
+                        "waves": [(1, wire_bytes(page)), (len(assets), first_assets)]},
+        "repeat_visit": {"requests": 1 + len(repeat_assets), "bytes": wire_bytes(repeat_page) + repeat_asset_bytes,
+                         "page_status": repeat_page.status_code,
+                         "waves": [(1, wire_bytes(repeat_page)), (len(repeat_assets), repeat_asset_bytes)]},
+    }
+
+
+def measure_reports(client, report_files, encoding):
+    """Download every report of an analysis, then revalidate them"""
+    headers = {"Accept-Encoding": encoding} if encoding else {}
+    downloads = [client.get(f"/reports/{name}", headers=headers) for name in report_files]
+    revalidations = [
+        client.get(f"/reports/{name}", headers=dict(headers, **{"If-None-Match": response.headers.get("ETag", "")}))
+        for name, response in zip(report_files, downloads)
+    ]
+    return {
+        "download_bytes": sum(wire_bytes(response) for response in downloads),
+        "revalidate_bytes": sum(wire_bytes(response) for response in revalidations),
+        "not_modified": sum(1 for response in revalidations if response.status_code == 304),
+    }
+
+
+def measure_analyze_response(web, report_files, reports_dir, encoding):
+    """Size of an /analyze-sized JSON response carrying the analysis' reports"""
+    payload = {"status": "success"}
+    for name in report_files:
+        with open(os.path.join(reports_dir, name), 'r') as f:
+            payload[name] = f.read()
+    headers = {"Accept-Encoding": encoding} if encoding else {}
+    with web.app.test_request_context("/analyze", method="POST", headers=headers):
+        response = web.compressor.compress(web.request, web.jsonify(payload))
+        return wire_bytes(response)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure response sizes and modelled load times with and without compression")
+    parser.add_argument("--reports-dir", default=os.path.join(REPO_ROOT, "reports"), help="Directory with saved reports")
+    parser.add_argument("--report-id", help="Analysis to measure (default: the most recent in --reports-dir)")
+    parser.add_argument("--bandwidth-mbps", type=float, default=10.0, help="Modelled link bandwidth")
+    parser.add_argument("--rtt-ms", type=float, default=50.0, help="Modelled round-trip time")
+    parser.add_argument("--history", help="JSONL file to append results to")
+    args = parser.parse_args()
+
+    reports_dir = os.path.abspath(args.reports_dir)
+    report_id = args.report_id
+    if not report_id:
+        orchestrator_reports = sorted(glob.glob(os.path.join(reports_dir, "report_*_orchestrator.txt")))
+        report_id = os.path.basename(orchestrator_reports[-1])[:-len("_orchestrator.txt")] if orchestrator_reports else None
+    report_files = sorted(os.path.basename(path) for path in glob.glob(os.path.join(reports_dir, f"{report_id}_*.txt"))) if report_id else []
+
+    sys.path.insert(0, REPO_ROOT)
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+        import app as web
+        web.app.config['REPORTS_FOLDER'] = reports_dir
+        client = web.app.test_client()
+        for encoding in [None] + list(reversed(web.compressor.encodings)):
+            label = encoding or "identity"
+            result = measure_visits(client, encoding)
+            for visit in ("first_visit", "repeat_visit"):
+                result[visit]["load_ms"] = round(load_time(result[visit].pop("waves"), args.bandwidth_mbps, args.rtt_ms) * 1000, 1)
+            if report_files:
+                result["reports"] = measure_reports(client, report_files, encoding)
+                result["analyze_response_bytes"] = measure_analyze_response(web, report_files, reports_dir, encoding)
+            results[label] = result
+
+    print(f"Link model: {args.bandwidth_mbps} Mbit/s, {args.rtt_ms} ms RTT"
+          + (f"; reports of {report_id} ({len(report_files)} files)" if report_files else "; no saved reports found"))
+    for label, result in results.items():
+        first, repeat = result["first_visit"], result["repeat_visit"]
+        print(f"{label:<9} first visit {first['bytes']:>8} B in {first['requests']} requests ({first['load_ms']} ms), "
+              f"repeat visit {repeat['bytes']:>6} B in {repeat['requests']} requests ({repeat['load_ms']} ms)")
+        if "reports" in result:
+            reports = result["reports"]
+            print(f"{'':<9} reports {reports['download_bytes']:>8} B, revalidated {reports['revalidate_bytes']} B "
+                  f"({reports['not_modified']} x 304), /analyze response {result['analyze_response_bytes']} B")
+
+    if args.history:
+        history_path = os.path.join(REPO_ROOT, args.history) if not os.path.isabs(args.history) else args.history
+        history_dir = os.path.dirname(history_path)
+        if history_dir:
+            os.makedirs(history_dir, exist_ok=True)
+        with open(history_path, 'a') as f:
+            f.write(json.dumps({
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "bandwidth_mbps": args.bandwidth_mbps,
+                "rtt_ms": args.rtt_ms,
+                "report_id": report_id,
+                "results": results
+            }) + "\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Import-time benchmark for the web app and the agent servers.
+
+Each module is imported in a fresh interpreter (so nothing is cached in sys.modules) from a
+temporary working directory (so the app's folders and databases are not created in the repo).
+Reports the median wall time over several runs and the slowest imports from -X importtime.
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --runs 10 --history data/import_times.jsonl
+    python benchmarks/import_time.py --max-seconds 1.0 app     # exit 1 if app.py is slower
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def benchmark_targets():
+    """Module name and directory for app.py and every agents/*.py server"""
+    targets = [("app", REPO_ROOT)]
+    for path in sorted(glob.glob(os.path.join(REPO_ROOT, "agents", "*.py"))):
+        targets.append((os.path.splitext(os.path.basename(path))[0], os.path.dirname(path)))
+    return targets
+
+
+def time_import(module, module_dir, workdir):
+    """
+    Import a module in a fresh interpreter.
+
+    Returns:
+        Tuple of (wall seconds for the import, list of (cumulative microseconds, nesting depth, module name))
+    """
+    code = (
+        "import sys, time; "
+        f"sys.path.insert(0, {module_dir!r}); "
+        "start = time.perf_counter(); "
+        f"import {module}; "
+        "print(time.perf_counter() - start)"
+    )
+    env = dict(os.environ, OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "benchmark"))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=workdir, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Nesting is shown by indenting the module name two spaces per level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((int(cumulative), depth, name.strip()))
+    return float(result.stdout.strip().splitlines()[-1]), imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start import time of app.py and agents/*.py")
+    parser.add_argument("modules", nargs="*", help="Modules to measure (default: app and every agent)")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreter runs per module")
+    parser.add_argument("--top", type=int, default=5, help="Number of slowest direct imports to list")
+    parser.add_argument("--history", help="JSONL file to append results to, for tracking start-up latency over time")
+    parser.add_argument("--max-seconds", type=float, help="Exit with status 1 when any median exceeds this")
+    args = parser.parse_args()
+
+    targets = [target for target in benchmark_targets() if not args.modules or target[0] in args.modules]
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for module, module_dir in targets:
+            timings = []
+            imports = []
+            for _ in range(args.runs):
+                seconds, imports = time_import(module, module_dir, workdir)
+                timings.append(seconds)
+            # Report the module's direct imports, which include the time of everything they import
+            slowest = sorted((cumulative, name) for cumulative, depth, name in imports if depth == 1)[::-1]
+            results.append({
+                "module": module,
+                "median_s": round(statistics.median(timings), 4),
+                "min_s": round(min(timings), 4),
+                "max_s": round(max(timings), 4),
+                "slowest_imports": [{"module": name, "cumulative_ms": round(us / 1000, 1)} for us, name in slowest[:args.top]]
+            })
+
+    for result in results:
+        print(f"{result['module']:<32} median {result['median_s'] * 1000:8.1f} ms  "
+              f"(min {result['min_s'] * 1000:.1f}, max {result['max_s'] * 1000:.1f})")
+        for item in result["slowest_imports"]:
+            print(f"    {item['cumulative_ms']:8.1f} ms  {item['module']}")
+
+    if args.history:
+        history_dir = os.path.dirname(args.history)
+        if history_dir:
+            os.makedirs(history_dir, exist_ok=True)
+        with open(args.history, 'a') as f:
+            f.write(json.dumps({
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "python": sys.version.split()[0],
+                "runs": args.runs,
+                "results": results
+            }) + "\n")
+
+    if args.max_seconds is not None:
+        slow = [result["module"] for result in results if result["median_s"] > args.max_seconds]
+        if slow:
+            print(f"Import time budget of {args.max_seconds}s exceeded by: {', '.join(slow)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Throughput benchmark for the legal red-flag scanner on multi-MB documents.
+
+Builds documents of the requested sizes by repeating a source document (example_deal.txt by
+default), scans each with LegalScanner and reports the median time, MB/s and hit count. For
+comparison it also times the naive approach of one case-insensitive regex search per
+dictionary term, whose cost grows with the size of the dictionary (on the smaller sizes only).
+
+    python benchmarks/legal_scan.py
+    python benchmarks/legal_scan.py --sizes-mb 1 10 50 --file uploads/big_om.txt --runs 5
+    python benchmarks/legal_scan.py --history data/legal_scan.jsonl
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import time
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from legal_scanner import LegalScanner  # noqa: E402
+
+
+def build_document(source, size_mb):
+    """Repeat the source text until the document reaches size_mb megabytes"""
+    target = int(size_mb * 1024 * 1024)
+    repeats = target // len(source) + 1
+    return (source * repeats)[:target]
+
+
+def naive_scan(scanner, text):
+    """One regex search per term and pattern: the approach the single-pass scanner replaces"""
+    hits = 0
+    for term in scanner.term_categories:
+        hits += sum(1 for _ in re.finditer(r"\b" + r"\s+".join(map(re.escape, term.split(" "))) + r"\b", text, re.IGNORECASE))
+    for entry in scanner.dictionary.values():
+        for pattern in entry.get("patterns", []):
+            hits += sum(1 for _ in re.finditer(pattern, text, re.IGNORECASE))
+    return hits
+
+
+def time_runs(fn, runs):
+    timings = []
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure LegalScanner throughput on large documents")
+    parser.add_argument("--file", default=os.path.join(REPO_ROOT, "example_deal.txt"), help="Source document text")
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=[1, 5, 20], help="Document sizes to scan")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per size (median is reported)")
+    parser.add_argument("--naive-max-mb", type=float, default=5,
+                        help="Largest size to also time the per-term baseline on (it is slow; 0 skips it)")
+    parser.add_argument("--history", help="JSONL file to append results to")
+    args = parser.parse_args()
+
+    with open(args.file, 'r', errors='ignore') as f:
+        source = f.read()
+    scanner = LegalScanner({"enabled": "true"})
+    print(f"Dictionary: {len(scanner.term_categories)} terms, {len(scanner.pattern_categories)} patterns")
+
+    results = []
+    for size_mb in args.sizes_mb:
+        text = build_document(source, size_mb)
+        seconds, (hits, _) = time_runs(lambda: scanner.scan(text), args.runs)
+        result = {
+            "size_mb": size_mb,
+            "scan_s": round(seconds, 4),
+            "scan_mb_per_s": round(size_mb / seconds, 2),
+            "hits": len(hits),
+        }
+        line = f"{size_mb:>6.1f} MB  scan {seconds * 1000:9.1f} ms ({result['scan_mb_per_s']:6.2f} MB/s, {len(hits)} hits)"
+        if size_mb <= args.naive_max_mb:
+            naive_seconds, naive_hits = time_runs(lambda: naive_scan(scanner, text), 1)
+            result.update({"naive_s": round(naive_seconds, 4), "speedup": round(naive_seconds / seconds, 1)})
+            line += f"  per-term regex {naive_seconds * 1000:9.1f} ms ({result['speedup']}x slower)"
+        print(line)
+        results.append(result)
+
+    if args.history:
+        history_dir = os.path.dirname(args.history)
+        if history_dir:
+            os.makedirs(history_dir, exist_ok=True)
+        with open(args.history, 'a') as f:
+            f.write(json.dumps({
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "source": os.path.basename(args.file),
+                "terms": len(scanner.term_categories),
+                "patterns": len(scanner.pattern_categories),
+                "results": results
+            }) + "\n")
+
+
+if __name__ == '__main__':
+    main()
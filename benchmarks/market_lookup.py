@@ -0,0 +1,120 @@
+"""
+Load and lookup benchmark for the local market data store.
+
+Writes a synthetic CSV extract (metros x submarkets x asset classes x quarters) to a temporary
+directory, loads it with MarketDataStore and times lookups of random deal locations, including
+the metro-name and submarket-alias matching done for every deal. It then rewrites the extract and
+reports how long the background watcher takes to swap in the new snapshot.
+
+    python benchmarks/market_lookup.py
+    python benchmarks/market_lookup.py --metros 400 --submarkets 30 --quarters 40 --lookups 50000
+    python benchmarks/market_lookup.py --history data/market_lookup.jsonl
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from market_data import MarketDataStore  # noqa: E402
+
+ASSET_CLASSES = ["Office", "Industrial", "Multifamily", "Retail", "Hotel"]
+
+
+def write_extract(path, metros, submarkets, quarters, seed):
+    """Write a synthetic extract and return the (msa, submarket, asset class) series it contains"""
+    rng = random.Random(seed)
+    series = []
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["MSA", "Submarket", "Property Type", "Quarter", "Asking Rent", "Vacancy",
+                         "Net Absorption", "Deliveries", "Cap Rate"])
+        for metro in range(metros):
+            msa = f"Metro{metro}-Suburb{metro}, TX"
+            for submarket in [f"Submarket {index} (S{index})" for index in range(submarkets)] + ["Total"]:
+                for asset_class in ASSET_CLASSES:
+                    series.append((msa, submarket, asset_class))
+                    for quarter in range(quarters):
+                        writer.writerow([msa, submarket, asset_class, f"{2015 + quarter // 4}Q{quarter % 4 + 1}",
+                                         f"${rng.uniform(15, 60):.2f}", f"{rng.uniform(3, 25):.1f}%",
+                                         f"{rng.randint(-200000, 200000):,}", rng.randint(0, 500000),
+                                         f"{rng.uniform(4, 9):.2f}%"])
+    return series
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure market data load, lookup and reload times")
+    parser.add_argument("--metros", type=int, default=100)
+    parser.add_argument("--submarkets", type=int, default=20, help="Submarkets per metro")
+    parser.add_argument("--quarters", type=int, default=20, help="Quarters of history per series")
+    parser.add_argument("--lookups", type=int, default=20000)
+    parser.add_argument("--history", help="JSONL file to append results to")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        path = os.path.join(data_dir, "extract.csv")
+        series = write_extract(path, args.metros, args.submarkets, args.quarters, seed=1)
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+
+        store = MarketDataStore(data_dir, reload_seconds=0.2)
+        start = time.perf_counter()
+        snapshot = store.snapshot()
+        load_s = time.perf_counter() - start
+
+        # Deals name their metro and submarket differently from the extract, as real documents do
+        rng = random.Random(2)
+        queries = []
+        for _ in range(args.lookups):
+            msa, submarket, asset_class = rng.choice(series)
+            metro = msa.split("-")[0]
+            queries.append((f"{metro}-Other, Texas", submarket.split(" (")[-1].rstrip(")") if "(" in submarket else None,
+                            asset_class.lower().replace("hotel", "hospitality")))
+        timings = []
+        matched = 0
+        for msa, submarket, asset_class in queries:
+            start = time.perf_counter()
+            match = store.lookup(msa, submarket, asset_class)
+            timings.append(time.perf_counter() - start)
+            matched += bool(match["submarket_rows"] or match["metro_rows"])
+        timings.sort()
+
+        write_extract(path + ".tmp", args.metros, args.submarkets, args.quarters, seed=3)
+        os.replace(path + ".tmp", path)
+        start = time.perf_counter()
+        while store.snapshot() is snapshot and time.perf_counter() - start < 60:
+            time.sleep(0.01)
+        reload_s = time.perf_counter() - start
+
+    result = {
+        "rows": snapshot.size,
+        "extract_mb": round(size_mb, 2),
+        "load_s": round(load_s, 3),
+        "lookup_median_us": round(statistics.median(timings) * 1e6, 1),
+        "lookup_p99_us": round(timings[int(len(timings) * 0.99)] * 1e6, 1),
+        "matched": matched,
+        "lookups": len(timings),
+        "reload_s": round(reload_s, 3),
+    }
+    print(f"{result['rows']} rows ({result['extract_mb']} MB CSV) loaded in {result['load_s']} s")
+    print(f"{result['lookups']} lookups: median {result['lookup_median_us']} us, p99 {result['lookup_p99_us']} us, "
+          f"{result['matched']} matched")
+    print(f"Changed extract picked up by the watcher after {result['reload_s']} s")
+
+    if args.history:
+        history_dir = os.path.dirname(args.history)
+        if history_dir:
+            os.makedirs(history_dir, exist_ok=True)
+        with open(args.history, 'a') as f:
+            f.write(json.dumps(dict(result, timestamp=datetime.now().isoformat(timespec="seconds"))) + "\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Extraction time of a multi-file deal package, in this process versus the extraction pool.
+
+Builds a ZIP package of synthetic text PDFs (an OM plus supporting documents) in a temporary
+directory and extracts it with FileProcessor.process_package, once with the pool disabled and
+once per worker count. The first pooled run includes starting the worker processes; the
+reported time is the median of the warm runs.
+
+    python benchmarks/package_extraction.py
+    python benchmarks/package_extraction.py --documents 6 --pages 80 --workers 2 4 --runs 5
+    python benchmarks/package_extraction.py --history data/package_extraction.jsonl
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import file_processor  # noqa: E402
+from file_processor import FileProcessor, build_package  # noqa: E402
+
+DOCUMENT_NAMES = ["Offering Memorandum.pdf", "Rent Roll.pdf", "T-12 Operating Statement.pdf",
+                  "Purchase and Sale Agreement.pdf", "Phase I ESA.pdf", "Title Commitment.pdf"]
+
+
+def make_pdf(title, pages, lines_per_page=45):
+    """A minimal valid PDF with one Helvetica text stream per page"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for page in range(pages):
+        text = "".join(
+            f"({title} page {page + 1} line {line}: net operating income 3,150,000 occupancy 94 percent) Tj 0 -14 Td "
+            for line in range(lines_per_page)
+        )
+        stream = f"BT /F1 9 Tf 40 800 Td {text}ET".encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] /Resources << /Font << /F1 3 0 R >> >> "
+                       b"/Contents %d 0 R >>" % len(objects))
+        page_ids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (" ".join(f"{i} 0 R" for i in page_ids).encode(), pages)
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(output)
+
+
+def time_runs(processor, path, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        processor.process_package(path)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sequential and pooled extraction of a deal package")
+    parser.add_argument("--documents", type=int, default=4, help="PDFs in the package (max %d)" % len(DOCUMENT_NAMES))
+    parser.add_argument("--pages", type=int, default=40, help="Pages per PDF")
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4], help="Pool sizes to compare")
+    parser.add_argument("--runs", type=int, default=3, help="Warm runs per configuration (median is reported)")
+    parser.add_argument("--history", help="JSONL file to append results to")
+    args = parser.parse_args()
+
+    names = DOCUMENT_NAMES[:args.documents]
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = os.path.join(work_dir, "deal_package.zip")
+        with open(path, 'wb') as f:
+            f.write(build_package([(name, make_pdf(name[:-4], args.pages)) for name in names]))
+        print(f"Package: {len(names)} PDFs x {args.pages} pages ({os.path.getsize(path) / 1024 / 1024:.1f} MB), "
+              f"{os.cpu_count()} CPUs")
+
+        processor = FileProcessor()
+        for workers in [1] + args.workers:
+            processor.extract_workers = workers
+            first = time_runs(processor, path, 1)[0]
+            warm = statistics.median(time_runs(processor, path, args.runs))
+            results.append({"workers": workers, "first_s": round(first, 3), "warm_s": round(warm, 3)})
+            label = "in process" if workers == 1 else f"{workers} workers"
+            print(f"{label:<11} first run {first:7.3f} s, warm {warm:7.3f} s"
+                  + (f" ({results[0]['warm_s'] / warm:.1f}x)" if workers > 1 else ""))
+            # A new pool size needs a new pool
+            file_processor._reset_extraction_pool()
+
+    if args.history:
+        history_dir = os.path.dirname(args.history)
+        if history_dir:
+            os.makedirs(history_dir, exist_ok=True)
+        with open(args.history, 'a') as f:
+            f.write(json.dumps({
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "documents": len(names),
+                "pages": args.pages,
+                "cpus": os.cpu_count(),
+                "results": results
+            }) + "\n")
+
+
+if __name__ == '__main__':
+    main()
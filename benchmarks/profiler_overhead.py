@@ -0,0 +1,91 @@
+"""
+Overhead of the request profiler on a CPU-bound part of an analysis.
+
+Extracts a synthetic text PDF with FileProcessor.process_file and normalises the text, without
+the profiler and under request_profiler.SamplingProfiler at each sampling interval, and
+reports the median time of each and the slowdown. Requests that do not ask to be profiled
+never create a profiler, so the first row is also the cost of profiling being available.
+
+    python benchmarks/profiler_overhead.py
+    python benchmarks/profiler_overhead.py --pages 200 --intervals-ms 1 5 20 --runs 7
+    python benchmarks/profiler_overhead.py --history data/profiler_overhead.jsonl
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from file_processor import FileProcessor  # noqa: E402
+from package_extraction import make_pdf  # noqa: E402
+from request_profiler import SamplingProfiler  # noqa: E402
+from text_normalizer import TextNormalizer  # noqa: E402
+
+
+def workload(processor, normalizer, path):
+    return normalizer.normalize(processor.process_file(path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the overhead of the sampling request profiler")
+    parser.add_argument("--pages", type=int, default=100, help="Pages in the synthetic PDF")
+    parser.add_argument("--intervals-ms", type=float, nargs="+", default=[1, 5, 10], help="Sampling intervals")
+    parser.add_argument("--runs", type=int, default=7, help="Runs per configuration (median is reported)")
+    parser.add_argument("--history", help="JSONL file to append results to")
+    args = parser.parse_args()
+
+    processor = FileProcessor()
+    normalizer = TextNormalizer()
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = os.path.join(work_dir, "om.pdf")
+        with open(path, 'wb') as f:
+            f.write(make_pdf("Offering Memorandum", args.pages))
+        workload(processor, normalizer, path)
+
+        # Configurations take turns within each round, so drift in machine speed affects them alike
+        configurations = [None] + args.intervals_ms
+        timings = {interval_ms: [] for interval_ms in configurations}
+        samples = {interval_ms: [] for interval_ms in args.intervals_ms}
+        for _ in range(args.runs):
+            for interval_ms in configurations:
+                start = time.perf_counter()
+                if interval_ms is None:
+                    workload(processor, normalizer, path)
+                else:
+                    with SamplingProfiler(interval=interval_ms / 1000) as profiler:
+                        workload(processor, normalizer, path)
+                    samples[interval_ms].append(profiler.samples)
+                timings[interval_ms].append(time.perf_counter() - start)
+
+    baseline = statistics.median(timings[None])
+    results.append({"interval_ms": None, "seconds": round(baseline, 4)})
+    print(f"not profiled        {baseline * 1000:8.1f} ms")
+    for interval_ms in args.intervals_ms:
+        seconds = statistics.median(timings[interval_ms])
+        overhead = seconds / baseline - 1
+        count = statistics.median(samples[interval_ms])
+        results.append({"interval_ms": interval_ms, "seconds": round(seconds, 4), "overhead": round(overhead, 4),
+                        "samples": count})
+        print(f"every {interval_ms:5.1f} ms       {seconds * 1000:8.1f} ms ({overhead:+.1%}, {count:.0f} samples)")
+
+    if args.history:
+        history_dir = os.path.dirname(args.history)
+        if history_dir:
+            os.makedirs(history_dir, exist_ok=True)
+        with open(args.history, 'a') as f:
+            f.write(json.dumps({
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "pages": args.pages,
+                "results": results
+            }) + "\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+Time and peak memory of spreadsheet ingestion for large rent rolls.
+
+Writes a synthetic multifamily rent roll of the requested sizes as CSV and as XLSX (plus a T-12
+sheet in the workbook) to a temporary directory, then summarises each file with
+spreadsheet_ingest.summarize_spreadsheet. Peak memory is the tracemalloc peak of a second run;
+rows are streamed into typed arrays, so it grows by tens of bytes per unit rather than with the
+file or a list of row objects.
+
+    python benchmarks/rent_roll_ingest.py
+    python benchmarks/rent_roll_ingest.py --rows 10000 100000 --show-summary
+    python benchmarks/rent_roll_ingest.py --history data/rent_roll_ingest.jsonl
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from spreadsheet_ingest import summarize_spreadsheet  # noqa: E402
+
+HEADER = ["Unit", "Unit Type", "SF", "Tenant", "Status", "Current Rent", "Market Rent", "Lease End"]
+UNIT_TYPES = [("1BR/1BA", 720, 1450), ("2BR/2BA", 1050, 1900), ("3BR/2BA", 1300, 2400), ("Studio", 520, 1150)]
+T12_LINES = [("Income", None), ("Gross Potential Rent", 520000), ("Vacancy Loss", -26000), ("Other Income", 18000),
+             ("Total Income", 512000), ("Operating Expenses", None), ("Payroll", 60000), ("Repairs & Maintenance", 35000),
+             ("Utilities", 42000), ("Real Estate Taxes", 70000), ("Insurance", 18000), ("Total Operating Expenses", 225000),
+             ("Net Operating Income", 287000)]
+
+
+def rent_roll_rows(count, seed=1):
+    rng = random.Random(seed)
+    for index in range(count):
+        unit_type, sf, rent = rng.choice(UNIT_TYPES)
+        vacant = rng.random() < 0.06
+        market = rent * rng.uniform(1.0, 1.1)
+        yield [f"{index + 100}", unit_type, sf, "" if vacant else f"Resident {index}", "Vacant" if vacant else "Occupied",
+               "" if vacant else f"${rent * rng.uniform(0.9, 1.02):,.2f}", f"${market:,.2f}",
+               "" if vacant else f"{rng.randint(1, 12)}/{rng.randint(1, 28)}/{rng.randint(2025, 2028)}"]
+
+
+def write_csv(path, count):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(rent_roll_rows(count))
+        writer.writerow(["Total", "", "", "", "", "", "", ""])
+
+
+def _cell(reference, value):
+    if isinstance(value, (int, float)):
+        return f'<c r="{reference}"><v>{value}</v></c>'
+    return f'<c r="{reference}" t="inlineStr"><is><t>{escape(str(value))}</t></is></c>'
+
+
+def _sheet_xml(rows):
+    yield '<?xml version="1.0" encoding="UTF-8"?><worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+    for number, row in enumerate(rows, 1):
+        cells = "".join(_cell(f"{chr(65 + column)}{number}", value) for column, value in enumerate(row) if value != "")
+        yield f'<row r="{number}">{cells}</row>'
+    yield '</sheetData></worksheet>'
+
+
+def write_xlsx(path, count):
+    """A minimal workbook (inline strings, no styles) with a rent roll and a T-12 sheet"""
+    months = [f"{name} 2025" for name in ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")]
+    t12 = [["T-12 Operating Statement"], [], ["Line Item"] + months + ["Total"]]
+    for label, annual in T12_LINES:
+        t12.append([label] + ([] if annual is None else [round(annual / 12, 2)] * 12 + [annual]))
+    sheets = [("Rent Roll", [HEADER] + list(rent_roll_rows(count))), ("T-12", t12)]
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as package:
+        package.writestr("[Content_Types].xml", '<?xml version="1.0"?><Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                         '<Default Extension="xml" ContentType="application/xml"/></Types>')
+        package.writestr("xl/workbook.xml", '<?xml version="1.0"?><workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+                         'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><sheets>'
+                         + "".join(f'<sheet name="{name}" sheetId="{index}" r:id="rId{index}"/>' for index, (name, _) in enumerate(sheets, 1))
+                         + '</sheets></workbook>')
+        package.writestr("xl/_rels/workbook.xml.rels", '<?xml version="1.0"?><Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                         + "".join(f'<Relationship Id="rId{index}" Target="worksheets/sheet{index}.xml"/>' for index in range(1, len(sheets) + 1))
+                         + '</Relationships>')
+        for index, (_, rows) in enumerate(sheets, 1):
+            package.writestr(f"xl/worksheets/sheet{index}.xml", "".join(_sheet_xml(rows)))
+
+
+def measure(path):
+    """Wall time of an untraced run, then the tracemalloc peak of a second run (tracing slows parsing down)"""
+    start = time.perf_counter()
+    summary = summarize_spreadsheet(path)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    summarize_spreadsheet(path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure spreadsheet ingestion time and memory for large rent rolls")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000], help="Rent roll sizes")
+    parser.add_argument("--show-summary", action="store_true", help="Print the summary of the largest workbook")
+    parser.add_argument("--history", help="JSONL file to append results to")
+    args = parser.parse_args()
+
+    results = []
+    summary = ""
+    with tempfile.TemporaryDirectory() as work_dir:
+        for count in args.rows:
+            for kind, writer in (("csv", write_csv), ("xlsx", write_xlsx)):
+                path = os.path.join(work_dir, f"rent_roll_{count}.{kind}")
+                writer(path, count)
+                elapsed, peak, summary = measure(path)
+                result = {"rows": count, "format": kind, "file_mb": round(os.path.getsize(path) / 1024 / 1024, 2),
+                          "seconds": round(elapsed, 3), "rows_per_s": round(count / elapsed),
+                          "peak_mb": round(peak / 1024 / 1024, 1), "summary_chars": len(summary)}
+                results.append(result)
+                print(f"{count:>7} rows {kind:<4} ({result['file_mb']:6.2f} MB): {elapsed:6.2f} s, "
+                      f"{result['rows_per_s']:>8} rows/s, peak {result['peak_mb']:5.1f} MB, summary {len(summary)} chars")
+    if args.show_summary:
+        print()
+        print(summary)
+
+    if args.history:
+        history_dir = os.path.dirname(args.history)
+        if history_dir:
+            os.makedirs(history_dir, exist_ok=True)
+        with open(args.history, 'a') as f:
+            f.write(json.dumps({"timestamp": datetime.now().isoformat(timespec="seconds"), "results": results}) + "\n")
+
+
+if __name__ == '__main__':
+    main()
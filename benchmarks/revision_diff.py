@@ -0,0 +1,109 @@
+"""
+LLM calls saved and planning time when a revised version of a deal is uploaded.
+
+Applies typical sponsor revisions to example_deal.txt (a price cut, updated occupancy, new
+financing terms, an added environmental finding, a rewritten market section) and reports for
+each the specialists that InvestmentAnalysisPipeline would re-run, the LLM calls saved against a
+full analysis, and the time deal_revision.plan_reanalysis takes on a document of --deal-kb. The
+generated context (comparables, market data, legal scan) is held fixed, so only the document
+diff decides.
+
+    python benchmarks/revision_diff.py
+    python benchmarks/revision_diff.py --agents all --deal-kb 400
+    python benchmarks/revision_diff.py --history data/revision_diff.jsonl
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from agent_registry import get_agent_specs  # noqa: E402
+from deal_facts import extract_deal_facts  # noqa: E402
+from deal_revision import plan_reanalysis  # noqa: E402
+
+REVISIONS = {
+    "price cut": [("Asking Price: $45,000,000", "Asking Price: $42,500,000"),
+                  ("- Purchase Price: $45,000,000", "- Purchase Price: $42,500,000")],
+    "occupancy update": [("- Total Occupancy: 92% (230,000 SF occupied)", "- Total Occupancy: 88% (220,000 SF occupied)")],
+    "new loan terms": [("FINANCING STRUCTURE\n", "FINANCING STRUCTURE\n- Lender: Regional bank, 5-year term, 2 years interest only\n")],
+    "environmental finding": [("DUE DILIGENCE STATUS\n", "DUE DILIGENCE STATUS\n- Phase II ESA recommended after a recognized environmental condition was found\n")],
+    "market rewrite": [("MARKET CONDITIONS\n", "MARKET CONDITIONS\n- Submarket vacancy rose to 14% with 1.2M SF of new supply under construction\n"
+                                              "- Rent growth slowed to 1.5% year over year\n")],
+}
+
+
+def revise(text, replacements):
+    for old, new in replacements:
+        if old not in text:
+            raise ValueError(f"example_deal.txt no longer contains {old!r}")
+        text = text.replace(old, new, 1)
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure which agents re-run for typical deal revisions")
+    parser.add_argument("--agents", help="ENABLED_AGENTS value (default: the configured agents)")
+    parser.add_argument("--deal-kb", type=int, default=200, help="Document size for the planning time (example text repeated)")
+    parser.add_argument("--runs", type=int, default=5, help="Timed runs per revision (median is reported)")
+    parser.add_argument("--history", help="JSONL file to append results to")
+    args = parser.parse_args()
+
+    with open(os.path.join(REPO_ROOT, "example_deal.txt"), 'r', errors='ignore') as f:
+        source = f.read()
+    specs = get_agent_specs(args.agents)
+    context = {key: "" for spec in specs for key in spec.context_inputs}
+    repeats = max(args.deal_kb * 1024 // len(source), 1)
+    full_calls = len(specs) + 1
+
+    results = []
+    for name, replacements in REVISIONS.items():
+        revised = revise(source, replacements)
+        previous = {
+            "report_id": "report_20250101_000000",
+            "deal_content": source,
+            "deal_facts": extract_deal_facts(source),
+            "agent_status": {spec.agent_id: "completed" for spec in specs},
+            "stage_context": context,
+            **{spec.result_key: "report" for spec in specs},
+        }
+        revision = plan_reanalysis(previous, revised, extract_deal_facts(revised), context, specs)
+        rerun = [agent_id for agent_id, agent in revision["agents"].items() if agent["rerun"]]
+
+        # Planning time on a large document: the revision repeated through the whole text
+        previous_large = dict(previous, deal_content="\n\n".join([source] * repeats))
+        revised_large = "\n\n".join([revised] * repeats)
+        timings = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            plan_reanalysis(previous_large, revised_large, previous["deal_facts"], context, specs)
+            timings.append(time.perf_counter() - start)
+
+        calls = len(rerun) + 1
+        results.append({"revision": name, "rerun": rerun, "llm_calls": calls, "full_llm_calls": full_calls,
+                        "saved": round(1 - calls / full_calls, 3), "topics": revision["changed_topics"],
+                        "plan_ms": round(statistics.median(timings) * 1000, 2)})
+        print(f"{name:<22} {calls}/{full_calls} LLM calls ({1 - calls / full_calls:.0%} saved), "
+              f"re-run: {', '.join(rerun) or 'none'} [{', '.join(revision['changed_topics'])}]; "
+              f"plan {statistics.median(timings) * 1000:.1f} ms at {len(revised_large) // 1024} KB")
+
+    if args.history:
+        history_dir = os.path.dirname(args.history)
+        if history_dir:
+            os.makedirs(history_dir, exist_ok=True)
+        with open(args.history, 'a') as f:
+            f.write(json.dumps({
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "agents": [spec.agent_id for spec in specs],
+                "deal_kb": args.deal_kb,
+                "results": results
+            }) + "\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Cost of persisting and loading the stage inputs and outputs of an analysis.
+
+Stores synthetic analyses (deal text built from example_deal.txt, a routed excerpt and prompt
+per specialist, reports of typical length) in a temporary StageStore and reports the time to
+save, load and record a re-run, and the stored bytes per analysis against the raw text size.
+The repeated sample text compresses far better than real documents, so treat the stored size
+as a lower bound.
+
+    python benchmarks/stage_store_io.py
+    python benchmarks/stage_store_io.py --analyses 500 --deal-kb 400
+    python benchmarks/stage_store_io.py --history data/stage_store_io.jsonl
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from agent_registry import get_agent_specs  # noqa: E402
+from stage_store import StageStore  # noqa: E402
+
+
+def synthetic_results(source, deal_kb, report_chars):
+    """Results shaped like InvestmentAnalysisPipeline.analyze output for a deal of deal_kb kilobytes"""
+    deal_content = (source * (deal_kb * 1024 // len(source) + 1))[:deal_kb * 1024]
+    specs = get_agent_specs()
+    report = ("The property shows stable occupancy and in-place rents below market. " * 100)[:report_chars]
+    agent_documents = {spec.agent_id: deal_content[:len(deal_content) // 3] for spec in specs}
+    results = {spec.result_key: f"{spec.title}: {report}" for spec in specs}
+    results.update({
+        "orchestrator_report": report,
+        "deal_content": deal_content,
+        "deal_facts": {"price": 52000000, "noi": 3150000, "cap_rate": 6.06},
+        "agents": [{"id": spec.agent_id, "result_key": spec.result_key, "report_suffix": spec.report_suffix} for spec in specs],
+        "agent_status": {**{spec.agent_id: "completed" for spec in specs}, "orchestrator": "completed"},
+        "agent_timings": {spec.agent_id: 21.5 for spec in specs},
+        "stage_context": {"deal_content": deal_content, "agent_documents": agent_documents,
+                          "comparables_context": "", "market_data_context": "", "legal_findings_context": ""},
+        "stage_inputs": {
+            **{spec.agent_id: {"system_prompt": spec.system_prompt, "model": "gpt-4o-mini",
+                               "user_prompt": f"{spec.task}\n\n{agent_documents[spec.agent_id]}\n\n{spec.closing}"} for spec in specs},
+            "orchestrator": {"system_prompt": "You are a senior investment analyst.", "model": "gpt-4o",
+                             "user_prompt": deal_content + "".join(results[spec.result_key] for spec in specs)}
+        }
+    })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure StageStore save and load times and storage size")
+    parser.add_argument("--analyses", type=int, default=100, help="Analyses to store")
+    parser.add_argument("--deal-kb", type=int, default=150, help="Extracted deal text per analysis")
+    parser.add_argument("--report-chars", type=int, default=6000, help="Characters per agent report")
+    parser.add_argument("--history", help="JSONL file to append results to")
+    args = parser.parse_args()
+
+    with open(os.path.join(REPO_ROOT, "example_deal.txt"), 'r', errors='ignore') as f:
+        source = f.read()
+    results = synthetic_results(source, args.deal_kb, args.report_chars)
+    raw_bytes = len(json.dumps(results).encode("utf-8"))
+
+    saves, loads, reruns = [], [], []
+    with tempfile.TemporaryDirectory() as work_dir:
+        store = StageStore(os.path.join(work_dir, "stages.db"))
+        for index in range(args.analyses):
+            report_id = f"report_20250101_{index:06d}"
+            start = time.perf_counter()
+            store.save(report_id, results)
+            saves.append(time.perf_counter() - start)
+        for report_id in store.report_ids():
+            start = time.perf_counter()
+            stored = store.load(report_id)
+            loads.append(time.perf_counter() - start)
+            stored["rerun"] = {"stages": ["orchestrator"], "reused": [], "stale": [], "elapsed_s": 0.0}
+            start = time.perf_counter()
+            store.save(report_id, stored)
+            reruns.append(time.perf_counter() - start)
+        db_bytes = sum(os.path.getsize(os.path.join(work_dir, name)) for name in os.listdir(work_dir))
+
+    result = {
+        "analyses": args.analyses,
+        "deal_kb": args.deal_kb,
+        "raw_kb_per_analysis": round(raw_bytes / 1024, 1),
+        "stored_kb_per_analysis": round(db_bytes / args.analyses / 1024, 1),
+        "save_ms": round(statistics.median(saves) * 1000, 2),
+        "load_ms": round(statistics.median(loads) * 1000, 2),
+        "rerun_save_ms": round(statistics.median(reruns) * 1000, 2),
+    }
+    print(f"{args.analyses} analyses of {args.deal_kb} KB deal text: {result['raw_kb_per_analysis']} KB of results each, "
+          f"{result['stored_kb_per_analysis']} KB stored (incl. one re-run)")
+    print(f"save {result['save_ms']} ms, load {result['load_ms']} ms, record re-run {result['rerun_save_ms']} ms (medians)")
+
+    if args.history:
+        history_dir = os.path.dirname(args.history)
+        if history_dir:
+            os.makedirs(history_dir, exist_ok=True)
+        with open(args.history, 'a') as f:
+            f.write(json.dumps({"timestamp": datetime.now().isoformat(timespec="seconds"), **result}) + "\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Analyse many deal documents in one run, e.g. an overnight screening of a deal flow export.
+
+By default the specialist requests of all deals go through a batch API (deferred mode, see
+InvestmentAnalysisPipeline.analyze_deferred): cheaper and outside the interactive rate limits,
+but results arrive within the batch completion window instead of minutes. --interactive runs the
+same deals through the normal pipeline instead, so throughput and cost can be compared.
+
+    python bulk_analyze.py deals/*.pdf
+    python bulk_analyze.py deals/*.pdf --backend local --poll-seconds 5
+    python bulk_analyze.py deals/*.pdf --interactive --workers 4
+    python bulk_analyze.py deals/*.pdf --history data/bulk_runs.jsonl
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import report_storage as storage
+from batch_backend import get_batch_backend, estimate_cost
+from investment_pipeline import InvestmentAnalysisPipeline
+from werkzeug.utils import secure_filename
+
+
+def store_upload(path):
+    """Copy a document into the uploads folder under a new report id, as /analyze does"""
+    return storage.save_upload(secure_filename(os.path.basename(path)), source_path=path)
+
+
+def save_result(report_id, results, error):
+    if error:
+        print(f"{report_id}: FAILED ({error})")
+        return
+    storage.save_reports(report_id, results)
+    status = "screened out" if results.get("screen") and not results["screen"]["passed"] else \
+        ("partial" if results["partial"] else "complete")
+    print(f"{report_id}: {status}")
+
+
+def run_deferred(uploads, args):
+    pipeline = InvestmentAnalysisPipeline(similarity_index=storage.similarity_index, tenant=args.tenant, priority="batch")
+    report_ids = {filepath: report_id for report_id, filepath in uploads}
+    backend = get_batch_backend(pipeline.client, args.backend)
+    _, stats = pipeline.analyze_deferred(
+        [filepath for _, filepath in uploads],
+        backend=backend,
+        poll_seconds=args.poll_seconds,
+        max_wait_seconds=args.max_wait_seconds,
+        on_result=lambda filepath, results, error: save_result(report_ids[filepath], results, error)
+    )
+    return stats
+
+
+def run_interactive(uploads, args):
+    start = time.monotonic()
+
+    def analyze(upload):
+        report_id, filepath = upload
+        pipeline = InvestmentAnalysisPipeline(similarity_index=storage.similarity_index, tenant=args.tenant, priority="batch")
+        try:
+            results = pipeline.analyze(filepath)
+        except Exception as e:
+            save_result(report_id, None, str(e))
+            return None
+        save_result(report_id, results, None)
+        return results
+
+    with ThreadPoolExecutor(max_workers=max(args.workers, 1)) as executor:
+        outcomes = list(executor.map(analyze, uploads))
+    wall_s = time.monotonic() - start
+    completed = [results for results in outcomes if results is not None and "stage_context" in results]
+    calls = [call for results in completed for call in results["model_usage"]["calls"]]
+    cost = sum(estimate_cost(call["model"], call["prompt_tokens"], call["completion_tokens"]) or 0 for call in calls)
+    return {
+        "deals": len(uploads),
+        "analysed": len(completed),
+        "screened_out": sum(1 for results in outcomes if results is not None and "stage_context" not in results),
+        "failed": sum(1 for results in outcomes if results is None),
+        "wall_s": round(wall_s, 3),
+        "deals_per_hour": round(len(uploads) / wall_s * 3600, 1) if wall_s else None,
+        "interactive_calls": len(calls),
+        "cost_usd": round(cost, 4),
+        "cost_per_deal_usd": round(cost / len(completed), 4) if completed else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyse many deal documents in one deferred (batch) or interactive run")
+    parser.add_argument("files", nargs="+", help="Deal documents or ZIP deal packages")
+    parser.add_argument("--interactive", action="store_true", help="Run through the interactive pipeline instead of batches")
+    parser.add_argument("--backend", help="Batch backend: openai or local (default BATCH_BACKEND, openai)")
+    parser.add_argument("--poll-seconds", type=float, help="Seconds between batch status checks (default BATCH_POLL_SECONDS, 30)")
+    parser.add_argument("--max-wait-seconds", type=float,
+                        help="Retry a batch's unfinished requests interactively after this long (default: wait until it ends)")
+    parser.add_argument("--workers", type=int, default=4, help="Deals analysed concurrently with --interactive")
+    parser.add_argument("--tenant", default="default", help="Tenant the LLM calls are scheduled for")
+    parser.add_argument("--history", help="JSONL file to append the run statistics to")
+    args = parser.parse_args()
+
+    missing = [path for path in args.files if not os.path.isfile(path)]
+    if missing:
+        parser.error(f"Not found: {', '.join(missing)}")
+    uploads = [store_upload(path) for path in args.files]
+
+    stats = run_interactive(uploads, args) if args.interactive else run_deferred(uploads, args)
+    stats["mode"] = "interactive" if args.interactive else "deferred"
+    print(f"{stats['mode']}: {stats['analysed']} of {stats['deals']} deals analysed in {stats['wall_s']:.1f}s "
+          f"({stats['deals_per_hour']} deals/hour), ${stats['cost_usd']:.4f} "
+          f"(${stats['cost_per_deal_usd'] or 0:.4f} per deal)"
+          + (f", ${stats['interactive_cost_per_deal_usd'] or 0:.4f} per deal at interactive prices"
+             if "interactive_cost_per_deal_usd" in stats else ""))
+
+    if args.history:
+        history_dir = os.path.dirname(args.history)
+        if history_dir:
+            os.makedirs(history_dir, exist_ok=True)
+        with open(args.history, 'a') as f:
+            f.write(json.dumps({"timestamp": datetime.now().isoformat(timespec="seconds"), **stats}) + "\n")
+    if stats["failed"]:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
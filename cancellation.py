@@ -0,0 +1,186 @@
+import select
+import socket
+import threading
+
+
+class CancelledError(Exception):
+    """Raised inside the pipeline when the request it is working for has been cancelled"""
+    pass
+
+
+class CancelToken:
+    """
+    Cancellation flag shared by everything working on one analysis.
+
+    Long running operations either poll cancelled / raise_if_cancelled() or register a
+    callback with on_cancel() that aborts them (e.g. closing an OpenAI response stream).
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self.reason = None
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self, reason="cancelled"):
+        """Cancel the work and run the registered abort callbacks once"""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Warning: Cancellation callback failed: {e}")
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise CancelledError(self.reason)
+
+    def wait(self, timeout=None):
+        """Block until cancelled or the timeout passes; returns True when cancelled"""
+        return self._event.wait(timeout)
+
+    def on_cancel(self, callback):
+        """
+        Register a callback to run on cancellation (immediately if already cancelled).
+
+        Returns:
+            Function that unregisters the callback
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                registered = True
+            else:
+                registered = False
+        if not registered:
+            callback()
+            return lambda: None
+
+        def unregister():
+            with self._lock:
+                if callback in self._callbacks:
+                    self._callbacks.remove(callback)
+        return unregister
+
+
+class CancellationRegistry:
+    """
+    Tracks the cancel token of every running /analyze request by request id.
+
+    Requests coalesced onto the same execution (see request_dedup.SingleFlight) share one token,
+    which is only cancelled once every request waiting on it has been cancelled or disconnected.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens = {}
+        self._requests = {}
+
+    def register(self, request_id, execution_key):
+        """
+        Attach a request to the token of an execution, creating the token for the first request.
+
+        Returns:
+            CancelToken for the execution
+        """
+        with self._lock:
+            entry = self._tokens.get(execution_key)
+            if entry is None or entry["token"].cancelled:
+                entry = {"token": CancelToken(), "requests": set()}
+                self._tokens[execution_key] = entry
+            entry["requests"].add(request_id)
+            self._requests[request_id] = execution_key
+            return entry["token"]
+
+    def cancel(self, request_id, reason="cancelled by client"):
+        """
+        Withdraw a request; cancels the execution when no other request is waiting on it.
+
+        Returns:
+            False if the request id is unknown (already finished or never started)
+        """
+        with self._lock:
+            execution_key = self._requests.pop(request_id, None)
+            if execution_key is None:
+                return False
+            entry = self._tokens[execution_key]
+            entry["requests"].discard(request_id)
+            remaining = len(entry["requests"])
+            if not remaining:
+                del self._tokens[execution_key]
+        if remaining:
+            print(f"Request {request_id} withdrawn; {remaining} other request(s) still waiting on the analysis")
+        else:
+            print(f"Cancelling analysis for request {request_id}: {reason}")
+            entry["token"].cancel(reason)
+        return True
+
+    def release(self, request_id):
+        """Forget a request that has finished"""
+        with self._lock:
+            execution_key = self._requests.pop(request_id, None)
+            if execution_key is None:
+                return
+            entry = self._tokens.get(execution_key)
+            if entry:
+                entry["requests"].discard(request_id)
+                if not entry["requests"]:
+                    del self._tokens[execution_key]
+
+
+def client_socket(environ):
+    """The client connection of a WSGI request, when the server exposes it (werkzeug, gunicorn)"""
+    for key in ("werkzeug.socket", "gunicorn.socket"):
+        sock = environ.get(key)
+        if sock is not None:
+            return sock
+    return None
+
+
+def client_disconnected(sock):
+    """True when the peer has closed the connection (a readable socket with nothing to read)"""
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+        if not readable:
+            return False
+        return sock.recv(1, socket.MSG_PEEK) == b""
+    except (OSError, ValueError):
+        return True
+
+
+class DisconnectWatcher:
+    """
+    Polls the client connection of a running request in the background and calls
+    on_disconnect when the client goes away (tab closed, request aborted, proxy timeout).
+    Does nothing when the WSGI server does not expose the socket.
+    """
+
+    def __init__(self, environ, on_disconnect, interval=1.0):
+        self.sock = client_socket(environ)
+        self.on_disconnect = on_disconnect
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        if self.sock is not None:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if client_disconnected(self.sock):
+                self.on_disconnect()
+                return
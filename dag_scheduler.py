@@ -0,0 +1,303 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from cancellation import CancelledError
+
+# Node states that produced a usable report ("resumed" nodes were completed by an earlier attempt,
+# "reused" ones are stored outputs kept by a stage re-run)
+SUCCESS_STATES = ("completed", "cached", "resumed", "reused")
+
+
+class NodeCache:
+    """
+    Cache of agent reports keyed by a hash of the agent, its prompts and the model settings.
+    Entries are kept in a small in-memory LRU and, when cache_dir is set, as files on disk so
+    they survive restarts and are shared between worker processes.
+    """
+
+    def __init__(self, cache_dir=None, max_entries=256):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key(self, agent_id, system_prompt, user_prompt, variant=""):
+        digest = hashlib.sha256()
+        for part in (agent_id, variant, system_prompt, user_prompt):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        if self.cache_dir:
+            path = os.path.join(self.cache_dir, f"{key}.txt")
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    value = f.read()
+                self._remember(key, value)
+                return value
+        return None
+
+    def set(self, key, value):
+        self._remember(key, value)
+        if self.cache_dir:
+            # Write to a temporary file first so readers never see a partial report
+            path = os.path.join(self.cache_dir, f"{key}.txt")
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(value)
+            os.replace(tmp_path, path)
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class DAGScheduler:
+    """
+    Executes agent specs (see agent_registry.AgentSpec) as a dependency graph.
+
+    Every agent starts as soon as all the agents it depends on have finished, so independent
+    agents run in parallel and the total latency is the longest dependency chain rather than
+    the sum of all agents. Each node can be served from a NodeCache and has its own timeout;
+    when a dependency fails or times out, dependents still run without that report.
+    """
+
+    def __init__(self, specs, run_node, cache=None, cache_variant="", default_timeout=None):
+        """
+        Args:
+            specs: List of AgentSpec in report order
+            run_node: Callable(spec, user_prompt, timeout) returning the report text
+            cache: Optional NodeCache
+            cache_variant: String mixed into cache keys (e.g. the model routing settings)
+            default_timeout: Per-node timeout in seconds for specs that do not set one
+        """
+        self.specs = list(specs)
+        self.run_node = run_node
+        self.cache = cache
+        self.cache_variant = cache_variant
+        self.default_timeout = default_timeout
+        # User prompt each node was run (or looked up in the cache) with, by agent id
+        self.user_prompts = {}
+        # Aborted calls get this long to unwind, so the tokens they used are recorded before run() returns
+        self.cancel_grace_seconds = float(os.environ.get("CANCEL_GRACE_SECONDS", 2))
+        self._validate()
+
+    def _validate(self):
+        """Reject unknown dependencies and cycles before anything is scheduled"""
+        specs_by_id = {spec.agent_id: spec for spec in self.specs}
+        for spec in self.specs:
+            for dependency in spec.depends_on:
+                if dependency not in specs_by_id:
+                    raise ValueError(f"Agent '{spec.agent_id}' depends on '{dependency}', which is not enabled")
+
+        visiting, visited = set(), set()
+
+        def visit(agent_id, path):
+            if agent_id in visited:
+                return
+            if agent_id in visiting:
+                raise ValueError(f"Agent dependency cycle: {' -> '.join(path + [agent_id])}")
+            visiting.add(agent_id)
+            for dependency in specs_by_id[agent_id].depends_on:
+                visit(dependency, path + [agent_id])
+            visiting.discard(agent_id)
+            visited.add(agent_id)
+
+        for spec in self.specs:
+            visit(spec.agent_id, [])
+
+    def _node_timeout(self, spec):
+        timeout = spec.timeout or os.environ.get(f"AGENT_TIMEOUT_{spec.agent_id.upper()}") or self.default_timeout
+        return float(timeout) if timeout else None
+
+    def run(self, context, deadline_at=None, on_late_result=None, precomputed=None, on_node_complete=None,
+            cancel_token=None):
+        """
+        Run every node of the graph.
+
+        Args:
+            context: Pipeline context passed to AgentSpec.build_prompt (deal_content, ...)
+            deadline_at: time.monotonic() value after which no node is started or waited for
+            on_late_result: Optional callback(agent_id, report) for nodes that finish after timing out
+            precomputed: Optional reports by agent id from an earlier attempt; these nodes are not run again
+            on_node_complete: Optional callback(agent_id, status, report, elapsed) for every node that
+                produced a report in this run, e.g. to persist stage results
+            cancel_token: Optional cancellation.CancelToken; once cancelled no further node is started,
+                running nodes are abandoned and every unfinished node is marked "cancelled"
+
+        Returns:
+            Tuple of (reports by agent id, status by agent id, elapsed seconds by agent id)
+        """
+        reports, status, timings = {}, {}, {}
+        remaining = OrderedDict((spec.agent_id, spec) for spec in self.specs)
+        running = {}
+        executor = ThreadPoolExecutor(max_workers=max(len(self.specs), 1), thread_name_prefix="agent")
+
+        try:
+            while remaining or running:
+                if cancel_token is not None and cancel_token.cancelled:
+                    self._cancel_nodes(remaining, running, reports, status, timings)
+                    break
+                self._start_ready_nodes(context, remaining, running, reports, status, timings, deadline_at, executor,
+                                        precomputed or {}, on_node_complete)
+                if not running:
+                    continue
+
+                now = time.monotonic()
+                limits = [node_deadline for _, _, node_deadline, _ in running.values() if node_deadline]
+                if deadline_at:
+                    limits.append(deadline_at)
+                wait_timeout = max(min(limits) - now, 0) if limits else None
+                if cancel_token is not None:
+                    # Wake up regularly to notice cancellation
+                    wait_timeout = min(wait_timeout, 0.25) if wait_timeout is not None else 0.25
+                done, _ = wait(running, timeout=wait_timeout, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    spec, started, _, cache_key = running.pop(future)
+                    timings[spec.agent_id] = round(time.monotonic() - started, 3)
+                    try:
+                        reports[spec.agent_id] = future.result()
+                        status[spec.agent_id] = "completed"
+                        if self.cache and cache_key:
+                            self.cache.set(cache_key, reports[spec.agent_id])
+                        self._notify(on_node_complete, spec, "completed", reports[spec.agent_id], timings[spec.agent_id])
+                    except CancelledError:
+                        reports[spec.agent_id] = f"CANCELLED: The {spec.title} agent was cancelled."
+                        status[spec.agent_id] = "cancelled"
+                    except Exception as e:
+                        print(f"Warning: {spec.title} Agent failed: {e}")
+                        reports[spec.agent_id] = f"FAILED: The {spec.title} agent could not complete ({e})."
+                        status[spec.agent_id] = "failed"
+
+                now = time.monotonic()
+                for future, (spec, started, node_deadline, cache_key) in list(running.items()):
+                    overall_expired = deadline_at is not None and now >= deadline_at
+                    if (node_deadline and now >= node_deadline) or overall_expired:
+                        running.pop(future)
+                        print(f"Warning: {spec.title} Agent timed out")
+                        timings[spec.agent_id] = round(now - started, 3)
+                        reports[spec.agent_id] = f"TIMED OUT: The {spec.title} agent did not finish within the request deadline. Its report will be saved when it completes."
+                        status[spec.agent_id] = "timed_out"
+                        future.add_done_callback(self._late_result_callback(spec, cache_key, on_late_result, on_node_complete))
+        finally:
+            # Do not block on timed out nodes; their threads finish in the background
+            executor.shutdown(wait=False)
+
+        return reports, status, timings
+
+    def _start_ready_nodes(self, context, remaining, running, reports, status, timings, deadline_at, executor,
+                           precomputed, on_node_complete):
+        """Start (or serve from an earlier attempt or the cache) every node whose dependencies have all finished"""
+        progress = True
+        while progress:
+            progress = False
+            for agent_id, spec in list(remaining.items()):
+                if any(dependency not in status for dependency in spec.depends_on):
+                    continue
+                del remaining[agent_id]
+                progress = True
+
+                if agent_id in precomputed:
+                    print(f"Reusing the {spec.title} report from an earlier run")
+                    reports[agent_id] = precomputed[agent_id]
+                    status[agent_id] = "resumed"
+                    timings[agent_id] = 0.0
+                    continue
+
+                if deadline_at is not None and time.monotonic() >= deadline_at:
+                    print(f"Warning: {spec.title} Agent not started before the deadline")
+                    reports[agent_id] = f"TIMED OUT: The {spec.title} agent could not start before the request deadline."
+                    status[agent_id] = "timed_out"
+                    timings[agent_id] = 0.0
+                    continue
+
+                dependency_reports = {
+                    dependency: (self._spec(dependency).section_heading, reports[dependency])
+                    for dependency in spec.depends_on if status[dependency] in SUCCESS_STATES
+                }
+                user_prompt = spec.build_prompt(context, dependency_reports)
+                self.user_prompts[agent_id] = user_prompt
+
+                cache_key = None
+                if self.cache:
+                    cache_key = self.cache.key(agent_id, spec.system_prompt, user_prompt, self.cache_variant)
+                    cached = self.cache.get(cache_key)
+                    if cached is not None:
+                        print(f"Using cached {spec.title} report")
+                        reports[agent_id] = cached
+                        status[agent_id] = "cached"
+                        timings[agent_id] = 0.0
+                        self._notify(on_node_complete, spec, "cached", cached, 0.0)
+                        continue
+
+                print(f"Running {spec.title} Agent...")
+                timeout = self._node_timeout(spec)
+                node_deadline = time.monotonic() + timeout if timeout else None
+                # The call itself may run until the overall deadline; the scheduler abandons it earlier if needed
+                call_timeout = timeout
+                if deadline_at is not None:
+                    remaining_time = max(deadline_at - time.monotonic(), 1)
+                    call_timeout = min(call_timeout, remaining_time) if call_timeout else remaining_time
+                future = executor.submit(self.run_node, spec, user_prompt, call_timeout)
+                running[future] = (spec, time.monotonic(), node_deadline, cache_key)
+
+    def _cancel_nodes(self, remaining, running, reports, status, timings):
+        """Mark every node that has not finished as cancelled"""
+        if running:
+            wait(list(running), timeout=self.cancel_grace_seconds)
+        now = time.monotonic()
+        for future, (spec, started, _, _) in list(running.items()):
+            future.cancel()
+            timings[spec.agent_id] = round(now - started, 3)
+            reports[spec.agent_id] = f"CANCELLED: The {spec.title} agent was cancelled."
+            status[spec.agent_id] = "cancelled"
+        running.clear()
+        for agent_id, spec in remaining.items():
+            reports[agent_id] = f"CANCELLED: The {spec.title} agent was cancelled."
+            status[agent_id] = "cancelled"
+            timings[agent_id] = 0.0
+        remaining.clear()
+
+    def _spec(self, agent_id):
+        return next(spec for spec in self.specs if spec.agent_id == agent_id)
+
+    def _notify(self, on_node_complete, spec, status, report, elapsed):
+        if not on_node_complete:
+            return
+        try:
+            on_node_complete(spec.agent_id, status, report, elapsed)
+        except Exception as e:
+            print(f"Warning: Could not record the {spec.title} result: {e}")
+
+    def _late_result_callback(self, spec, cache_key, on_late_result, on_node_complete=None):
+        def callback(future):
+            try:
+                report = future.result()
+            except Exception as e:
+                print(f"Warning: {spec.title} Agent failed after timing out: {e}")
+                return
+            print(f"{spec.title} Agent finished after timing out, saving late result")
+            try:
+                if self.cache and cache_key:
+                    self.cache.set(cache_key, report)
+                if on_late_result:
+                    on_late_result(spec.agent_id, report)
+                self._notify(on_node_complete, spec, "completed", report, None)
+            except Exception as e:
+                print(f"Warning: Could not save late {spec.title} result: {e}")
+        return callback
@@ -0,0 +1,213 @@
+import re
+
+# Asset classes recognised in "Property Type" lines, checked in order (most specific first)
+ASSET_CLASS_KEYWORDS = [
+    ("medical_office", ["medical office", "mob"]),
+    ("self_storage", ["self storage", "self-storage", "storage facility"]),
+    ("senior_housing", ["senior housing", "assisted living", "memory care"]),
+    ("student_housing", ["student housing"]),
+    ("mixed_use", ["mixed-use", "mixed use"]),
+    ("multifamily", ["multifamily", "multi-family", "apartment", "apartments"]),
+    ("industrial", ["industrial", "warehouse", "distribution", "logistics", "flex"]),
+    ("hospitality", ["hotel", "hospitality", "motel", "resort"]),
+    ("retail", ["retail", "shopping center", "strip center", "mall"]),
+    ("office", ["office"]),
+    ("land", ["land", "lot"]),
+]
+
+# Line labels for each numeric fact; the first matching line in the document wins
+FACT_LABELS = {
+    "price": ["asking price", "purchase price", "sale price", "price"],
+    "square_feet": ["square footage", "rentable square feet", "rentable area", "building size", "gross leasable area", "gla", "size"],
+    "units": ["number of units", "unit count", "units"],
+    "noi": ["net operating income (noi)", "net operating income", "current annual noi", "noi"],
+    "gross_income": ["gross rental income", "gross income", "effective gross income", "total revenue"],
+    "operating_expenses": ["total operating expenses", "operating expenses"],
+    "annual_debt_service": ["annual debt service", "debt service"],
+    "loan_amount": ["loan amount"],
+    "cap_rate": ["cap rate", "capitalization rate", "going-in cap rate"],
+    "dscr": ["debt service coverage ratio (dscr)", "debt service coverage ratio", "dscr"],
+    "ltv": ["loan-to-value (ltv)", "loan-to-value", "ltv"],
+    "occupancy": ["total occupancy", "occupancy rate", "occupancy", "physical occupancy"],
+    "year_built": ["year built"],
+    "irr": ["projected irr", "target irr", "irr"],
+}
+
+PERCENT_FACTS = {"cap_rate", "ltv", "occupancy", "irr"}
+
+STATE_NAMES = {
+    "alabama": "AL", "alaska": "AK", "arizona": "AZ", "arkansas": "AR", "california": "CA",
+    "colorado": "CO", "connecticut": "CT", "delaware": "DE", "florida": "FL", "georgia": "GA",
+    "hawaii": "HI", "idaho": "ID", "illinois": "IL", "indiana": "IN", "iowa": "IA",
+    "kansas": "KS", "kentucky": "KY", "louisiana": "LA", "maine": "ME", "maryland": "MD",
+    "massachusetts": "MA", "michigan": "MI", "minnesota": "MN", "mississippi": "MS", "missouri": "MO",
+    "montana": "MT", "nebraska": "NE", "nevada": "NV", "new hampshire": "NH", "new jersey": "NJ",
+    "new mexico": "NM", "new york": "NY", "north carolina": "NC", "north dakota": "ND", "ohio": "OH",
+    "oklahoma": "OK", "oregon": "OR", "pennsylvania": "PA", "rhode island": "RI", "south carolina": "SC",
+    "south dakota": "SD", "tennessee": "TN", "texas": "TX", "utah": "UT", "vermont": "VT",
+    "virginia": "VA", "washington": "WA", "west virginia": "WV", "wisconsin": "WI", "wyoming": "WY",
+    "district of columbia": "DC",
+}
+
+_MULTIPLIERS = {"k": 1e3, "thousand": 1e3, "m": 1e6, "mm": 1e6, "million": 1e6, "b": 1e9, "bn": 1e9, "billion": 1e9}
+
+
+def parse_number(text):
+    """
+    Parse a money, percentage or ratio string such as "$45,000,000", "$42M", "8.5%" or "1.35x".
+
+    Returns:
+        Float value, or None if no number is present
+    """
+    match = re.search(r"(-?\d[\d,]*(?:\.\d+)?|-?\.\d+)\s*(?:(million|mm|m|billion|bn|b|k|thousand)\b)?", text.lower())
+    if not match:
+        return None
+    digits = match.group(1).replace(",", "")
+    value = float(digits)
+    if match.group(2):
+        value *= _MULTIPLIERS[match.group(2)]
+    return value
+
+
+def _find_labelled_value(lines, labels):
+    """Return the text after the first "<label>:" line matching any of the labels"""
+    for label in labels:
+        pattern = re.compile(r"^\s*[-*•]?\s*" + re.escape(label) + r"\s*:\s*(.+)$", re.IGNORECASE)
+        for line in lines:
+            match = pattern.match(line)
+            if match:
+                return match.group(1).strip()
+    return None
+
+
+def classify_asset_class(text):
+    """Map a free-text property type description onto a canonical asset class"""
+    lowered = (text or "").lower()
+    for asset_class, keywords in ASSET_CLASS_KEYWORDS:
+        for keyword in keywords:
+            if re.search(r"\b" + re.escape(keyword) + r"\b", lowered):
+                return asset_class
+    return None
+
+
+def _parse_location(value):
+    """Split "1234 Main St, Austin, Texas 78701" into city and state"""
+    parts = [part.strip() for part in value.split(",") if part.strip()]
+    city, state = None, None
+    for index, part in enumerate(parts):
+        state_match = re.match(r"^([A-Za-z ]+?)\s*(\d{5})?$", part)
+        if not state_match:
+            continue
+        candidate = state_match.group(1).strip()
+        if candidate.lower() in STATE_NAMES:
+            state = STATE_NAMES[candidate.lower()]
+        elif len(candidate) == 2 and candidate.upper() in STATE_NAMES.values():
+            state = candidate.upper()
+        else:
+            continue
+        if index > 0:
+            city = parts[index - 1]
+        break
+    return city, state
+
+
+def extract_deal_facts(text):
+    """
+    Extract key deal facts from document text using labelled "Label: value" lines.
+    Missing ratios are derived from the underlying figures where possible.
+
+    Args:
+        text: Extracted deal document text
+
+    Returns:
+        Dictionary of facts; only keys that could be determined are present
+    """
+    lines = (text or "").splitlines()
+    facts = {}
+
+    name = _find_labelled_value(lines, ["property", "property name", "asset"])
+    if name:
+        facts["property_name"] = name
+
+    property_type = _find_labelled_value(lines, ["property type", "asset type", "asset class", "building class"])
+    asset_class = classify_asset_class(property_type) or classify_asset_class(name)
+    if property_type:
+        facts["property_type"] = property_type
+    if asset_class:
+        facts["asset_class"] = asset_class
+
+    location = _find_labelled_value(lines, ["location", "address", "property address"])
+    if location:
+        facts["location"] = location
+        city, state = _parse_location(location)
+        if city:
+            facts["city"] = city
+        if state:
+            facts["state"] = state
+
+    for key, labels in [("submarket", ["submarket"]), ("msa", ["msa", "metro", "market"])]:
+        value = _find_labelled_value(lines, labels)
+        if value:
+            facts[key] = value
+
+    for key, labels in FACT_LABELS.items():
+        value = _find_labelled_value(lines, labels)
+        if value is None:
+            continue
+        number = parse_number(value)
+        if number is None:
+            continue
+        if key in PERCENT_FACTS and number > 1:
+            number = number / 100.0
+        facts[key] = number
+
+    # Derive ratios the document did not state explicitly
+    if "cap_rate" not in facts and facts.get("noi") and facts.get("price"):
+        facts["cap_rate"] = facts["noi"] / facts["price"]
+    if "dscr" not in facts and facts.get("noi") and facts.get("annual_debt_service"):
+        facts["dscr"] = facts["noi"] / facts["annual_debt_service"]
+    if "ltv" not in facts and facts.get("loan_amount") and facts.get("price"):
+        facts["ltv"] = facts["loan_amount"] / facts["price"]
+    if facts.get("price") and facts.get("square_feet"):
+        facts["price_per_sf"] = facts["price"] / facts["square_feet"]
+    if facts.get("price") and facts.get("units"):
+        facts["price_per_unit"] = facts["price"] / facts["units"]
+
+    return facts
+
+
+def format_deal_facts(facts):
+    """Render extracted facts as compact plain text for prompts"""
+    labels = [
+        ("property_name", "Property", None),
+        ("asset_class", "Asset Class", None),
+        ("location", "Location", None),
+        ("price", "Price", "money"),
+        ("square_feet", "Square Feet", "int"),
+        ("units", "Units", "int"),
+        ("price_per_sf", "Price/SF", "money"),
+        ("price_per_unit", "Price/Unit", "money"),
+        ("noi", "NOI", "money"),
+        ("cap_rate", "Cap Rate", "percent"),
+        ("dscr", "DSCR", "ratio"),
+        ("ltv", "LTV", "percent"),
+        ("occupancy", "Occupancy", "percent"),
+        ("year_built", "Year Built", "year"),
+    ]
+    parts = []
+    for key, label, kind in labels:
+        value = facts.get(key)
+        if value is None:
+            continue
+        if kind == "money":
+            value = f"${value:,.0f}"
+        elif kind == "int":
+            value = f"{value:,.0f}"
+        elif kind == "percent":
+            value = f"{value * 100:.2f}%"
+        elif kind == "ratio":
+            value = f"{value:.2f}x"
+        elif kind == "year":
+            value = f"{value:.0f}"
+        parts.append(f"{label}: {value}")
+    return "; ".join(parts)
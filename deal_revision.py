@@ -0,0 +1,259 @@
+import difflib
+import hashlib
+import os
+import re
+import time
+
+from dag_scheduler import SUCCESS_STATES
+from deal_facts import extract_deal_facts
+from section_router import segment_sections, classify_section
+
+# Topics a change to each extracted fact concerns, used when a changed line matches no topic keyword
+# (e.g. "Asking Price: $48,500,000"). Facts not listed here concern every agent. Pricing facts also
+# concern the market topic, since the market agent prices comparables by price per foot and cap rate.
+FACT_TOPICS = {
+    "price": ("financial", "market"),
+    "price_per_sf": ("financial", "market"),
+    "price_per_unit": ("financial", "market"),
+    "noi": ("financial",),
+    "gross_income": ("financial",),
+    "operating_expenses": ("financial",),
+    "cap_rate": ("financial", "market"),
+    "irr": ("financial",),
+    "loan_amount": ("capital",),
+    "annual_debt_service": ("capital",),
+    "dscr": ("capital",),
+    "ltv": ("capital",),
+    "occupancy": ("tenancy",),
+    "square_feet": ("property",),
+    "units": ("property",),
+    "year_built": ("property",),
+    "property_name": ("property",),
+    "property_type": ("property", "market"),
+    "asset_class": ("property", "market"),
+    "location": ("property", "market"),
+    "city": ("market",),
+    "state": ("market",),
+    "msa": ("market",),
+    "submarket": ("market",),
+}
+
+# Changed lines shown per section in the response and the orchestrator note
+MAX_CHANGED_LINES = 6
+MAX_LINE_CHARS = 160
+
+# Reference numbers in the generated prompt context that move whenever text is inserted above
+# them, without the evidence itself changing
+VOLATILE_CONTEXT = re.compile(r"\((line \d+|similarity \d\.\d+)")
+
+
+def _heading_key(heading):
+    return re.sub(r"\s+", " ", (heading or "").lower()).strip()
+
+
+def _section_hash(text):
+    return hashlib.sha256(re.sub(r"\s+", " ", text).strip().encode("utf-8")).hexdigest()
+
+
+def _facts_changed(old, new):
+    """Fact keys whose value differs between two fact dictionaries"""
+    return sorted(key for key in set(old) | set(new) if old.get(key) != new.get(key))
+
+
+def diff_facts(old, new):
+    """
+    Compare the facts extracted from two versions of a deal.
+
+    Returns:
+        List of dictionaries with fact, old and new value, in fact name order
+    """
+    return [{"fact": key, "old": old.get(key), "new": new.get(key)} for key in _facts_changed(old, new)]
+
+
+def diff_sections(old_text, new_text):
+    """
+    Compare two versions of a deal document section by section.
+
+    Sections are matched by heading (and by order among sections with the same heading), so
+    moving text within a section or inserting a section elsewhere does not mark the others as
+    changed. Each changed section is tagged with the topics its changed lines concern: the topic
+    keywords in those lines, then the facts they change, then the topics of the whole section.
+
+    Returns:
+        Dictionary with the changed sections (heading, change: added/removed/modified, topics,
+        facts, lines), unchanged_sections, total_sections and changed_share (share of the
+        document's characters in changed sections)
+    """
+    def keyed(sections):
+        seen = {}
+        keys = {}
+        for section in sections:
+            heading = _heading_key(section["heading"])
+            occurrence = seen.get(heading, 0)
+            seen[heading] = occurrence + 1
+            keys[(heading, occurrence)] = section
+        return keys
+
+    old_sections = keyed(segment_sections(old_text))
+    new_sections = keyed(segment_sections(new_text))
+    changes = []
+    unchanged = 0
+    changed_chars = 0
+    for key in list(new_sections) + [key for key in old_sections if key not in new_sections]:
+        old_section = old_sections.get(key)
+        new_section = new_sections.get(key)
+        if old_section is not None and new_section is not None and \
+                _section_hash(old_section["text"]) == _section_hash(new_section["text"]):
+            unchanged += 1
+            continue
+        old_lines = old_section["text"].split("\n") if old_section else []
+        new_lines = new_section["text"].split("\n") if new_section else []
+        changed_lines = [
+            line for line in difflib.unified_diff(old_lines, new_lines, lineterm="", n=0)
+            if line[:1] in "+-" and not line.startswith(("+++", "---")) and line[1:].strip()
+        ]
+        section = new_section or old_section
+        facts = _facts_changed(extract_deal_facts(old_section["text"]) if old_section else {},
+                               extract_deal_facts(new_section["text"]) if new_section else {})
+        changes.append({
+            "heading": section["heading"],
+            "change": "modified" if old_section and new_section else ("added" if new_section else "removed"),
+            "topics": _change_topics(section, changed_lines, facts),
+            "facts": facts,
+            "lines": [line[:MAX_LINE_CHARS] for line in changed_lines[:MAX_CHANGED_LINES]],
+            "lines_changed": len(changed_lines),
+        })
+        changed_chars += max(len(old_section["text"]) if old_section else 0, len(new_section["text"]) if new_section else 0)
+    total = unchanged + len(changes)
+    return {
+        "sections": changes,
+        "unchanged_sections": unchanged,
+        "total_sections": total,
+        "changed_share": round(min(changed_chars / max(len(new_text), len(old_text), 1), 1.0), 3),
+    }
+
+
+def _change_topics(section, changed_lines, facts):
+    """
+    Topics of a section change. An empty list means the change could not be attributed to any
+    topic and concerns every agent.
+    """
+    # Classified without the heading and position bonuses, so only what changed counts
+    changed_text = "\n".join(line[1:] for line in changed_lines)
+    topics = [topic for topic in classify_section({"heading": "", "text": changed_text, "position": 1}) if topic != "overview"]
+    for fact in facts:
+        if fact not in FACT_TOPICS:
+            return []
+        topics += [topic for topic in FACT_TOPICS[fact] if topic not in topics]
+    if not topics:
+        topics = [topic for topic in classify_section(section) if topic != "overview"]
+    return topics
+
+
+def plan_reanalysis(previous, deal_content, deal_facts, context, specs, max_changed_share=None):
+    """
+    Decide which specialists must re-run for a revised version of an analysed deal.
+
+    A specialist re-runs when a changed section concerns one of its topics, when a change cannot
+    be attributed to a topic, when generated context it reads (comparables, market data, legal
+    scan) changed, when its previous run produced no report, or when a specialist it depends on
+    re-runs. The orchestrator always re-runs, so the final report reflects the revision.
+
+    Args:
+        previous: Stored results of the previous version (see stage_store.StageStore.load)
+        deal_content: Normalised text of the revised document
+        deal_facts: Facts extracted from the revised document
+        context: Stage context built for the revised document
+        specs: Enabled AgentSpecs
+        max_changed_share: Re-run everything when more than this share of the document changed
+            (defaults to REVISION_MAX_CHANGED_SHARE)
+
+    Returns:
+        Revision dictionary with previous_report_id, sections, facts, agents (per agent id:
+        rerun and reasons), reused (agent ids whose previous report can be kept) and elapsed_ms
+    """
+    start = time.perf_counter()
+    if max_changed_share is None:
+        max_changed_share = float(os.environ.get("REVISION_MAX_CHANGED_SHARE", 0.6))
+    sections = diff_sections(previous["deal_content"], deal_content)
+    facts = diff_facts(previous.get("deal_facts") or {}, deal_facts)
+    previous_context = previous.get("stage_context") or {}
+    previous_status = previous.get("agent_status") or {}
+
+    changed_topics = set()
+    unattributed = []
+    for section in sections["sections"]:
+        if section["topics"]:
+            changed_topics.update(section["topics"])
+        else:
+            unattributed.append(section["heading"] or "untitled section")
+    rewrite = sections["changed_share"] > max_changed_share
+
+    agents = {}
+    for spec in specs:
+        reasons = []
+        if previous_status.get(spec.agent_id) not in SUCCESS_STATES or spec.result_key not in previous:
+            reasons.append("no usable report from the previous version")
+        if rewrite:
+            reasons.append(f"{sections['changed_share']:.0%} of the document changed")
+        elif not spec.topics:
+            reasons += [f"section changed: {section['heading'] or 'untitled section'}" for section in sections["sections"]]
+        else:
+            for section in sections["sections"]:
+                matched = [topic for topic in section["topics"] if topic in spec.topics]
+                if matched:
+                    reasons.append(f"section changed: {section['heading'] or 'untitled section'} ({', '.join(matched)})")
+            reasons += [f"unclassified change in {heading}" for heading in unattributed]
+        for key in spec.context_inputs:
+            if VOLATILE_CONTEXT.sub("(", context.get(key) or "") != VOLATILE_CONTEXT.sub("(", previous_context.get(key) or ""):
+                reasons.append(f"{key.replace('_context', '').replace('_', ' ')} changed")
+        agents[spec.agent_id] = {"rerun": bool(reasons), "reasons": reasons}
+
+    # Dependents read the reports of the specialists that re-run
+    changed = True
+    while changed:
+        changed = False
+        for spec in specs:
+            rerun_dependencies = [d for d in spec.depends_on if agents.get(d, {}).get("rerun")]
+            if rerun_dependencies and not agents[spec.agent_id]["rerun"]:
+                agents[spec.agent_id] = {"rerun": True, "reasons": [f"depends on {', '.join(rerun_dependencies)}"]}
+                changed = True
+
+    return {
+        "previous_report_id": previous.get("report_id"),
+        "sections": sections["sections"],
+        "unchanged_sections": sections["unchanged_sections"],
+        "total_sections": sections["total_sections"],
+        "changed_share": sections["changed_share"],
+        "changed_topics": sorted(changed_topics),
+        "facts": facts,
+        "agents": agents,
+        "reused": [spec.agent_id for spec in specs if not agents[spec.agent_id]["rerun"]],
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 3),
+    }
+
+
+def _format_value(value):
+    if isinstance(value, float) and abs(value) < 10:
+        return f"{value:.4g}"
+    if isinstance(value, (int, float)):
+        return f"{value:,.0f}"
+    return "-" if value is None else str(value)
+
+
+def format_revision(revision):
+    """Render a revision as plain text: changed facts, then changed sections with their changed lines"""
+    lines = [f"REVISION OF {revision['previous_report_id'] or 'an earlier analysis'}: "
+             f"{len(revision['sections'])} of {revision['total_sections']} sections changed"]
+    if revision["facts"]:
+        lines.append("Changed figures: " + "; ".join(
+            f"{fact['fact'].replace('_', ' ')} {_format_value(fact['old'])} -> {_format_value(fact['new'])}"
+            for fact in revision["facts"]
+        ))
+    for section in revision["sections"]:
+        topics = f" [{', '.join(section['topics'])}]" if section["topics"] else ""
+        lines.append(f"- {section['heading'] or 'Untitled section'} ({section['change']}){topics}")
+        lines.extend(f"    {line}" for line in section["lines"])
+        if section["lines_changed"] > len(section["lines"]):
+            lines.append(f"    ... {section['lines_changed'] - len(section['lines'])} more changed lines")
+    return "\n".join(lines)
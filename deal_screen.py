@@ -0,0 +1,133 @@
+import json
+import os
+import time
+
+from deal_facts import format_deal_facts
+
+SCREEN_MODES = ("off", "stop", "decline_memo")
+
+
+class DealScreen:
+    """
+    Deterministic buy-box screen that runs before any LLM call.
+
+    Key ratios come from deal_facts.extract_deal_facts. A deal fails the screen only when
+    a metric is present and violates a configured threshold; metrics that cannot be found
+    in the document are reported but never fail the deal.
+
+    Thresholds are read from a JSON file (SCREEN_CONFIG) or individual environment variables:
+        SCREEN_MODE                  off | stop | decline_memo (default decline_memo)
+        SCREEN_MIN_DSCR              e.g. 1.0 (default 1.0)
+        SCREEN_MIN_CAP_RATE          percent, e.g. 5.5
+        SCREEN_MAX_LTV               percent, e.g. 75
+        SCREEN_MIN_OCCUPANCY         percent, e.g. 80
+        SCREEN_ALLOWED_ASSET_CLASSES comma separated, e.g. office,industrial,multifamily
+
+    Cap rate, LTV and occupancy are always percentages. Values between 0 and 1 are rejected,
+    since 0.055 is far more likely a ratio meant as 5.5% than a 0.055% threshold.
+    """
+
+    def __init__(self, config=None):
+        config = config if config is not None else self._load_config()
+        self.mode = str(config.get("mode", "decline_memo")).lower()
+        if self.mode not in SCREEN_MODES:
+            raise ValueError(f"Invalid screen mode '{self.mode}'. Expected one of: {', '.join(SCREEN_MODES)}")
+        self.min_dscr = self._to_float(config.get("min_dscr", 1.0))
+        self.min_cap_rate = self._percent_to_ratio("min_cap_rate", config.get("min_cap_rate"))
+        self.max_ltv = self._percent_to_ratio("max_ltv", config.get("max_ltv"))
+        self.min_occupancy = self._percent_to_ratio("min_occupancy", config.get("min_occupancy"))
+        allowed = config.get("allowed_asset_classes") or []
+        if isinstance(allowed, str):
+            allowed = [item.strip() for item in allowed.split(",") if item.strip()]
+        self.allowed_asset_classes = {item.lower() for item in allowed}
+
+    @property
+    def enabled(self):
+        return self.mode != "off"
+
+    def _load_config(self):
+        config_path = os.environ.get("SCREEN_CONFIG")
+        if config_path:
+            with open(config_path, 'r') as f:
+                return json.load(f)
+        config = {}
+        for key in ("mode", "min_dscr", "min_cap_rate", "max_ltv", "min_occupancy", "allowed_asset_classes"):
+            value = os.environ.get(f"SCREEN_{key.upper()}")
+            if value:
+                config[key] = value
+        return config
+
+    def _to_float(self, value):
+        if value is None or value == "":
+            return None
+        return float(value)
+
+    def _percent_to_ratio(self, key, value):
+        """Convert a percentage threshold (5.5) to the ratio deal facts are extracted as (0.055)"""
+        value = self._to_float(value)
+        if value is None:
+            return None
+        if not 1 <= value <= 100:
+            raise ValueError(f"Invalid {key} {value:g}: expected a percentage between 1 and 100, e.g. 5.5 for 5.5%")
+        return value / 100.0
+
+    def screen(self, facts):
+        """
+        Check extracted deal facts against the buy box.
+
+        Args:
+            facts: Dictionary from deal_facts.extract_deal_facts
+
+        Returns:
+            Dictionary with passed, failures, missing_metrics, metrics and elapsed_ms
+        """
+        start = time.perf_counter()
+        failures = []
+        missing = []
+
+        def check(metric, threshold, fails, describe):
+            if threshold is None:
+                return
+            value = facts.get(metric)
+            if value is None:
+                missing.append(metric)
+            elif fails(value, threshold):
+                failures.append(describe(value, threshold))
+
+        check("dscr", self.min_dscr, lambda v, t: v < t,
+              lambda v, t: f"DSCR of {v:.2f}x is below the minimum of {t:.2f}x")
+        check("cap_rate", self.min_cap_rate, lambda v, t: v < t,
+              lambda v, t: f"Cap rate of {v * 100:.2f}% is below the minimum of {t * 100:.2f}%")
+        check("ltv", self.max_ltv, lambda v, t: v > t,
+              lambda v, t: f"LTV of {v * 100:.1f}% exceeds the maximum of {t * 100:.1f}%")
+        check("occupancy", self.min_occupancy, lambda v, t: v < t,
+              lambda v, t: f"Occupancy of {v * 100:.1f}% is below the minimum of {t * 100:.1f}%")
+
+        if self.allowed_asset_classes:
+            asset_class = facts.get("asset_class")
+            if asset_class is None:
+                missing.append("asset_class")
+            elif asset_class not in self.allowed_asset_classes:
+                failures.append(
+                    f"Asset class '{asset_class}' is outside the buy box ({', '.join(sorted(self.allowed_asset_classes))})"
+                )
+
+        return {
+            "mode": self.mode,
+            "passed": not failures,
+            "failures": failures,
+            "missing_metrics": missing,
+            "metrics": format_deal_facts(facts),
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 3)
+        }
+
+
+def format_screen_summary(screen_result):
+    """Render a failed screen as plain text for reports and the decline memo prompt"""
+    lines = ["DEAL PRE-SCREEN: FAILED", "", "The deal falls outside the investment buy box:"]
+    lines.extend(f"- {failure}" for failure in screen_result["failures"])
+    if screen_result.get("metrics"):
+        lines.extend(["", "Key metrics extracted from the document:", screen_result["metrics"]])
+    if screen_result.get("missing_metrics"):
+        lines.extend(["", f"Metrics not found in the document: {', '.join(screen_result['missing_metrics'])}"])
+    return "\n".join(lines)
@@ -0,0 +1,248 @@
+import fcntl
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+
+import numpy as np
+
+from deal_facts import extract_deal_facts, format_deal_facts
+
+STOP_WORDS = {
+    "the", "and", "for", "with", "this", "that", "from", "are", "was", "were", "will", "have", "has",
+    "per", "year", "years", "annual", "total", "property", "deal", "our", "its", "all", "not", "any",
+}
+
+# Extracted facts are stronger similarity signals than individual words
+FACT_TOKEN_WEIGHT = 4.0
+
+
+class DealSimilarityIndex:
+    """
+    Local nearest-neighbour index over previously analysed deals.
+
+    Each deal is turned into a hashed TF-IDF vector built from its document text plus
+    tokens derived from its extracted facts (asset class, location, price and cap rate
+    buckets). Vectors are appended to a flat float32 file, so adding a deal is O(1)
+    on disk, and a query is a single matrix-vector product over all stored deals.
+
+    Appends take an exclusive lock on a lock file in the index directory, so several
+    server processes (gunicorn workers) can add deals to the same index without
+    interleaving their vector and deal records.
+    """
+
+    def __init__(self, index_dir=None, dimensions=None):
+        self.index_dir = index_dir or os.environ.get("SIMILARITY_INDEX_DIR", os.path.join("data", "similarity"))
+        self.dimensions = int(dimensions or os.environ.get("SIMILARITY_DIMENSIONS", 1024))
+        os.makedirs(self.index_dir, exist_ok=True)
+        self.vectors_path = os.path.join(self.index_dir, "vectors.f32")
+        self.deals_path = os.path.join(self.index_dir, "deals.jsonl")
+        self.lock_path = os.path.join(self.index_dir, "index.lock")
+        self._lock = threading.Lock()
+        self._vectors = np.zeros((0, self.dimensions), dtype=np.float32)
+        self._document_frequency = np.zeros(self.dimensions, dtype=np.float32)
+        self._deals = []
+        self._loaded_size = -1
+        self._row_norms = None
+
+    def __len__(self):
+        with self._lock:
+            self._reload_if_changed()
+            return len(self._deals)
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive lock shared with other processes appending to this index"""
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _reload_if_changed(self):
+        """Reload from disk when another process has appended deals"""
+        size = os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0
+        if size == self._loaded_size:
+            return
+
+        deals = []
+        if os.path.exists(self.deals_path):
+            with open(self.deals_path, 'r') as f:
+                deals = [json.loads(line) for line in f if line.strip()]
+
+        row_bytes = self.dimensions * 4
+        rows = min(size // row_bytes, len(deals))
+        if rows:
+            vectors = np.fromfile(self.vectors_path, dtype=np.float32, count=rows * self.dimensions)
+            vectors = vectors.reshape(rows, self.dimensions)
+        else:
+            vectors = np.zeros((0, self.dimensions), dtype=np.float32)
+
+        self._vectors = vectors
+        self._deals = deals[:rows]
+        self._document_frequency = (vectors > 0).sum(axis=0).astype(np.float32)
+        self._loaded_size = rows * row_bytes
+        self._row_norms = None
+
+    def _tokens(self, text, facts):
+        """Yield (token, weight) pairs for text words and extracted facts"""
+        words = [word for word in re.findall(r"[a-z][a-z0-9]{2,}", (text or "").lower()) if word not in STOP_WORDS]
+        for word, count in Counter(words).items():
+            yield word, 1.0 + math.log(count)
+
+        facts = facts or {}
+        for key in ("asset_class", "city", "state", "submarket", "msa"):
+            if facts.get(key):
+                yield f"{key}={str(facts[key]).lower()}", FACT_TOKEN_WEIGHT
+        # Bucket numeric facts so that deals of similar size and pricing collide
+        if facts.get("price"):
+            yield f"price_bucket={int(math.log2(max(facts['price'], 1)))}", FACT_TOKEN_WEIGHT
+        if facts.get("square_feet"):
+            yield f"sf_bucket={int(math.log2(max(facts['square_feet'], 1)))}", FACT_TOKEN_WEIGHT
+        if facts.get("cap_rate"):
+            yield f"cap_bucket={round(facts['cap_rate'] * 200)}", FACT_TOKEN_WEIGHT
+        if facts.get("year_built"):
+            yield f"vintage={int(facts['year_built']) // 10}", FACT_TOKEN_WEIGHT / 2
+
+    def vectorize(self, text, facts=None):
+        """
+        Build an un-normalised hashed term-frequency vector for a deal.
+
+        Args:
+            text: Deal document text
+            facts: Extracted deal facts (see deal_facts.extract_deal_facts)
+
+        Returns:
+            float32 numpy array of length self.dimensions
+        """
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for token, weight in self._tokens(text, facts):
+            # crc32 is stable across processes, unlike hash()
+            digest = zlib.crc32(token.encode("utf-8"))
+            vector[digest % self.dimensions] += weight
+        return vector
+
+    def add_deal(self, deal_id, text, facts=None):
+        """
+        Append an analysed deal to the index.
+
+        Args:
+            deal_id: Identifier of the analysis (report_id)
+            text: Deal document text
+            facts: Extracted deal facts
+        """
+        vector = self.vectorize(text, facts)
+        record = {"deal_id": deal_id, "content_sha256": content_hash(text), "facts": facts or {}}
+        with self._lock, self._file_lock():
+            self._reload_if_changed()
+            with open(self.vectors_path, 'ab') as f:
+                f.write(vector.tobytes())
+            with open(self.deals_path, 'a') as f:
+                f.write(json.dumps(record) + "\n")
+            self._vectors = np.vstack([self._vectors, vector[np.newaxis, :]])
+            self._document_frequency += (vector > 0)
+            self._deals.append(record)
+            self._loaded_size += vector.nbytes
+            self._row_norms = None
+
+    def add_reports_folder(self, reports_folder):
+        """
+        Incrementally add deals whose extracted text (report_<timestamp>_deal.txt) is not yet indexed.
+
+        Returns:
+            Number of newly indexed deals
+        """
+        with self._lock:
+            self._reload_if_changed()
+            known = {deal["deal_id"] for deal in self._deals}
+
+        count = 0
+        for filename in sorted(os.listdir(reports_folder)):
+            if not filename.endswith("_deal.txt"):
+                continue
+            deal_id = filename[:-len("_deal.txt")]
+            if deal_id in known:
+                continue
+            with open(os.path.join(reports_folder, filename), 'r', encoding='utf-8', errors='replace') as f:
+                text = f.read()
+            self.add_deal(deal_id, text, extract_deal_facts(text))
+            count += 1
+        return count
+
+    def query(self, text, facts=None, top_k=5, exclude_ids=None, min_score=0.05):
+        """
+        Find the most similar historical deals.
+
+        Args:
+            text: Deal document text
+            facts: Extracted deal facts
+            top_k: Number of neighbours to return
+            exclude_ids: Optional deal ids to skip (e.g. the deal being analysed). Deals with
+                exactly the same text (earlier uploads of the same document) are always skipped.
+            min_score: Minimum cosine similarity to include
+
+        Returns:
+            List of dictionaries with deal_id, score and facts, best match first
+        """
+        query_vector = self.vectorize(text, facts)
+        with self._lock:
+            self._reload_if_changed()
+            vectors = self._vectors
+            deals = self._deals
+            if not deals:
+                return []
+            # Cosine similarity of TF-IDF vectors: weight every bucket by idf^2 instead of
+            # materialising a re-weighted copy of the matrix. Row norms only change when
+            # deals are added, so they are cached between queries.
+            idf = np.log((1.0 + len(deals)) / (1.0 + self._document_frequency)) + 1.0
+            idf_squared = (idf * idf).astype(np.float32)
+            if self._row_norms is None:
+                self._row_norms = np.sqrt(np.einsum("ij,ij,j->i", vectors, vectors, idf_squared))
+            row_norms = self._row_norms
+
+        numerator = vectors @ (query_vector * idf_squared)
+        query_norm = math.sqrt(float((query_vector * query_vector) @ idf_squared))
+        if query_norm == 0:
+            return []
+        scores = numerator / np.maximum(row_norms * query_norm, 1e-12)
+
+        exclude_ids = set(exclude_ids or [])
+        text_hash = content_hash(text)
+        excluded = [row for row, deal in enumerate(deals)
+                    if deal["deal_id"] in exclude_ids or deal.get("content_sha256") == text_hash]
+        scores[excluded] = -np.inf
+        candidates = min(len(deals), top_k)
+        top = np.argpartition(-scores, candidates - 1)[:candidates]
+        top = top[np.argsort(-scores[top])]
+
+        results = []
+        for row in top:
+            deal = deals[row]
+            if scores[row] < min_score:
+                continue
+            results.append({"deal_id": deal["deal_id"], "score": round(float(scores[row]), 4), "facts": deal["facts"]})
+            if len(results) == top_k:
+                break
+        return results
+
+
+def content_hash(text):
+    """SHA-256 of a deal's text, identifying re-uploads of the same document"""
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def format_comparable_deals(comparables):
+    """Render nearest historical deals as a plain text block for agent prompts"""
+    if not comparables:
+        return ""
+    lines = ["COMPARABLE HISTORICAL DEALS (previously analysed by our team, most similar first):"]
+    for index, comparable in enumerate(comparables, start=1):
+        summary = format_deal_facts(comparable["facts"]) or "No key metrics extracted"
+        lines.append(f"{index}. {comparable['deal_id']} (similarity {comparable['score']:.2f}) - {summary}")
+    return "\n".join(lines)
@@ -0,0 +1,200 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from cancellation import CancelledError
+
+# Lanes in the order they are served; interactive UI requests always go ahead of batch work
+PRIORITY_LANES = ("interactive", "batch")
+
+
+class FairShareScheduler:
+    """
+    Admission control for LLM calls shared by every tenant.
+
+    At most max_concurrency calls run at once. When calls are waiting for a slot, the next one
+    is chosen from the highest priority lane, then from the tenant with the lowest virtual time,
+    then first come first served within the tenant. A tenant's virtual time advances by
+    1 / weight for every call it is granted, so a tenant bulk-submitting deals only gets its
+    weighted share of the slots while other tenants have work queued (weighted fair queuing).
+
+    The state is kept in memory, so it is per process: every web server worker and job worker
+    has its own slots and tenant shares, and LLM_MAX_CONCURRENCY applies to each of them.
+
+    Configuration (environment variables):
+        LLM_MAX_CONCURRENCY   concurrent LLM calls across all tenants, per process (default 8, 0 disables the scheduler)
+        TENANT_WEIGHTS        comma separated tenant=weight pairs, e.g. research=2,acquisitions=1 (default weight 1)
+    """
+
+    def __init__(self, max_concurrency=None, tenant_weights=None, wait_samples=1000):
+        if max_concurrency is None:
+            max_concurrency = int(os.environ.get("LLM_MAX_CONCURRENCY", 8))
+        self.max_concurrency = max_concurrency
+        if tenant_weights is None:
+            tenant_weights = self._parse_weights(os.environ.get("TENANT_WEIGHTS", ""))
+        self.tenant_weights = tenant_weights
+        self.wait_samples = wait_samples
+        self._condition = threading.Condition()
+        self._waiting = []
+        self._active = {}
+        self._virtual_time = {}
+        self._virtual_clock = 0.0
+        self._sequence = 0
+        self._stats = {}
+
+    @property
+    def enabled(self):
+        return self.max_concurrency > 0
+
+    def _parse_weights(self, value):
+        weights = {}
+        for item in value.split(","):
+            if "=" not in item:
+                continue
+            tenant, weight = item.split("=", 1)
+            weights[tenant.strip()] = float(weight)
+        return weights
+
+    def _weight(self, tenant):
+        return max(self.tenant_weights.get(tenant, 1.0), 0.01)
+
+    @contextmanager
+    def slot(self, tenant="default", priority="interactive", timeout=None, cancel_token=None):
+        """
+        Hold one LLM call slot for the duration of the with block.
+
+        Args:
+            tenant: Tenant the call is made for
+            priority: interactive or batch
+            timeout: Optional seconds to wait for a slot before raising TimeoutError
+            cancel_token: Optional cancellation.CancelToken; a cancelled call leaves the queue
+
+        Yields:
+            Seconds spent waiting in the queue
+        """
+        if not self.enabled:
+            yield 0.0
+            return
+        waited = self.acquire(tenant, priority, timeout, cancel_token)
+        try:
+            yield waited
+        finally:
+            self.release(tenant)
+
+    def acquire(self, tenant="default", priority="interactive", timeout=None, cancel_token=None):
+        """
+        Block until the scheduler grants a slot to this call.
+
+        Returns:
+            Seconds spent waiting in the queue
+        """
+        if priority not in PRIORITY_LANES:
+            raise ValueError(f"Invalid priority '{priority}'. Expected one of: {', '.join(PRIORITY_LANES)}")
+        start = time.monotonic()
+        with self._condition:
+            self._sequence += 1
+            # A tenant that was idle re-enters at the current virtual clock instead of
+            # claiming the credit it accumulated while it had nothing queued
+            self._virtual_time[tenant] = max(self._virtual_time.get(tenant, 0.0), self._virtual_clock)
+            waiter = {"tenant": tenant, "lane": PRIORITY_LANES.index(priority), "sequence": self._sequence, "granted": False}
+            self._waiting.append(waiter)
+            self._dispatch()
+
+            deadline = start + timeout if timeout else None
+            while not waiter["granted"]:
+                remaining = deadline - time.monotonic() if deadline else None
+                if remaining is not None and remaining <= 0:
+                    self._waiting.remove(waiter)
+                    raise TimeoutError(f"No LLM slot became available for tenant '{tenant}' within {timeout:.0f}s")
+                if cancel_token is not None:
+                    if cancel_token.cancelled:
+                        self._waiting.remove(waiter)
+                        raise CancelledError(cancel_token.reason)
+                    # Wake up regularly to notice cancellation while queued
+                    remaining = min(remaining, 0.5) if remaining is not None else 0.5
+                self._condition.wait(remaining)
+
+            waited = time.monotonic() - start
+            self._record_wait(tenant, priority, waited)
+            return waited
+
+    def release(self, tenant="default"):
+        """Return a slot and hand it to the next waiting call"""
+        with self._condition:
+            self._active[tenant] = self._active.get(tenant, 1) - 1
+            if self._active[tenant] <= 0:
+                del self._active[tenant]
+            self._dispatch()
+
+    def _dispatch(self):
+        """Grant free slots to waiting calls; the caller holds the condition lock"""
+        granted = False
+        while self._waiting and sum(self._active.values()) < self.max_concurrency:
+            waiter = min(
+                self._waiting,
+                key=lambda w: (w["lane"], self._virtual_time[w["tenant"]], w["sequence"])
+            )
+            self._waiting.remove(waiter)
+            tenant = waiter["tenant"]
+            self._virtual_clock = self._virtual_time[tenant]
+            self._virtual_time[tenant] += 1.0 / self._weight(tenant)
+            self._active[tenant] = self._active.get(tenant, 0) + 1
+            waiter["granted"] = True
+            granted = True
+        if granted:
+            self._condition.notify_all()
+
+    def _record_wait(self, tenant, priority, waited):
+        stats = self._stats.setdefault(tenant, {
+            "calls": 0, "total_wait_s": 0.0, "max_wait_s": 0.0,
+            "lanes": {}, "recent_waits": deque(maxlen=self.wait_samples)
+        })
+        stats["calls"] += 1
+        stats["total_wait_s"] += waited
+        stats["max_wait_s"] = max(stats["max_wait_s"], waited)
+        stats["lanes"][priority] = stats["lanes"].get(priority, 0) + 1
+        stats["recent_waits"].append(waited)
+
+    def stats(self):
+        """
+        Queue wait statistics per tenant, for capacity planning.
+
+        Returns:
+            Dictionary with the concurrency limit, current load and per-tenant wait times
+        """
+        with self._condition:
+            tenants = {}
+            for tenant, stats in self._stats.items():
+                recent = sorted(stats["recent_waits"])
+                tenants[tenant] = {
+                    "calls": stats["calls"],
+                    "weight": self._weight(tenant),
+                    "active": self._active.get(tenant, 0),
+                    "queued": sum(1 for waiter in self._waiting if waiter["tenant"] == tenant),
+                    "calls_by_priority": dict(stats["lanes"]),
+                    "avg_wait_s": round(stats["total_wait_s"] / stats["calls"], 3),
+                    "p50_wait_s": round(recent[len(recent) // 2], 3),
+                    "p95_wait_s": round(recent[min(int(len(recent) * 0.95), len(recent) - 1)], 3),
+                    "max_wait_s": round(stats["max_wait_s"], 3),
+                }
+            return {
+                "max_concurrency": self.max_concurrency,
+                "active": sum(self._active.values()),
+                "queued": len(self._waiting),
+                "tenants": tenants
+            }
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Process-wide scheduler shared by every pipeline and router"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = FairShareScheduler()
+        return _scheduler
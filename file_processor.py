@@ -1,13 +1,131 @@
+import io
+import multiprocessing
 import os
-import PyPDF2
-import docx
+import re
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from spreadsheet_ingest import summarize_rows, summarize_spreadsheet
+
+# Deal package documents by role, recognised from their file names. The merged text lists the
+# documents in this order, so labelled facts are taken from the offering memorandum first.
+DOCUMENT_ROLES = [
+    ("Offering Memorandum", ("offering memorandum", "offering", "memorandum", "om", "cim", "teaser", "flyer", "brochure")),
+    ("Rent Roll", ("rent roll", "rentroll", "rr", "unit mix", "tenant roster")),
+    ("T-12 Operating Statement", ("t12", "t 12", "trailing", "operating statement", "operating statements", "p l",
+                                  "income statement", "financials")),
+    ("Purchase and Sale Agreement", ("psa", "purchase and sale", "purchase agreement", "sale agreement", "loi",
+                                     "letter of intent")),
+    ("Lease", ("lease", "leases", "lease abstract", "estoppel", "snda")),
+    ("Loan Terms", ("term sheet", "loan", "debt quote", "financing")),
+    ("Appraisal", ("appraisal", "bov", "broker opinion")),
+    ("Environmental Report", ("phase i", "phase 1", "esa", "environmental")),
+    ("Property Condition Report", ("pca", "pcr", "property condition", "inspection")),
+    ("Title and Survey", ("title", "survey", "alta", "title commitment")),
+]
+OTHER_DOCUMENT_ROLE = "Supporting Document"
+
+# Formats that can be extracted, on their own or inside a package
+SUPPORTED_EXTENSIONS = {'.txt', '.md', '.pdf', '.doc', '.docx', '.csv', '.xlsx'}
+
+# Formats worth extracting in a worker process; plain text is read in place
+POOLED_EXTENSIONS = {'.pdf', '.doc', '.docx', '.csv', '.xlsx'}
+
+_extraction_pool = None
+_extraction_pool_lock = threading.Lock()
+
+
+def document_role(filename):
+    """Guess a package document's role (rent roll, T-12, ...) from its file name"""
+    stem = " " + " ".join(re.findall(r"[a-z0-9]+", os.path.splitext(os.path.basename(filename))[0].lower())) + " "
+    for role, keywords in DOCUMENT_ROLES:
+        if any(f" {keyword} " in stem for keyword in keywords):
+            return role
+    return OTHER_DOCUMENT_ROLE
+
+
+def build_package(documents):
+    """
+    Bundle uploaded documents into a ZIP deal package.
+    
+    Documents are stored uncompressed (PDFs already are) in name order with fixed timestamps, so
+    the same set of files always produces the same bytes and duplicate submissions are recognised.
+    
+    Args:
+        documents: List of (file name, file bytes)
+        
+    Returns:
+        ZIP file bytes
+    """
+    buffer = io.BytesIO()
+    used = set()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as package:
+        for name, data in sorted(documents, key=lambda document: document[0]):
+            stem, ext = os.path.splitext(name)
+            unique, counter = name, 2
+            while unique in used:
+                unique, counter = f"{stem}-{counter}{ext}", counter + 1
+            used.add(unique)
+            package.writestr(zipfile.ZipInfo(unique, date_time=(1980, 1, 1, 0, 0, 0)), data)
+    return buffer.getvalue()
+
+
+def _extract_in_worker(path):
+    """Extract one package document in a pool process. Returns (text, error, seconds)."""
+    start = time.perf_counter()
+    try:
+        return FileProcessor().process_file(path), None, time.perf_counter() - start
+    except Exception as e:
+        return None, str(e), time.perf_counter() - start
+
+
+def _get_extraction_pool(workers):
+    """Process pool shared by every package extraction in this process, created on first use"""
+    global _extraction_pool
+    with _extraction_pool_lock:
+        if _extraction_pool is None:
+            # The web server is multi-threaded, and forking a threaded process can deadlock the child
+            _extraction_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _extraction_pool
+
+
+def _reset_extraction_pool():
+    global _extraction_pool
+    with _extraction_pool_lock:
+        if _extraction_pool is not None:
+            _extraction_pool.shutdown(wait=False, cancel_futures=True)
+        _extraction_pool = None
+
 
 class FileProcessor:
     """
     Handles processing of various file formats for investment deal documents.
-    Supports: .txt, .pdf, .doc, .docx, .md
+    Supports: .txt, .pdf, .doc, .docx, .md, .csv, .xlsx, and .zip deal packages of those formats
+    
+    PyPDF2 and python-docx are imported on first use, so text uploads and server start-up
+    do not pay for them.
+    
+    Configuration (environment variables):
+        EXTRACT_WORKERS      processes extracting package documents in parallel (default: CPU count, max 4; 1 disables the pool)
+        PACKAGE_MAX_FILES    documents accepted in one package (default 50)
+        PACKAGE_MAX_BYTES    total uncompressed size of a package (default 200 MB)
     """
     
+    def __init__(self):
+        self.extract_workers = int(os.environ.get("EXTRACT_WORKERS", min(4, os.cpu_count() or 1)))
+        self.package_max_files = int(os.environ.get("PACKAGE_MAX_FILES", 50))
+        self.package_max_bytes = int(os.environ.get("PACKAGE_MAX_BYTES", 200 * 1024 * 1024))
+    
+    def preload(self):
+        """Import the PDF and DOCX libraries ahead of the first upload (e.g. before a server forks)"""
+        import PyPDF2
+        import docx
+    
     def process_file(self, filepath):
         """
         Process a file and extract text content.
@@ -25,10 +143,15 @@ class FileProcessor:
         
         if file_ext == '.txt' or file_ext == '.md':
             return self._process_text_file(filepath)
+        elif file_ext == '.zip':
+            return self.process_package(filepath)[0]
         elif file_ext == '.pdf':
             return self._process_pdf_file(filepath)
         elif file_ext == '.doc' or file_ext == '.docx':
             return self._process_docx_file(filepath)
+        elif file_ext == '.csv' or file_ext == '.xlsx':
+            # Rent rolls and operating statements are reduced to computed summaries instead of raw cells
+            return summarize_spreadsheet(filepath)
         else:
             raise ValueError(f"Unsupported file type: {file_ext}")
     
@@ -44,6 +167,7 @@ class FileProcessor:
     
     def _process_pdf_file(self, filepath):
         """Process PDF files"""
+        import PyPDF2
         try:
             text_content = []
             with open(filepath, 'rb') as f:
@@ -51,18 +175,128 @@ class FileProcessor:
                 for page_num, page in enumerate(pdf_reader.pages):
                     text = page.extract_text()
                     text_content.append(text)
-            return "\n".join(text_content)
+            # Form feeds mark page boundaries for TextNormalizer's header/footer detection
+            return "\f".join(text_content)
         except Exception as e:
             raise ValueError(f"Error processing PDF file: {str(e)}")
     
     def _process_docx_file(self, filepath):
-        """Process DOCX files"""
+        """Process DOCX files, keeping tables in document order"""
+        import docx
+        from docx.table import Table
+        from docx.text.paragraph import Paragraph
         try:
             doc = docx.Document(filepath)
             text_content = []
-            for paragraph in doc.paragraphs:
-                text_content.append(paragraph.text)
+            tables = 0
+            for element in doc.element.body.iterchildren():
+                tag = element.tag.rsplit("}", 1)[-1]
+                if tag == "p":
+                    text_content.append(Paragraph(element, doc).text)
+                elif tag == "tbl":
+                    tables += 1
+                    rows = [[cell.text.strip() for cell in row.cells] for row in Table(element, doc).rows]
+                    # Pasted rent rolls and operating statements are summarised like spreadsheets
+                    summary = summarize_rows(rows, f"{os.path.basename(filepath)}, table {tables}", fallback=False)
+                    text_content.append(summary or "\n".join(" | ".join(row) for row in rows if any(row)))
             return "\n".join(text_content)
         except Exception as e:
             raise ValueError(f"Error processing DOCX file: {str(e)}")
-
+    
+    def is_package(self, filepath):
+        return os.path.splitext(filepath)[1].lower() == '.zip'
+    
+    def process_package(self, filepath):
+        """
+        Extract every document of a ZIP deal package (OM, rent roll, T-12, PSA, ...) and merge them
+        into one corpus. PDF and Word documents are extracted concurrently in a process pool.
+        Each document starts on a new page under a "# DOCUMENT n OF m - name (role)" heading,
+        so section routing and the agents can tell which file a passage came from.
+        
+        Args:
+            filepath: Path to the ZIP package
+            
+        Returns:
+            Tuple of (merged text, list of per-file dictionaries with name, role, status, size,
+            characters and extraction time, or the reason the file was skipped or failed)
+        """
+        if not zipfile.is_zipfile(filepath):
+            raise ValueError("Error processing ZIP package: not a valid ZIP file")
+        
+        work_dir = tempfile.mkdtemp(prefix="deal_package_")
+        try:
+            files, paths = self._unpack(filepath, work_dir)
+            self._extract_all(files, paths)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        
+        extracted = [entry for entry in files if entry["status"] == "extracted"]
+        if not extracted:
+            reasons = "; ".join(f"{entry['name']}: {entry.get('error') or entry.get('reason')}" for entry in files)
+            raise ValueError(f"No documents could be extracted from the package ({reasons or 'it is empty'})")
+        
+        roles = [role for role, _ in DOCUMENT_ROLES] + [OTHER_DOCUMENT_ROLE]
+        extracted.sort(key=lambda entry: (roles.index(entry["role"]), entry["name"]))
+        listing = "\n".join(f"- {entry['name']} ({entry['role']})" for entry in extracted)
+        parts = [f"DEAL PACKAGE: {len(extracted)} documents\n{listing}"]
+        for number, entry in enumerate(extracted, 1):
+            parts.append(f"# DOCUMENT {number} OF {len(extracted)} - {entry['name']} ({entry['role']})\n\n{entry.pop('text')}")
+        # Form feeds keep each document's pages separate for TextNormalizer's header/footer detection
+        return "\f".join(parts), files
+    
+    def _unpack(self, filepath, work_dir):
+        """Copy the supported members of a package to work_dir, enforcing the file count and size limits"""
+        files, paths = [], {}
+        total = 0
+        with zipfile.ZipFile(filepath) as package:
+            for info in package.infolist():
+                name = info.filename
+                basename = os.path.basename(name.rstrip("/"))
+                if info.is_dir() or name.startswith("__MACOSX/") or basename.startswith("."):
+                    continue
+                ext = os.path.splitext(basename)[1].lower()
+                entry = {"name": name, "role": document_role(basename), "bytes": info.file_size}
+                files.append(entry)
+                if ext not in SUPPORTED_EXTENSIONS:
+                    entry.update({"status": "skipped", "reason": f"unsupported file type {ext or '(none)'}"})
+                    continue
+                if len(paths) >= self.package_max_files:
+                    entry.update({"status": "skipped", "reason": f"package limit of {self.package_max_files} documents"})
+                    continue
+                total += info.file_size
+                if total > self.package_max_bytes:
+                    raise ValueError(f"Error processing ZIP package: contents exceed {self.package_max_bytes} bytes")
+                # Members are written under generated names, so paths inside the archive cannot escape work_dir
+                path = os.path.join(work_dir, f"{len(paths):04d}{ext}")
+                try:
+                    with package.open(info) as source, open(path, 'wb') as target:
+                        shutil.copyfileobj(source, target)
+                except (RuntimeError, zipfile.BadZipFile, NotImplementedError) as e:
+                    entry.update({"status": "failed", "error": f"could not be unpacked ({e})"})
+                    continue
+                paths[len(files) - 1] = path
+        return files, paths
+    
+    def _extract_all(self, files, paths):
+        """Extract the unpacked documents, PDFs and Word files in the process pool when there are several"""
+        pooled = [index for index, path in paths.items() if os.path.splitext(path)[1] in POOLED_EXTENSIONS]
+        results = {}
+        if self.extract_workers > 1 and len(pooled) > 1:
+            try:
+                pool = _get_extraction_pool(self.extract_workers)
+                futures = {index: pool.submit(_extract_in_worker, paths[index]) for index in pooled}
+                results = {index: future.result() for index, future in futures.items()}
+            except (BrokenProcessPool, OSError) as e:
+                print(f"Warning: Extraction pool failed ({e}); extracting package documents in this process")
+                _reset_extraction_pool()
+                results = {}
+        for index, path in paths.items():
+            if index not in results:
+                results[index] = _extract_in_worker(path)
+            text, error, seconds = results[index]
+            entry = files[index]
+            entry["elapsed_ms"] = round(seconds * 1000, 1)
+            if error or not (text or "").strip():
+                entry.update({"status": "failed", "error": error or "no text could be extracted"})
+            else:
+                entry.update({"status": "extracted", "text": text, "characters": len(text)})
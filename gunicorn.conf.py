@@ -0,0 +1,18 @@
+# Production server settings: gunicorn -c gunicorn.conf.py app:app
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5001)}"
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+# Analyses can take several minutes
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 600))
+
+# Import the app once in the master process and fork workers from it
+preload_app = os.environ.get("GUNICORN_PRELOAD", "true").lower() == "true"
+
+
+def when_ready(server):
+    """Runs in the master before any worker is forked; load the heavy libraries once for all workers"""
+    if preload_app:
+        from app import preload
+        preload()
@@ -0,0 +1,198 @@
+import gzip
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Content types worth compressing; images, PDFs and archives are already compressed
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "image/svg+xml")
+
+# /static/... references in HTML that get a content fingerprint appended
+STATIC_REFERENCE = re.compile(r'((?:href|src)=")/static/([^"?#]+)(")')
+
+# Fingerprinted asset URLs change whenever the file changes, so browsers may keep them for a year
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+def content_etag(data):
+    """Strong ETag value derived from the content itself"""
+    return hashlib.sha256(data).hexdigest()[:32]
+
+
+class ResponseCompressor:
+    """
+    Compresses text responses with brotli (when the brotli package is installed) or gzip,
+    whichever the client prefers in Accept-Encoding.
+
+    A compressed response keeps a strong ETag with the encoding appended ("<etag>-gzip"), so
+    conditional requests made with the compressed ETag still get 304 Not Modified. Compressed
+    bodies of responses with an ETag (static files, reports) are kept in a small LRU cache so
+    repeat downloads are not compressed again.
+
+    Configuration (environment variables):
+        COMPRESS_RESPONSES    true | false (default true)
+        COMPRESS_MIN_BYTES    smaller bodies are sent as they are (default 1024)
+        COMPRESS_MAX_BYTES    file responses larger than this are streamed uncompressed (default 10 MB)
+        COMPRESS_GZIP_LEVEL   gzip level 1-9 (default 6)
+        COMPRESS_BROTLI_QUALITY  brotli quality 0-11 (default 5)
+    """
+
+    def __init__(self, config=None, cache_entries=128):
+        config = config if config is not None else self._load_config()
+        self.enabled = str(config.get("enabled", "true")).lower() == "true"
+        self.min_bytes = int(config.get("min_bytes", 1024))
+        self.max_bytes = int(config.get("max_bytes", 10 * 1024 * 1024))
+        self.gzip_level = int(config.get("gzip_level", 6))
+        self.brotli_quality = int(config.get("brotli_quality", 5))
+        self.encodings = (["br"] if brotli is not None else []) + ["gzip"]
+        self.cache_entries = cache_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load_config(self):
+        config = {}
+        for key in ("enabled", "min_bytes", "max_bytes", "gzip_level", "brotli_quality"):
+            env_key = "COMPRESS_RESPONSES" if key == "enabled" else f"COMPRESS_{key.upper()}"
+            value = os.environ.get(env_key)
+            if value:
+                config[key] = value
+        return config
+
+    def _compressible(self, response):
+        if response.status_code < 200 or response.status_code >= 300 or response.status_code in (204, 206):
+            return False
+        if "Content-Encoding" in response.headers or response.is_streamed and not response.direct_passthrough:
+            return False
+        if not (response.mimetype or "").startswith(COMPRESSIBLE_TYPES):
+            return False
+        length = response.content_length
+        if response.direct_passthrough and (length is None or length > self.max_bytes):
+            return False
+        return length is None or length >= self.min_bytes
+
+    def compress(self, request, response):
+        """
+        Compress a response for the request's Accept-Encoding (an after_request hook).
+
+        Returns:
+            The compressed response, a 304 response when the client already has it, or the response unchanged
+        """
+        if not self.enabled or not self._compressible(response):
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = request.accept_encodings.best_match(self.encodings)
+        if encoding is None:
+            return response
+
+        etag, weak = response.get_etag()
+        encoded_etag = f"{etag}-{encoding}" if etag else None
+        if encoded_etag and not weak and request.method in ("GET", "HEAD") and encoded_etag in request.if_none_match:
+            # The client already has this compressed representation
+            response.status_code = 304
+            response.direct_passthrough = False
+            response.set_data(b"")
+            response.set_etag(encoded_etag)
+            for header in ("Content-Length", "Content-Disposition"):
+                response.headers.pop(header, None)
+            return response
+
+        response.direct_passthrough = False
+        body = self._cached(encoded_etag) if encoded_etag and not weak else None
+        if body is None:
+            data = response.get_data()
+            if len(data) < self.min_bytes:
+                return response
+            body = self._encode(data, encoding)
+            if encoded_etag and not weak:
+                self._store(encoded_etag, body)
+        response.set_data(body)
+        response.headers["Content-Encoding"] = encoding
+        if encoded_etag:
+            response.set_etag(encoded_etag, weak)
+        return response
+
+    def _encode(self, data, encoding):
+        if encoding == "br":
+            return brotli.compress(data, quality=self.brotli_quality)
+        return gzip.compress(data, compresslevel=self.gzip_level, mtime=0)
+
+    def _cached(self, key):
+        with self._lock:
+            body = self._cache.get(key)
+            if body is not None:
+                self._cache.move_to_end(key)
+            return body
+
+    def _store(self, key, body):
+        with self._lock:
+            self._cache[key] = body
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+
+
+class StaticAssets:
+    """
+    Content fingerprints for the frontend's static files.
+
+    Pages are served with every /static/... reference rewritten to /static/...?v=<fingerprint>.
+    Requests carrying the current fingerprint get a year-long immutable Cache-Control, so a
+    repeat visit loads the assets from the browser cache without a request; a changed file gets
+    a new fingerprint and is fetched again. Fingerprints are recomputed when a file's
+    modification time changes.
+    """
+
+    def __init__(self, static_folder):
+        self.static_folder = static_folder
+        self._fingerprints = {}
+        self._lock = threading.Lock()
+
+    def fingerprint(self, filename):
+        """Short content hash of a static file, or None if it does not exist"""
+        path = os.path.join(self.static_folder, filename)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+        with self._lock:
+            cached = self._fingerprints.get(filename)
+            if cached and cached[0] == mtime:
+                return cached[1]
+        with open(path, 'rb') as f:
+            fingerprint = content_etag(f.read())[:12]
+        with self._lock:
+            self._fingerprints[filename] = (mtime, fingerprint)
+        return fingerprint
+
+    def render(self, filename):
+        """
+        Read an HTML page and fingerprint its static asset references.
+
+        Returns:
+            Tuple of (page bytes, ETag of the rendered page)
+        """
+        with open(os.path.join(self.static_folder, filename), 'r') as f:
+            html = f.read()
+
+        def add_fingerprint(match):
+            fingerprint = self.fingerprint(match.group(2))
+            if not fingerprint:
+                return match.group(0)
+            return f"{match.group(1)}/static/{match.group(2)}?v={fingerprint}{match.group(3)}"
+
+        data = STATIC_REFERENCE.sub(add_fingerprint, html).encode("utf-8")
+        return data, content_etag(data)
+
+    def apply_cache_headers(self, response, filename, version):
+        """Mark a static file response as immutable when it was requested with its current fingerprint"""
+        if response.status_code in (200, 304) and version and version == self.fingerprint(filename):
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        return response
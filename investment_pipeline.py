@@ -1,8 +1,24 @@
-from openai import OpenAI
+import json
 import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from cancellation import CancelledError
 from file_processor import FileProcessor
-import requests
-from python_a2a import AgentNetwork, Message, TextContent, MessageRole
+from text_normalizer import TextNormalizer
+from section_router import SectionRouter
+from legal_scanner import LegalScanner
+from deal_facts import extract_deal_facts
+from deal_revision import plan_reanalysis, format_revision
+from portfolio_compare import deal_metrics, rank_deals, build_comparison_prompt, format_metrics_table
+from deal_similarity import format_comparable_deals
+from market_data import get_market_data, format_market_data
+from deal_screen import DealScreen, format_screen_summary
+from model_router import ModelRouter, estimate_tokens
+from agent_registry import get_agent_specs
+from dag_scheduler import DAGScheduler, NodeCache, SUCCESS_STATES
+from batch_backend import get_batch_backend, write_batch_file, estimate_cost, model_prices, TERMINAL_STATES
 
 class InvestmentAnalysisPipeline:
     """
@@ -16,20 +32,52 @@ class InvestmentAnalysisPipeline:
     2. Direct Mode (default): Uses OpenAI directly with specialized system prompts
        - No external services required
        - System prompts replicate agent functionality
+    
+    openai and python_a2a are imported when a pipeline is created rather than when this module
+    is imported, so the web server starts quickly; call preload_dependencies() to load them early.
     """
     
-    def __init__(self):
+    def __init__(self, similarity_index=None, tenant="default", priority="interactive"):
         self.setup_agents()
         self.file_processor = FileProcessor()
+        # Strips page furniture, whitespace and boilerplate before the text reaches any prompt
+        self.text_normalizer = TextNormalizer()
+        # Sends each specialist only the document sections relevant to its topics
+        self.section_router = SectionRouter()
+        self.legal_scanner = LegalScanner()
+        # Optional DealSimilarityIndex used to ground market and real estate prompts in prior deals
+        self.similarity_index = similarity_index
+        self.comparable_deal_count = int(os.environ.get("COMPARABLE_DEAL_COUNT", 5))
+        # Local submarket metrics (rents, vacancy, absorption, cap rates) for the market agent
+        self.market_data = get_market_data()
+        self.deal_screen = DealScreen()
+        # Picks the model per agent and document size, and logs latency/tokens per model.
+        # LLM calls queue for a fair share of the shared quota on behalf of the tenant.
+        self.model_router = ModelRouter(tenant=tenant, priority=priority)
+        # Request deadline (0 disables) and the share of it kept back for the orchestrator
+        self.deadline_seconds = float(os.environ.get("PIPELINE_DEADLINE_SECONDS", 0))
+        # (at most ORCHESTRATOR_RESERVE_FRACTION of it, so short deadlines still leave time for specialists)
+        self.orchestrator_reserve_seconds = float(os.environ.get("ORCHESTRATOR_RESERVE_SECONDS", 45))
+        self.orchestrator_reserve_fraction = float(os.environ.get("ORCHESTRATOR_RESERVE_FRACTION", 0.3))
+        # Cancelled analyses and the tokens they wasted are appended here
+        self.cancellation_log_path = os.environ.get("CANCELLATION_LOG", os.path.join("data", "cancellations.jsonl"))
+        # Specialist agents from the registry (ENABLED_AGENTS) and the per-node report cache
+        self.agent_specs = get_agent_specs()
+        self.node_cache = None
+        if os.environ.get("NODE_CACHE", "true").lower() == "true":
+            self.node_cache = NodeCache(os.environ.get("NODE_CACHE_DIR", os.path.join("data", "node_cache")))
         # Agent endpoints (can be configured via environment variables)
         self.real_estate_agent_url = os.environ.get("REAL_ESTATE_AGENT_URL", "http://localhost:5005")
         self.financial_modeling_agent_url = os.environ.get("FINANCIAL_MODELING_AGENT_URL", "http://localhost:5006")
         self.market_analysis_agent_url = os.environ.get("MARKET_ANALYSIS_AGENT_URL", "http://localhost:5007")
         self.legal_agent_url = os.environ.get("LEGAL_AGENT_URL", "http://localhost:5008")
         self.use_external_agents = os.environ.get("USE_EXTERNAL_AGENTS", "false").lower() == "true"
+        # Agents with a standalone service; the others always use direct OpenAI calls
+        self.external_agent_ids = {"real_estate", "financial_modeling", "market_analysis", "legal"}
         
         # Initialize agent network if using external agents
         if self.use_external_agents:
+            from python_a2a import AgentNetwork
             self.agent_network = AgentNetwork()
             try:
                 self.agent_network.add("real_estate", self.real_estate_agent_url)
@@ -50,74 +98,28 @@ class InvestmentAnalysisPipeline:
         if not api_key:
             raise ValueError("OPENAI_API_KEY environment variable not set")
         
+        from openai import OpenAI
         self.client = OpenAI(api_key=api_key)
         
-        # Real Estate Analysis Agent System Prompt
-        self.real_estate_system_prompt = """You are a specialized real estate investment analysis agent. Your expertise includes:
-
-1. Property Fundamentals Analysis:
-   - Location quality and desirability
-   - Property type and quality (Class A, B, C)
-   - Physical condition and age
-   - Zoning and land use restrictions
-   - Environmental considerations
-
-2. Financial Metrics:
-   - Cap rates and capitalization rates
-   - Net Operating Income (NOI) analysis
-   - Cash-on-cash returns
-   - Gross Rental Multiplier (GRM)
-   - Debt Service Coverage Ratio (DSCR)
-   - Loan-to-Value (LTV) ratios
-
-3. Operational Metrics:
-   - Occupancy rates and trends
-   - Lease terms and tenant quality
-   - Property management quality
-   - Operating expenses and expense ratios
-   - Maintenance and capital expenditure needs
-
-IMPORTANT: Return your response as plain text only. Do NOT use markdown formatting such as:
-- No markdown headers (###, ##, #)
-- No horizontal rules (---)
-- No markdown bold (**text**) or italic (*text*)
-- No code blocks or backticks
-- Use plain text with line breaks and simple formatting only
-- Use numbered lists and bullet points with plain text (1., 2., -)
-
-Provide a comprehensive analysis in a structured format with clear sections using plain text only."""
+        # Specialist agent prompts live in agent_registry.AGENT_SPECS
         
-        # Financial Modeling Agent System Prompt
-        self.financial_modeling_system_prompt = """You are a specialized financial modeling and valuation expert for real estate investments. Your expertise includes:
-
-1. Financial Modeling:
-   - Discounted Cash Flow (DCF) analysis
-   - Pro forma income statements
-   - Cash flow projections (5-10 year horizons)
-   - Sensitivity analysis and scenario modeling
-   - Break-even analysis
-
-2. Return Metrics:
-   - Internal Rate of Return (IRR) calculations
-   - Multiple on Invested Capital (MOIC)
-   - Equity Multiple
-   - Cash-on-Cash Return
-   - Net Present Value (NPV)
-   - Yield analysis
-
-3. Valuation Methods:
-   - Income approach (capitalization method)
-   - Sales comparison approach
-   - Cost approach
-   - Discounted cash flow valuation
-   - Terminal value calculations
+        # Orchestrator/Synthesis Agent System Prompt
+        self.orchestrator_system_prompt = """You are a senior investment analyst and orchestrator responsible for synthesizing multiple specialized analyses into a comprehensive final investment recommendation report.
 
-4. Capital Structure Analysis:
-   - Debt vs. equity financing
-   - Loan terms and amortization schedules
-   - Interest rate analysis
-   - Leverage impact on returns
-   - Refinancing scenarios
+Your role is to:
+1. Review and synthesize all specialized agent analyses (real estate fundamentals, financial modeling, market analysis, legal/compliance)
+2. Provide a balanced, professional investment recommendation
+3. Create a comprehensive final report that includes:
+   - Executive Summary
+   - Deal Overview
+   - Real Estate Fundamentals Summary
+   - Financial Analysis Summary
+   - Market Analysis Summary
+   - Legal and Compliance Summary
+   - Investment Recommendation (Invest / Do Not Invest / Conditional)
+   - Key Decision Factors
+   - Risk Assessment (including legal risks)
+   - Next Steps and Action Items
 
 IMPORTANT: Return your response as plain text only. Do NOT use markdown formatting such as:
 - No markdown headers (###, ##, #)
@@ -127,50 +129,16 @@ IMPORTANT: Return your response as plain text only. Do NOT use markdown formatti
 - Use plain text with line breaks and simple formatting only
 - Use numbered lists and bullet points with plain text (1., 2., -)
 
-Provide detailed financial analysis with calculations, assumptions, and clear explanations of methodologies used."""
+Be professional, balanced, and provide actionable insights. Your recommendation should be clear and well-justified based on all the analyses provided."""
         
-        # Market Analysis Agent System Prompt
-        self.market_analysis_system_prompt = """You are a specialized real estate market analysis expert. Your expertise includes:
-
-1. Location Analysis:
-   - Neighborhood quality and desirability
-   - Demographics and population trends
-   - Economic indicators (employment, income growth)
-   - School district quality
-   - Crime rates and safety
-   - Walkability and transit access
-   - Proximity to amenities
-   - Future development plans and infrastructure projects
+        # Decline Memo System Prompt (used when a deal fails the deterministic pre-screen)
+        self.decline_memo_system_prompt = """You are a senior investment analyst writing a short decline memo for a real estate deal that failed the firm's buy-box screen.
 
-2. Market Trends:
-   - Historical price appreciation trends
-   - Rental rate trends and forecasts
-   - Occupancy trends
-   - Absorption rates
-   - Days on market (DOM) trends
-   - Market cycle position
-
-3. Supply and Demand Dynamics:
-   - Current inventory levels
-   - New construction pipeline
-   - Absorption rates
-   - Vacancy rates and trends
-   - Population growth and migration patterns
-   - Job growth and economic development
-
-4. Comparable Properties (Comps):
-   - Similar properties in the area
-   - Recent sales comparables
-   - Rental comparables
-   - Price per square foot analysis
-   - Cap rate comparables
-   - Feature comparisons
-
-5. Competitive Landscape:
-   - Competing properties
-   - Market positioning
-   - Competitive advantages/disadvantages
-   - Market share analysis
+Your memo should include:
+   - Deal Overview (one short paragraph)
+   - Reasons for Decline (based on the screen failures provided)
+   - What Would Need to Change for the deal to be reconsidered (e.g. price, leverage, occupancy)
+   - Recommendation: Do Not Invest
 
 IMPORTANT: Return your response as plain text only. Do NOT use markdown formatting such as:
 - No markdown headers (###, ##, #)
@@ -180,83 +148,12 @@ IMPORTANT: Return your response as plain text only. Do NOT use markdown formatti
 - Use plain text with line breaks and simple formatting only
 - Use numbered lists and bullet points with plain text (1., 2., -)
 
-Provide comprehensive market analysis with data-driven insights and clear risk/opportunity assessments."""
+Keep the memo concise and factual."""
         
-        # Legal Analysis Agent System Prompt
-        self.legal_system_prompt = """You are a specialized real estate legal and regulatory compliance expert. Your expertise includes:
-
-1. Legal Structure Analysis:
-   - Entity types (LLC, LP, Corporation, Trust)
-   - Ownership structure and beneficial ownership
-   - Partnership agreements and operating agreements
-   - Corporate governance requirements
-   - Legal entity formation and jurisdiction
-
-2. Regulatory Compliance:
-   - SEC regulations (if applicable for investment funds)
-   - State and local real estate regulations
-   - Fair housing laws and compliance
-   - Americans with Disabilities Act (ADA) compliance
-   - Building codes and safety regulations
-   - Fire safety and life safety codes
-
-3. Zoning and Land Use:
-   - Current zoning classification
-   - Permitted uses and restrictions
-   - Variance requirements and special permits
-   - Setback requirements
-   - Density restrictions
-   - Future zoning changes and development plans
-   - Non-conforming use issues
-
-4. Title and Ownership:
-   - Title insurance and title defects
-   - Easements and encumbrances
-   - Liens and judgments
-   - Boundary disputes
-   - Mineral rights and subsurface rights
-   - Air rights and development rights
-   - Condemnation and eminent domain risks
+        # Portfolio Comparison System Prompt (ranks several analysed deals against each other)
+        self.portfolio_system_prompt = """You are a senior investment analyst preparing an investment committee's comparison of several real estate deals that have each been analysed already.
 
-5. Environmental Regulations:
-   - Environmental site assessments (Phase I/II)
-   - Contaminated land issues
-   - Asbestos and lead-based paint
-   - Wetlands and protected areas
-   - Endangered species considerations
-   - Stormwater management requirements
-   - Brownfield redevelopment programs
-
-6. Contract and Lease Review:
-   - Purchase and sale agreements
-   - Lease agreements and terms
-   - Assignment and subletting rights
-   - Default and termination provisions
-   - Dispute resolution mechanisms
-   - Force majeure clauses
-
-7. Tax and Structuring:
-   - Property tax assessments
-   - Transfer tax implications
-   - 1031 exchange opportunities
-   - Tax abatements and incentives
-   - Entity-level tax considerations
-   - State and local tax implications
-
-8. Due Diligence Legal Issues:
-   - Permits and approvals
-   - Violations and citations
-   - Pending litigation
-   - Regulatory enforcement actions
-   - Insurance claims history
-   - Historical compliance issues
-
-9. Risk Assessment:
-   - Legal liability exposure
-   - Regulatory enforcement risks
-   - Litigation risks
-   - Compliance failure consequences
-   - Reputation risks
+You receive a table of key metrics with a deterministic score for every deal and the conclusion of each deal's full analysis. Rank all of the deals, weighing the metrics together with the qualitative findings (risks, legal issues, market position) in the conclusions. Do not invent figures that are not given.
 
 IMPORTANT: Return your response as plain text only. Do NOT use markdown formatting such as:
 - No markdown headers (###, ##, #)
@@ -266,37 +163,9 @@ IMPORTANT: Return your response as plain text only. Do NOT use markdown formatti
 - Use plain text with line breaks and simple formatting only
 - Use numbered lists and bullet points with plain text (1., 2., -)
 
-Provide comprehensive legal analysis with clear identification of risks, compliance requirements, and recommended actions. Structure your response with clear sections for each area of analysis."""
-        
-        # Orchestrator/Synthesis Agent System Prompt
-        self.orchestrator_system_prompt = """You are a senior investment analyst and orchestrator responsible for synthesizing multiple specialized analyses into a comprehensive final investment recommendation report.
-
-Your role is to:
-1. Review and synthesize all specialized agent analyses (real estate fundamentals, financial modeling, market analysis, legal/compliance)
-2. Provide a balanced, professional investment recommendation
-3. Create a comprehensive final report that includes:
-   - Executive Summary
-   - Deal Overview
-   - Real Estate Fundamentals Summary
-   - Financial Analysis Summary
-   - Market Analysis Summary
-   - Legal and Compliance Summary
-   - Investment Recommendation (Invest / Do Not Invest / Conditional)
-   - Key Decision Factors
-   - Risk Assessment (including legal risks)
-   - Next Steps and Action Items
-
-IMPORTANT: Return your response as plain text only. Do NOT use markdown formatting such as:
-- No markdown headers (###, ##, #)
-- No horizontal rules (---)
-- No markdown bold (**text**) or italic (*text*)
-- No code blocks or backticks
-- Use plain text with line breaks and simple formatting only
-- Use numbered lists and bullet points with plain text (1., 2., -)
-
-Be professional, balanced, and provide actionable insights. Your recommendation should be clear and well-justified based on all the analyses provided."""
+Be concise and decisive."""
     
-    def _call_agent(self, agent_id, deal_content, system_prompt, user_prompt):
+    def _call_agent(self, agent_id, deal_content, system_prompt, user_prompt, timeout=None, cancel_token=None):
         """
         Call an agent either via external service or using OpenAI directly.
         
@@ -305,19 +174,29 @@ Be professional, balanced, and provide actionable insights. Your recommendation
             deal_content: The deal document content
             system_prompt: System prompt for direct OpenAI call (fallback)
             user_prompt: User prompt for the analysis
+            timeout: Optional timeout in seconds for the direct OpenAI call
+            cancel_token: Optional cancellation.CancelToken that aborts the call
             
         Returns:
             Agent response as string
         """
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        
         # Try external agent first if enabled
-        if self.use_external_agents and self.agent_network:
+        if self.use_external_agents and self.agent_network and agent_id in self.external_agent_ids:
             try:
+                from python_a2a import Message, TextContent, MessageRole
                 agent = self.agent_network.get_agent(agent_id)
                 message = Message(
                     content=TextContent(text=user_prompt),
                     role=MessageRole.USER
                 )
-                response = agent.ask(message)
+                with self.model_router.llm_slot(timeout, cancel_token):
+                    response = agent.ask(message)
+                # python_a2a calls cannot be interrupted; discard the answer if the request was cancelled meanwhile
+                if cancel_token is not None:
+                    cancel_token.raise_if_cancelled()
                 # Extract text from response
                 if isinstance(response, str):
                     return response
@@ -327,139 +206,888 @@ Be professional, balanced, and provide actionable insights. Your recommendation
                     elif hasattr(response.content, 'text'):
                         return response.content.text
                 return str(response)
+            except CancelledError:
+                raise
             except Exception as e:
                 print(f"Warning: Could not reach {agent_id} agent service: {e}")
                 print(f"   Falling back to direct OpenAI call")
         
-        # Fallback to direct OpenAI call with system prompt
+        # Fallback to direct OpenAI call with system prompt, on the routed model
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.7
-            )
-            return response.choices[0].message.content
+            kwargs = {"timeout": timeout} if timeout else {}
+            return self.model_router.complete(self.client, agent_id, system_prompt, user_prompt, cancel_token=cancel_token, **kwargs)
+        except CancelledError:
+            raise
         except Exception as e:
             raise Exception(f"Error calling {agent_id} agent: {str(e)}")
     
-    def analyze(self, filepath):
+    def analyze(self, filepath, deadline_seconds=None, on_late_result=None, precomputed_reports=None, on_agent_complete=None,
+                cancel_token=None, previous_results=None):
         """
         Main analysis pipeline that processes the investment deal file through all agents.
         
         Args:
-            filepath: Path to the investment deal document
+            filepath: Path to the investment deal document, or a ZIP deal package of several documents
+            deadline_seconds: Overall time budget for the request (defaults to PIPELINE_DEADLINE_SECONDS).
+                When specialists are still running at the deadline, the orchestrator runs on the
+                reports that finished and the rest are marked as timed out.
+            on_late_result: Optional callback(agent_id, report) invoked when a timed out agent finishes later
+            precomputed_reports: Optional specialist reports by agent id from an earlier, interrupted attempt;
+                those agents are not run again
+            on_agent_complete: Optional callback(agent_id, status, report, elapsed) invoked as each specialist
+                report becomes available, e.g. to persist it for resumption
+            cancel_token: Optional cancellation.CancelToken. When it is cancelled, pending agents are
+                skipped, in-progress calls are aborted, the orchestrator is not run, the wasted
+                tokens are logged and CancelledError is raised.
+            previous_results: Optional stored results of an earlier version of the same deal (see
+                stage_store.StageStore.load). The documents are compared section by section and
+                only the specialists whose sections or context changed are run again; the others
+                keep their earlier report. The orchestrator always runs.
             
         Returns:
             Dictionary containing reports from all agents and orchestrator
         """
-        # Step 1: Process and extract text from file
+        if deadline_seconds is None:
+            deadline_seconds = self.deadline_seconds
+        deadline_at = time.monotonic() + deadline_seconds if deadline_seconds else None
+        
+        # Earlier versions of a revised deal are not comparables for it
+        revision_chain = []
+        if previous_results is not None:
+            revision_chain = [previous_results["report_id"]] + (previous_results.get("revision") or {}).get("chain", [])
+        
+        # Step 1: Extract and preprocess the document
+        prepared = self._prepare(filepath, exclude_ids=revision_chain)
+        deal_content, deal_facts = prepared["deal_content"], prepared["deal_facts"]
+        if prepared["screen"] is not None and not prepared["screen"]["passed"]:
+            results = self._screened_out_results(deal_content, deal_facts, prepared["screen"])
+            results["normalization"] = prepared["normalization"]
+            results["source_files"] = prepared["source_files"]
+            return results
+        
+        # Step 2: Specialist agents, scheduled as a dependency graph with maximal parallelism
+        context = prepared["context"]
+        
+        # For a revised deal, specialists untouched by the revision keep their earlier report
+        revision = None
+        reused_reports = {}
+        if previous_results is not None:
+            revision = plan_reanalysis(previous_results, deal_content, deal_facts, context, self.agent_specs)
+            revision["chain"] = revision_chain
+            specs_by_id = {spec.agent_id: spec for spec in self.agent_specs}
+            reused_reports = {
+                agent_id: previous_results[specs_by_id[agent_id].result_key] for agent_id in revision["reused"]
+                if agent_id not in (precomputed_reports or {})
+            }
+            print(f"Revision of {revision['previous_report_id']}: {len(revision['sections'])} of {revision['total_sections']} "
+                  f"sections changed, reusing {', '.join(reused_reports) or 'no'} reports ({revision['elapsed_ms']} ms)")
+        
+        specialists_deadline = self._specialists_deadline(deadline_at, deadline_seconds)
+        scheduler = DAGScheduler(
+            self.agent_specs,
+            lambda spec, user_prompt, timeout: self._call_agent(spec.agent_id, deal_content, spec.system_prompt, user_prompt, timeout, cancel_token),
+            cache=self.node_cache,
+            cache_variant=self._cache_variant(),
+            default_timeout=os.environ.get("AGENT_TIMEOUT_SECONDS")
+        )
+        reports, agent_status, agent_timings = scheduler.run(
+            context, specialists_deadline, on_late_result,
+            precomputed={**reused_reports, **(precomputed_reports or {})}, on_node_complete=on_agent_complete,
+            cancel_token=cancel_token
+        )
+        if cancel_token is not None and cancel_token.cancelled:
+            self._record_cancellation(cancel_token.reason, "specialists", agent_status)
+            raise CancelledError(cancel_token.reason)
+        for agent_id in reused_reports:
+            agent_status[agent_id] = "reused"
+            agent_timings[agent_id] = previous_results.get("agent_timings", {}).get(agent_id, 0.0)
+        revision_note = ""
+        if revision is not None:
+            revision["llm_calls_saved"] = len(reused_reports)
+            carried_over = [spec.title for spec in self.agent_specs if spec.agent_id in reused_reports]
+            carried_over_note = ""
+            if carried_over:
+                carried_over_note = f"The {', '.join(carried_over)} analyses were carried over from the earlier version because the revision does not touch their scope. "
+            revision_note = f"""
+
+REVISED DEAL: This document is a revised version of a deal analysed earlier. What changed:
+{format_revision(revision)}
+{carried_over_note}Point out what changed in this revision and how it affects the recommendation."""
+        
+        # Step 3: Orchestrator/Synthesis Agent, on whatever specialist reports finished in time
+        orchestrator_report, orchestrator_prompt, missing = self._synthesize(
+            deal_content, reports, agent_status, deadline_at, cancel_token, revision_note
+        )
+        
+        results = {spec.result_key: reports[spec.agent_id] for spec in self.agent_specs}
+        results.update({
+            "orchestrator_report": orchestrator_report,
+            "deal_content": deal_content,
+            "deal_facts": deal_facts,
+            "source_files": prepared["source_files"],
+            "normalization": prepared["normalization"],
+            "section_routing": prepared["section_routing"],
+            "legal_scan": prepared["legal_scan"],
+            "comparable_deals": prepared["comparable_deals"],
+            "market_data": prepared["market_data"],
+            "screen": prepared["screen"],
+            "model_usage": self.model_router.summary(),
+            "agents": self._agent_descriptions(),
+            "agent_status": agent_status,
+            "agent_timings": agent_timings,
+            "partial": bool(missing) or agent_status["orchestrator"] != "completed",
+            "deadline_seconds": deadline_seconds,
+            "revision": revision,
+            "revision_of": revision["previous_report_id"] if revision else None,
+            # Inputs of every stage, persisted by stage_store.StageStore so single stages can be re-run later
+            "stage_context": context,
+            "stage_inputs": self._stage_inputs(scheduler.user_prompts, orchestrator_prompt)
+        })
+        return results
+    
+    def analyze_deferred(self, filepaths, backend=None, poll_seconds=None, max_wait_seconds=None, on_result=None):
+        """
+        Analyse many deals without interactive latency, e.g. for overnight screening runs.
+        
+        Every deal is extracted and preprocessed as in analyze(). The specialist requests of all
+        deals are then written to a batch request JSONL file and submitted through a batch backend
+        (batch_backend.get_batch_backend), one batch per dependency level of the agent graph, and
+        polled until done. Requests that fail, expire or fail the quality check are retried
+        interactively. Finally each deal's orchestrator runs as an interactive call.
+        
+        Args:
+            filepaths: Paths of the deal documents or packages
+            backend: Optional batch_backend.BatchBackend (defaults to BATCH_BACKEND)
+            poll_seconds: Seconds between batch status checks (defaults to BATCH_POLL_SECONDS, 30)
+            max_wait_seconds: Stop waiting for a batch after this long and retry its unfinished
+                requests interactively (defaults to BATCH_MAX_WAIT_SECONDS; 0 waits indefinitely)
+            on_result: Optional callback(filepath, results, error) invoked as each deal finishes
+            
+        Returns:
+            Tuple of (list of (filepath, results or None, error or None) in input order, run statistics
+            with throughput, LLM calls and batch vs. interactive cost)
+        """
+        start = time.monotonic()
+        backend = backend or get_batch_backend(self.client)
+        if poll_seconds is None:
+            poll_seconds = float(os.environ.get("BATCH_POLL_SECONDS", 30))
+        if max_wait_seconds is None:
+            max_wait_seconds = float(os.environ.get("BATCH_MAX_WAIT_SECONDS", 0)) or None
+        run_id = f"deferred_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+        batch_dir = os.environ.get("BATCH_DIR", os.path.join("data", "batches"))
+        specs_by_id = {spec.agent_id: spec for spec in self.agent_specs}
+        prices = model_prices()
+        outcomes = {}
+        
+        def finish(key, filepath, results, error):
+            outcomes[key] = (filepath, results, error)
+            if on_result is not None:
+                on_result(filepath, results, error)
+        
+        # Step 1: Extract and preprocess every deal; screened out deals are finished right away
+        deals = {}
+        for index, filepath in enumerate(filepaths):
+            key = f"deal{index:05d}"
+            try:
+                prepared = self._prepare(filepath)
+            except Exception as e:
+                print(f"Warning: Could not prepare {filepath}: {e}")
+                finish(key, filepath, None, str(e))
+                continue
+            if prepared["screen"] is not None and not prepared["screen"]["passed"]:
+                results = self._screened_out_results(prepared["deal_content"], prepared["deal_facts"], prepared["screen"])
+                results["normalization"] = prepared["normalization"]
+                results["source_files"] = prepared["source_files"]
+                finish(key, filepath, results, None)
+                continue
+            deals[key] = {"filepath": filepath, "prepared": prepared, "reports": {}, "status": {}, "timings": {},
+                          "user_prompts": {}, "models": {}, "calls": []}
+        
+        # Step 2: Specialists, one batch per dependency level so dependents see their inputs' reports
+        batches = []
+        fallback_calls = 0
+        fallback_workers = int(os.environ.get("BATCH_FALLBACK_WORKERS", 8))
+        remaining = list(self.agent_specs)
+        while remaining and deals:
+            remaining_ids = {spec.agent_id for spec in remaining}
+            wave = [spec for spec in remaining if not any(dependency in remaining_ids for dependency in spec.depends_on)]
+            remaining = [spec for spec in remaining if spec not in wave]
+            requests, pending = [], {}
+            for key, deal in deals.items():
+                for spec in wave:
+                    dependency_reports = {
+                        dependency: (specs_by_id[dependency].section_heading, deal["reports"][dependency])
+                        for dependency in spec.depends_on if deal["status"].get(dependency) in SUCCESS_STATES
+                    }
+                    user_prompt = spec.build_prompt(deal["prepared"]["context"], dependency_reports)
+                    deal["user_prompts"][spec.agent_id] = user_prompt
+                    cache_key = None
+                    if self.node_cache:
+                        cache_key = self.node_cache.key(spec.agent_id, spec.system_prompt, user_prompt, self._cache_variant())
+                        cached = self.node_cache.get(cache_key)
+                        if cached is not None:
+                            deal["reports"][spec.agent_id] = cached
+                            deal["status"][spec.agent_id] = "cached"
+                            deal["timings"][spec.agent_id] = 0.0
+                            continue
+                    body, prompt_tokens = self.model_router.batch_request(spec.agent_id, spec.system_prompt, user_prompt)
+                    custom_id = f"{key}:{spec.agent_id}"
+                    requests.append((custom_id, body))
+                    pending[custom_id] = (key, spec, body["model"], prompt_tokens, cache_key)
+            if not requests:
+                continue
+            
+            path = os.path.join(batch_dir, f"{run_id}_level{len(batches)}.jsonl")
+            write_batch_file(path, requests)
+            wave_start = time.monotonic()
+            batch_id = backend.submit(path, {"run": run_id})
+            print(f"Submitted {len(requests)} requests ({', '.join(spec.agent_id for spec in wave)}) as batch {batch_id}")
+            batch_status = backend.wait(batch_id, poll_seconds, max_wait_seconds)
+            if batch_status["status"] not in TERMINAL_STATES:
+                # Unfinished requests are retried interactively below; stop paying for them in the batch
+                backend.cancel(batch_id)
+                batch_status = backend.status(batch_id)
+            batch_results = backend.results(batch_id)
+            wave_elapsed = time.monotonic() - wave_start
+            batches.append({"batch_id": batch_id, "backend": backend.name, "requests": len(requests),
+                            "status": batch_status["status"], "completed": len(batch_results), "wait_s": round(wave_elapsed, 3)})
+            
+            retries = []
+            for custom_id, (key, spec, model, prompt_tokens, cache_key) in pending.items():
+                deal = deals[key]
+                result = batch_results.get(custom_id) or {"text": None, "error": "no result before the batch ended"}
+                passed = False
+                if result["text"] is not None:
+                    model = result.get("model") or model
+                    passed = self.model_router.record_batch_call(spec.agent_id, model, result["text"], result.get("finish_reason"),
+                                                                 result.get("usage"), prompt_tokens, wave_elapsed)
+                    usage = result.get("usage") or {}
+                    deal["calls"].append({"agent": spec.agent_id, "model": model, "batch": True,
+                                          "prompt_tokens": usage.get("prompt_tokens") or prompt_tokens,
+                                          "completion_tokens": usage.get("completion_tokens") or estimate_tokens(result["text"])})
+                if not passed:
+                    print(f"Warning: Batch {spec.agent_id} request for {deal['filepath']} "
+                          f"{'failed: ' + str(result['error']) if result['text'] is None else 'failed the quality check'}; retrying interactively")
+                    retries.append((key, spec, prompt_tokens, cache_key))
+                    continue
+                if cache_key:
+                    self.node_cache.set(cache_key, result["text"])
+                deal["reports"][spec.agent_id] = result["text"]
+                deal["status"][spec.agent_id] = "completed"
+                deal["timings"][spec.agent_id] = round(wave_elapsed, 3)
+                deal["models"][spec.agent_id] = model
+            
+            # Failed, expired and poor batch answers are retried interactively (with escalation), concurrently
+            # so that an expired batch of many deals does not turn into one long chain of calls
+            def retry(item):
+                key, spec, prompt_tokens, cache_key = item
+                deal = deals[key]
+                model = self.model_router.select_model(spec.agent_id, prompt_tokens)[0]
+                try:
+                    report = self._call_agent(spec.agent_id, deal["prepared"]["deal_content"], spec.system_prompt,
+                                              deal["user_prompts"][spec.agent_id])
+                    status = "completed"
+                    deal["calls"].append({"agent": spec.agent_id, "model": model, "batch": False,
+                                          "prompt_tokens": prompt_tokens, "completion_tokens": estimate_tokens(report)})
+                    if cache_key:
+                        self.node_cache.set(cache_key, report)
+                except Exception as e:
+                    print(f"Warning: {spec.title} Agent failed for {deal['filepath']}: {e}")
+                    report, status = f"FAILED: The {spec.title} analysis could not be completed ({e}).", "failed"
+                deal["reports"][spec.agent_id] = report
+                deal["status"][spec.agent_id] = status
+                deal["timings"][spec.agent_id] = round(time.monotonic() - wave_start, 3)
+                deal["models"][spec.agent_id] = model
+            
+            if retries:
+                with ThreadPoolExecutor(max_workers=max(fallback_workers, 1), thread_name_prefix="batch-fallback") as executor:
+                    list(executor.map(retry, retries))
+                fallback_calls += len(retries)
+        
+        # Step 3: One orchestrator call per deal, as the specialist reports are all in
+        def synthesize(key):
+            deal = deals[key]
+            prepared = deal["prepared"]
+            try:
+                orchestrator_report, orchestrator_prompt, missing = self._synthesize(
+                    prepared["deal_content"], deal["reports"], deal["status"]
+                )
+                prompt_tokens = estimate_tokens(self.orchestrator_system_prompt) + estimate_tokens(orchestrator_prompt)
+                model = self.model_router.select_model("orchestrator", prompt_tokens)[0]
+                deal["calls"].append({"agent": "orchestrator", "model": model, "batch": False,
+                                      "prompt_tokens": prompt_tokens, "completion_tokens": estimate_tokens(orchestrator_report)})
+                # Interactive and fallback calls are estimated from the prompt and report sizes
+                cost = sum(estimate_cost(call["model"], call["prompt_tokens"], call["completion_tokens"],
+                                         call["batch"] and backend.discounted, prices) or 0
+                           for call in deal["calls"])
+                interactive_cost = sum(estimate_cost(call["model"], call["prompt_tokens"], call["completion_tokens"], False, prices) or 0
+                                       for call in deal["calls"])
+                per_model = {}
+                for call in deal["calls"]:
+                    totals = per_model.setdefault(call["model"], {"calls": 0, "batch_calls": 0, "prompt_tokens": 0, "completion_tokens": 0})
+                    totals["calls"] += 1
+                    totals["batch_calls"] += 1 if call["batch"] else 0
+                    totals["prompt_tokens"] += call["prompt_tokens"] or 0
+                    totals["completion_tokens"] += call["completion_tokens"] or 0
+                results = {spec.result_key: deal["reports"][spec.agent_id] for spec in self.agent_specs}
+                results.update({
+                    "orchestrator_report": orchestrator_report,
+                    "deal_content": prepared["deal_content"],
+                    "deal_facts": prepared["deal_facts"],
+                    "source_files": prepared["source_files"],
+                    "normalization": prepared["normalization"],
+                    "section_routing": prepared["section_routing"],
+                    "legal_scan": prepared["legal_scan"],
+                    "comparable_deals": prepared["comparable_deals"],
+                    "market_data": prepared["market_data"],
+                    "screen": prepared["screen"],
+                    "model_usage": {"calls": deal["calls"], "per_model": per_model},
+                    "agents": self._agent_descriptions(),
+                    "agent_status": deal["status"],
+                    "agent_timings": deal["timings"],
+                    "partial": bool(missing) or deal["status"]["orchestrator"] != "completed",
+                    "deadline_seconds": None,
+                    "deferred": {
+                        "run_id": run_id,
+                        "batch_calls": sum(1 for call in deal["calls"] if call["batch"]),
+                        "interactive_calls": sum(1 for call in deal["calls"] if not call["batch"]),
+                        "cost_usd": round(cost, 6),
+                        "interactive_cost_usd": round(interactive_cost, 6)
+                    },
+                    "stage_context": prepared["context"],
+                    "stage_inputs": {
+                        **{agent_id: {"system_prompt": specs_by_id[agent_id].system_prompt, "user_prompt": user_prompt,
+                                      "model": deal["models"].get(agent_id)}
+                           for agent_id, user_prompt in deal["user_prompts"].items()},
+                        "orchestrator": {"system_prompt": self.orchestrator_system_prompt, "user_prompt": orchestrator_prompt,
+                                         "model": model}
+                    }
+                })
+                finish(key, deal["filepath"], results, None)
+            except Exception as e:
+                print(f"Warning: Could not finish {deal['filepath']}: {e}")
+                finish(key, deal["filepath"], None, str(e))
+        
+        workers = int(os.environ.get("BATCH_ORCHESTRATOR_WORKERS", 4))
+        with ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="orchestrator") as executor:
+            list(executor.map(synthesize, list(deals)))
+        
+        wall_s = time.monotonic() - start
+        completed = [results for _, results, _ in outcomes.values() if results is not None and "deferred" in results]
+        cost = sum(results["deferred"]["cost_usd"] for results in completed)
+        interactive_cost = sum(results["deferred"]["interactive_cost_usd"] for results in completed)
+        stats = {
+            "run_id": run_id,
+            "backend": backend.name,
+            "deals": len(filepaths),
+            "analysed": len(completed),
+            "screened_out": sum(1 for _, results, _ in outcomes.values() if results is not None and "deferred" not in results),
+            "failed": sum(1 for _, results, _ in outcomes.values() if results is None),
+            "wall_s": round(wall_s, 3),
+            "deals_per_hour": round(len(filepaths) / wall_s * 3600, 1) if wall_s else None,
+            "batches": batches,
+            "batch_calls": sum(results["deferred"]["batch_calls"] for results in completed),
+            "interactive_calls": sum(results["deferred"]["interactive_calls"] for results in completed),
+            "fallback_calls": fallback_calls,
+            "cost_usd": round(cost, 4),
+            "interactive_cost_usd": round(interactive_cost, 4),
+            "cost_per_deal_usd": round(cost / len(completed), 4) if completed else None,
+            "interactive_cost_per_deal_usd": round(interactive_cost / len(completed), 4) if completed else None
+        }
+        print(f"Deferred run {run_id}: {stats['analysed']} analysed, {stats['screened_out']} screened out, {stats['failed']} failed "
+              f"in {wall_s:.1f}s; ${stats['cost_usd']:.4f} vs ${stats['interactive_cost_usd']:.4f} interactive")
+        return [outcomes[key] for key in sorted(outcomes)], stats
+    
+    def _prepare(self, filepath, exclude_ids=None):
+        """
+        Extract, normalise and preprocess a deal document: everything before the first LLM call.
+        
+        Args:
+            filepath: Path to the investment deal document or ZIP deal package
+            exclude_ids: Report ids never to use as comparable deals (e.g. earlier versions of the deal)
+            
+        Returns:
+            Dictionary with deal_content, deal_facts, source_files, normalization and screen; unless
+            the deal failed the buy-box screen, also comparable_deals, market_data, section_routing,
+            legal_scan and context (the stage context the specialists' prompts are built from)
+        """
+        # Extract the text of the document, or of every document in a package
         print("Processing investment deal document...")
-        deal_content = self.file_processor.process_file(filepath)
+        source_files = None
+        if self.file_processor.is_package(filepath):
+            # A deal package (OM, rent roll, T-12, ...) is merged into one corpus and analysed once
+            deal_content, source_files = self.file_processor.process_package(filepath)
+            extracted = [entry for entry in source_files if entry["status"] == "extracted"]
+            print(f"Extracted {len(extracted)} of {len(source_files)} package documents: "
+                  + ", ".join(f"{entry['name']} ({entry['role']})" for entry in extracted))
+        else:
+            deal_content = self.file_processor.process_file(filepath)
         
         if not deal_content:
             raise ValueError("Failed to extract content from the investment deal file")
         
-        # Step 2: Real Estate Analysis Agent
-        print("Running Real Estate Analysis Agent...")
-        real_estate_prompt = f"""Analyze the following real estate investment deal document:
-
-{deal_content}
-
-Provide a comprehensive analysis of property fundamentals, financial metrics, and operational metrics."""
+        # The document is sent to every specialist and the orchestrator, so each token saved here is saved per prompt
+        deal_content, normalization = self.text_normalizer.normalize(deal_content)
+        normalization["prompt_tokens_saved"] = normalization["tokens_saved"] * (len(self.agent_specs) + 1)
+        print(f"Normalised deal text: {normalization['original_tokens']} -> {normalization['normalized_tokens']} tokens "
+              f"({normalization['percent_saved']}% saved, {normalization['elapsed_ms']} ms)")
         
-        real_estate_report = self._call_agent(
-            "real_estate",
-            deal_content,
-            self.real_estate_system_prompt,
-            real_estate_prompt
-        )
+        deal_facts = extract_deal_facts(deal_content)
         
-        # Step 3: Financial Modeling Agent
-        print("Running Financial Modeling Agent...")
-        financial_prompt = f"""Perform financial modeling and valuation analysis for the following real estate investment deal:
-
-{deal_content}
-
-Provide detailed financial analysis including DCF, IRR, cash flow projections, and valuation."""
+        prepared = {
+            "deal_content": deal_content,
+            "deal_facts": deal_facts,
+            "source_files": source_files,
+            "normalization": normalization,
+            "screen": None
+        }
         
-        financial_report = self._call_agent(
-            "financial_modeling",
-            deal_content,
-            self.financial_modeling_system_prompt,
-            financial_prompt
-        )
+        # Deterministic buy-box screen before paying for any LLM calls
+        if self.deal_screen.enabled:
+            prepared["screen"] = self.deal_screen.screen(deal_facts)
+            if not prepared["screen"]["passed"]:
+                return prepared
         
-        # Step 4: Market Analysis Agent
-        print("Running Market Analysis Agent...")
-        market_prompt = f"""Analyze the market, location, and comparable properties for the following real estate investment deal:
-
-{deal_content}
-
-Provide comprehensive market analysis including location quality, market trends, and comparable properties."""
+        comparable_deals = []
+        if self.similarity_index is not None:
+            try:
+                comparable_deals = self.similarity_index.query(deal_content, deal_facts, top_k=self.comparable_deal_count,
+                                                               exclude_ids=exclude_ids)
+            except Exception as e:
+                print(f"Warning: Could not query comparable deals: {e}")
+        comparables_context = format_comparable_deals(comparable_deals)
+        if comparables_context:
+            comparables_context = f"{comparables_context}\nUse these prior deals as reference points where relevant; do not invent other comparables."
         
-        market_report = self._call_agent(
-            "market_analysis",
-            deal_content,
-            self.market_analysis_system_prompt,
-            market_prompt
-        )
+        # Dataset rows for the deal's metro, submarket and asset class, so the market agent interprets real figures
+        market_data = {"metro": None, "submarket_rows": [], "metro_rows": []}
+        try:
+            market_data = self.market_data.lookup(
+                deal_facts.get("msa"), deal_facts.get("submarket"), deal_facts.get("asset_class"),
+                city=deal_facts.get("city"), state=deal_facts.get("state")
+            )
+            if market_data["submarket_rows"] or market_data["metro_rows"]:
+                print(f"Market data: {len(market_data['submarket_rows'])} submarket and {len(market_data['metro_rows'])} "
+                      f"metro rows for {market_data['metro']} ({market_data['lookup_us']} us)")
+        except Exception as e:
+            print(f"Warning: Could not look up market data: {e}")
         
-        # Step 5: Legal Analysis Agent
-        print("Running Legal Analysis Agent...")
-        legal_prompt = f"""Analyze the legal, regulatory, and compliance aspects of the following real estate investment deal:
-
-{deal_content}
-
-Provide comprehensive legal analysis including structure, compliance, zoning, title, and legal risks."""
+        # Each specialist gets the sections relevant to it plus a short summary instead of the full document
+        agent_documents, section_routing = self.section_router.route(deal_content, deal_facts, self.agent_specs)
+        if section_routing["applied"]:
+            print(f"Section routing: {len(section_routing['sections'])} sections, "
+                  f"saved {section_routing['prompt_tokens_saved']} prompt tokens across {len(agent_documents)} agents "
+                  f"({section_routing['elapsed_ms']} ms)")
+        
+        # Located legal red flags from the full document, so the legal agent starts from evidence
+        # even for sections that section routing left out of its excerpt
+        legal_hits, legal_scan = self.legal_scanner.scan(deal_content)
+        if legal_scan["enabled"]:
+            print(f"Legal scan: {legal_scan['hits']} hits ({legal_scan['negated_hits']} negated) "
+                  f"in {legal_scan['elapsed_ms']} ms")
+        legal_scan["findings"] = legal_hits[:self.legal_scanner.max_findings]
+        
+        # Stage context the specialists' prompts are built from
+        prepared["context"] = {
+            "deal_content": deal_content,
+            "agent_documents": agent_documents,
+            "comparables_context": comparables_context,
+            "market_data_context": format_market_data(market_data),
+            "legal_findings_context": self.legal_scanner.format_findings(legal_hits)
+        }
+        prepared.update({
+            "comparable_deals": comparable_deals,
+            "market_data": market_data,
+            "section_routing": section_routing,
+            "legal_scan": legal_scan
+        })
+        return prepared
+    
+    def rerun(self, stored, stages=None, include_dependents=False, use_cache=True, deadline_seconds=None,
+              on_late_result=None, cancel_token=None):
+        """
+        Re-execute selected stages of a stored analysis, reusing the stored outputs of the others.
+        
+        Extraction, normalisation, routing, the legal scan and the market lookup are not repeated:
+        specialists are re-run on the stored stage context with the current prompts and model
+        settings. A specialist whose stored run produced no report (failed, timed out, cancelled,
+        or not enabled then) has nothing to reuse and is re-run as well.
         
-        legal_report = self._call_agent(
-            "legal",
-            deal_content,
-            self.legal_system_prompt,
-            legal_prompt
+        Args:
+            stored: Results of the earlier analysis, as returned by analyze() and loaded by stage_store.StageStore
+            stages: Stage ids to re-run (specialist agent ids and/or "orchestrator"); None re-runs the
+                stages without a usable report plus the orchestrator
+            include_dependents: Also re-run every stage that consumes a re-run stage's report
+            use_cache: Serve specialists whose prompt did not change from the node cache
+            deadline_seconds: Optional time budget, as for analyze()
+            on_late_result: Optional callback(agent_id, report) for specialists that finish after timing out
+            cancel_token: Optional cancellation.CancelToken
+            
+        Returns:
+            Updated results, with a "rerun" entry listing the re-run, reused and stale stages
+        """
+        if not stored.get("stage_context"):
+            raise ValueError("The analysis has no stored stage inputs to re-run (it was screened out or predates stage storage)")
+        start = time.monotonic()
+        specs_by_id = {spec.agent_id: spec for spec in self.agent_specs}
+        stored_status = stored.get("agent_status", {})
+        if stages is None:
+            stages = [agent_id for agent_id in specs_by_id if stored_status.get(agent_id) not in SUCCESS_STATES] + ["orchestrator"]
+        unknown = [stage for stage in stages if stage not in specs_by_id and stage != "orchestrator"]
+        if unknown:
+            raise ValueError(f"Unknown stages: {', '.join(unknown)}. Available: {', '.join(list(specs_by_id) + ['orchestrator'])}")
+        selected = set(stages)
+        if include_dependents:
+            selected |= self._dependents(selected)
+        
+        # Stored reports of the specialists that are not re-run; those without one must be re-run anyway
+        reusable = {
+            spec.agent_id: stored[spec.result_key] for spec in self.agent_specs
+            if spec.agent_id not in selected and stored_status.get(spec.agent_id) in SUCCESS_STATES and spec.result_key in stored
+        }
+        forced = [agent_id for agent_id in specs_by_id if agent_id not in selected and agent_id not in reusable]
+        if forced:
+            print(f"Re-running {', '.join(forced)} as well: no stored report to reuse")
+        rerun_specialists = [agent_id for agent_id in specs_by_id if agent_id not in reusable]
+        print(f"Re-running {', '.join(rerun_specialists + (['orchestrator'] if 'orchestrator' in selected else [])) or 'nothing'}"
+              f" for {stored.get('report_id', 'the stored analysis')}")
+        
+        if deadline_seconds is None:
+            deadline_seconds = self.deadline_seconds
+        deadline_at = time.monotonic() + deadline_seconds if deadline_seconds else None
+        context = stored["stage_context"]
+        deal_content = stored["deal_content"]
+        scheduler = DAGScheduler(
+            self.agent_specs,
+            lambda spec, user_prompt, timeout: self._call_agent(spec.agent_id, deal_content, spec.system_prompt, user_prompt, timeout, cancel_token),
+            cache=self.node_cache if use_cache else None,
+            cache_variant=self._cache_variant(),
+            default_timeout=os.environ.get("AGENT_TIMEOUT_SECONDS")
         )
+        specialists_deadline = self._specialists_deadline(deadline_at, deadline_seconds) if "orchestrator" in selected else deadline_at
+        reports, agent_status, agent_timings = scheduler.run(
+            context, specialists_deadline, on_late_result, precomputed=reusable, cancel_token=cancel_token
+        )
+        if cancel_token is not None and cancel_token.cancelled:
+            self._record_cancellation(cancel_token.reason, "specialists", agent_status)
+            raise CancelledError(cancel_token.reason)
+        for agent_id in reusable:
+            agent_status[agent_id] = "reused"
+            agent_timings[agent_id] = stored.get("agent_timings", {}).get(agent_id, 0.0)
+        
+        orchestrator_prompt = None
+        if "orchestrator" in selected:
+            orchestrator_report, orchestrator_prompt, missing = self._synthesize(
+                deal_content, reports, agent_status, deadline_at, cancel_token
+            )
+        else:
+            missing = [agent_id for agent_id, status in agent_status.items() if status not in SUCCESS_STATES]
+            orchestrator_report = stored["orchestrator_report"]
+            agent_status["orchestrator"] = "reused" if stored_status.get("orchestrator") == "completed" else stored_status.get("orchestrator", "skipped")
+        
+        # Stages that kept their stored output although a report they consume was just replaced
+        rerun_stages = rerun_specialists + (["orchestrator"] if "orchestrator" in selected else [])
+        stale = [
+            spec.agent_id for spec in self.agent_specs
+            if spec.agent_id in reusable and any(dependency in rerun_specialists for dependency in spec.depends_on)
+        ]
+        if "orchestrator" not in selected and rerun_specialists:
+            stale.append("orchestrator")
+        if stale:
+            print(f"Warning: {', '.join(stale)} kept stored output built on reports that were re-run")
+        
+        results = dict(stored)
+        results.update({spec.result_key: reports[spec.agent_id] for spec in self.agent_specs})
+        stage_inputs = dict(stored.get("stage_inputs") or {})
+        stage_inputs.update(self._stage_inputs(
+            {agent_id: prompt for agent_id, prompt in scheduler.user_prompts.items() if agent_id in rerun_specialists},
+            orchestrator_prompt
+        ))
+        results.update({
+            "orchestrator_report": orchestrator_report,
+            "model_usage": self.model_router.summary(),
+            "agents": self._agent_descriptions(),
+            "agent_status": agent_status,
+            "agent_timings": agent_timings,
+            "partial": bool(missing) or agent_status["orchestrator"] not in SUCCESS_STATES,
+            "stage_inputs": stage_inputs,
+            "rerun": {
+                "stages": rerun_stages,
+                "reused": [stage for stage in list(specs_by_id) + ["orchestrator"] if stage not in rerun_stages],
+                "stale": stale,
+                "elapsed_s": round(time.monotonic() - start, 3)
+            }
+        })
+        return results
+    
+    def compare(self, analyses, cancel_token=None):
+        """
+        Rank several analysed deals against each other without re-running any agent.
+        
+        A metrics table is computed locally from each deal's extracted facts and scored
+        deterministically; a single synthesis call then ranks the deals on the table and a bounded
+        excerpt of each deal's stored conclusion, so the prompt size does not grow with the
+        documents.
         
-        # Step 6: Orchestrator/Synthesis Agent
+        Args:
+            analyses: Stored results of the analyses to compare (see stage_store.StageStore.load_many)
+            cancel_token: Optional cancellation.CancelToken
+            
+        Returns:
+            Dictionary with the ranked metrics table, its plain text rendering, the ranking report,
+            the prompt size, model usage and elapsed time
+        """
+        start = time.monotonic()
+        ranked = rank_deals([deal_metrics(results) for results in analyses])
+        prompt, excerpt_chars = build_comparison_prompt(ranked, {results["report_id"]: results for results in analyses})
+        metrics_elapsed = time.monotonic() - start
+        print(f"Comparing {len(ranked)} deals: {estimate_tokens(prompt)} prompt tokens, "
+              f"{excerpt_chars} characters of conclusion per deal ({metrics_elapsed * 1000:.1f} ms)")
+        
+        try:
+            ranking_report = self.model_router.complete(
+                self.client,
+                "portfolio",
+                self.portfolio_system_prompt,
+                prompt,
+                cancel_token=cancel_token
+            )
+            status = "completed"
+        except CancelledError:
+            raise
+        except Exception as e:
+            # The deterministic table is still useful without the written ranking
+            print(f"Warning: Portfolio comparison failed: {e}")
+            ranking_report = f"FAILED: The ranking could not be written ({e}). The metrics table above is still available."
+            status = "failed"
+        
+        return {
+            "table": ranked,
+            "metrics_table": format_metrics_table(ranked),
+            "ranking_report": ranking_report,
+            "status": status,
+            "prompt_tokens": estimate_tokens(prompt),
+            "excerpt_chars": excerpt_chars,
+            "model_usage": self.model_router.summary(),
+            "metrics_ms": round(metrics_elapsed * 1000, 3),
+            "elapsed_s": round(time.monotonic() - start, 3)
+        }
+    
+    def _dependents(self, stages):
+        """Every stage that directly or indirectly consumes the reports of the given stages"""
+        dependents = set()
+        changed = True
+        while changed:
+            changed = False
+            for spec in self.agent_specs:
+                if spec.agent_id not in dependents and any(d in stages or d in dependents for d in spec.depends_on):
+                    dependents.add(spec.agent_id)
+                    changed = True
+        if any(stage in (spec.agent_id for spec in self.agent_specs) for stage in set(stages) | dependents):
+            dependents.add("orchestrator")
+        return dependents
+    
+    def _synthesize(self, deal_content, reports, agent_status, deadline_at=None, cancel_token=None, revision_note=""):
+        """
+        Run the orchestrator on the specialist reports and record its status in agent_status.
+        revision_note describes the changes when the deal is a revised version of an earlier one.
+        
+        Returns:
+            Tuple of (orchestrator report, orchestrator user prompt, ids of the specialists without a report)
+        """
         print("Running Orchestrator Agent...")
+        missing = [agent_id for agent_id, status in agent_status.items() if status not in SUCCESS_STATES]
+        missing_note = ""
+        if missing:
+            missing_note = f"""
+
+NOTE: The following analyses did not complete and are unavailable: {', '.join(missing)}. Base your recommendation on the analyses that are available and state clearly which sections are missing."""
+        
+        analyses = "\n\n".join(f"{spec.section_heading}:\n{reports[spec.agent_id]}" for spec in self.agent_specs)
         orchestrator_prompt = f"""Synthesize the following specialized analyses into a comprehensive final investment recommendation:
 
 ORIGINAL DEAL DOCUMENT:
 {deal_content}
 
-REAL ESTATE FUNDAMENTALS ANALYSIS:
-{real_estate_report}
-
-FINANCIAL MODELING ANALYSIS:
-{financial_report}
-
-MARKET ANALYSIS:
-{market_report}
-
-LEGAL AND COMPLIANCE ANALYSIS:
-{legal_report}
+{analyses}{missing_note}{revision_note}
 
 Create a comprehensive final report with a clear investment recommendation based on all analyses."""
         
-        orchestrator_response = self.client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": self.orchestrator_system_prompt},
-                {"role": "user", "content": orchestrator_prompt}
-            ],
-            temperature=0.7
-        )
-        orchestrator_report = orchestrator_response.choices[0].message.content
-        
-        print("Analysis complete!")
+        # The orchestrator never runs past the caller's deadline
+        orchestrator_timeout = deadline_at - time.monotonic() if deadline_at else None
+        if orchestrator_timeout is not None and orchestrator_timeout <= 0:
+            print("Warning: Deadline reached before the orchestrator could run")
+            agent_status["orchestrator"] = "timed_out"
+            orchestrator_report = "TIMED OUT: The request deadline passed before the final synthesis could run. The specialist reports above are still available."
+            return orchestrator_report, orchestrator_prompt, missing
+        try:
+            orchestrator_kwargs = {"timeout": orchestrator_timeout} if orchestrator_timeout else {}
+            orchestrator_report = self.model_router.complete(
+                self.client,
+                "orchestrator",
+                self.orchestrator_system_prompt,
+                orchestrator_prompt,
+                cancel_token=cancel_token,
+                **orchestrator_kwargs
+            )
+            agent_status["orchestrator"] = "completed"
+        except CancelledError:
+            agent_status["orchestrator"] = "cancelled"
+            self._record_cancellation(cancel_token.reason, "orchestrator", agent_status)
+            raise
+        except Exception as e:
+            # Keep the specialist reports even when synthesis fails
+            print(f"Warning: Orchestrator failed: {e}")
+            orchestrator_report = f"FAILED: The final synthesis could not be completed ({e}). The specialist reports above are still available."
+            agent_status["orchestrator"] = "failed"
         
-        return {
-            "real_estate_report": real_estate_report,
-            "financial_modeling_report": financial_report,
-            "market_analysis_report": market_report,
-            "legal_report": legal_report,
-            "orchestrator_report": orchestrator_report
+        print("Analysis complete!" if not missing else f"Analysis complete with missing sections: {', '.join(missing)}")
+        return orchestrator_report, orchestrator_prompt, missing
+    
+    def _specialists_deadline(self, deadline_at, deadline_seconds):
+        """
+        When specialists stop being waited for: the deadline minus the orchestrator's reserve, which is
+        ORCHESTRATOR_RESERVE_SECONDS but at most ORCHESTRATOR_RESERVE_FRACTION of the whole budget
+        """
+        if not deadline_at:
+            return None
+        return deadline_at - min(self.orchestrator_reserve_seconds, self.orchestrator_reserve_fraction * deadline_seconds)
+    
+    def _stage_inputs(self, user_prompts, orchestrator_prompt=None):
+        """System and user prompt, and the model that answered, of each stage run by this pipeline"""
+        models = {call["agent"]: call["model"] for call in self.model_router.summary()["calls"]}
+        stages = {
+            spec.agent_id: {"system_prompt": spec.system_prompt, "user_prompt": user_prompts[spec.agent_id],
+                            "model": models.get(spec.agent_id)}
+            for spec in self.agent_specs if spec.agent_id in user_prompts
+        }
+        if orchestrator_prompt is not None:
+            stages["orchestrator"] = {"system_prompt": self.orchestrator_system_prompt, "user_prompt": orchestrator_prompt,
+                                      "model": models.get("orchestrator")}
+        return stages
+    
+    def _record_cancellation(self, reason, stage, agent_status):
+        """Log the tokens spent on a cancelled analysis, whose results nobody will read"""
+        calls = self.model_router.summary()["calls"]
+        prompt_tokens = sum(call["prompt_tokens"] or 0 for call in calls)
+        completion_tokens = sum(call["completion_tokens"] or 0 for call in calls)
+        entry = {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "tenant": self.model_router.tenant,
+            "reason": reason,
+            "stage": stage,
+            "agent_status": agent_status,
+            "llm_calls": len(calls),
+            "aborted_calls": sum(1 for call in calls if call["cancelled"]),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "wasted_tokens": prompt_tokens + completion_tokens
         }
+        print(f"Analysis cancelled during {stage} ({reason}): {entry['wasted_tokens']} tokens wasted "
+              f"over {entry['llm_calls']} calls")
+        if self.cancellation_log_path:
+            try:
+                log_dir = os.path.dirname(self.cancellation_log_path)
+                if log_dir:
+                    os.makedirs(log_dir, exist_ok=True)
+                with open(self.cancellation_log_path, 'a') as f:
+                    f.write(json.dumps(entry) + "\n")
+            except OSError as e:
+                print(f"Warning: Could not write cancellation log: {e}")
+        return entry
+    
+    def _agent_descriptions(self):
+        """Describe the enabled specialist agents so callers can save and display their reports"""
+        return [
+            {
+                "id": spec.agent_id,
+                "title": spec.title,
+                "result_key": spec.result_key,
+                "report_suffix": spec.report_suffix
+            }
+            for spec in self.agent_specs
+        ]
+    
+    def _cache_variant(self):
+        """Model settings that change agent output, mixed into node cache keys"""
+        return f"{','.join(self.model_router.tiers)}|{self.model_router.specialist_tier}|{self.model_router.temperature}|{sorted(self.model_router.agent_models.items())}"
+    
+    def settings_fingerprint(self, deadline_seconds=None):
+        """
+        Describe every setting that changes the outcome of analyze() for the same document,
+        so duplicate submissions are only coalesced when they would produce the same result.
+        """
+        screen = self.deal_screen
+        return "|".join([
+            ",".join(spec.agent_id for spec in self.agent_specs),
+            self._cache_variant(),
+            f"{self.model_router.synthesis_tier}",
+            f"{screen.mode}:{screen.min_dscr}:{screen.min_cap_rate}:{screen.max_ltv}:{screen.min_occupancy}:{sorted(screen.allowed_asset_classes)}",
+            f"{self.comparable_deal_count}",
+            f"{self.market_data.snapshot().version}:{self.market_data.periods}",
+            f"{self.legal_scanner.enabled}:{self.legal_scanner.fingerprint}:{self.legal_scanner.max_findings}",
+            f"{deadline_seconds if deadline_seconds is not None else self.deadline_seconds}",
+        ])
+    
+    def _screened_out_results(self, deal_content, deal_facts, screen_result):
+        """
+        Build results for a deal that failed the pre-screen without running the specialist agents.
+        In decline_memo mode a single call writes a short decline memo; in stop mode no LLM call is made.
+        """
+        summary = format_screen_summary(screen_result)
+        full_pipeline_calls = len(self.agent_specs) + 1
+        
+        if self.deal_screen.mode == "decline_memo":
+            print("Deal failed pre-screen, writing decline memo...")
+            # Only the opening of the document is needed to describe the deal
+            decline_prompt = f"""Write a decline memo for the following real estate investment deal.
 
+{summary}
+
+DEAL DOCUMENT (excerpt):
+{deal_content[:6000]}"""
+            orchestrator_report = self.model_router.complete(
+                self.client,
+                "decline_memo",
+                self.decline_memo_system_prompt,
+                decline_prompt
+            )
+            llm_calls = 1
+        else:
+            print("Deal failed pre-screen, stopping pipeline")
+            orchestrator_report = f"{summary}\n\nRecommendation: Do Not Invest"
+            llm_calls = 0
+        
+        screen_result["llm_calls_saved"] = full_pipeline_calls - llm_calls
+        print(f"Pre-screen saved {screen_result['llm_calls_saved']} LLM calls ({screen_result['elapsed_ms']} ms)")
+        
+        skipped = f"Not run: the deal failed the pre-screen.\n\n{summary}"
+        results = {spec.result_key: skipped for spec in self.agent_specs}
+        agent_status = {spec.agent_id: "skipped" for spec in self.agent_specs}
+        agent_status["orchestrator"] = "completed"
+        results.update({
+            "orchestrator_report": orchestrator_report,
+            "deal_content": deal_content,
+            "deal_facts": deal_facts,
+            "comparable_deals": [],
+            "screen": screen_result,
+            "model_usage": self.model_router.summary(),
+            "agents": self._agent_descriptions(),
+            "agent_status": agent_status,
+            "agent_timings": {},
+            "partial": False,
+            "deadline_seconds": None
+        })
+        return results
+
+
+def preload_dependencies():
+    """
+    Import the heavy libraries used by the pipeline ahead of the first request, for example in
+    a pre-forking server's master process so that every worker inherits them already loaded.
+    """
+    import openai
+    if os.environ.get("USE_EXTERNAL_AGENTS", "false").lower() == "true":
+        import python_a2a
+    FileProcessor().preload()
+    get_market_data().snapshot()
@@ -0,0 +1,239 @@
+import json
+import os
+import socket
+import sqlite3
+import time
+import uuid
+
+from fair_scheduler import PRIORITY_LANES
+
+JOB_STATES = ("queued", "running", "completed", "failed")
+
+
+def default_worker_id():
+    """Identify a worker by host and process so leases can be traced back to it"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobQueue:
+    """
+    Durable queue of analysis jobs and their per-agent stage results, stored in SQLite.
+
+    Workers claim a job with a lease and renew it with heartbeats while they work. When a
+    worker dies its lease expires and another worker claims the job; the specialist reports
+    already recorded as stage results are reused, so the job resumes from the last
+    completed agent instead of paying for every LLM call again.
+
+    Several worker processes can share one database. Across hosts the database must sit on a
+    filesystem with working locks (SQLite in WAL mode does not support network filesystems).
+    """
+
+    def __init__(self, db_path=None, max_attempts=None):
+        self.db_path = db_path or os.environ.get("JOB_QUEUE_PATH", os.path.join("data", "jobs.db"))
+        self.max_attempts = int(max_attempts or os.environ.get("JOB_MAX_ATTEMPTS", 3))
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    report_id TEXT NOT NULL,
+                    filepath TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    tenant TEXT NOT NULL,
+                    priority TEXT NOT NULL,
+                    deadline_seconds REAL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    lease_owner TEXT,
+                    lease_expires_at REAL,
+                    error TEXT,
+                    result TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, lease_expires_at);
+                CREATE TABLE IF NOT EXISTS stage_results (
+                    job_id TEXT NOT NULL,
+                    agent_id TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    report TEXT NOT NULL,
+                    elapsed_s REAL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (job_id, agent_id)
+                );
+            """)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def enqueue(self, report_id, filepath, filename, tenant="default", priority="batch", deadline_seconds=None):
+        """
+        Add an analysis job for an uploaded document.
+
+        Returns:
+            Job id
+        """
+        if priority not in PRIORITY_LANES:
+            raise ValueError(f"Invalid priority '{priority}'. Expected one of: {', '.join(PRIORITY_LANES)}")
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT INTO jobs (id, report_id, filepath, filename, tenant, priority, deadline_seconds, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, 'queued', ?, ?)",
+                (job_id, report_id, filepath, filename, tenant, priority, deadline_seconds, now, now)
+            )
+        finally:
+            conn.close()
+        return job_id
+
+    def claim(self, worker_id, lease_seconds=60):
+        """
+        Claim the next queued job, or a running job whose lease has expired.
+        A job whose lease expires after max_attempts attempts is marked failed instead.
+
+        Args:
+            worker_id: Identifier of the claiming worker
+            lease_seconds: How long the claim is valid without a heartbeat
+
+        Returns:
+            Job dictionary, or None when there is no work
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            # BEGIN IMMEDIATE takes the write lock up front so two workers never claim the same job
+            conn.execute("BEGIN IMMEDIATE")
+            # A job whose lease expired after its last allowed attempt is not handed out again
+            abandoned = conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, lease_owner = NULL, lease_expires_at = NULL, updated_at = ? "
+                "WHERE status = 'running' AND lease_expires_at < ? AND attempts >= ?",
+                (f"Lease expired on attempt {self.max_attempts} of {self.max_attempts}", now, now, self.max_attempts)
+            ).rowcount
+            if abandoned:
+                print(f"{abandoned} job(s) lost their worker on the last allowed attempt, marked failed")
+            lanes = " ".join(f"WHEN '{lane}' THEN {rank}" for rank, lane in enumerate(PRIORITY_LANES))
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' OR (status = 'running' AND lease_expires_at < ? AND attempts < ?) "
+                f"ORDER BY CASE priority {lanes} END, created_at LIMIT 1",
+                (now, self.max_attempts)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            if row["status"] == "running":
+                print(f"Lease of job {row['id']} held by {row['lease_owner']} expired, taking over")
+            conn.execute(
+                "UPDATE jobs SET status = 'running', lease_owner = ?, lease_expires_at = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (worker_id, now + lease_seconds, now, row["id"])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        job = dict(row)
+        job.update({"status": "running", "lease_owner": worker_id, "attempts": row["attempts"] + 1})
+        return job
+
+    def heartbeat(self, job_id, worker_id, lease_seconds=60):
+        """
+        Extend the lease on a running job.
+
+        Returns:
+            False if the worker no longer owns the job (its lease expired and another worker took it)
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            updated = conn.execute(
+                "UPDATE jobs SET lease_expires_at = ?, updated_at = ? WHERE id = ? AND lease_owner = ? AND status = 'running'",
+                (now + lease_seconds, now, job_id, worker_id)
+            ).rowcount
+        finally:
+            conn.close()
+        return bool(updated)
+
+    def save_stage(self, job_id, agent_id, status, report, elapsed_s=None):
+        """Record a specialist report so a later attempt can resume without re-running the agent"""
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO stage_results (job_id, agent_id, status, report, elapsed_s, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, agent_id, status, report, elapsed_s, time.time())
+            )
+        finally:
+            conn.close()
+
+    def stage_reports(self, job_id):
+        """Specialist reports completed by earlier attempts, by agent id"""
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT agent_id, report FROM stage_results WHERE job_id = ?", (job_id,)).fetchall()
+        finally:
+            conn.close()
+        return {row["agent_id"]: row["report"] for row in rows}
+
+    def complete(self, job_id, worker_id, result):
+        """
+        Mark a job completed with its /analyze style response.
+
+        Returns:
+            False if the worker lost the job to another worker before finishing
+        """
+        return self._finish(job_id, worker_id, "status = 'completed', result = ?, error = NULL", (json.dumps(result),))
+
+    def fail(self, job_id, worker_id, error):
+        """
+        Record a failed attempt. The job is queued again until it has used max_attempts.
+
+        Returns:
+            False if the worker lost the job to another worker before finishing
+        """
+        job = self.get(job_id)
+        if job and job["attempts"] < self.max_attempts:
+            print(f"Job {job_id} failed on attempt {job['attempts']}, requeueing: {error}")
+            return self._finish(job_id, worker_id, "status = 'queued', error = ?", (str(error),))
+        print(f"Job {job_id} failed permanently: {error}")
+        return self._finish(job_id, worker_id, "status = 'failed', error = ?", (str(error),))
+
+    def _finish(self, job_id, worker_id, assignments, values):
+        conn = self._connect()
+        try:
+            updated = conn.execute(
+                f"UPDATE jobs SET {assignments}, lease_owner = NULL, lease_expires_at = NULL, updated_at = ? "
+                "WHERE id = ? AND lease_owner = ? AND status = 'running'",
+                values + (time.time(), job_id, worker_id)
+            ).rowcount
+        finally:
+            conn.close()
+        return bool(updated)
+
+    def get(self, job_id):
+        """
+        Look up a job with the agents completed so far.
+
+        Returns:
+            Job dictionary (result decoded), or None if the job does not exist
+        """
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            stages = conn.execute(
+                "SELECT agent_id, status, elapsed_s FROM stage_results WHERE job_id = ? ORDER BY created_at", (job_id,)
+            ).fetchall()
+        finally:
+            conn.close()
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        job["completed_agents"] = [dict(stage) for stage in stages]
+        return job
@@ -0,0 +1,277 @@
+import bisect
+import hashlib
+import json
+import os
+import re
+import time
+from collections import Counter
+
+# Legal red-flag dictionary: category -> severity, literal terms (matched case-insensitively on word
+# boundaries, any whitespace between words) and regular expressions. Patterns are matched against
+# the lowercased text starting at a word boundary, so write them in lower case. Extend or override
+# categories with LEGAL_SCAN_TERMS_FILE.
+DEFAULT_LEGAL_TERMS = {
+    "easements": {
+        "severity": "medium",
+        "terms": ["easement", "easements", "right of way", "right-of-way", "access agreement", "encroachment",
+                  "encroachments", "reciprocal easement agreement", "shared driveway", "utility easement",
+                  "conservation easement", "license agreement"],
+    },
+    "liens": {
+        "severity": "high",
+        "terms": ["lien", "liens", "mechanic's lien", "mechanics lien", "mechanics' lien", "tax lien", "judgment lien",
+                  "lis pendens", "encumbrance", "encumbrances", "ucc filing", "ucc-1", "ucc financing statement",
+                  "notice of lien", "lien waiver"],
+    },
+    "environmental": {
+        "severity": "high",
+        "terms": ["phase i", "phase ii", "phase 1", "phase 2", "recognized environmental condition",
+                  "recognized environmental conditions", "asbestos", "asbestos-containing", "lead-based paint",
+                  "underground storage tank", "underground storage tanks", "leaking underground storage tank",
+                  "contamination", "contaminated", "remediation", "hazardous materials", "hazardous substances",
+                  "petroleum release", "dry cleaner", "mold", "radon", "vapor intrusion", "brownfield", "superfund",
+                  "wetlands", "no further action letter", "environmental lien", "pcbs"],
+        "patterns": [r"\bflood\s+zone\s+(?:a|ae|ah|ao|v|ve)\b", r"\brecs?\b(?=\s+(?:identified|were|was|noted))"],
+    },
+    "zoning": {
+        "severity": "high",
+        "terms": ["non-conforming", "nonconforming", "non conforming", "legal non-conforming",
+                  "legally non-conforming", "grandfathered", "variance", "special use permit",
+                  "conditional use permit", "zoning violation", "rezoning", "zoning change", "planned unit development",
+                  "density bonus", "parking variance", "setback variance"],
+    },
+    "litigation": {
+        "severity": "high",
+        "terms": ["pending litigation", "threatened litigation", "litigation", "lawsuit", "lawsuits", "complaint filed",
+                  "plaintiff", "defendant", "judgment", "arbitration", "class action", "eviction proceedings",
+                  "bankruptcy", "chapter 11", "foreclosure", "receivership", "receiver appointed", "notice of default",
+                  "default notice", "cease and desist", "consent decree", "settlement agreement"],
+        "patterns": [r"\b(?:case|docket|index|cause)\s+(?:no\.?|number|#)\s*[a-z0-9](?:[\w\-:/.]*\w)?"],
+    },
+    "title": {
+        "severity": "high",
+        "terms": ["title defect", "title defects", "cloud on title", "title exception", "title exceptions",
+                  "survey exception", "boundary dispute", "quiet title", "adverse possession", "gap in title",
+                  "unrecorded", "ground lease", "leasehold", "fee simple", "deed restriction", "deed restrictions",
+                  "restrictive covenant", "restrictive covenants", "cc&rs"],
+    },
+    "lease_provisions": {
+        "severity": "medium",
+        "terms": ["right of first refusal", "rofr", "right of first offer", "rofo", "purchase option",
+                  "option to purchase", "co-tenancy", "exclusive use", "early termination", "termination option",
+                  "kick-out clause", "kick-out", "go dark", "go-dark", "estoppel", "estoppels", "snda",
+                  "subordination", "rent abatement", "free rent", "most favored nation"],
+    },
+    "regulatory": {
+        "severity": "medium",
+        "terms": ["ada", "americans with disabilities act", "code violation", "code violations",
+                  "building code violation", "open permit", "open permits", "certificate of occupancy",
+                  "temporary certificate of occupancy", "fire code", "life safety", "rent control",
+                  "rent stabilization", "rent stabilized", "hud", "lihtc", "land use restriction agreement", "lura",
+                  "affordability covenant", "historic designation", "landmark", "cfius"],
+    },
+    "financing": {
+        "severity": "medium",
+        "terms": ["due on sale", "due-on-sale", "prepayment penalty", "defeasance", "yield maintenance", "lockout",
+                  "lock-out", "cross-default", "cross default", "full recourse", "recourse", "personal guaranty",
+                  "carve-out guaranty", "bad boy guaranty", "cash sweep", "cash management", "loan assumption",
+                  "assumption fee", "balloon payment", "maturity default"],
+    },
+    "tax": {
+        "severity": "low",
+        "terms": ["tax abatement", "pilot", "payment in lieu of taxes", "reassessment", "tax appeal", "transfer tax",
+                  "delinquent taxes", "tax delinquency", "special assessment", "special assessments", "tax increment",
+                  "opportunity zone", "1031 exchange"],
+    },
+}
+
+SEVERITY_ORDER = {"high": 0, "medium": 1, "low": 2}
+
+# A hit preceded by one of these words within a few words is most likely a statement that the issue is absent
+NEGATION_PATTERN = re.compile(
+    r"\b(?:no|not|none|without|free of|absence of|neither|nor|never|no known|did not identify)\b[^.;:\n]{0,40}$",
+    re.IGNORECASE
+)
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def _trie_regex(terms):
+    """
+    Compile literal terms into a single regular expression shaped like a trie (shared prefixes
+    are factored out), so the regex engine walks the text once and never backtracks over
+    alternatives that share a prefix. This is the regular-expression equivalent of an
+    Aho-Corasick automaton and keeps matching linear in the text size for large dictionaries.
+    """
+    trie = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def to_regex(node):
+        if list(node) == [""]:
+            return ""
+        optional = "" in node
+        branches = []
+        for char in sorted(key for key in node if key):
+            # Any run of whitespace between words matches, e.g. across line breaks
+            piece = r"\s+" if char == " " else re.escape(char)
+            branches.append(piece + to_regex(node[char]))
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if optional:
+            body = f"(?:{body})?"
+        return body
+
+    return to_regex(trie)
+
+
+class LegalScanner:
+    """
+    Finds legal red flags (easements, liens, environmental issues, zoning, litigation, title,
+    lease provisions, ...) in deal text with a single pass over the document.
+
+    All literal terms are compiled into one trie-shaped regular expression and all patterns
+    are added to the same expression as named alternatives, so the text is scanned once no
+    matter how large the dictionary is. Each hit carries its category, severity, position,
+    line number, surrounding context and whether it is negated ("no pending litigation").
+    The findings are summarised for the legal agent so it reasons over located evidence
+    instead of searching the whole document.
+
+    Configuration (environment variables):
+        LEGAL_SCAN                   true | false (default true)
+        LEGAL_SCAN_TERMS_FILE        JSON file with extra categories, or categories replacing the defaults
+        LEGAL_SCAN_CONTEXT_CHARS     characters of context on each side of a hit (default 120)
+        LEGAL_SCAN_MAX_FINDINGS      hits listed in the agent prompt (default 60)
+    """
+
+    def __init__(self, config=None):
+        config = config if config is not None else self._load_config()
+        self.enabled = str(config.get("enabled", "true")).lower() == "true"
+        self.context_chars = int(config.get("context_chars", 120))
+        self.max_findings = int(config.get("max_findings", 60))
+        self.dictionary = dict(DEFAULT_LEGAL_TERMS)
+        self.dictionary.update(config.get("terms") or {})
+        self.fingerprint = hashlib.sha256(json.dumps(self.dictionary, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+        self._compile()
+
+    def _load_config(self):
+        config = {}
+        for key in ("enabled", "context_chars", "max_findings"):
+            env_key = "LEGAL_SCAN" if key == "enabled" else f"LEGAL_SCAN_{key.upper()}"
+            value = os.environ.get(env_key)
+            if value:
+                config[key] = value
+        terms_file = os.environ.get("LEGAL_SCAN_TERMS_FILE")
+        if terms_file:
+            with open(terms_file, 'r') as f:
+                config["terms"] = json.load(f)
+        return config
+
+    def _compile(self):
+        self.term_categories = {}
+        for category, entry in self.dictionary.items():
+            for term in entry.get("terms", []):
+                self.term_categories.setdefault(self._term_key(term), category)
+        alternatives = []
+        if self.term_categories:
+            alternatives.append(rf"(?:{_trie_regex(sorted(self.term_categories))})\b")
+        self.pattern_categories = {}
+        for category, entry in self.dictionary.items():
+            for pattern in entry.get("patterns", []):
+                group = f"p{len(self.pattern_categories)}"
+                self.pattern_categories[group] = category
+                alternatives.append(f"(?P<{group}>{pattern[2:] if pattern.startswith(chr(92) + 'b') else pattern})")
+        # Every alternative starts at a word boundary. Checking it once, outside the alternation, lets
+        # the engine reject most positions with a single test; matching lowercased text instead of
+        # using IGNORECASE is roughly three times faster again.
+        pattern = r"\b(?:" + "|".join(alternatives) + ")" if alternatives else None
+        self.regex = re.compile(pattern) if pattern else None
+        self.regex_ignorecase = re.compile(pattern, re.IGNORECASE) if pattern else None
+
+    def _term_key(self, text):
+        return WHITESPACE_PATTERN.sub(" ", text.strip().lower())
+
+    def scan(self, text):
+        """
+        Scan document text for legal red flags.
+
+        Args:
+            text: Normalised deal text
+
+        Returns:
+            Tuple of (list of hit dictionaries in document order, stats dictionary)
+        """
+        start = time.perf_counter()
+        hits = []
+        if self.enabled and self.regex is not None and text:
+            line_starts = [0] + [match.end() for match in re.finditer("\n", text)]
+            lowered = text.lower()
+            # A few characters change length when lowercased, which would shift every offset after them
+            matches = self.regex.finditer(lowered) if len(lowered) == len(text) else self.regex_ignorecase.finditer(text)
+            for match in matches:
+                matched = match.group(0)
+                if match.lastgroup:
+                    category = self.pattern_categories[match.lastgroup]
+                else:
+                    category = self.term_categories.get(self._term_key(matched))
+                    if category is None:
+                        continue
+                hit_start, hit_end = match.start(), match.end()
+                matched = text[hit_start:hit_end]
+                before = text[max(0, hit_start - self.context_chars):hit_start]
+                after = text[hit_end:hit_end + self.context_chars]
+                hits.append({
+                    "category": category,
+                    "severity": self.dictionary[category].get("severity", "medium"),
+                    "term": self._term_key(matched),
+                    "start": hit_start,
+                    "end": hit_end,
+                    "line": bisect.bisect_right(line_starts, hit_start),
+                    "context": WHITESPACE_PATTERN.sub(" ", f"{before}{matched}{after}").strip(),
+                    "negated": bool(NEGATION_PATTERN.search(before[-60:])),
+                })
+
+        elapsed = time.perf_counter() - start
+        categories = Counter(hit["category"] for hit in hits)
+        stats = {
+            "enabled": self.enabled,
+            "terms": len(self.term_categories),
+            "patterns": len(self.pattern_categories),
+            "hits": len(hits),
+            "negated_hits": sum(1 for hit in hits if hit["negated"]),
+            "hits_by_category": dict(categories.most_common()),
+            "chars": len(text or ""),
+            "elapsed_ms": round(elapsed * 1000, 3),
+        }
+        return hits, stats
+
+    def format_findings(self, hits):
+        """
+        Render hits as a plain text evidence list for the legal agent prompt.
+        Hits are grouped by term, most severe categories first; repeated mentions of a term are
+        collapsed into a count with the first location and context.
+        """
+        if not hits:
+            return ""
+        grouped = {}
+        for hit in hits:
+            key = (hit["category"], hit["term"], hit["negated"])
+            grouped.setdefault(key, []).append(hit)
+        groups = sorted(
+            grouped.values(),
+            key=lambda group: (SEVERITY_ORDER.get(group[0]["severity"], 1), group[0]["negated"], group[0]["start"])
+        )
+
+        lines = ["LEGAL RED-FLAG SCAN (automated keyword scan of the full document; verify each item, "
+                 "and note that the scan cannot tell whether an issue is material):"]
+        for index, group in enumerate(groups[:self.max_findings], start=1):
+            hit = group[0]
+            mentions = f", {len(group)} mentions" if len(group) > 1 else ""
+            negated = " [appears negated]" if hit["negated"] else ""
+            lines.append(f"{index}. [{hit['severity'].upper()}] {hit['category']}: \"{hit['term']}\" "
+                         f"(line {hit['line']}{mentions}){negated} - ...{hit['context']}...")
+        if len(groups) > self.max_findings:
+            lines.append(f"{len(groups) - self.max_findings} further findings omitted.")
+        lines.append("Address each finding that is not negated, and flag any legal issue in the document that the scan missed.")
+        return "\n".join(lines)
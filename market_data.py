@@ -0,0 +1,464 @@
+import csv
+import hashlib
+import math
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+from deal_facts import STATE_NAMES, classify_asset_class
+
+# Column name variants accepted in extracts, mapped to the canonical column
+COLUMN_ALIASES = {
+    "metro": "msa", "market": "msa", "cbsa": "msa",
+    "sub_market": "submarket",
+    "property_type": "asset_class", "asset_type": "asset_class", "sector": "asset_class",
+    "quarter": "period", "date": "period", "as_of": "period",
+    "rent": "asking_rent", "avg_asking_rent": "asking_rent", "effective_rent": "asking_rent",
+    "vacancy": "vacancy_rate", "availability": "availability_rate",
+    "absorption": "net_absorption", "net_absorption_sf": "net_absorption",
+    "completions": "deliveries", "construction": "under_construction",
+    "cap": "cap_rate", "market_cap_rate": "cap_rate",
+    "price_per_sf": "sale_price_per_sf",
+}
+
+KEY_COLUMNS = ("msa", "submarket", "asset_class", "period")
+
+# Metrics rendered into the market prompt, in order: (column, label, format)
+METRICS = [
+    ("asking_rent", "asking rent", "money"),
+    ("rent_growth", "rent growth", "percent"),
+    ("vacancy_rate", "vacancy", "percent"),
+    ("availability_rate", "availability", "percent"),
+    ("net_absorption", "net absorption", "number"),
+    ("deliveries", "deliveries", "number"),
+    ("under_construction", "under construction", "number"),
+    ("inventory", "inventory", "number"),
+    ("cap_rate", "cap rate", "percent"),
+    ("sale_price_per_sf", "sale price/SF", "money"),
+]
+PERCENT_METRICS = {column for column, _, kind in METRICS if kind == "percent"}
+
+# Submarket values that mark a metro-wide row
+METRO_WIDE_SUBMARKETS = {"", "all", "total", "metro", "market", "overall"}
+
+NUMBER_PATTERN = re.compile(r"-?\d[\d,]*(?:\.\d+)?|-?\.\d+")
+
+# Period formats of market extracts: "2024 Q1", "2024Q1", "Q1 2024", "1Q24", "2024-03", "2024-03-31",
+# "3/31/2024", "Mar 2024" and "2024"
+MONTH_NUMBERS = {name: index for index, name in enumerate(
+    ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"), start=1)}
+PERIOD_PATTERNS = [
+    (re.compile(r"^(\d{4})\s*[-/ ]?\s*q([1-4])$"), lambda m: (int(m.group(1)), int(m.group(2)) * 3, 0)),
+    (re.compile(r"^q([1-4])\s*[-/ ']?\s*(\d{4}|\d{2})$"), lambda m: (_full_year(m.group(2)), int(m.group(1)) * 3, 0)),
+    (re.compile(r"^([1-4])q\s*[-/ ']?\s*(\d{4}|\d{2})$"), lambda m: (_full_year(m.group(2)), int(m.group(1)) * 3, 0)),
+    (re.compile(r"^(\d{4})[-/.](\d{1,2})(?:[-/.](\d{1,2}))?"), lambda m: (int(m.group(1)), int(m.group(2)), int(m.group(3) or 0))),
+    (re.compile(r"^(\d{1,2})/(\d{1,2})/(\d{4})$"), lambda m: (int(m.group(3)), int(m.group(1)), int(m.group(2)))),
+    (re.compile(r"^([a-z]{3})[a-z]*\.?\s*[-/ ']?\s*(\d{4}|\d{2})$"),
+     lambda m: (_full_year(m.group(2)), MONTH_NUMBERS[m.group(1)], 0) if m.group(1) in MONTH_NUMBERS else None),
+    (re.compile(r"^(\d{4})$"), lambda m: (int(m.group(1)), 12, 31)),
+]
+
+
+def _normalize_name(value):
+    """Lowercase a name and reduce it to single-spaced alphanumeric words"""
+    return " ".join(re.findall(r"[a-z0-9]+", (value or "").lower()))
+
+
+def _state_code(text):
+    """Two-letter state code from a state name or code, or None"""
+    text = (text or "").strip()
+    if text.lower() in STATE_NAMES:
+        return STATE_NAMES[text.lower()]
+    if len(text) == 2 and text.upper() in STATE_NAMES.values():
+        return text.upper()
+    return None
+
+
+def msa_key(msa=None, city=None, state=None):
+    """
+    Canonical metro key "<principal city>|<state>", so "Austin-Round Rock-Georgetown, TX",
+    "Austin-Round Rock, Texas" and a deal located in Austin, Texas all share "austin|tx".
+    """
+    if msa:
+        name, _, rest = msa.partition(",")
+        city = re.split(r"\s*[-–/]\s*", name.strip())[0]
+        state = re.split(r"\s*[-–/]\s*", rest.strip())[0] if rest.strip() else state
+    city = _normalize_name(city)
+    state = _state_code(state)
+    if not city:
+        return None
+    return f"{city}|{state.lower()}" if state else city
+
+
+def submarket_keys(submarket):
+    """Lookup keys for a submarket name: the full name, and the name and abbreviation of "Name (ABBR)" separately"""
+    keys = [_normalize_name(submarket)]
+    match = re.match(r"^(.*?)\s*\(([^)]+)\)\s*$", submarket or "")
+    if match:
+        keys += [_normalize_name(match.group(2)), _normalize_name(match.group(1))]
+    return [key for index, key in enumerate(keys) if key and key not in keys[:index]]
+
+
+def asset_class_key(value):
+    """Canonical asset class of a dataset value, falling back to the value itself in snake case"""
+    return classify_asset_class(value) or _normalize_name(value).replace(" ", "_")
+
+
+def _full_year(text):
+    year = int(text)
+    return year + 2000 if year < 100 else year
+
+
+def period_key(period):
+    """
+    Sortable (year, month, day) of a period label, so "Q4 2023" sorts before "Q1 2024".
+    Quarters sort as their last month and bare years as their end; unrecognised labels sort
+    before every recognised one.
+    """
+    text = " ".join((period or "").lower().split())
+    for pattern, key in PERIOD_PATTERNS:
+        match = pattern.match(text)
+        if match:
+            parsed = key(match)
+            if parsed:
+                return parsed
+    return (0, 0, 0)
+
+
+def _parse_number(value):
+    """
+    Parse a metric cell such as 58.4, "$58.40", "21.4%" or "(45,000)".
+
+    Returns:
+        Tuple of (number or NaN, whether the cell carried a % sign)
+    """
+    if value is None or value == "":
+        return np.nan, False
+    try:
+        return float(value), False
+    except (TypeError, ValueError):
+        pass
+    text = str(value).strip()
+    match = NUMBER_PATTERN.search(text)
+    if not match:
+        return np.nan, False
+    number = float(match.group(0).replace(",", ""))
+    if text.startswith("(") and text.endswith(")"):
+        number = -number
+    return number, "%" in text
+
+
+def _parse_metric_column(column, cells):
+    """
+    Parse the cells of one metric column of a file.
+
+    Percentages may be written as 8.5%, 8.5 or 0.085. The scale is decided once for the column:
+    values without a % sign are percentage points when any of them is above 1 (e.g. rent growth
+    of 5.2, 1.0 and 0.8 is 5.2%, 1% and 0.8%), and fractions otherwise. Values with a % sign are
+    always percentage points.
+    """
+    parsed = [_parse_number(cell) for cell in cells]
+    if column not in PERCENT_METRICS:
+        return [number for number, _ in parsed]
+    points = any(abs(number) > 1 for number, percent in parsed if not percent and not math.isnan(number))
+    return [number / 100.0 if percent or points else number for number, percent in parsed]
+
+
+def _read_csv(path):
+    with open(path, 'r', newline='', encoding='utf-8-sig', errors='replace') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        columns = {name: [] for name in header}
+        for row in reader:
+            if not any(cell.strip() for cell in row):
+                continue
+            for name, cell in zip(header, row + [""] * (len(header) - len(row))):
+                columns[name].append(cell)
+    return columns
+
+
+def _read_parquet(path):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        print(f"Warning: Skipping {path}: reading Parquet market data requires the pyarrow package")
+        return None
+    return pq.read_table(path).to_pydict()
+
+
+class MarketDataSnapshot:
+    """
+    One immutable load of the market data files.
+
+    Metrics are stored column by column as float64 arrays (NaN where a file has no value) next to
+    the key columns, sorted by series and newest period first. The indexes map
+    (metro, submarket, asset class) and (metro, asset class) to slices of those arrays, so a
+    lookup is a dictionary access and never scans rows.
+    """
+
+    def __init__(self, tables, signature=()):
+        self.signature = signature
+        self.version = hashlib.sha256(repr(signature).encode("utf-8")).hexdigest()[:12]
+        self.files = [os.path.basename(entry[0]) for entry in signature]
+
+        keys = {name: [] for name in ("msa", "submarket", "asset_class", "period", "source", "msa_key", "submarket_key")}
+        metrics = {column: [] for column, _, _ in METRICS}
+        # Extracts repeat the same few names on every row, so each distinct value is normalised once
+        metro_keys, submarket_names, asset_classes = {}, {}, {}
+        for source, columns in tables:
+            columns = {COLUMN_ALIASES.get(_normalize_name(name).replace(" ", "_"), _normalize_name(name).replace(" ", "_")): values
+                       for name, values in columns.items()}
+            if not {"msa", "asset_class"} <= set(columns):
+                print(f"Warning: Skipping {source}: market data needs at least msa and asset_class columns")
+                continue
+            keep = [index for index, (msa, asset_class) in enumerate(zip(columns["msa"], columns["asset_class"]))
+                    if msa and asset_class]
+            for index in keep:
+                msa = str(columns["msa"][index])
+                if msa not in metro_keys:
+                    metro_keys[msa] = msa_key(msa) or ""
+                submarket = str(columns["submarket"][index] or "").strip() if "submarket" in columns else ""
+                if submarket not in submarket_names:
+                    submarket_key = _normalize_name(submarket)
+                    submarket_names[submarket] = ("", "") if submarket_key in METRO_WIDE_SUBMARKETS else (submarket, submarket_key)
+                asset_class = str(columns["asset_class"][index])
+                if asset_class not in asset_classes:
+                    asset_classes[asset_class] = asset_class_key(asset_class)
+                keys["msa"].append(msa)
+                keys["msa_key"].append(metro_keys[msa])
+                keys["submarket"].append(submarket_names[submarket][0])
+                keys["submarket_key"].append(submarket_names[submarket][1])
+                keys["asset_class"].append(asset_classes[asset_class])
+                keys["period"].append(str(columns["period"][index] or "").strip() if "period" in columns else "")
+            keys["source"].extend([source] * len(keep))
+            for column, values in metrics.items():
+                cells = columns.get(column)
+                values.extend(_parse_metric_column(column, [cells[index] for index in keep]) if cells else [np.nan] * len(keep))
+
+        # Group each series together with its newest period first
+        series = list(zip(keys["msa_key"], keys["submarket_key"], keys["asset_class"]))
+        period_keys = {period: period_key(period) for period in set(keys["period"])}
+        order = sorted(range(len(series)), key=lambda index: (period_keys[keys["period"][index]], keys["period"][index]), reverse=True)
+        order = np.array(sorted(order, key=series.__getitem__), dtype=np.int64)
+
+        self.size = len(order)
+        self.msa, self.submarket, self.asset_class, self.period, self.source = (
+            np.array(keys[name], dtype=object)[order] if self.size else np.array([], dtype=object)
+            for name in ("msa", "submarket", "asset_class", "period", "source")
+        )
+        self.metrics = {column: np.array(values, dtype=np.float64)[order] if self.size else np.array([], dtype=np.float64)
+                        for column, values in metrics.items()}
+
+        self.submarket_index = {}
+        self.metro_index = {}
+        series = [series[index] for index in order]
+        start = 0
+        for index in range(1, self.size + 1):
+            if index < self.size and series[index] == series[start]:
+                continue
+            metro, submarket_key, asset_class = series[start]
+            if submarket_key:
+                for key in submarket_keys(self.submarket[start]):
+                    self.submarket_index.setdefault((metro, key, asset_class), (start, index))
+            else:
+                self.metro_index[(metro, asset_class)] = (start, index)
+            start = index
+
+    def rows(self, span, limit):
+        """Materialise up to limit rows of an index span as dictionaries"""
+        start, end = span
+        end = min(end, start + limit)
+        # Slice every column once instead of indexing numpy arrays cell by cell
+        metrics = [(column, values[start:end].tolist()) for column, values in self.metrics.items()]
+        return [
+            {
+                "msa": self.msa[index],
+                "submarket": self.submarket[index] or None,
+                "asset_class": self.asset_class[index],
+                "period": self.period[index],
+                "source": self.source[index],
+                **{column: values[offset] for column, values in metrics if not math.isnan(values[offset])}
+            }
+            for offset, index in enumerate(range(start, end))
+        ]
+
+
+class MarketDataStore:
+    """
+    Local submarket metrics (rents, vacancy, absorption, cap rates) for grounding the market agent.
+
+    Loads every CSV and Parquet file in a directory into a MarketDataSnapshot and answers lookups
+    by metro, submarket and asset class from its in-memory indexes. A background thread watches
+    the files' modification times and sizes and, when an extract is added, replaced or removed,
+    builds a new snapshot and swaps it in once the files have stopped changing; lookups running at
+    that moment keep the snapshot they started with.
+
+    Expected columns: msa, submarket (blank or "Total" for metro-wide rows), asset_class, period,
+    and any of the METRICS columns. Parquet files need the optional pyarrow package.
+
+    Configuration (environment variables):
+        MARKET_DATA_DIR             directory with the extracts (default data/market)
+        MARKET_DATA_RELOAD_SECONDS  how often to check for changed files (default 30, 0 disables)
+        MARKET_DATA_PERIODS         periods of each series sent to the market agent (default 4)
+    """
+
+    def __init__(self, data_dir=None, reload_seconds=None, periods=None):
+        self.data_dir = data_dir or os.environ.get("MARKET_DATA_DIR", os.path.join("data", "market"))
+        self.reload_seconds = float(reload_seconds if reload_seconds is not None else os.environ.get("MARKET_DATA_RELOAD_SECONDS", 30))
+        self.periods = int(periods or os.environ.get("MARKET_DATA_PERIODS", 4))
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._watcher_pid = None
+
+    def _signature(self):
+        """(path, mtime, size) of every extract in the data directory"""
+        if not os.path.isdir(self.data_dir):
+            return ()
+        entries = []
+        for name in sorted(os.listdir(self.data_dir)):
+            if name.lower().endswith((".csv", ".parquet")):
+                path = os.path.join(self.data_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((path, stat.st_mtime_ns, stat.st_size))
+        return tuple(entries)
+
+    def _load(self, signature):
+        start = time.perf_counter()
+        tables = []
+        for path, _, _ in signature:
+            try:
+                columns = _read_parquet(path) if path.lower().endswith(".parquet") else _read_csv(path)
+            except Exception as e:
+                print(f"Warning: Could not read market data file {path}: {e}")
+                continue
+            if columns:
+                tables.append((os.path.basename(path), columns))
+        snapshot = MarketDataSnapshot(tables, signature)
+        if signature:
+            print(f"Loaded market data: {snapshot.size} rows from {len(tables)} files "
+                  f"({(time.perf_counter() - start) * 1000:.1f} ms)")
+        return snapshot
+
+    def reload(self, force=False):
+        """Rebuild the snapshot if the files changed (or always, with force); returns True if it was replaced"""
+        with self._lock:
+            signature = self._signature()
+            if not force and self._snapshot is not None and signature == self._snapshot.signature:
+                return False
+            self._snapshot = self._load(signature)
+            return True
+
+    def snapshot(self):
+        """Current snapshot, loading it on first use and starting the reload watcher in this process"""
+        if self._snapshot is None:
+            self.reload()
+        # Threads do not survive a fork, so each server worker starts its own watcher
+        if self.reload_seconds > 0 and self._watcher_pid != os.getpid():
+            with self._lock:
+                # Checked again under the lock, so concurrent first requests start only one watcher
+                if self._watcher_pid != os.getpid():
+                    self._watcher_pid = os.getpid()
+                    threading.Thread(target=self._watch, daemon=True, name="market-data-reload").start()
+        return self._snapshot
+
+    def _watch(self):
+        # A file is only reloaded once it has looked the same for a whole interval, so an extract
+        # that is still being written is not loaded half-way through
+        pending = None
+        while True:
+            time.sleep(self.reload_seconds)
+            try:
+                signature = self._signature()
+                if signature != self._snapshot.signature and signature == pending:
+                    self.reload()
+                pending = signature
+            except Exception as e:
+                print(f"Warning: Market data reload failed: {e}")
+
+    def lookup(self, msa=None, submarket=None, asset_class=None, city=None, state=None):
+        """
+        Find the rows for a deal's location: its submarket series and the metro-wide series
+        for the same asset class.
+
+        Args:
+            msa: Metro name from the deal (e.g. "Austin-Round Rock, Texas")
+            submarket: Submarket name from the deal
+            asset_class: Canonical asset class (see deal_facts.classify_asset_class)
+            city, state: Used for the metro when msa is not given
+
+        Returns:
+            Dictionary with the metro key, "submarket" and "metro" row lists (newest period first),
+            the snapshot version and the lookup time in microseconds
+        """
+        start = time.perf_counter()
+        snapshot = self.snapshot()
+        metro, submarket_rows, metro_rows = None, [], []
+        # The deal's metro name may not match the dataset's, so its city is tried as well
+        candidates = [msa_key(msa, city, state), msa_key(None, city, state)] if asset_class else []
+        for candidate in candidates:
+            if not candidate:
+                continue
+            submarket_span = next((snapshot.submarket_index[(candidate, key, asset_class)] for key in submarket_keys(submarket)
+                                   if (candidate, key, asset_class) in snapshot.submarket_index), None)
+            metro_span = snapshot.metro_index.get((candidate, asset_class))
+            if metro is None or submarket_span or metro_span:
+                metro = candidate
+            if submarket_span or metro_span:
+                submarket_rows = snapshot.rows(submarket_span, self.periods) if submarket_span else []
+                metro_rows = snapshot.rows(metro_span, self.periods) if metro_span else []
+                break
+        return {
+            "metro": metro,
+            "asset_class": asset_class,
+            "submarket_rows": submarket_rows,
+            "metro_rows": metro_rows,
+            "version": snapshot.version,
+            "lookup_us": round((time.perf_counter() - start) * 1e6, 1),
+        }
+
+
+def _format_value(value, kind):
+    if kind == "percent":
+        return f"{value * 100:.1f}%"
+    if kind == "money":
+        return f"${value:,.2f}"
+    return f"{value:,.0f}"
+
+
+def format_market_data(match):
+    """Render the rows of a lookup as plain text for the market agent's prompt ("" if nothing matched)"""
+    blocks = []
+    for key in ("submarket_rows", "metro_rows"):
+        rows = match.get(key) or []
+        if not rows:
+            continue
+        first = rows[0]
+        heading = f"{first['submarket']} submarket, {first['msa']}" if first["submarket"] else f"{first['msa']} (metro-wide)"
+        lines = [f"{heading}, {first['asset_class'].replace('_', ' ')} (source: {first['source']}):"]
+        for row in rows:
+            values = [f"{label} {_format_value(row[column], kind)}" for column, label, kind in METRICS if column in row]
+            lines.append(f"- {row['period'] or 'latest'}: {', '.join(values) if values else 'no metrics'}")
+        blocks.append("\n".join(lines))
+    if not blocks:
+        return ""
+    return ("MARKET DATA (local dataset):\n" + "\n\n".join(blocks)
+            + "\nBase rent, vacancy, absorption and cap rate trends on these figures and say where the dataset has no figure instead of estimating one.")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_market_data():
+    """Process-wide market data store shared by every pipeline"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = MarketDataStore()
+        return _store
@@ -0,0 +1,327 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from agent_registry import AGENT_SPECS
+from cancellation import CancelledError
+from fair_scheduler import get_scheduler
+
+# Phrases that indicate the model declined or could not complete the analysis
+REFUSAL_MARKERS = ("i'm sorry", "i am sorry", "i cannot", "i can't", "unable to provide", "as an ai")
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token for English prose)"""
+    return len(text or "") // 4
+
+
+class ModelRouter:
+    """
+    Picks a model per agent and per document size instead of a hard-coded gpt-4o.
+
+    Models are arranged in tiers from cheapest to largest. Specialists start on the
+    specialist tier, synthesis runs on the synthesis tier, and any call whose prompt is
+    larger than large_document_tokens starts on the top tier. A response that fails the
+    quality check (too short, truncated or a refusal) is retried one tier up.
+
+    Configuration comes from a JSON file (MODEL_ROUTING_CONFIG) or environment variables:
+        MODEL_TIERS              comma separated, cheapest first (default gpt-4o-mini,gpt-4o)
+        MODEL_SPECIALIST_TIER    tier index for specialist agents (default 0)
+        MODEL_SYNTHESIS_TIER     tier index for the orchestrator and portfolio comparison (default last tier)
+        MODEL_<AGENT_ID>         pin a model for one registered agent, e.g. MODEL_LEGAL=gpt-4o
+        MODEL_TEMPERATURE        sampling temperature (default 0.7)
+        MODEL_LARGE_DOCUMENT_TOKENS  prompt size that starts on the top tier (default 30000)
+        MODEL_MIN_RESPONSE_CHARS     shortest acceptable answer before escalating (default 400)
+        MODEL_USAGE_LOG          JSONL file receiving one line per call (default data/model_usage.jsonl)
+
+    Every call waits for a slot from the shared fair_scheduler.FairShareScheduler, on behalf
+    of the router's tenant and priority lane.
+    """
+
+    SYNTHESIS_AGENTS = {"orchestrator", "portfolio"}
+
+    def __init__(self, config=None, scheduler=None, tenant="default", priority="interactive"):
+        config = config if config is not None else self._load_config()
+        tiers = config.get("tiers") or ["gpt-4o-mini", "gpt-4o"]
+        if isinstance(tiers, str):
+            tiers = [tier.strip() for tier in tiers.split(",") if tier.strip()]
+        self.tiers = tiers
+        self.specialist_tier = int(config.get("specialist_tier", 0))
+        self.synthesis_tier = int(config.get("synthesis_tier", len(self.tiers) - 1))
+        self.agent_models = {key.lower(): value for key, value in (config.get("agents") or {}).items()}
+        self.temperature = float(config.get("temperature", 0.7))
+        self.large_document_tokens = int(config.get("large_document_tokens", 30000))
+        self.min_response_chars = int(config.get("min_response_chars", 400))
+        self.usage_log_path = config.get("usage_log", os.path.join("data", "model_usage.jsonl"))
+        self.scheduler = scheduler or get_scheduler()
+        self.tenant = tenant
+        self.priority = priority
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def _load_config(self):
+        config_path = os.environ.get("MODEL_ROUTING_CONFIG")
+        if config_path:
+            with open(config_path, 'r') as f:
+                return json.load(f)
+        config = {"agents": {}}
+        env_keys = {
+            "MODEL_TIERS": "tiers",
+            "MODEL_SPECIALIST_TIER": "specialist_tier",
+            "MODEL_SYNTHESIS_TIER": "synthesis_tier",
+            "MODEL_TEMPERATURE": "temperature",
+            "MODEL_LARGE_DOCUMENT_TOKENS": "large_document_tokens",
+            "MODEL_MIN_RESPONSE_CHARS": "min_response_chars",
+            "MODEL_USAGE_LOG": "usage_log",
+        }
+        for env_key, value in os.environ.items():
+            if env_key in env_keys:
+                config[env_keys[env_key]] = value
+            elif env_key.startswith("MODEL_"):
+                # Only pins for known agents; unrelated MODEL_* variables (MODEL_NAME, ...) are ignored
+                agent_id = env_key[len("MODEL_"):].lower()
+                if agent_id in self.known_agent_ids():
+                    config["agents"][agent_id] = value
+        return config
+
+    @classmethod
+    def known_agent_ids(cls):
+        """Agent ids that can be pinned to a model: every registered specialist plus the synthesis agents"""
+        return {spec.agent_id for spec in AGENT_SPECS} | cls.SYNTHESIS_AGENTS
+
+    def llm_slot(self, timeout=None, cancel_token=None):
+        """Context manager holding a scheduler slot for one LLM call; yields the queue wait in seconds"""
+        return self.scheduler.slot(self.tenant, self.priority, timeout, cancel_token)
+
+    def select_model(self, agent_id, prompt_tokens):
+        """
+        Choose the starting model for a call.
+
+        Args:
+            agent_id: Agent making the call (real_estate, legal, orchestrator, ...)
+            prompt_tokens: Estimated size of the prompt
+
+        Returns:
+            Tuple of (model name, tier index or None when the model is pinned)
+        """
+        pinned = self.agent_models.get(agent_id)
+        if pinned:
+            return pinned, self.tiers.index(pinned) if pinned in self.tiers else None
+
+        tier = self.synthesis_tier if agent_id in self.SYNTHESIS_AGENTS else self.specialist_tier
+        if prompt_tokens >= self.large_document_tokens:
+            tier = len(self.tiers) - 1
+        tier = max(0, min(tier, len(self.tiers) - 1))
+        return self.tiers[tier], tier
+
+    def passes_quality_check(self, text, finish_reason=None):
+        """Reject empty, truncated, very short or refused answers"""
+        if not text or len(text.strip()) < self.min_response_chars:
+            return False
+        if finish_reason == "length":
+            return False
+        opening = text.strip()[:200].lower()
+        return not any(marker in opening for marker in REFUSAL_MARKERS)
+
+    def complete(self, client, agent_id, system_prompt, user_prompt, cancel_token=None, **kwargs):
+        """
+        Run a chat completion on the routed model, escalating to larger tiers when
+        the answer fails the quality check.
+
+        Args:
+            client: OpenAI client
+            agent_id: Agent making the call
+            system_prompt: System prompt
+            user_prompt: User prompt
+            cancel_token: Optional cancellation.CancelToken. The response is then streamed so the
+                call can be aborted part way through; raises CancelledError when cancelled.
+            **kwargs: Extra arguments passed to chat.completions.create. A timeout covers the whole
+                call: waiting for a scheduler slot, the API calls and any escalations.
+
+        Returns:
+            Response text from the last model tried
+
+        Raises:
+            TimeoutError: if the timeout runs out before a model is called
+        """
+        prompt_tokens = estimate_tokens(system_prompt) + estimate_tokens(user_prompt)
+        model, tier = self.select_model(agent_id, prompt_tokens)
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+        timeout = kwargs.pop("timeout", None)
+        deadline = time.monotonic() + timeout if timeout else None
+
+        while True:
+            with self.llm_slot(self._remaining(deadline, agent_id), cancel_token) as queue_wait:
+                call_kwargs = dict(kwargs)
+                if deadline is not None:
+                    # The API call gets what the slot wait left of the timeout
+                    call_kwargs["timeout"] = self._remaining(deadline, agent_id)
+                start = time.perf_counter()
+                if cancel_token is None:
+                    response = client.chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        temperature=self.temperature,
+                        **call_kwargs
+                    )
+                    choice = response.choices[0]
+                    text, finish_reason, usage = choice.message.content, getattr(choice, "finish_reason", None), getattr(response, "usage", None)
+                else:
+                    text, finish_reason, usage = self._stream(client, model, messages, cancel_token, call_kwargs)
+                latency = time.perf_counter() - start
+            if cancel_token is not None and cancel_token.cancelled:
+                # Whatever was generated before the stream was closed is paid for but thrown away
+                self._record(agent_id, model, latency, usage, prompt_tokens, False, False, queue_wait,
+                             completion_tokens=estimate_tokens(text), cancelled=True)
+                raise CancelledError(cancel_token.reason)
+            passed = self.passes_quality_check(text, finish_reason)
+            escalate = not passed and tier is not None and tier < len(self.tiers) - 1
+            self._record(agent_id, model, latency, usage, prompt_tokens, passed, escalate, queue_wait)
+
+            if not escalate:
+                return text
+            print(f"   {agent_id} answer from {model} failed quality check, escalating to {self.tiers[tier + 1]}")
+            tier += 1
+            model = self.tiers[tier]
+
+    def _remaining(self, deadline, agent_id):
+        """Seconds left until deadline (None for no deadline); raises TimeoutError once it has passed"""
+        if deadline is None:
+            return None
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"{agent_id} call timed out before a model could be called")
+        return remaining
+
+    def batch_request(self, agent_id, system_prompt, user_prompt):
+        """
+        Request body for a deferred call through a batch API, on the model complete() would start with.
+
+        Returns:
+            Tuple of (chat completion request body, estimated prompt tokens)
+        """
+        prompt_tokens = estimate_tokens(system_prompt) + estimate_tokens(user_prompt)
+        model, _ = self.select_model(agent_id, prompt_tokens)
+        body = {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            "temperature": self.temperature
+        }
+        return body, prompt_tokens
+
+    def record_batch_call(self, agent_id, model, text, finish_reason, usage, estimated_prompt_tokens, latency):
+        """
+        Log a call answered through a batch API like an interactive one.
+        Batch answers are not escalated; the caller retries a failed answer with complete().
+
+        Returns:
+            True when the answer passes the quality check
+        """
+        passed = self.passes_quality_check(text, finish_reason)
+        self._record(agent_id, model, latency, usage, estimated_prompt_tokens, passed, False,
+                     completion_tokens=estimate_tokens(text), batch=True)
+        return passed
+
+    def _stream(self, client, model, messages, cancel_token, kwargs):
+        """
+        Stream a completion, closing the connection as soon as the token is cancelled.
+
+        Returns:
+            Tuple of (text received, finish reason, usage or None)
+        """
+        cancel_token.raise_if_cancelled()
+        stream = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=self.temperature,
+            stream=True,
+            stream_options={"include_usage": True},
+            **kwargs
+        )
+        unregister = cancel_token.on_cancel(stream.close)
+        parts, finish_reason, usage = [], None, None
+        try:
+            for chunk in stream:
+                if cancel_token.cancelled:
+                    break
+                if chunk.choices:
+                    parts.append(chunk.choices[0].delta.content or "")
+                    finish_reason = getattr(chunk.choices[0], "finish_reason", None) or finish_reason
+                if getattr(chunk, "usage", None):
+                    usage = chunk.usage
+        except Exception:
+            # Closing the stream from another thread surfaces as a read error here
+            if not cancel_token.cancelled:
+                raise
+        finally:
+            unregister()
+        if cancel_token.cancelled:
+            stream.close()
+        return "".join(parts), finish_reason, usage
+
+    def _record(self, agent_id, model, latency, usage, estimated_prompt_tokens, passed, escalated, queue_wait=0.0,
+                completion_tokens=None, cancelled=False, batch=False):
+        entry = {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "tenant": self.tenant,
+            "agent": agent_id,
+            "model": model,
+            "latency_s": round(latency, 3),
+            "queue_wait_s": round(queue_wait, 3),
+            "prompt_tokens": self._usage(usage, "prompt_tokens") or estimated_prompt_tokens,
+            "completion_tokens": self._usage(usage, "completion_tokens") or completion_tokens,
+            "passed_quality_check": passed,
+            "escalated": escalated,
+            "cancelled": cancelled,
+            "batch": batch
+        }
+        print(f"   {agent_id} -> {model}{' (batch)' if batch else ''}: {entry['latency_s']:.2f}s, "
+              f"{entry['prompt_tokens']} prompt / {entry['completion_tokens']} completion tokens")
+        with self._lock:
+            self.calls.append(entry)
+            if self.usage_log_path:
+                try:
+                    log_dir = os.path.dirname(self.usage_log_path)
+                    if log_dir:
+                        os.makedirs(log_dir, exist_ok=True)
+                    with open(self.usage_log_path, 'a') as f:
+                        f.write(json.dumps(entry) + "\n")
+                except OSError as e:
+                    print(f"Warning: Could not write model usage log: {e}")
+
+    @staticmethod
+    def _usage(usage, key):
+        # Usage objects from the client, or dictionaries from batch output files
+        return usage.get(key) if isinstance(usage, dict) else getattr(usage, key, None)
+
+    def summary(self):
+        """
+        Aggregate the calls made through this router by model.
+
+        Returns:
+            Dictionary with the individual calls and per-model totals
+        """
+        with self._lock:
+            calls = list(self.calls)
+        per_model = {}
+        for call in calls:
+            totals = per_model.setdefault(call["model"], {
+                "calls": 0, "latency_s": 0.0, "queue_wait_s": 0.0, "prompt_tokens": 0, "completion_tokens": 0, "escalations": 0,
+                "cancelled": 0
+            })
+            totals["calls"] += 1
+            totals["latency_s"] = round(totals["latency_s"] + call["latency_s"], 3)
+            totals["queue_wait_s"] = round(totals["queue_wait_s"] + call["queue_wait_s"], 3)
+            totals["prompt_tokens"] += call["prompt_tokens"] or 0
+            totals["completion_tokens"] += call["completion_tokens"] or 0
+            totals["escalations"] += 1 if call["escalated"] else 0
+            totals["cancelled"] += 1 if call["cancelled"] else 0
+        return {"calls": calls, "per_model": per_model}
@@ -0,0 +1,189 @@
+import os
+import re
+
+from dag_scheduler import SUCCESS_STATES
+from model_router import estimate_tokens
+from section_router import segment_sections
+
+# Columns of the comparison table: (key, label, kind, better) where better is "high" or "low" for
+# the metrics that count towards the deterministic score and None for the descriptive ones
+COMPARISON_COLUMNS = [
+    ("price", "Price", "money", None),
+    ("price_per_sf", "Price/SF", "money", None),
+    ("price_per_unit", "Price/Unit", "money", None),
+    ("noi", "NOI", "money", None),
+    ("cap_rate", "Cap Rate", "percent", "high"),
+    ("irr", "IRR", "percent", "high"),
+    ("dscr", "DSCR", "ratio", "high"),
+    ("debt_yield", "Debt Yield", "percent", "high"),
+    ("ltv", "LTV", "percent", "low"),
+    ("occupancy", "Occupancy", "percent", "high"),
+    ("expense_ratio", "Expense Ratio", "percent", "low"),
+    ("year_built", "Built", "year", None),
+]
+SCORED_METRICS = [key for key, _, _, better in COMPARISON_COLUMNS if better]
+
+# Headings of the orchestrator report sections that carry the conclusion, most useful first
+EXCERPT_HEADINGS = ("recommendation", "key decision", "executive summary", "risk")
+
+
+def deal_metrics(results):
+    """
+    Table row for one stored analysis: its extracted facts plus the ratios derived from them.
+
+    Args:
+        results: Stored results of an analysis (see stage_store.StageStore)
+
+    Returns:
+        Dictionary with report_id, property, asset_class, location and the COMPARISON_COLUMNS keys
+        (None where the document did not give the figures)
+    """
+    facts = results.get("deal_facts") or {}
+    row = {
+        "report_id": results.get("report_id"),
+        "property": facts.get("property_name"),
+        "asset_class": facts.get("asset_class"),
+        "location": facts.get("location") or ", ".join(part for part in (facts.get("city"), facts.get("state")) if part) or None,
+    }
+    for key, _, _, _ in COMPARISON_COLUMNS:
+        row[key] = facts.get(key)
+    if facts.get("noi") and facts.get("loan_amount"):
+        row["debt_yield"] = facts["noi"] / facts["loan_amount"]
+    if facts.get("operating_expenses") and facts.get("gross_income"):
+        row["expense_ratio"] = facts["operating_expenses"] / facts["gross_income"]
+    status = results.get("agent_status") or {}
+    row["partial"] = bool(results.get("partial"))
+    row["missing_agents"] = sorted(agent_id for agent_id, state in status.items()
+                                   if state not in SUCCESS_STATES)
+    return row
+
+
+def rank_deals(rows):
+    """
+    Score and rank table rows deterministically.
+
+    Each scored metric is turned into a percentile among the deals that have it (1.0 is the best
+    value, ties share the average); a deal's score is the mean of its percentiles. Deals with
+    fewer scored metrics are not penalised for the missing ones, but their coverage is reported.
+
+    Returns:
+        The rows, best first, each with score, coverage (scored metrics available) and rank
+    """
+    percentiles = {id(row): [] for row in rows}
+    for key in SCORED_METRICS:
+        better = next(direction for column, _, _, direction in COMPARISON_COLUMNS if column == key)
+        present = [row for row in rows if row.get(key) is not None]
+        if len(present) < 2:
+            continue
+        values = sorted(row[key] for row in present)
+        for row in present:
+            below = sum(1 for value in values if value < row[key])
+            equal = sum(1 for value in values if value == row[key])
+            percentile = (below + (equal - 1) / 2) / (len(values) - 1)
+            percentiles[id(row)].append(percentile if better == "high" else 1 - percentile)
+    for row in rows:
+        scores = percentiles[id(row)]
+        row["score"] = round(sum(scores) / len(scores), 3) if scores else None
+        row["coverage"] = len(scores)
+    ranked = sorted(rows, key=lambda row: (row["score"] is None, -(row["score"] or 0), row["report_id"] or ""))
+    for rank, row in enumerate(ranked, start=1):
+        row["rank"] = rank
+    return ranked
+
+
+def _format_cell(value, kind):
+    if value is None:
+        return "-"
+    if kind == "money":
+        return f"${value:,.0f}"
+    if kind == "percent":
+        return f"{value * 100:.1f}%"
+    if kind == "ratio":
+        return f"{value:.2f}x"
+    if kind == "year":
+        return f"{value:.0f}"
+    return str(value)
+
+
+def format_metrics_table(rows):
+    """Render ranked rows as a pipe-separated plain text table for the synthesis prompt and the saved report"""
+    header = ["Rank", "Report", "Property", "Class", "Location"] + [label for _, label, _, _ in COMPARISON_COLUMNS] + ["Score"]
+    lines = [" | ".join(header)]
+    for row in rows:
+        cells = [str(row["rank"]), row["report_id"] or "-", row["property"] or "-", row["asset_class"] or "-",
+                 row["location"] or "-"]
+        cells += [_format_cell(row.get(key), kind) for key, _, kind, _ in COMPARISON_COLUMNS]
+        cells.append("-" if row["score"] is None else f"{row['score']:.2f} ({row['coverage']}/{len(SCORED_METRICS)})")
+        lines.append(" | ".join(cells))
+    return "\n".join(lines)
+
+
+def report_excerpt(results, max_chars):
+    """
+    The conclusion of an analysis in at most max_chars: the recommendation, decision factors,
+    summary and risk sections of the orchestrator report, or the opening of the specialist reports
+    when synthesis did not complete.
+    """
+    if max_chars <= 0:
+        return ""
+    status = (results.get("agent_status") or {}).get("orchestrator")
+    report = results.get("orchestrator_report") or ""
+    if status in SUCCESS_STATES and report:
+        sections = segment_sections(report)
+        chosen = []
+        for keyword in EXCERPT_HEADINGS:
+            chosen += [section for section in sections
+                       if section["heading"] and keyword in section["heading"].lower() and section not in chosen]
+        text = "\n\n".join(section["text"] for section in chosen) or report
+    else:
+        text = "\n\n".join(
+            f"{agent['id']}: {results[agent['result_key']][:max_chars // 2]}" for agent in results.get("agents", [])
+            if results.get(agent["result_key"]) and not re.match(r"^(FAILED|TIMED OUT|CANCELLED)", results[agent["result_key"]])
+        )
+    text = re.sub(r"\n{3,}", "\n\n", text).strip()
+    if len(text) > max_chars:
+        text = text[:max_chars].rsplit(" ", 1)[0] + " ..."
+    return text
+
+
+def build_comparison_prompt(ranked, analyses, max_prompt_tokens=None, max_excerpt_chars=None):
+    """
+    User prompt for the single synthesis call that ranks the deals.
+
+    The metrics table is always included in full; the rest of the token budget is shared evenly
+    among the deals' excerpts (up to max_excerpt_chars each), so the prompt stays bounded however
+    many deals are compared.
+
+    Args:
+        ranked: Rows from rank_deals
+        analyses: Stored results by report id
+        max_prompt_tokens: Prompt budget (defaults to COMPARE_MAX_PROMPT_TOKENS, 12000)
+        max_excerpt_chars: Longest excerpt per deal (defaults to COMPARE_EXCERPT_CHARS, 1500)
+
+    Returns:
+        Tuple of (prompt, characters allowed per excerpt)
+    """
+    if max_prompt_tokens is None:
+        max_prompt_tokens = int(os.environ.get("COMPARE_MAX_PROMPT_TOKENS", 12000))
+    if max_excerpt_chars is None:
+        max_excerpt_chars = int(os.environ.get("COMPARE_EXCERPT_CHARS", 1500))
+    table = format_metrics_table(ranked)
+    # Instructions take about 300 tokens and each deal's excerpt header about 30
+    remaining_chars = max(max_prompt_tokens - estimate_tokens(table) - 300 - 30 * len(ranked), 0) * 4
+    excerpt_chars = min(max_excerpt_chars, remaining_chars // max(len(ranked), 1))
+
+    blocks = []
+    for row in ranked:
+        excerpt = report_excerpt(analyses[row["report_id"]], excerpt_chars)
+        incomplete = f" (incomplete analysis: {', '.join(row['missing_agents'])} missing)" if row["missing_agents"] else ""
+        blocks.append(f"[{row['report_id']}] {row['property'] or 'Unnamed property'}{incomplete}\n{excerpt or 'No conclusion available.'}")
+    prompt = f"""Rank the following {len(ranked)} analysed real estate deals from most to least attractive for investment.
+
+KEY METRICS (extracted from each deal's documents; the score is the mean percentile rank of cap rate, IRR, DSCR, debt yield, LTV, occupancy and expense ratio among these deals, with the number of those metrics available):
+{table}
+
+CONCLUSIONS OF THE INDIVIDUAL ANALYSES:
+{chr(10).join(blocks)}
+
+Produce a ranked list with every deal, each with a one or two sentence justification and a recommendation (Invest / Do Not Invest / Conditional). Where your ranking departs from the metric score, say why. Close with the key trade-offs between the top deals."""
+    return prompt, excerpt_chars
@@ -0,0 +1,191 @@
+import os
+import shutil
+import threading
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+
+from agent_registry import AGENT_SPECS
+from deal_similarity import DealSimilarityIndex
+from job_queue import JobQueue
+from search_index import ReportSearchIndex
+from stage_store import StageStore
+
+load_dotenv()
+
+# Where analyses are stored. Shared by the web app (app.py) and the command line tools
+# (worker.py, rerun.py, bulk_analyze.py), which must not need Flask to save reports.
+UPLOAD_FOLDER = 'uploads'
+REPORTS_FOLDER = 'reports'
+# Indexes, queues, caches and logs; unlike REPORTS_FOLDER it is never served
+DATA_FOLDER = 'data'
+
+os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+os.makedirs(REPORTS_FOLDER, exist_ok=True)
+os.makedirs(DATA_FOLDER, exist_ok=True)
+
+# Full-text index over reports and extracted deal text, updated as reports are written
+search_index = ReportSearchIndex(os.environ.get("SEARCH_INDEX_PATH", os.path.join(DATA_FOLDER, 'search_index.db')))
+
+# Similarity index over previously analysed deals, used to ground comparables in agent prompts
+similarity_index = DealSimilarityIndex(os.environ.get("SIMILARITY_INDEX_DIR", os.path.join(DATA_FOLDER, 'similarity')))
+
+# Inputs and outputs of every pipeline stage per analysis, for re-running single stages (rerun.py, /reports/<id>/rerun)
+stage_store = StageStore(os.environ.get("STAGE_STORE_PATH", os.path.join(DATA_FOLDER, 'stages.db')))
+
+# Durable queue of analysis jobs processed by worker.py
+job_queue = JobQueue(os.environ.get("JOB_QUEUE_PATH", os.path.join(DATA_FOLDER, 'jobs.db')))
+
+# Last timestamp handed out as a report id (see save_upload)
+report_id_lock = threading.Lock()
+last_report_time = None
+
+# Report files written per analysis besides the specialist reports: (agent id, result key, file suffix)
+SYNTHESIS_REPORT_FILES = [
+    ("orchestrator", "orchestrator_report", "orchestrator"),
+    ("deal", "deal_content", "deal"),
+]
+
+
+def report_files(results):
+    """List (agent id, result key, file suffix) for every report file of an analysis"""
+    return [(agent["id"], agent["result_key"], agent["report_suffix"]) for agent in results['agents']] + SYNTHESIS_REPORT_FILES
+
+
+def save_upload(filename, file_bytes=None, source_path=None):
+    """
+    Save an uploaded document under a new report id.
+    Report ids are timestamps to the second, so an upload arriving in the same second as the
+    previous one is moved to the next free second instead of overwriting its reports.
+    A document already on disk (source_path) is hard-linked instead of copied where possible.
+    
+    Returns:
+        Tuple of (report_id, filepath)
+    """
+    global last_report_time
+    with report_id_lock:
+        report_time = datetime.now().replace(microsecond=0)
+        if last_report_time is not None and report_time <= last_report_time:
+            report_time = last_report_time + timedelta(seconds=1)
+        last_report_time = report_time
+    timestamp = report_time.strftime("%Y%m%d_%H%M%S")
+    filepath = os.path.join(UPLOAD_FOLDER, f"{timestamp}_{filename}")
+    if source_path:
+        try:
+            os.link(source_path, filepath)
+        except OSError:
+            shutil.copyfile(source_path, filepath)
+    else:
+        with open(filepath, 'wb') as f:
+            f.write(file_bytes)
+    return f"report_{timestamp}", filepath
+
+
+def build_response(report_id, results):
+    """Build the /analyze JSON response from pipeline results"""
+    response = {
+        "status": "success",
+        "report_id": report_id,
+        "orchestrator_report": results['orchestrator_report'],
+        "source_files": results.get('source_files'),
+        "normalization": results.get('normalization'),
+        "section_routing": results.get('section_routing'),
+        "legal_scan": results.get('legal_scan'),
+        "comparable_deals": results['comparable_deals'],
+        "market_data": results.get('market_data'),
+        "screen": results['screen'],
+        "model_usage": results['model_usage'],
+        "agents": results['agents'],
+        "agent_status": results['agent_status'],
+        "agent_timings": results['agent_timings'],
+        "partial": results['partial'],
+        "revision": results.get('revision'),
+        "reports": {}
+    }
+    for agent_id, result_key, suffix in report_files(results):
+        if agent_id == "deal":
+            continue
+        response[result_key] = results[result_key]
+        response["reports"][suffix] = f"/reports/{report_id}_{suffix}.txt"
+    return response
+
+
+def save_reports(report_id, results):
+    """Write every report for an analysis to the reports folder and add it to the search and similarity indexes"""
+    indexed = {}
+    for agent_id, result_key, suffix in report_files(results):
+        report_path = os.path.join(REPORTS_FOLDER, f"{report_id}_{suffix}.txt")
+        if results['agent_status'].get(agent_id) == "timed_out":
+            # The agent may already have finished during synthesis; never overwrite its late result
+            try:
+                with open(report_path, 'x') as f:
+                    f.write(results[result_key])
+            except FileExistsError:
+                continue
+        else:
+            with open(report_path, 'w') as f:
+                f.write(results[result_key])
+        indexed[suffix] = results[result_key]
+    
+    # Index reports for /search (incremental upsert, no rebuild)
+    try:
+        search_index.index_reports(report_id, indexed)
+    except Exception as e:
+        print(f"Warning: Could not index reports for {report_id}: {e}")
+    
+    try:
+        similarity_index.add_deal(report_id, results['deal_content'], results['deal_facts'])
+    except Exception as e:
+        print(f"Warning: Could not add {report_id} to the similarity index: {e}")
+    
+    try:
+        stage_store.save(report_id, results)
+    except Exception as e:
+        print(f"Warning: Could not store the stages of {report_id}: {e}")
+
+
+def rerun_analysis(pipeline, report_id, stored, stages=None, include_dependents=False, use_cache=True, deadline_seconds=None):
+    """
+    Re-run selected stages of a stored analysis (see InvestmentAnalysisPipeline.rerun), overwrite
+    the report files of the stages that ran and store the new stage runs.
+    
+    Returns:
+        The /analyze response for the updated analysis, plus a "rerun" summary
+    """
+    results = pipeline.rerun(
+        stored,
+        stages,
+        include_dependents=include_dependents,
+        use_cache=use_cache,
+        deadline_seconds=deadline_seconds,
+        on_late_result=lambda agent_id, report: save_late_report(report_id, agent_id, report)
+    )
+    rerun = set(results['rerun']['stages'])
+    indexed = {}
+    for agent_id, result_key, suffix in report_files(results):
+        if agent_id in rerun:
+            with open(os.path.join(REPORTS_FOLDER, f"{report_id}_{suffix}.txt"), 'w') as f:
+                f.write(results[result_key])
+            indexed[suffix] = results[result_key]
+    try:
+        search_index.index_reports(report_id, indexed)
+    except Exception as e:
+        print(f"Warning: Could not index reports for {report_id}: {e}")
+    stage_store.save(report_id, results)
+    response = build_response(report_id, results)
+    response["rerun"] = results['rerun']
+    return response
+
+
+def save_late_report(report_id, agent_id, report):
+    """Persist a specialist report that finished after the request deadline, replacing the timed out placeholder"""
+    suffix = next((spec.report_suffix for spec in AGENT_SPECS if spec.agent_id == agent_id), agent_id)
+    report_path = os.path.join(REPORTS_FOLDER, f"{report_id}_{suffix}.txt")
+    with open(report_path, 'w') as f:
+        f.write(report)
+    search_index.index_document(report_id, suffix, report)
+    try:
+        stage_store.record_late_output(report_id, agent_id, report)
+    except Exception as e:
+        print(f"Warning: Could not store the late {agent_id} stage of {report_id}: {e}")
+    print(f"Saved late {agent_id} report to {report_path}")
@@ -0,0 +1,170 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one execution.
+
+    The first caller for a key runs the function; callers that arrive while it is still
+    running wait for it and receive the same result (or the same exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        """
+        Run fn once for all concurrent callers using key.
+
+        Returns:
+            Tuple of (result, shared) where shared is True for callers that waited on another execution
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = {"event": threading.Event(), "result": None, "error": None}
+                self._calls[key] = call
+                leader = True
+            else:
+                leader = False
+
+        if not leader:
+            call["event"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"], True
+
+        try:
+            call["result"] = fn()
+            return call["result"], False
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call["event"].set()
+
+
+class IdempotencyConflict(Exception):
+    """Raised when an Idempotency-Key is reused for a different request"""
+    pass
+
+
+class IdempotencyStore:
+    """
+    Stores the response of completed requests by client-supplied Idempotency-Key so that
+    retries return the original result instead of re-running the analysis. A row is claimed
+    before the work starts, so a retry that reaches another worker process while the first
+    request is still running waits for it instead of starting a second pipeline.
+    """
+
+    def __init__(self, db_path=None, ttl_hours=None, stale_seconds=None):
+        self.db_path = db_path or os.environ.get("IDEMPOTENCY_DB_PATH", os.path.join("data", "idempotency.db"))
+        self.ttl_seconds = float(ttl_hours or os.environ.get("IDEMPOTENCY_TTL_HOURS", 24)) * 3600
+        # A claim that has not completed after this long belongs to a crashed worker and can be taken over
+        self.stale_seconds = float(stale_seconds or os.environ.get("IDEMPOTENCY_STALE_SECONDS", 900))
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS idempotency_keys (
+                    key TEXT PRIMARY KEY,
+                    fingerprint TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    status_code INTEGER,
+                    response TEXT,
+                    created_at REAL NOT NULL
+                )
+            """)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def claim(self, key, fingerprint, timeout=None):
+        """
+        Claim a key before running the request.
+
+        Args:
+            key: Idempotency-Key header value
+            fingerprint: Hash of the request content and settings
+            timeout: Optional seconds to wait for a request with the same key that is still running
+
+        Returns:
+            None if this caller should run the request, otherwise the stored (status_code, response)
+
+        Raises:
+            IdempotencyConflict: if the key was used for a different request
+            TimeoutError: if the request with the same key is still running after timeout seconds
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM idempotency_keys WHERE created_at < ?", (now - self.ttl_seconds,))
+            inserted = conn.execute(
+                "INSERT OR IGNORE INTO idempotency_keys (key, fingerprint, status, created_at) VALUES (?, ?, 'in_progress', ?)",
+                (key, fingerprint, now)
+            ).rowcount
+        if inserted:
+            return None
+        return self.wait_for(key, fingerprint, timeout)
+
+    def wait_for(self, key, fingerprint, timeout=None, poll_interval=1.0):
+        """
+        Wait for another execution of the same key to finish and return its stored response.
+        Returns None when this caller should run the request instead: the other execution
+        released the key, or its claim went stale and this caller took it over.
+        """
+        deadline = time.monotonic() + timeout if timeout else None
+        while True:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT fingerprint, status, status_code, response, created_at FROM idempotency_keys WHERE key = ?",
+                    (key,)
+                ).fetchone()
+            if row is None:
+                # The earlier attempt failed and released the key; run it again
+                remaining = deadline - time.monotonic() if deadline else None
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"Timed out waiting for the original request with Idempotency-Key '{key}'")
+                return self.claim(key, fingerprint, remaining)
+            stored_fingerprint, status, status_code, response, created_at = row
+            if stored_fingerprint != fingerprint:
+                raise IdempotencyConflict(f"Idempotency-Key '{key}' was already used for a different request")
+            if status == "completed":
+                return status_code, json.loads(response)
+            age = time.time() - created_at
+            if age > self.stale_seconds:
+                # Compare-and-swap on the claim time, so only one of several waiters takes the claim over
+                with self._connect() as conn:
+                    taken = conn.execute(
+                        "UPDATE idempotency_keys SET created_at = ? WHERE key = ? AND status = 'in_progress' AND created_at = ?",
+                        (time.time(), key, created_at)
+                    ).rowcount
+                if taken:
+                    print(f"Warning: Idempotency-Key '{key}' was claimed {age:.0f}s ago and never completed; running the request again")
+                    return None
+                continue
+            if deadline and time.monotonic() >= deadline:
+                raise TimeoutError(f"Timed out waiting for the original request with Idempotency-Key '{key}'")
+            time.sleep(min(poll_interval, deadline - time.monotonic()) if deadline else poll_interval)
+
+    def complete(self, key, status_code, response):
+        """Store the response of a successful request"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE idempotency_keys SET status = 'completed', status_code = ?, response = ? WHERE key = ?",
+                (status_code, json.dumps(response), key)
+            )
+
+    def release(self, key):
+        """Forget a claimed key after a failed request so a retry runs again"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM idempotency_keys WHERE key = ? AND status = 'in_progress'", (key,))
@@ -0,0 +1,364 @@
+import html
+import json
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+
+# Where a sampled stack spends its time, decided by the first rule matching any frame of the
+# stack. Entries are top-level packages ("httpx") or exact frames ("app:save_reports").
+PROFILE_CATEGORIES = [
+    ("network", ("httpx", "httpcore", "h11", "anyio", "openai", "ssl", "socket", "urllib3", "requests", "http",
+                 "python_a2a")),
+    ("llm_slot_wait", ("fair_scheduler",)),
+    ("document_parsing", ("PyPDF2", "pypdf", "docx", "lxml", "file_processor", "spreadsheet_ingest", "zipfile")),
+    ("json", ("json",)),
+    ("file_io", ("shutil", "tempfile", "sqlite3", "search_index", "job_queue", "upload_sessions", "app:save_upload",
+                 "app:save_reports", "app:save_late_report", "dag_scheduler:NodeCache.get",
+                 "dag_scheduler:NodeCache.set")),
+    ("preprocessing", ("text_normalizer", "section_router", "legal_scanner", "deal_facts", "deal_similarity",
+                       "market_data", "deal_screen")),
+    ("waiting", ("threading", "queue", "concurrent", "selectors", "request_dedup", "cancellation")),
+]
+OTHER_CATEGORY = "python"
+
+# Leading frames of worker threads that only start the thread, dropped from their stacks
+THREAD_BOOTSTRAP_MODULES = ("threading", "concurrent.futures.thread")
+
+FLAMEGRAPH_WIDTH = 1200
+FLAMEGRAPH_FRAME_HEIGHT = 16
+
+
+def _schedstat_path(native_id):
+    return f"/proc/self/task/{native_id}/schedstat"
+
+
+def _thread_cpu_ns(native_id):
+    """On-CPU time of a thread in nanoseconds (Linux schedstat), or None when it is not available"""
+    try:
+        with open(_schedstat_path(native_id)) as f:
+            return int(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _thread_label(name):
+    """Group pool threads under one label: "agent_3" -> "agent", "Thread-7 (run)" -> "Thread" """
+    return re.sub(r"[-_ ]?\d+.*$", "", name) or name
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler for one request.
+
+    A background thread takes the Python stacks of the thread that entered the profiler and of
+    every thread started while it runs (the DAG scheduler's agent threads) every interval, and
+    charges the elapsed time to them. On Linux each thread's CPU time is read from schedstat at
+    every sample, so each stack also gets the share of that time it spent on a CPU; the rest is
+    time spent blocked on the network, locks or other threads. Nothing is hooked into the code
+    being profiled, and nothing runs unless a profiler is entered.
+    """
+
+    def __init__(self, interval=0.005, max_seconds=900):
+        self.interval = interval
+        self.max_seconds = max_seconds
+        # (thread label, stack of "module:function" frames) -> [wall seconds, cpu seconds]
+        self.stacks = {}
+        self.samples = 0
+        self.cpu_available = False
+        self.started_at = None
+        self.wall_seconds = 0.0
+        self.process_cpu_seconds = 0.0
+        self.request_cpu_seconds = 0.0
+        self._target = None
+        self._target_depth = 0
+        self._baseline = set()
+        self._cpu_ns = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self._target = threading.get_ident()
+        # Frames outside the profiled block (the web server's) are cut from the request thread's stacks
+        frame, depth = sys._getframe(1), 0
+        while frame.f_back is not None:
+            frame, depth = frame.f_back, depth + 1
+        self._target_depth = depth
+        self._baseline = set(sys._current_frames()) - {self._target}
+        self.started_at = datetime.now()
+        self._start = self._last = time.perf_counter()
+        self._process_cpu = time.process_time()
+        self._request_cpu = time.thread_time()
+        self._cpu_ns = {self._target: _thread_cpu_ns(threading.get_native_id())}
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+        self.wall_seconds = time.perf_counter() - self._start
+        self.process_cpu_seconds = time.process_time() - self._process_cpu
+        self.request_cpu_seconds = time.thread_time() - self._request_cpu
+        return False
+
+    def _run(self):
+        deadline = self._start + self.max_seconds
+        while not self._stop.wait(self.interval):
+            self._sample()
+            if time.perf_counter() > deadline:
+                print(f"Warning: Profiling stopped after {self.max_seconds}s")
+                return
+
+    def _sample(self):
+        now = time.perf_counter()
+        elapsed, self._last = now - self._last, now
+        sampler = self._thread.ident
+        threads = {thread.ident: thread for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == sampler or (ident in self._baseline and ident != self._target):
+                continue
+            thread = threads.get(ident)
+            stack = []
+            while frame is not None:
+                stack.append(f"{frame.f_globals.get('__name__', '?')}:{getattr(frame.f_code, 'co_qualname', frame.f_code.co_name)}")
+                frame = frame.f_back
+            stack.reverse()
+            if ident == self._target:
+                label, stack = "request", stack[self._target_depth:]
+            else:
+                label = _thread_label(thread.name) if thread is not None else "thread"
+                while stack and stack[0].split(":", 1)[0] in THREAD_BOOTSTRAP_MODULES:
+                    stack.pop(0)
+
+            cpu = 0.0
+            if thread is not None and thread.native_id is not None:
+                cpu_ns = _thread_cpu_ns(thread.native_id)
+                if cpu_ns is not None:
+                    self.cpu_available = True
+                    previous = self._cpu_ns.get(ident)
+                    self._cpu_ns[ident] = cpu_ns
+                    if previous is not None:
+                        cpu = min(max(cpu_ns - previous, 0) / 1e9, elapsed)
+            totals = self.stacks.setdefault((label, tuple(stack)), [0.0, 0.0])
+            totals[0] += elapsed
+            totals[1] += cpu
+        self.samples += 1
+
+    def folded(self):
+        """Stacks in the collapsed format of flamegraph.pl and speedscope, weighted in wall-clock microseconds"""
+        lines = []
+        for (label, stack), (wall, _) in sorted(self.stacks.items()):
+            if wall > 0:
+                lines.append(f"{';'.join((label,) + stack)} {round(wall * 1e6)}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """
+        Wall-clock and CPU breakdown of the profile.
+
+        Returns:
+            Dictionary with totals, per-category times for the request thread (the request's own
+            wall clock) and for all sampled threads (thread-seconds), and the top functions
+        """
+        categories = {"request_thread": {}, "all_threads": {}}
+        functions = {}
+        for (label, stack), (wall, cpu) in self.stacks.items():
+            category = categorize(stack)
+            scopes = ("request_thread", "all_threads") if label == "request" else ("all_threads",)
+            for scope in scopes:
+                entry = categories[scope].setdefault(category, {"wall_s": 0.0, "cpu_s": 0.0})
+                entry["wall_s"] += wall
+                entry["cpu_s"] += cpu
+            if stack:
+                entry = functions.setdefault(stack[-1], {"wall_s": 0.0, "cpu_s": 0.0})
+                entry["wall_s"] += wall
+                entry["cpu_s"] += cpu
+
+        def rounded(entries):
+            return [
+                {"name": name, "wall_s": round(entry["wall_s"], 4), "cpu_s": round(entry["cpu_s"], 4) if self.cpu_available else None,
+                 "off_cpu_s": round(entry["wall_s"] - entry["cpu_s"], 4) if self.cpu_available else None}
+                for name, entry in sorted(entries.items(), key=lambda item: -item[1]["wall_s"])
+            ]
+
+        return {
+            "started_at": self.started_at.isoformat(timespec="seconds") if self.started_at else None,
+            "wall_s": round(self.wall_seconds, 4),
+            "request_thread_cpu_s": round(self.request_cpu_seconds, 4),
+            "process_cpu_s": round(self.process_cpu_seconds, 4),
+            "samples": self.samples,
+            "interval_ms": round(self.interval * 1000, 2),
+            "threads": sorted({label for label, _ in self.stacks}),
+            "cpu_per_sample": self.cpu_available,
+            "categories": {scope: rounded(entries) for scope, entries in categories.items()},
+            "top_functions": rounded(functions)[:25],
+        }
+
+
+def categorize(stack):
+    """Category of a sampled stack (see PROFILE_CATEGORIES)"""
+    frames = set(stack)
+    modules = {frame.split(":", 1)[0] for frame in stack}
+    for category, entries in PROFILE_CATEGORIES:
+        for entry in entries:
+            if ":" in entry:
+                if entry in frames:
+                    return category
+            elif any(module == entry or module.startswith(entry + ".") for module in modules):
+                return category
+    return OTHER_CATEGORY
+
+
+def render_flamegraph(stacks, title="Request profile"):
+    """
+    Render sampled stacks as a self-contained SVG flame graph.
+
+    Frame width is wall-clock time; colour is the share of it spent on a CPU (red) rather than
+    waiting (blue), so blocking calls stand out from computation. Hover a frame for its times.
+
+    Args:
+        stacks: Dictionary of (thread label, frames) -> [wall seconds, cpu seconds], as SamplingProfiler.stacks
+        title: Heading shown above the graph
+
+    Returns:
+        SVG document as a string
+    """
+    root = {"children": {}, "wall": 0.0, "cpu": 0.0}
+    for (label, stack), (wall, cpu) in stacks.items():
+        node = root
+        node["wall"] += wall
+        node["cpu"] += cpu
+        for name in (label,) + tuple(stack):
+            node = node["children"].setdefault(name, {"children": {}, "wall": 0.0, "cpu": 0.0})
+            node["wall"] += wall
+            node["cpu"] += cpu
+
+    def depth_of(node):
+        return 1 + max((depth_of(child) for child in node["children"].values()), default=0)
+
+    total = root["wall"] or 1.0
+    depth = depth_of(root)
+    top = 40
+    height = top + depth * FLAMEGRAPH_FRAME_HEIGHT + 10
+    scale = (FLAMEGRAPH_WIDTH - 20) / total
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{FLAMEGRAPH_WIDTH}" height="{height}" '
+        f'font-family="Verdana, sans-serif" font-size="11">',
+        f'<rect width="100%" height="100%" fill="#f8f8f8"/>',
+        f'<text x="10" y="18" font-size="14">{html.escape(title)}</text>',
+        f'<text x="10" y="33" fill="#555">Width: wall-clock time ({total:.3f} thread-seconds). '
+        f'Colour: red on CPU, blue waiting. Hover a frame for details.</text>',
+    ]
+
+    def draw(name, node, x, level):
+        width = node["wall"] * scale
+        if width < 0.3:
+            return
+        y = height - 10 - (level + 1) * FLAMEGRAPH_FRAME_HEIGHT
+        share = node["cpu"] / node["wall"] if node["wall"] else 0.0
+        colour = "rgb({},{},{})".format(*(round(hot * share + cold * (1 - share))
+                                          for hot, cold in zip((230, 90, 50), (90, 140, 215))))
+        tooltip = (f"{name}: wall {node['wall']:.4f}s ({node['wall'] / total:.1%}), "
+                   f"cpu {node['cpu']:.4f}s ({share:.0%} on CPU)")
+        parts.append(f'<g><title>{html.escape(tooltip)}</title>'
+                     f'<rect x="{x:.2f}" y="{y}" width="{width:.2f}" height="{FLAMEGRAPH_FRAME_HEIGHT - 1}" '
+                     f'fill="{colour}" rx="2"/>')
+        characters = int(width / 7)
+        if characters >= 3:
+            label = name if len(name) <= characters else name[:characters - 2] + ".."
+            parts.append(f'<text x="{x + 3:.2f}" y="{y + FLAMEGRAPH_FRAME_HEIGHT - 4}">{html.escape(label)}</text>')
+        parts.append('</g>')
+        child_x = x
+        for child_name, child in sorted(node["children"].items()):
+            draw(child_name, child, child_x, level + 1)
+            child_x += child["wall"] * scale
+
+    draw("all", root, 10, 0)
+    parts.append('</svg>')
+    return "\n".join(parts)
+
+
+class ProfileStore:
+    """
+    Saved request profiles: one directory per profile with profile.json (metadata and the wall
+    versus CPU breakdown), flamegraph.svg and stacks.folded. Only the newest `keep` are kept.
+    """
+
+    FILES = ("profile.json", "flamegraph.svg", "stacks.folded")
+
+    def __init__(self, directory, keep=50):
+        self.directory = directory
+        self.keep = keep
+        self._lock = threading.Lock()
+
+    def save(self, profiler, metadata=None):
+        """
+        Write a finished profile.
+
+        Args:
+            profiler: SamplingProfiler that has exited
+            metadata: Optional dictionary stored with it (request path, report id, status, ...)
+
+        Returns:
+            Profile id
+        """
+        profile_id = f"profile_{profiler.started_at:%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:6]}"
+        profile_dir = os.path.join(self.directory, profile_id)
+        os.makedirs(profile_dir, exist_ok=True)
+        profile = {"id": profile_id, **(metadata or {}), **profiler.summary()}
+        title = f"{profile_id} {metadata.get('path', '') if metadata else ''} ({profiler.wall_seconds:.2f}s)"
+        with open(os.path.join(profile_dir, "profile.json"), 'w') as f:
+            json.dump(profile, f, indent=2)
+        with open(os.path.join(profile_dir, "flamegraph.svg"), 'w') as f:
+            f.write(render_flamegraph(profiler.stacks, title))
+        with open(os.path.join(profile_dir, "stacks.folded"), 'w') as f:
+            f.write(profiler.folded())
+        self._prune()
+        return profile_id
+
+    def _prune(self):
+        with self._lock:
+            for profile_id in self._ids()[self.keep:]:
+                shutil.rmtree(os.path.join(self.directory, profile_id), ignore_errors=True)
+
+    def _ids(self):
+        """Profile ids, newest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted((name for name in os.listdir(self.directory) if name.startswith("profile_")), reverse=True)
+
+    def list(self):
+        """Summaries of the saved profiles, newest first"""
+        profiles = []
+        for profile_id in self._ids():
+            profile = self.get(profile_id)
+            if profile is None:
+                continue
+            profiles.append({key: profile.get(key) for key in
+                             ("id", "started_at", "path", "status", "report_id", "wall_s", "request_thread_cpu_s", "samples")})
+        return profiles
+
+    def get(self, profile_id):
+        """profile.json of a profile, or None when there is no such profile"""
+        path = self.path(profile_id, "profile.json")
+        if path is None:
+            return None
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def path(self, profile_id, name):
+        """Path of one of a profile's files, or None for unknown profiles and file names"""
+        if name not in self.FILES or not re.fullmatch(r"profile_[0-9_]+_[0-9a-f]+", profile_id):
+            return None
+        path = os.path.join(self.directory, profile_id, name)
+        return path if os.path.exists(path) else None
@@ -0,0 +1,99 @@
+"""
+Re-run selected stages of stored analyses, reusing the stored outputs of the other stages
+(see stage_store.StageStore and InvestmentAnalysisPipeline.rerun).
+
+    python rerun.py report_20250114_093000 --stages orchestrator
+    python rerun.py report_20250114_093000                       # failed stages + orchestrator
+    python rerun.py --all --stages legal --include-dependents --workers 8
+    python rerun.py --since 2025-01-01 --stages orchestrator --limit 200
+    python rerun.py report_20250114_093000 --history             # list the stored stage runs
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import report_storage as storage
+from investment_pipeline import InvestmentAnalysisPipeline
+
+
+def rerun_one(report_id, args):
+    """Re-run one stored analysis. Returns (report_id, rerun summary or None, error or None)."""
+    stored = storage.stage_store.load(report_id)
+    if stored is None:
+        return report_id, None, "no stored stages"
+    try:
+        pipeline = InvestmentAnalysisPipeline(similarity_index=storage.similarity_index, tenant=args.tenant, priority="batch")
+        response = storage.rerun_analysis(
+            pipeline, report_id, stored, args.stages,
+            include_dependents=args.include_dependents,
+            use_cache=not args.no_cache,
+            deadline_seconds=args.deadline_seconds
+        )
+        return report_id, response["rerun"], None
+    except Exception as e:
+        return report_id, None, str(e)
+
+
+def print_history(report_id):
+    runs = storage.stage_store.runs(report_id)
+    if not runs:
+        print(f"{report_id}: no stored stages")
+        return
+    for run in runs:
+        print(f"{report_id}  run {run['run']:>3}  {run['stage']:<20} {run['status'] or '-':<10} "
+              f"{run['model'] or '-':<16} {'-' if run['elapsed_s'] is None else str(run['elapsed_s']) + 's':>8}  "
+              f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(run['created_at']))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-run selected stages of stored analyses")
+    parser.add_argument("report_ids", nargs="*", help="Report ids to re-run")
+    parser.add_argument("--all", action="store_true", help="Re-run every stored analysis")
+    parser.add_argument("--since", help="Re-run stored analyses from this date (YYYY-MM-DD) or report id on")
+    parser.add_argument("--limit", type=int, help="At most this many analyses with --all/--since")
+    parser.add_argument("--stages", type=lambda value: [stage.strip() for stage in value.split(",") if stage.strip()],
+                        help="Comma-separated stages to re-run: agent ids and/or orchestrator "
+                             "(default: stages without a usable report, plus the orchestrator)")
+    parser.add_argument("--include-dependents", action="store_true",
+                        help="Also re-run the stages that consume a re-run stage's report")
+    parser.add_argument("--no-cache", action="store_true", help="Do not serve unchanged specialist prompts from the node cache")
+    parser.add_argument("--deadline-seconds", type=float, help="Time budget per analysis")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("RERUN_WORKERS", 4)),
+                        help="Analyses re-run concurrently (LLM calls are still limited by the fair scheduler)")
+    parser.add_argument("--tenant", default="default", help="Tenant the LLM calls are scheduled for")
+    parser.add_argument("--history", action="store_true", help="List the stored stage runs instead of re-running")
+    args = parser.parse_args()
+
+    report_ids = list(args.report_ids)
+    if args.all or args.since:
+        report_ids += [report_id for report_id in storage.stage_store.report_ids(args.since, args.limit) if report_id not in report_ids]
+    if not report_ids:
+        parser.error("Give report ids, --all or --since")
+
+    if args.history:
+        for report_id in report_ids:
+            print_history(report_id)
+        return
+
+    start = time.monotonic()
+    failures = 0
+    with ThreadPoolExecutor(max_workers=max(args.workers, 1)) as executor:
+        for report_id, rerun, error in executor.map(lambda report_id: rerun_one(report_id, args), report_ids):
+            if error:
+                failures += 1
+                print(f"{report_id}: FAILED ({error})")
+                continue
+            print(f"{report_id}: re-ran {', '.join(rerun['stages']) or 'nothing'}, reused {len(rerun['reused'])} stages "
+                  f"in {rerun['elapsed_s']:.1f}s" + (f"; stale: {', '.join(rerun['stale'])}" if rerun['stale'] else ""))
+    print(f"Re-ran {len(report_ids) - failures} of {len(report_ids)} analyses in {time.monotonic() - start:.1f}s")
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+import os
+import re
+import sqlite3
+from datetime import datetime
+
+class ReportSearchIndex:
+    """
+    Full-text index over agent reports, orchestrator reports and extracted deal text.
+    Backed by a SQLite FTS5 table so searches return ranked snippets without
+    scanning the reports folder. Documents are upserted one at a time as they
+    are written, so the index never needs a full rebuild.
+    """
+
+    # Report files written by app.py are named report_<timestamp>_<agent>.txt
+    REPORT_FILE_PATTERN = re.compile(r"^(report_(\d{8}_\d{6}))_(.+)\.txt$")
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.environ.get("SEARCH_INDEX_PATH", os.path.join("data", "search_index.db"))
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._create_schema()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _create_schema(self):
+        """Create the document metadata table and the FTS5 table if they do not exist"""
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    id INTEGER PRIMARY KEY,
+                    report_id TEXT NOT NULL,
+                    agent TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    UNIQUE (report_id, agent)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_agent_date ON documents (agent, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_date ON documents (created_at)")
+            conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+                    content,
+                    tokenize = 'porter unicode61'
+                )
+            """)
+
+    def index_document(self, report_id, agent, content, created_at=None):
+        """
+        Add or replace a single document in the index.
+
+        Args:
+            report_id: ID of the analysis the document belongs to (e.g. report_20250101_120000)
+            agent: Agent that produced the document (real_estate, financial, market, legal, orchestrator, deal)
+            content: Text content to index
+            created_at: datetime or ISO string; defaults to the timestamp encoded in report_id
+        """
+        created_at = self._normalize_timestamp(created_at, report_id)
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id FROM documents WHERE report_id = ? AND agent = ?",
+                (report_id, agent)
+            ).fetchone()
+            if row:
+                doc_id = row[0]
+                conn.execute("UPDATE documents SET created_at = ? WHERE id = ?", (created_at, doc_id))
+                conn.execute("DELETE FROM documents_fts WHERE rowid = ?", (doc_id,))
+            else:
+                cursor = conn.execute(
+                    "INSERT INTO documents (report_id, agent, created_at) VALUES (?, ?, ?)",
+                    (report_id, agent, created_at)
+                )
+                doc_id = cursor.lastrowid
+            conn.execute("INSERT INTO documents_fts (rowid, content) VALUES (?, ?)", (doc_id, content or ""))
+
+    def index_reports(self, report_id, documents, created_at=None):
+        """
+        Index every document produced by one analysis.
+
+        Args:
+            report_id: ID of the analysis
+            documents: Dictionary mapping agent name to text content
+            created_at: Optional timestamp for all documents
+        """
+        for agent, content in documents.items():
+            if content:
+                self.index_document(report_id, agent, content, created_at)
+
+    def index_reports_folder(self, reports_folder):
+        """
+        Incrementally index report files that are not yet in the index.
+        Useful for backfilling reports written before the index existed.
+
+        Returns:
+            Number of newly indexed files
+        """
+        with self._connect() as conn:
+            indexed = set(conn.execute("SELECT report_id, agent FROM documents").fetchall())
+
+        count = 0
+        for filename in sorted(os.listdir(reports_folder)):
+            match = self.REPORT_FILE_PATTERN.match(filename)
+            if not match:
+                continue
+            report_id, _, agent = match.groups()
+            if (report_id, agent) in indexed:
+                continue
+            with open(os.path.join(reports_folder, filename), 'r', encoding='utf-8', errors='replace') as f:
+                self.index_document(report_id, agent, f.read())
+            count += 1
+        return count
+
+    def search(self, query, agent=None, since=None, until=None, limit=20):
+        """
+        Search the index and return ranked snippets.
+
+        Args:
+            query: Free text query; each word must appear in the document
+            agent: Optional agent name (or list of names) to filter by
+            since: Optional lower bound on the report date (datetime or ISO string)
+            until: Optional upper bound on the report date (datetime or ISO string)
+            limit: Maximum number of results
+
+        Returns:
+            List of dictionaries with report_id, agent, created_at, snippet and score
+        """
+        match_expression = self._build_match_expression(query)
+        if not match_expression:
+            return []
+
+        sql = """
+            SELECT d.report_id, d.agent, d.created_at,
+                   snippet(documents_fts, 0, '[', ']', '...', 16),
+                   bm25(documents_fts)
+            FROM documents_fts
+            JOIN documents d ON d.id = documents_fts.rowid
+            WHERE documents_fts MATCH ?
+        """
+        params = [match_expression]
+        if agent:
+            agents = [agent] if isinstance(agent, str) else list(agent)
+            sql += f" AND d.agent IN ({', '.join('?' for _ in agents)})"
+            params.extend(agents)
+        if since:
+            sql += " AND d.created_at >= ?"
+            params.append(self._normalize_timestamp(since))
+        if until:
+            sql += " AND d.created_at <= ?"
+            params.append(self._normalize_timestamp(until, end_of_day=True))
+        sql += " ORDER BY bm25(documents_fts) LIMIT ?"
+        params.append(int(limit))
+
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+
+        return [
+            {
+                "report_id": report_id,
+                "agent": agent_name,
+                "created_at": created_at,
+                "snippet": snippet,
+                # bm25() returns lower-is-better negative scores; flip for readability
+                "score": round(-score, 4)
+            }
+            for report_id, agent_name, created_at, snippet, score in rows
+        ]
+
+    def _build_match_expression(self, query):
+        """Quote each term so user input cannot break FTS5 query syntax"""
+        terms = re.findall(r"\w+", query or "")
+        return " ".join(f'"{term}"' for term in terms)
+
+    def _normalize_timestamp(self, value, report_id=None, end_of_day=False):
+        """Convert datetimes, dates and report ids into sortable ISO strings"""
+        if isinstance(value, datetime):
+            return value.isoformat(timespec="seconds")
+        if value:
+            value = str(value)
+            # Bare dates (YYYY-MM-DD) cover the whole day when used as an upper bound
+            if end_of_day and len(value) == 10:
+                return f"{value}T23:59:59"
+            return value
+        if report_id:
+            match = re.search(r"(\d{8}_\d{6})", report_id)
+            if match:
+                return datetime.strptime(match.group(1), "%Y%m%d_%H%M%S").isoformat(timespec="seconds")
+        return datetime.now().isoformat(timespec="seconds")
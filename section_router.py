@@ -0,0 +1,212 @@
+import os
+import re
+import time
+
+from deal_facts import format_deal_facts
+from model_router import estimate_tokens
+
+# Keywords per topic. Matches in a section heading count HEADING_WEIGHT times as much as in the body.
+TOPIC_KEYWORDS = {
+    "overview": ("executive summary", "overview", "introduction", "investment highlights", "summary", "the offering",
+                 "investment thesis", "deal summary", "transaction summary"),
+    "property": ("property description", "building", "site", "construction", "amenities", "parking", "physical",
+                 "square feet", "year built", "renovation", "capital improvements", "condition", "floor", "roof", "hvac"),
+    "tenancy": ("rent roll", "tenant", "lease", "occupancy", "vacancy", "expiration", "walt", "renewal",
+                "unit mix", "in-place rent", "market rent", "concession"),
+    "financial": ("financial", "noi", "net operating income", "operating expenses", "revenue", "income",
+                  "cash flow", "pro forma", "irr", "cap rate", "valuation", "returns", "budget", "t-12",
+                  "cash-on-cash", "equity multiple", "exit", "capital expenditure", "capex"),
+    "capital": ("financing", "debt", "loan", "ltv", "dscr", "interest rate", "lender", "mortgage",
+                "capital structure", "equity", "amortization", "refinance", "refinancing"),
+    "market": ("market", "submarket", "demographic", "population", "employment", "job growth", "supply",
+               "absorption", "comparable", "competition", "rent growth", "economy", "msa", "migration"),
+    "legal": ("legal", "title", "zoning", "easement", "litigation", "entity", "llc", "agreement", "contract",
+              "regulatory", "compliance", "permit", "ada", "covenant", "estoppel", "snda", "purchase and sale"),
+    "environmental": ("environmental", "phase i", "phase ii", "asbestos", "contamination", "flood", "wetland",
+                      "remediation", "hazardous", "esa"),
+    "tax": ("tax", "assessment", "abatement", "1031", "depreciation", "pilot", "millage"),
+    "risk": ("risk", "mitigation", "sensitivity", "downside", "stress", "contingency", "contingencies"),
+}
+TOPICS = tuple(TOPIC_KEYWORDS)
+
+# One pattern per topic matching its keywords as whole words (plurals included), so "lease" does not
+# count inside "release" nor "tax" inside "syntax"
+TOPIC_PATTERNS = {
+    topic: re.compile(r"\b(?:%s)(?:s|es)?\b" % "|".join(re.escape(keyword) for keyword in sorted(keywords, key=len, reverse=True)))
+    for topic, keywords in TOPIC_KEYWORDS.items()
+}
+
+HEADING_WEIGHT = 5.0
+
+MARKDOWN_HEADING = re.compile(r"^#{1,6}\s+\S")
+NUMBERED_HEADING = re.compile(r"^(section\s+)?(\d{1,2}(\.\d{1,2})*|[ivx]{1,5}|[a-h])[.)]\s+[A-Z][^.]{2,70}$", re.IGNORECASE)
+TITLE_HEADING = re.compile(r"^[A-Z][A-Za-z0-9&/,'() -]{2,70}:?$")
+
+
+def is_heading(line, previous_blank):
+    """Recognise section headings: markdown, ALL CAPS, numbered, or short Title Case lines after a blank line"""
+    line = line.strip()
+    if not line or len(line) > 80:
+        return False
+    if MARKDOWN_HEADING.match(line):
+        return True
+    letters = [char for char in line if char.isalpha()]
+    if len(letters) >= 3 and all(char.isupper() for char in letters) and not line.endswith((".", ",")):
+        return True
+    if NUMBERED_HEADING.match(line) and not line.endswith("."):
+        return True
+    # "Market Overview" style headings: short, no sentence punctuation, most words capitalised
+    if previous_blank and TITLE_HEADING.match(line) and ":" not in line[:-1]:
+        words = [word for word in re.split(r"\s+", line.rstrip(":")) if word[:1].isalpha()]
+        capitalised = sum(1 for word in words if word[0].isupper())
+        return 1 <= len(words) <= 8 and capitalised >= max(1, int(len(words) * 0.6))
+    return False
+
+
+def segment_sections(text):
+    """
+    Split a document into sections at its headings.
+
+    Returns:
+        List of dictionaries with heading (None for text before the first heading), text and position
+    """
+    sections = []
+    heading, lines = None, []
+    previous_blank = True
+    for line in text.split("\n"):
+        # "Label: value" lines are deal facts, not headings
+        if is_heading(line, previous_blank) and not re.match(r"^[^:]{1,40}:\s*\S", line.strip()):
+            if heading is not None or any(existing.strip() for existing in lines):
+                sections.append({"heading": heading, "text": "\n".join(lines).strip("\n")})
+            heading, lines = line.strip().lstrip("#").strip().rstrip(":"), [line]
+        else:
+            lines.append(line)
+        previous_blank = not line.strip()
+    if heading is not None or any(existing.strip() for existing in lines):
+        sections.append({"heading": heading, "text": "\n".join(lines).strip("\n")})
+    for position, section in enumerate(sections):
+        section["position"] = position
+    return sections
+
+
+def classify_section(section):
+    """
+    Tag a section with every topic whose keyword score is close to the best one.
+
+    Returns:
+        List of topics, most relevant first (empty when nothing matched)
+    """
+    heading = (section["heading"] or "").lower()
+    body = section["text"].lower()
+    body_words = max(len(body.split()), 1)
+    scores = {}
+    for topic, pattern in TOPIC_PATTERNS.items():
+        heading_hits = len(pattern.findall(heading))
+        body_hits = len(pattern.findall(body))
+        # Body hits are normalised per 100 words so long sections do not match every topic
+        score = HEADING_WEIGHT * heading_hits + min(body_hits * 100.0 / body_words, 10.0)
+        if score > 0:
+            scores[topic] = score
+    # The text before the first heading and the first section of the document usually introduce the deal
+    if section["heading"] is None or section["position"] == 0:
+        scores["overview"] = scores.get("overview", 0) + HEADING_WEIGHT
+    if not scores:
+        return []
+    best = max(scores.values())
+    return sorted((topic for topic, score in scores.items() if score >= best * 0.5 and score >= 1.0),
+                  key=lambda topic: -scores[topic])
+
+
+class SectionRouter:
+    """
+    Sends each specialist agent only the parts of the deal document that are relevant to it.
+
+    The document is split at its headings, every section is tagged with topics from
+    TOPIC_KEYWORDS, and each AgentSpec with topics receives the matching sections (in document
+    order) plus a short global summary of the extracted deal facts and the outline of the
+    sections left out. Sections without any topic are sent to every agent. Documents that are
+    short or have too few headings are sent in full.
+
+    Configuration (environment variables):
+        SECTION_ROUTING              true | false (default true)
+        SECTION_ROUTING_MIN_TOKENS   documents smaller than this are sent in full (default 2000)
+        SECTION_ROUTING_MIN_SECTIONS documents with fewer sections are sent in full (default 4)
+    """
+
+    def __init__(self, config=None):
+        config = config if config is not None else self._load_config()
+        self.enabled = str(config.get("enabled", "true")).lower() == "true"
+        self.min_tokens = int(config.get("min_tokens", 2000))
+        self.min_sections = int(config.get("min_sections", 4))
+
+    def _load_config(self):
+        config = {}
+        for key, env_key in (("enabled", "SECTION_ROUTING"), ("min_tokens", "SECTION_ROUTING_MIN_TOKENS"),
+                             ("min_sections", "SECTION_ROUTING_MIN_SECTIONS")):
+            value = os.environ.get(env_key)
+            if value:
+                config[key] = value
+        return config
+
+    def route(self, deal_content, deal_facts, specs):
+        """
+        Build the document excerpt for each agent.
+
+        Args:
+            deal_content: Normalised deal document text
+            deal_facts: Dictionary from deal_facts.extract_deal_facts
+            specs: Enabled AgentSpecs
+
+        Returns:
+            Tuple of (document text by agent id for routed agents, stats dictionary)
+        """
+        start = time.perf_counter()
+        full_tokens = estimate_tokens(deal_content)
+        stats = {"enabled": self.enabled, "applied": False, "document_tokens": full_tokens, "sections": [], "agents": {}}
+        documents = {}
+
+        sections = segment_sections(deal_content) if self.enabled else []
+        for section in sections:
+            section["topics"] = classify_section(section)
+            section["tokens"] = estimate_tokens(section["text"])
+        stats["sections"] = [
+            {"heading": section["heading"], "topics": section["topics"], "tokens": section["tokens"]} for section in sections
+        ]
+
+        if self.enabled and full_tokens >= self.min_tokens and len(sections) >= self.min_sections:
+            stats["applied"] = True
+            summary_facts = format_deal_facts(deal_facts)
+            for spec in specs:
+                if not spec.topics:
+                    continue
+                wanted = set(spec.topics)
+                # One pass: testing membership in the selected list is quadratic in the section count
+                selected, omitted = [], []
+                for section in sections:
+                    relevant = not section["topics"] or not wanted.isdisjoint(section["topics"])
+                    (selected if relevant else omitted).append(section)
+                if not omitted:
+                    continue
+                documents[spec.agent_id] = self._build_document(selected, omitted, summary_facts)
+                stats["agents"][spec.agent_id] = {
+                    "sections_sent": len(selected),
+                    "sections_omitted": len(omitted),
+                    "document_tokens": estimate_tokens(documents[spec.agent_id]),
+                }
+
+        for spec in specs:
+            stats["agents"].setdefault(spec.agent_id, {
+                "sections_sent": len(sections), "sections_omitted": 0, "document_tokens": full_tokens
+            })
+        stats["prompt_tokens_saved"] = sum(full_tokens - agent["document_tokens"] for agent in stats["agents"].values())
+        stats["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        return documents, stats
+
+    def _build_document(self, selected, omitted, summary_facts):
+        lines = ["DEAL SUMMARY (extracted from the full document):", summary_facts or "No key metrics extracted."]
+        omitted_headings = [section["heading"] for section in omitted if section["heading"]]
+        if omitted_headings:
+            lines.append(f"Sections omitted as outside the scope of this analysis: {'; '.join(omitted_headings)}")
+        lines.extend(["", "RELEVANT SECTIONS OF THE DEAL DOCUMENT:", ""])
+        lines.append("\n\n".join(section["text"] for section in selected))
+        return "\n".join(lines)
@@ -0,0 +1,559 @@
+import csv
+import os
+import re
+import zipfile
+from array import array
+from datetime import datetime, timedelta
+from xml.etree.ElementTree import iterparse
+
+import numpy as np
+
+# Rent roll columns and the header names that identify them, most specific first
+RENT_ROLL_COLUMNS = [
+    ("market_rent", ("market rent", "market", "asking rent", "pro forma rent", "proforma rent", "market rate")),
+    ("rent", ("current rent", "in place rent", "inplace rent", "actual rent", "contract rent", "lease rent",
+              "monthly rent", "base rent", "annual rent", "rent", "charges")),
+    ("unit_type", ("unit type", "floor plan", "floorplan", "plan", "bed bath", "bd ba", "type", "unit mix")),
+    ("unit", ("unit", "unit number", "unit no", "unit id", "apt", "apartment", "suite", "space")),
+    ("sf", ("sf", "sq ft", "sqft", "square feet", "square footage", "rsf", "nrsf", "nra", "area", "size")),
+    ("tenant", ("tenant", "tenant name", "resident", "resident name", "lessee", "name")),
+    ("status", ("status", "occupancy", "occupancy status", "occupied", "unit status")),
+    ("lease_end", ("lease end", "lease expiration", "lease expiry", "expiration", "expiration date", "lease exp",
+                   "expires", "lease to", "move out")),
+]
+
+MONTH_NAMES = ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec")
+MONTH_HEADER = re.compile(r"^(?:(%s)[a-z]*\.?[\s\-/']*(\d{2,4})?|(\d{4})[\-/](\d{1,2})|(\d{1,2})[\-/](\d{4}))$" % "|".join(MONTH_NAMES))
+# Excel stores dates as days since 1899-12-30; serials in this range are 1954-2064
+EXCEL_DATE_RANGE = (20000, 60000)
+EXCEL_EPOCH = datetime(1899, 12, 30)
+
+# Unit statuses, matched as whole words on the normalised status or tenant name. An occupied status
+# wins over vacant markers ("Occupied - Down Payment Plan"), and units on notice are still occupied.
+OCCUPIED_STATUS = re.compile(r"\b(occupied|notice|ntv)\b")
+VACANT_STATUS = re.compile(r"\b(vacant|vacancy|unoccupied|available|down|model)\b")
+TOTAL_LABEL = re.compile(r"\b(totals?|subtotal|grand total|summary)\b")
+YEAR_PATTERN = re.compile(r"\b(19\d{2}|20\d{2})\b|\b\d{1,2}[/\-]\d{1,2}[/\-](\d{2})$")
+
+# Operating statement line items that carry the totals, matched on the lowercased label
+INCOME_TOTAL = re.compile(r"^(total (operating |rental )?(income|revenue)s?|effective gross (income|revenue)|egi|total egi)\b")
+EXPENSE_TOTAL = re.compile(r"^total (operating )?expenses?\b")
+NOI_LINE = re.compile(r"^(net operating income|noi)\b")
+
+# Rows read while looking for the header row of a sheet
+HEADER_SCAN_ROWS = 30
+
+
+def _normalize_header(value):
+    return " ".join(re.findall(r"[a-z0-9]+", str(value).lower())) if value is not None else ""
+
+
+def _to_float(value):
+    """Parse a cell as a number ("$1,450.00", "(2,300)", "94%"); NaN when it is not numeric"""
+    if value is None or value == "":
+        return np.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    text = value.strip()
+    negative = text.startswith("(") and text.endswith(")") or text.startswith("-")
+    cleaned = re.sub(r"[^\d.]", "", text)
+    if not cleaned or cleaned.count(".") > 1:
+        return np.nan
+    number = float(cleaned)
+    return -number if negative else number
+
+
+def _year_of(value):
+    """Year of a date cell (Excel serial, ISO or US date string), or 0 when there is none"""
+    if value is None or value == "":
+        return 0
+    number = value if isinstance(value, (int, float)) else None
+    if number is None:
+        try:
+            number = float(value)
+        except ValueError:
+            match = YEAR_PATTERN.search(value.strip())
+            if not match:
+                return 0
+            return int(match.group(1)) if match.group(1) else 2000 + int(match.group(2))
+    if EXCEL_DATE_RANGE[0] <= number <= EXCEL_DATE_RANGE[1]:
+        return (EXCEL_EPOCH + timedelta(days=number)).year
+    return int(number) if 1900 <= number <= 2100 else 0
+
+
+def _month_label(value):
+    """Month label of a T-12 column header ("Jan 2025", "2025-01", Excel date), or None"""
+    if isinstance(value, (int, float)):
+        if EXCEL_DATE_RANGE[0] <= value <= EXCEL_DATE_RANGE[1]:
+            return (EXCEL_EPOCH + timedelta(days=value)).strftime("%b %Y")
+        return None
+    text = str(value or "").strip().lower()
+    match = MONTH_HEADER.match(text)
+    if not match:
+        return None
+    if match.group(1):
+        return str(value).strip()
+    year, month = (match.group(3), match.group(4)) if match.group(3) else (match.group(6), match.group(5))
+    return f"{MONTH_NAMES[int(month) - 1].title()} {year}" if 1 <= int(month) <= 12 else None
+
+
+def _money(value):
+    return f"-${abs(value):,.0f}" if value < 0 else f"${value:,.0f}"
+
+
+def _rate(value):
+    return f"{value * 100:.1f}%"
+
+
+def match_rent_roll_header(row):
+    """Map rent roll fields to column positions for a candidate header row"""
+    columns = {}
+    headers = [_normalize_header(cell) for cell in row]
+    # Exact names first, then names that merely contain an alias (e.g. "Market Rent ($/mo)")
+    for exact in (True, False):
+        for field, aliases in RENT_ROLL_COLUMNS:
+            if field in columns:
+                continue
+            for position, header in enumerate(headers):
+                if not header or position in columns.values():
+                    continue
+                if any(header == alias if exact else f" {alias} " in f" {header} " for alias in aliases):
+                    columns[field] = position
+                    break
+    if ("unit" in columns or "tenant" in columns) and ("rent" in columns or "market_rent" in columns):
+        return columns
+    return None
+
+
+def match_operating_statement_header(row):
+    """Positions of the month columns and the total column of a T-12 header row, or None"""
+    months = [(position, _month_label(cell)) for position, cell in enumerate(row)]
+    months = [(position, label) for position, label in months if label]
+    if len(months) < 3:
+        return None
+    total = next((position for position, cell in enumerate(row)
+                  if _normalize_header(cell) in ("total", "t12", "t 12", "t 12 total", "annual", "ttm", "trailing 12")), None)
+    return {"months": months, "total": total}
+
+
+class RentRollSummary:
+    """
+    Accumulates a rent roll row by row into typed columns (array('d') for rents and areas, small
+    integer codes for unit types, lease expiration years and occupancy flags), so a 100k-row sheet
+    needs a few megabytes regardless of how wide it is. summary() computes unit mix, occupancy,
+    in-place versus market rent and lease expirations with vectorised numpy operations.
+    """
+
+    def __init__(self, source, columns, header):
+        self.source = source
+        self.columns = columns
+        self.rent_label = str(header[columns["rent"]]).strip() if "rent" in columns else None
+        self.rent = array('d')
+        self.market_rent = array('d')
+        self.sf = array('d')
+        self.occupied = array('b')
+        self.type_codes = array('i')
+        self.lease_end_year = array('h')
+        self.unit_types = {}
+        self.skipped_rows = 0
+
+    def _cell(self, row, field):
+        position = self.columns.get(field)
+        return row[position] if position is not None and position < len(row) else None
+
+    def add(self, row):
+        unit, tenant = self._cell(row, "unit"), self._cell(row, "tenant")
+        label = _normalize_header(unit if unit not in (None, "") else tenant)
+        # Blank separator rows and total/summary lines are not units
+        if not label or TOTAL_LABEL.search(label):
+            self.skipped_rows += 1
+            return
+        rent = _to_float(self._cell(row, "rent"))
+        status = _normalize_header(self._cell(row, "status"))
+        tenant_name = _normalize_header(tenant)
+        if status:
+            occupied = bool(OCCUPIED_STATUS.search(status)) or not VACANT_STATUS.search(status)
+        elif "tenant" in self.columns:
+            occupied = bool(tenant_name) and not VACANT_STATUS.search(tenant_name)
+        else:
+            occupied = rent > 0
+        unit_type = str(self._cell(row, "unit_type") or "").strip() or "Unspecified"
+        self.rent.append(rent)
+        self.market_rent.append(_to_float(self._cell(row, "market_rent")))
+        self.sf.append(_to_float(self._cell(row, "sf")))
+        self.occupied.append(1 if occupied else 0)
+        self.type_codes.append(self.unit_types.setdefault(unit_type, len(self.unit_types)))
+        self.lease_end_year.append(_year_of(self._cell(row, "lease_end")))
+
+    def summary(self):
+        count = len(self.rent)
+        if not count:
+            return None
+        rent = np.frombuffer(self.rent, dtype=np.float64)
+        market = np.frombuffer(self.market_rent, dtype=np.float64)
+        sf = np.frombuffer(self.sf, dtype=np.float64)
+        occupied = np.frombuffer(self.occupied, dtype=np.int8).astype(bool)
+        codes = np.frombuffer(self.type_codes, dtype=np.int32)
+        years = np.frombuffer(self.lease_end_year, dtype=np.int16)
+
+        lines = [f"RENT ROLL SUMMARY ({self.source}, {count:,} units)"]
+        occupied_count = int(occupied.sum())
+        lines.append(f"Occupancy: {_rate(occupied_count / count)} ({occupied_count:,} of {count:,} units occupied)")
+        has_sf = ~np.isnan(sf)
+        if has_sf.any():
+            total_sf = sf[has_sf].sum()
+            lines.append(f"Rentable area: {total_sf:,.0f} SF, {_rate(sf[has_sf & occupied].sum() / total_sf) if total_sf else 'n/a'} leased by area, "
+                         f"average unit {sf[has_sf].mean():,.0f} SF")
+
+        in_place = occupied & ~np.isnan(rent) & (rent > 0)
+        if in_place.any():
+            line = f"In-place rent ({self.rent_label}): average {_money(rent[in_place].mean())} per occupied unit"
+            with_sf = in_place & has_sf & (sf > 0)
+            if with_sf.any():
+                line += f", ${rent[with_sf].sum() / sf[with_sf].sum():,.2f} per SF"
+            lines.append(line + f", total {_money(rent[in_place].sum())}")
+        has_market = ~np.isnan(market) & (market > 0)
+        if has_market.any():
+            lines.append(f"Market rent: average {_money(market[has_market].mean())} per unit")
+            both = in_place & has_market
+            if both.any():
+                gap = market[both].sum() - rent[both].sum()
+                lines.append(f"Loss to lease: {_rate(gap / market[both].sum())} ({_money(gap)} across {int(both.sum()):,} occupied units "
+                             f"with both rents)")
+
+        if len(self.unit_types) > 1:
+            type_count = len(self.unit_types)
+            units = np.bincount(codes, minlength=type_count)
+            occupied_units = np.bincount(codes, weights=occupied, minlength=type_count)
+
+            def average(values, mask):
+                totals = np.bincount(codes[mask], weights=values[mask], minlength=type_count)
+                counts = np.bincount(codes[mask], minlength=type_count)
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    return np.where(counts > 0, totals / np.maximum(counts, 1), np.nan)
+
+            average_sf = average(sf, has_sf)
+            average_rent = average(rent, in_place)
+            average_market = average(market, has_market)
+            names = {code: name for name, code in self.unit_types.items()}
+            lines.append("Unit mix:")
+            for code in np.argsort(-units)[:15]:
+                parts = [f"{int(units[code]):,} units", f"{_rate(occupied_units[code] / units[code])} occupied"]
+                if not np.isnan(average_sf[code]):
+                    parts.append(f"avg {average_sf[code]:,.0f} SF")
+                if not np.isnan(average_rent[code]):
+                    parts.append(f"in-place {_money(average_rent[code])}")
+                if not np.isnan(average_market[code]):
+                    parts.append(f"market {_money(average_market[code])}")
+                lines.append(f"- {names[code]}: {', '.join(parts)}")
+            if type_count > 15:
+                lines.append(f"- ... {type_count - 15} more unit types")
+
+        dated = occupied & (years > 0)
+        if dated.any():
+            expiring_years, expiring = np.unique(years[dated], return_counts=True)
+            listed = ", ".join(f"{year}: {count:,}" for year, count in zip(expiring_years[:8], expiring[:8]))
+            if len(expiring_years) > 8:
+                listed += f", {int(expiring_years[8])} and later: {int(expiring[8:].sum()):,}"
+            lines.append(f"Lease expirations (occupied units by year): {listed}")
+        if self.skipped_rows:
+            lines.append(f"({self.skipped_rows:,} blank or total rows excluded)")
+        return "\n".join(lines)
+
+
+class OperatingStatementSummary:
+    """
+    Accumulates a T-12 operating statement: one float64 row of monthly values per line item.
+    summary() reports total income, expenses and NOI (from the statement's own total lines where
+    present), the largest expense lines and the NOI trend from the monthly columns.
+    """
+
+    def __init__(self, source, header_match):
+        self.source = source
+        self.month_positions = [position for position, _ in header_match["months"]]
+        self.month_labels = [label for _, label in header_match["months"]]
+        self.total_position = header_match["total"]
+        self.labels = []
+        self.sections = []
+        self.values = array('d')
+        self.section = None
+
+    def add(self, row):
+        label_cell = next((cell for position, cell in enumerate(row)
+                           if position not in self.month_positions and isinstance(cell, str) and cell.strip()), None)
+        if not label_cell:
+            return
+        label = label_cell.strip()
+        months = [_to_float(row[position]) if position < len(row) else np.nan for position in self.month_positions]
+        if all(np.isnan(value) for value in months):
+            # A label without figures starts a section such as "Operating Expenses"
+            lowered = label.lower()
+            if "expense" in lowered:
+                self.section = "expense"
+            elif "income" in lowered or "revenue" in lowered:
+                self.section = "income"
+            return
+        self.labels.append(label)
+        self.sections.append(self.section)
+        self.values.extend(months)
+
+    def _line(self, pattern, totals):
+        for index, label in enumerate(self.labels):
+            if pattern.match(label.lower()):
+                return index, totals[index]
+        return None, None
+
+    def summary(self):
+        if not self.labels:
+            return None
+        months = np.frombuffer(self.values, dtype=np.float64).reshape(len(self.labels), len(self.month_labels))
+        totals = np.nansum(months, axis=1)
+        lines = [f"OPERATING STATEMENT SUMMARY ({self.source}, {len(self.month_labels)} months "
+                 f"{self.month_labels[0]} - {self.month_labels[-1]}, {len(self.labels)} line items)"]
+        income_row, income = self._line(INCOME_TOTAL, totals)
+        expense_row, expenses = self._line(EXPENSE_TOTAL, totals)
+        noi_row, noi = self._line(NOI_LINE, totals)
+        expense_lines = [index for index, section in enumerate(self.sections)
+                         if section == "expense" and index not in (expense_row, noi_row) and not TOTAL_LABEL.search(self.labels[index].lower())]
+        if income is None:
+            income_lines = [index for index, section in enumerate(self.sections)
+                            if section == "income" and not TOTAL_LABEL.search(self.labels[index].lower())]
+            income = float(totals[income_lines].sum()) if income_lines else None
+        if expenses is None and expense_lines:
+            expenses = float(totals[expense_lines].sum())
+        if noi is None and income is not None and expenses is not None:
+            noi = income - expenses
+        if income is not None:
+            lines.append(f"Total Income: {_money(income)}")
+        if expenses is not None:
+            lines.append(f"Total Operating Expenses: {_money(expenses)}"
+                         + (f" ({_rate(expenses / income)} of income)" if income else ""))
+        if noi is not None:
+            lines.append(f"Net Operating Income: {_money(noi)}")
+        if expense_lines:
+            largest = sorted(expense_lines, key=lambda index: -totals[index])[:6]
+            lines.append("Largest expenses: " + ", ".join(f"{self.labels[index]} {_money(totals[index])}" for index in largest))
+        if noi_row is not None and len(self.month_labels) >= 6:
+            monthly = months[noi_row]
+            first, last = np.nanmean(monthly[:3]), np.nanmean(monthly[-3:])
+            if first:
+                lines.append(f"Monthly NOI: first three months average {_money(first)}, last three {_money(last)} "
+                             f"({(last - first) / abs(first) * 100:+.1f}%)")
+        return "\n".join(lines)
+
+
+class ColumnSummary:
+    """Fallback for sheets that are neither a rent roll nor a T-12: column names, row count and numeric totals"""
+
+    def __init__(self, source, header):
+        self.source = source
+        self.header = [str(cell).strip() if cell not in (None, "") else f"Column {position + 1}" for position, cell in enumerate(header)]
+        self.rows = 0
+        self.sums = np.zeros(len(header))
+        self.numeric = np.zeros(len(header), dtype=np.int64)
+        self.samples = []
+
+    def add(self, row):
+        if not any(cell not in (None, "") for cell in row):
+            return
+        self.rows += 1
+        values = np.array([_to_float(cell) for cell in row[:len(self.header)]] + [np.nan] * max(0, len(self.header) - len(row)))
+        present = ~np.isnan(values)
+        self.sums[present] += values[present]
+        self.numeric += present
+        if len(self.samples) < 5:
+            self.samples.append(" | ".join("" if cell is None else str(cell) for cell in row[:len(self.header)]))
+
+    def summary(self):
+        if not self.rows:
+            return None
+        lines = [f"TABLE ({self.source}, {self.rows:,} rows)", "Columns: " + ", ".join(self.header)]
+        totals = [f"{name} {self.sums[position]:,.2f}" for position, name in enumerate(self.header)
+                  if self.numeric[position] >= max(1, self.rows // 2)]
+        if totals:
+            lines.append("Column totals: " + ", ".join(totals))
+        lines.append("First rows:")
+        lines.extend(f"  {sample}" for sample in self.samples)
+        return "\n".join(lines)
+
+
+def summarize_rows(rows, source, fallback=True):
+    """
+    Summarise one table streamed as lists of cell values. The header row is looked for in the
+    first HEADER_SCAN_ROWS rows; a rent roll or T-12 header selects the matching summary.
+
+    Args:
+        rows: Iterable of rows (lists of strings or numbers)
+        source: Description of the table for the summary heading (file and sheet name)
+        fallback: Summarise other tables by their columns; when False they return None
+
+    Returns:
+        Summary text, or None for an empty (or, without fallback, unrecognised) table
+    """
+    rows = iter(rows)
+    buffered = []
+    accumulator = None
+    for row in rows:
+        buffered.append(row)
+        columns = match_rent_roll_header(row)
+        if columns:
+            accumulator = RentRollSummary(source, columns, row)
+            break
+        statement = match_operating_statement_header(row)
+        if statement:
+            accumulator = OperatingStatementSummary(source, statement)
+            break
+        if len(buffered) >= HEADER_SCAN_ROWS:
+            break
+    if accumulator is None:
+        if not fallback:
+            return None
+        header_index = next((index for index, row in enumerate(buffered) if any(cell not in (None, "") for cell in row)), None)
+        if header_index is None:
+            return None
+        accumulator = ColumnSummary(source, buffered[header_index])
+        for row in buffered[header_index + 1:]:
+            accumulator.add(row)
+    for row in rows:
+        accumulator.add(row)
+    return accumulator.summary()
+
+
+def iter_csv_rows(path):
+    """Stream the rows of a CSV file; the delimiter (comma, semicolon, tab or pipe) is taken from the first line"""
+    with open(path, 'r', newline='', encoding='utf-8-sig', errors='replace') as f:
+        first_line = f.readline()
+        f.seek(0)
+        delimiter = max(",;\t|", key=first_line.count)
+        yield from csv.reader(f, delimiter=delimiter)
+
+
+def _local(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+_COLUMN_INDEXES = {}
+
+
+def _column_index(reference):
+    """Zero-based column of a cell reference such as "AB12" """
+    letters = reference.rstrip("0123456789")
+    index = _COLUMN_INDEXES.get(letters)
+    if index is None:
+        index = 0
+        for char in letters:
+            index = index * 26 + ord(char.upper()) - 64
+        index = _COLUMN_INDEXES[letters] = index - 1
+    return index
+
+
+def _xlsx_shared_strings(package):
+    strings = []
+    if "xl/sharedStrings.xml" not in package.namelist():
+        return strings
+    with package.open("xl/sharedStrings.xml") as f:
+        for _, element in iterparse(f):
+            if _local(element.tag) == "si":
+                strings.append("".join(node.text or "" for node in element.iter() if _local(node.tag) == "t"))
+                element.clear()
+    return strings
+
+
+def _xlsx_sheets(package):
+    """(sheet name, path inside the package) for every worksheet, in workbook order"""
+    targets = {}
+    with package.open("xl/_rels/workbook.xml.rels") as f:
+        for _, element in iterparse(f):
+            if _local(element.tag) == "Relationship":
+                target = element.get("Target", "").lstrip("/")
+                targets[element.get("Id")] = target if target.startswith("xl/") else f"xl/{target}"
+    sheets = []
+    with package.open("xl/workbook.xml") as f:
+        for _, element in iterparse(f):
+            if _local(element.tag) == "sheet":
+                relation = next((value for key, value in element.attrib.items() if _local(key) == "id"), None)
+                if relation in targets:
+                    sheets.append((element.get("name"), targets[relation]))
+    return sheets
+
+
+def _iter_xlsx_rows(package, path, shared_strings):
+    """Stream the rows of one worksheet, releasing each row element once it has been read"""
+    with package.open(path) as f:
+        sheet_data = None
+        tags = None
+        for event, element in iterparse(f, events=("start", "end")):
+            if tags is None:
+                # Tags carry the workbook's namespace ("{...spreadsheetml/2006/main}row"), taken from the root element
+                namespace = element.tag[:element.tag.index("}") + 1] if element.tag.startswith("{") else ""
+                tags = {name: namespace + name for name in ("sheetData", "row", "c", "v", "is", "t")}
+            if event == "start":
+                if sheet_data is None and element.tag == tags["sheetData"]:
+                    sheet_data = element
+                continue
+            if element.tag != tags["row"]:
+                continue
+            row = []
+            for cell in element:
+                if cell.tag != tags["c"]:
+                    continue
+                kind = cell.get("t")
+                value = None
+                for child in cell:
+                    if child.tag == tags["v"]:
+                        value = child.text
+                    elif child.tag == tags["is"]:
+                        value = "".join(node.text or "" for node in child.iter(tags["t"]))
+                if value is not None:
+                    if kind == "s":
+                        value = shared_strings[int(value)]
+                    elif kind not in ("str", "inlineStr", "e"):
+                        try:
+                            value = float(value)
+                        except ValueError:
+                            pass
+                reference = cell.get("r")
+                position = _column_index(reference) if reference else len(row)
+                if position >= len(row):
+                    row.extend([None] * (position - len(row) + 1))
+                row[position] = value
+            yield row
+            element.clear()
+            if sheet_data is not None:
+                sheet_data.clear()
+
+
+def summarize_spreadsheet(path):
+    """
+    Summarise a CSV or XLSX file: every sheet is streamed once and reduced to a rent roll,
+    operating statement or column summary, so the prompt gets a few lines per sheet instead
+    of its cells.
+
+    Args:
+        path: Path to a .csv or .xlsx file
+
+    Returns:
+        Summary text
+    """
+    name = os.path.basename(path)
+    if path.lower().endswith(".csv"):
+        summaries = [summarize_rows(iter_csv_rows(path), name)]
+    else:
+        try:
+            package = zipfile.ZipFile(path)
+        except zipfile.BadZipFile:
+            raise ValueError("Error processing XLSX file: not a valid workbook (legacy .xls files are not supported)")
+        with package:
+            shared_strings = _xlsx_shared_strings(package)
+            summaries = [
+                summarize_rows(_iter_xlsx_rows(package, sheet_path, shared_strings), f"{name}, sheet \"{sheet}\"")
+                for sheet, sheet_path in _xlsx_sheets(package)
+            ]
+    summaries = [summary for summary in summaries if summary]
+    if not summaries:
+        raise ValueError(f"Error processing spreadsheet: {name} has no data")
+    return "\n\n".join(summaries)
@@ -0,0 +1,226 @@
+import json
+import os
+import sqlite3
+import time
+import zlib
+
+
+def _pack(value):
+    return zlib.compress(json.dumps(value).encode("utf-8"), 6)
+
+
+def _unpack(blob):
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+def _pack_text(text):
+    return zlib.compress(text.encode("utf-8"), 6) if text is not None else None
+
+
+def _unpack_text(blob):
+    return zlib.decompress(blob).decode("utf-8") if blob is not None else None
+
+
+class StageStore:
+    """
+    Inputs and outputs of every stage of every analysis, stored in SQLite, so that single stages
+    (one specialist, or only the orchestrator) can be re-run later without repeating the others.
+
+    Each analysis keeps its latest results, including the stage context the specialists' prompts
+    are built from (deal text, routed excerpts, comparables, market data, legal findings). Every
+    execution of a stage is kept as a run with its system prompt, user prompt, model and output:
+    run 0 is the original analysis and each re-run adds the next run for the stages it executed,
+    so prompt iterations can be compared afterwards. Text is stored zlib-compressed.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.environ.get("STAGE_STORE_PATH", os.path.join("data", "stages.db"))
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS analyses (
+                    report_id TEXT PRIMARY KEY,
+                    results BLOB NOT NULL,
+                    runs INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS stage_runs (
+                    report_id TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    run INTEGER NOT NULL,
+                    status TEXT,
+                    model TEXT,
+                    system_prompt BLOB,
+                    user_prompt BLOB,
+                    output BLOB,
+                    elapsed_s REAL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (report_id, stage, run)
+                );
+            """)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def save(self, report_id, results):
+        """
+        Store the results of an analysis or a re-run and record a run for each stage it executed.
+
+        Args:
+            report_id: Report id of the analysis
+            results: Pipeline results with stage_context and stage_inputs (see InvestmentAnalysisPipeline)
+
+        Returns:
+            Run number recorded, or None when the results have no stage inputs (e.g. a screened-out deal)
+        """
+        if not results.get("stage_context"):
+            return None
+        stage_inputs = results.get("stage_inputs") or {}
+        rerun = results.get("rerun")
+        outputs = {agent["id"]: results.get(agent["result_key"]) for agent in results.get("agents", [])}
+        outputs["orchestrator"] = results.get("orchestrator_report")
+        executed = rerun["stages"] if rerun else list(outputs)
+
+        # The deal text is stored once, not again inside the stage context
+        stored = {key: value for key, value in results.items() if key not in ("stage_inputs", "rerun")}
+        stored["stage_context"] = {key: value for key, value in results["stage_context"].items() if key != "deal_content"}
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT runs FROM analyses WHERE report_id = ?", (report_id,)).fetchone()
+            run = row["runs"] + 1 if row is not None and rerun else 0
+            conn.execute(
+                "INSERT INTO analyses (report_id, results, runs, created_at, updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (report_id) DO UPDATE SET results = excluded.results, runs = excluded.runs, updated_at = excluded.updated_at",
+                (report_id, _pack(stored), run, now, now)
+            )
+            for stage in executed:
+                inputs = stage_inputs.get(stage, {})
+                conn.execute(
+                    "INSERT OR REPLACE INTO stage_runs (report_id, stage, run, status, model, system_prompt, user_prompt, "
+                    "output, elapsed_s, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (report_id, stage, run, results.get("agent_status", {}).get(stage), inputs.get("model"),
+                     _pack_text(inputs.get("system_prompt")), _pack_text(inputs.get("user_prompt")),
+                     _pack_text(outputs.get(stage)), results.get("agent_timings", {}).get(stage), now)
+                )
+            conn.execute("COMMIT")
+        return run
+
+    def record_late_output(self, report_id, stage, output):
+        """
+        Replace the timed out placeholder of a specialist that finished after the deadline, so a
+        re-run reuses its report. Does nothing when the analysis is not stored (yet).
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT results, runs FROM analyses WHERE report_id = ?", (report_id,)).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return False
+            results = _unpack(row["results"])
+            agent = next((agent for agent in results.get("agents", []) if agent["id"] == stage), None)
+            if agent is None:
+                conn.execute("COMMIT")
+                return False
+            results[agent["result_key"]] = output
+            results["agent_status"][stage] = "completed"
+            conn.execute("UPDATE analyses SET results = ?, updated_at = ? WHERE report_id = ?",
+                         (_pack(results), time.time(), report_id))
+            conn.execute("UPDATE stage_runs SET status = 'completed', output = ? WHERE report_id = ? AND stage = ? AND run = ?",
+                         (_pack_text(output), report_id, stage, row["runs"]))
+            conn.execute("COMMIT")
+        return True
+
+    def load(self, report_id):
+        """
+        Latest results of an analysis, ready for InvestmentAnalysisPipeline.rerun, or None when
+        nothing is stored for it. stage_inputs holds the prompts of each stage's latest run.
+        """
+        with self._connect() as conn:
+            row = conn.execute("SELECT results FROM analyses WHERE report_id = ?", (report_id,)).fetchone()
+            if row is None:
+                return None
+            stage_rows = conn.execute(
+                "SELECT stage, model, system_prompt, user_prompt FROM stage_runs WHERE report_id = ? ORDER BY run",
+                (report_id,)
+            ).fetchall()
+        results = _unpack(row["results"])
+        results["report_id"] = report_id
+        results["stage_context"]["deal_content"] = results["deal_content"]
+        results["stage_inputs"] = {
+            stage["stage"]: {"model": stage["model"], "system_prompt": _unpack_text(stage["system_prompt"]),
+                             "user_prompt": _unpack_text(stage["user_prompt"])}
+            for stage in stage_rows
+        }
+        return results
+
+    def load_many(self, report_ids):
+        """
+        Latest results of several analyses in one query, without their stage inputs, e.g. to
+        compare deals. Returns a dictionary by report id; ids with nothing stored are left out.
+        """
+        if not report_ids:
+            return {}
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT report_id, results FROM analyses WHERE report_id IN ({', '.join('?' * len(report_ids))})",
+                list(report_ids)
+            ).fetchall()
+        loaded = {}
+        for row in rows:
+            results = _unpack(row["results"])
+            results["report_id"] = row["report_id"]
+            loaded[row["report_id"]] = results
+        return loaded
+
+    def runs(self, report_id, stage=None):
+        """Stage runs of an analysis (without prompts and outputs), oldest first"""
+        query = "SELECT stage, run, status, model, elapsed_s, created_at FROM stage_runs WHERE report_id = ?"
+        params = [report_id]
+        if stage:
+            query += " AND stage = ?"
+            params.append(stage)
+        with self._connect() as conn:
+            return [dict(row) for row in conn.execute(query + " ORDER BY run, stage", params).fetchall()]
+
+    def stage_run(self, report_id, stage, run=None):
+        """
+        Inputs and output of one execution of a stage (the latest when run is None).
+
+        Returns:
+            Dictionary with stage, run, status, model, system_prompt, user_prompt, output and
+            elapsed_s, or None when there is no such run
+        """
+        query = "SELECT * FROM stage_runs WHERE report_id = ? AND stage = ?"
+        params = [report_id, stage]
+        if run is not None:
+            query += " AND run = ?"
+            params.append(run)
+        with self._connect() as conn:
+            row = conn.execute(query + " ORDER BY run DESC LIMIT 1", params).fetchone()
+        if row is None:
+            return None
+        entry = dict(row)
+        for key in ("system_prompt", "user_prompt", "output"):
+            entry[key] = _unpack_text(entry[key])
+        return entry
+
+    def report_ids(self, since=None, limit=None):
+        """Report ids of the stored analyses, oldest first, optionally from a report id or date (YYYYMMDD) on"""
+        query = "SELECT report_id FROM analyses"
+        params = []
+        if since:
+            query += " WHERE report_id >= ?"
+            params.append(since if since.startswith("report_") else f"report_{since.replace('-', '')}")
+        query += " ORDER BY report_id"
+        if limit:
+            query += " LIMIT ?"
+            params.append(int(limit))
+        with self._connect() as conn:
+            return [row["report_id"] for row in conn.execute(query, params).fetchall()]
@@ -2,6 +2,12 @@
 const API_BASE_URL = window.location.origin;
 const API_URL = `${API_BASE_URL}/analyze`;
 const HEALTH_URL = `${API_BASE_URL}/health`;
+const UPLOADS_URL = `${API_BASE_URL}/uploads`;
+
+// Files larger than this are sent in chunks through a resumable upload session
+const CHUNKED_UPLOAD_THRESHOLD = 8 * 1024 * 1024;
+const PARALLEL_CHUNKS = 4;
+const CHUNK_RETRIES = 3;
 
 // DOM Elements
 const uploadSection = document.getElementById('upload-section');
@@ -19,11 +25,15 @@ const financialContent = document.getElementById('financial-content');
 const marketContent = document.getElementById('market-content');
 const legalContent = document.getElementById('legal-content');
 const orchestratorContent = document.getElementById('orchestrator-content');
+const additionalReports = document.getElementById('additional-reports');
 const newAnalysisBtn = document.getElementById('new-analysis-btn');
 const retryBtn = document.getElementById('retry-btn');
 const downloadAllBtn = document.getElementById('download-all-btn');
+const cancelBtn = document.getElementById('cancel-btn');
 
 let currentResults = null;
+// The /analyze request in progress: { requestId, controller }
+let currentRequest = null;
 
 // Initialize
 document.addEventListener('DOMContentLoaded', () => {
@@ -66,6 +76,13 @@ function setupEventListeners() {
         uploadSection.style.display = 'block';
     });
     
+    // Cancel button, and cancel a running analysis when the page is closed so its LLM calls stop
+    cancelBtn.addEventListener('click', () => {
+        cancelAnalysis();
+        resetForm();
+    });
+    window.addEventListener('pagehide', cancelAnalysis);
+    
     // Download buttons
     downloadAllBtn.addEventListener('click', downloadAllReports);
     
@@ -80,9 +97,8 @@ function setupEventListeners() {
 
 // Handle file selection
 function handleFileSelect(e) {
-    const file = e.target.files[0];
-    if (file) {
-        updateFileDisplay(file);
+    if (e.target.files.length) {
+        updateFileDisplay(e.target.files);
     }
 }
 
@@ -103,27 +119,30 @@ function handleDrop(e) {
     e.preventDefault();
     dropZone.classList.remove('dragover');
     
-    const file = e.dataTransfer.files[0];
-    if (file) {
-        if (isValidFile(file)) {
-            fileInput.files = e.dataTransfer.files;
-            updateFileDisplay(file);
+    const files = e.dataTransfer.files;
+    if (files.length) {
+        if (Array.from(files).every(isValidFile)) {
+            fileInput.files = files;
+            updateFileDisplay(files);
         } else {
-            showError('Invalid file type. Please upload TXT, PDF, DOC, DOCX, or MD files.');
+            showError('Invalid file type. Please upload TXT, PDF, DOC, DOCX, MD, CSV, XLSX, or ZIP files.');
         }
     }
 }
 
 // Check if file is valid
 function isValidFile(file) {
-    const validExtensions = ['.txt', '.pdf', '.doc', '.docx', '.md'];
+    const validExtensions = ['.txt', '.pdf', '.doc', '.docx', '.md', '.csv', '.xlsx', '.zip'];
     const fileName = file.name.toLowerCase();
     return validExtensions.some(ext => fileName.endsWith(ext));
 }
 
 // Update file display
-function updateFileDisplay(file) {
-    fileName.textContent = `Selected: ${file.name} (${formatFileSize(file.size)})`;
+function updateFileDisplay(files) {
+    const totalSize = Array.from(files).reduce((sum, file) => sum + file.size, 0);
+    fileName.textContent = files.length === 1
+        ? `Selected: ${files[0].name} (${formatFileSize(totalSize)})`
+        : `Selected: ${files.length} files as one deal package (${formatFileSize(totalSize)})`;
     analyzeBtn.disabled = false;
 }
 
@@ -136,15 +155,119 @@ function formatFileSize(bytes) {
     return Math.round(bytes / Math.pow(k, i) * 100) / 100 + ' ' + sizes[i];
 }
 
+// Generate a unique Idempotency-Key for an /analyze submission
+function newIdempotencyKey() {
+    if (window.crypto && crypto.randomUUID) {
+        return crypto.randomUUID();
+    }
+    return `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+}
+
+// Hex SHA-256 of a blob, or null where Web Crypto is unavailable (plain HTTP to a remote host)
+async function sha256Hex(blob) {
+    if (!(window.crypto && crypto.subtle)) return null;
+    const digest = await crypto.subtle.digest('SHA-256', await blob.arrayBuffer());
+    return Array.from(new Uint8Array(digest)).map(byte => byte.toString(16).padStart(2, '0')).join('');
+}
+
+// Send one chunk, retrying network errors, checksum mismatches and server errors
+async function sendChunk(uploadId, index, chunk, signal) {
+    const headers = { 'Content-Type': 'application/octet-stream' };
+    const checksum = await sha256Hex(chunk);
+    if (checksum) {
+        headers['X-Chunk-SHA256'] = checksum;
+    }
+    for (let attempt = 1; ; attempt++) {
+        let response = null;
+        try {
+            response = await fetch(`${UPLOADS_URL}/${uploadId}/chunks/${index}`, {
+                method: 'PUT', headers, body: chunk, signal
+            });
+        } catch (error) {
+            if (error.name === 'AbortError' || attempt >= CHUNK_RETRIES) throw error;
+        }
+        if (response && response.ok) return;
+        if (response && (response.status === 404 || attempt >= CHUNK_RETRIES)) {
+            const errorData = await response.json().catch(() => ({}));
+            throw new Error(errorData.error || `Chunk upload failed: ${response.status}`);
+        }
+        await delay(1000 * attempt);
+    }
+}
+
+// Upload a large file in parallel chunks, resuming an earlier session for the same file.
+// Returns the upload id and the localStorage key that remembers the session.
+async function uploadInChunks(file, signal) {
+    const resumeKey = `upload:${file.name}:${file.size}:${file.lastModified}`;
+    let session = null;
+    const savedId = localStorage.getItem(resumeKey);
+    if (savedId) {
+        const response = await fetch(`${UPLOADS_URL}/${savedId}`, { signal });
+        if (response.ok) {
+            session = await response.json();
+        }
+    }
+    if (!session) {
+        const response = await fetch(UPLOADS_URL, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ filename: file.name, size: file.size }),
+            signal
+        });
+        if (!response.ok) {
+            const errorData = await response.json().catch(() => ({ error: 'Unknown error occurred' }));
+            throw new Error(errorData.error || `Server error: ${response.status}`);
+        }
+        session = await response.json();
+        localStorage.setItem(resumeKey, session.upload_id);
+    }
+    
+    // Chunks the server already acknowledged are skipped
+    const pending = [...session.missing_chunks];
+    let sent = session.bytes_received;
+    const sendPending = async () => {
+        while (pending.length) {
+            const index = pending.shift();
+            const start = index * session.chunk_size;
+            const chunk = file.slice(start, Math.min(start + session.chunk_size, file.size));
+            await sendChunk(session.upload_id, index, chunk, signal);
+            sent += chunk.size;
+            updateLoadingStatus(`Uploading file... ${Math.floor(sent * 100 / file.size)}%`);
+        }
+    };
+    await Promise.all(Array.from({ length: PARALLEL_CHUNKS }, sendPending));
+    return { uploadId: session.upload_id, resumeKey };
+}
+
+// Cancel the running analysis on the server and abort the request
+function cancelAnalysis() {
+    if (!currentRequest) return;
+    const { requestId, controller } = currentRequest;
+    currentRequest = null;
+    navigator.sendBeacon(`${API_URL}/${encodeURIComponent(requestId)}/cancel`);
+    controller.abort();
+}
+
 // Handle form submit
 async function handleSubmit(e) {
     e.preventDefault();
     
-    const file = fileInput.files[0];
-    if (!file) {
+    const files = Array.from(fileInput.files);
+    if (!files.length) {
         showError('Please select a file first.');
         return;
     }
+    // Several documents are sent in one request and merged into one deal package by the server;
+    // only a single file (e.g. a ZIP package) can use the chunked upload
+    const file = files[0];
+    const totalSize = files.reduce((sum, selected) => sum + selected.size, 0);
+    if (files.length > 1 && totalSize > CHUNKED_UPLOAD_THRESHOLD) {
+        showError(`These files total ${formatFileSize(totalSize)}. Combine them into a ZIP file and upload that instead.`);
+        return;
+    }
+    
+    // Ignore repeated clicks while this submission is running
+    analyzeBtn.disabled = true;
     
     // Show loading, hide upload
     uploadSection.style.display = 'none';
@@ -157,15 +280,39 @@ async function handleSubmit(e) {
     
     // Upload and analyze
     try {
-        const formData = new FormData();
-        formData.append('file', file);
-        
         updateLoadingStatus('Uploading file...');
         
-        const response = await fetch(API_URL, {
-            method: 'POST',
-            body: formData
-        });
+        // One key per submission, so a retried request returns the original analysis instead of re-running it.
+        // The request id lets the analysis be cancelled while it runs.
+        const request = { requestId: newIdempotencyKey(), controller: new AbortController() };
+        currentRequest = request;
+        const headers = { 'Idempotency-Key': newIdempotencyKey(), 'X-Request-ID': request.requestId };
+        let response;
+        if (files.length === 1 && file.size > CHUNKED_UPLOAD_THRESHOLD) {
+            // Large documents are uploaded in resumable chunks; the analysis starts once they are assembled
+            const { uploadId, resumeKey } = await uploadInChunks(file, request.controller.signal);
+            updateLoadingStatus('Upload complete, extracting document...');
+            response = await fetch(`${UPLOADS_URL}/${uploadId}/complete`, {
+                method: 'POST',
+                headers,
+                signal: request.controller.signal
+            });
+            if (response.ok || response.status === 404) {
+                localStorage.removeItem(resumeKey);
+            }
+        } else {
+            const formData = new FormData();
+            files.forEach(selected => formData.append('file', selected));
+            response = await fetch(API_URL, {
+                method: 'POST',
+                headers,
+                body: formData,
+                signal: request.controller.signal
+            });
+        }
+        if (currentRequest === request) {
+            currentRequest = null;
+        }
         
         if (!response.ok) {
             const errorData = await response.json().catch(() => ({ error: 'Unknown error occurred' }));
@@ -208,6 +355,9 @@ async function handleSubmit(e) {
         displayResults(result);
         
     } catch (error) {
+        if (error.name === 'AbortError') {
+            return;
+        }
         console.error('Error:', error);
         showError(error.message || 'An error occurred while analyzing the file.');
     }
@@ -249,12 +399,43 @@ function displayResults(result) {
     marketContent.textContent = result.market_analysis_report || 'No market analysis available.';
     legalContent.textContent = result.legal_report || 'No legal analysis available.';
     orchestratorContent.textContent = result.orchestrator_report || 'No orchestrator report available.';
+    displayAdditionalReports(result);
     
     // Show results, hide loading
     loadingSection.style.display = 'none';
     resultsSection.style.display = 'block';
 }
 
+// Display reports from agents beyond the four core specialists
+function displayAdditionalReports(result) {
+    const coreAgents = ['real_estate', 'financial_modeling', 'market_analysis', 'legal'];
+    additionalReports.innerHTML = '';
+    
+    (result.agents || []).filter(agent => !coreAgents.includes(agent.id)).forEach(agent => {
+        const card = document.createElement('div');
+        card.className = 'report-card';
+        
+        const header = document.createElement('div');
+        header.className = 'report-header';
+        const title = document.createElement('h3');
+        title.textContent = agent.title;
+        const button = document.createElement('button');
+        button.className = 'download-btn';
+        button.setAttribute('data-report', agent.id);
+        button.textContent = 'Download';
+        header.appendChild(title);
+        header.appendChild(button);
+        
+        const content = document.createElement('div');
+        content.className = 'report-content';
+        content.textContent = result[agent.result_key] || `No ${agent.title} analysis available.`;
+        
+        card.appendChild(header);
+        card.appendChild(content);
+        additionalReports.appendChild(card);
+    });
+}
+
 // Show error
 function showError(message) {
     document.getElementById('error-message').textContent = message;
@@ -289,6 +470,9 @@ function downloadReport(reportType) {
         'legal': 'legal_report',
         'orchestrator': 'orchestrator_report'
     };
+    (currentResults.agents || []).forEach(agent => {
+        reportKeyMap[agent.id] = agent.result_key;
+    });
     
     const reportKey = reportKeyMap[reportType];
     const reportContent = currentResults[reportKey];
@@ -314,7 +498,13 @@ function downloadReport(reportType) {
 function downloadAllReports() {
     if (!currentResults) return;
     
-    ['real_estate', 'financial_modeling', 'market_analysis', 'legal', 'orchestrator'].forEach((type, index) => {
+    const reportTypes = (currentResults.agents || []).map(agent => agent.id);
+    if (reportTypes.length === 0) {
+        reportTypes.push('real_estate', 'financial_modeling', 'market_analysis', 'legal');
+    }
+    reportTypes.push('orchestrator');
+    
+    reportTypes.forEach((type, index) => {
         setTimeout(() => downloadReport(type), index * 300);
     });
 }
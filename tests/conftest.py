@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def web(tmp_path_factory):
+    """The Flask app module, imported once with its uploads, reports and stores in a temporary directory"""
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("app"))
+    os.environ.setdefault("OPENAI_API_KEY", "test")
+    import app
+    yield app
+    os.chdir(cwd)
@@ -0,0 +1,132 @@
+import io
+import threading
+import time
+import types
+
+import pytest
+
+from cancellation import CancellationRegistry, CancelledError, CancelToken
+from fair_scheduler import FairShareScheduler
+from model_router import ModelRouter
+from request_dedup import SingleFlight
+
+
+def test_callbacks_run_once_and_immediately_after_cancellation():
+    token = CancelToken()
+    calls = []
+    token.on_cancel(lambda: calls.append("stream closed"))
+    unregister = token.on_cancel(lambda: calls.append("unregistered"))
+    unregister()
+    token.cancel("client disconnected")
+    token.cancel("again")
+    token.on_cancel(lambda: calls.append("late"))
+    assert calls == ["stream closed", "late"]
+    assert token.reason == "client disconnected"
+    with pytest.raises(CancelledError):
+        token.raise_if_cancelled()
+
+
+def test_shared_analysis_is_cancelled_when_its_last_request_goes():
+    registry = CancellationRegistry()
+    token = registry.register("request-1", "deal")
+    assert registry.register("request-2", "deal") is token
+    assert registry.cancel("request-1")
+    assert not token.cancelled
+    assert registry.cancel("request-2")
+    assert token.cancelled
+    assert not registry.cancel("request-2")
+    assert registry.register("request-3", "deal") is not token
+
+
+def test_finished_requests_are_released():
+    registry = CancellationRegistry()
+    token = registry.register("request-1", "deal")
+    registry.release("request-1")
+    assert not registry.cancel("request-1")
+    assert not token.cancelled
+
+
+def test_queued_call_leaves_the_scheduler_queue_when_cancelled():
+    scheduler = FairShareScheduler(max_concurrency=1, tenant_weights={})
+    scheduler.acquire("blocker")
+    token = CancelToken()
+    threading.Timer(0.1, token.cancel).start()
+    start = time.monotonic()
+    with pytest.raises(CancelledError):
+        scheduler.acquire("analyst", cancel_token=token)
+    assert time.monotonic() - start < 1
+    assert scheduler.stats()["queued"] == 0
+
+
+class SlowStream:
+    """A streamed completion that yields one chunk every 50 ms until it is closed"""
+
+    def __init__(self):
+        self.closed = threading.Event()
+
+    def __iter__(self):
+        for _ in range(200):
+            if self.closed.is_set():
+                raise ConnectionError("stream closed")
+            time.sleep(0.05)
+            delta = types.SimpleNamespace(content="The deal is analysed. ")
+            yield types.SimpleNamespace(choices=[types.SimpleNamespace(delta=delta, finish_reason=None)], usage=None)
+
+    def close(self):
+        self.closed.set()
+
+
+def test_streamed_call_is_aborted_mid_response():
+    stream = SlowStream()
+    client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=types.SimpleNamespace(
+        create=lambda **kwargs: stream)))
+    router = ModelRouter({"usage_log": None})
+    token = CancelToken()
+    threading.Timer(0.2, token.cancel, ("client disconnected",)).start()
+    start = time.monotonic()
+    with pytest.raises(CancelledError):
+        router.complete(client, "market", "You are a market analyst.", "Analyze:", cancel_token=token)
+    assert time.monotonic() - start < 1
+    assert stream.closed.is_set()
+    assert router.calls[-1]["cancelled"]
+
+
+class CancellableAnalysis:
+    """Stands in for app.run_analysis: the first run waits until cancelled and takes a moment to stop"""
+
+    def __init__(self):
+        self.runs = 0
+        self.started = threading.Event()
+
+    def __call__(self, pipeline, filename, file_bytes, deadline_seconds=None, cancel_token=None, *args, **kwargs):
+        self.runs += 1
+        run = self.runs
+        if run == 1:
+            self.started.set()
+            cancel_token.wait(2)
+            time.sleep(0.3)
+            cancel_token.raise_if_cancelled()
+        return {"status": "success", "report_id": f"report_{run}"}
+
+
+def test_submission_after_cancellation_starts_a_new_analysis(web, monkeypatch):
+    stub = CancellableAnalysis()
+    monkeypatch.setattr(web, "run_analysis", stub)
+    monkeypatch.setattr(web, "analysis_flights", SingleFlight())
+    client = web.app.test_client()
+
+    def post(request_id):
+        return client.post("/analyze", data={"file": (io.BytesIO(b"Harbor Point office tower"), "deal.txt")},
+                           headers={"X-Request-ID": request_id})
+
+    replies = {}
+    first = threading.Thread(target=lambda: replies.update(first=post("request-1")))
+    first.start()
+    stub.started.wait(2)
+    assert client.post("/analyze/request-1/cancel").status_code == 202
+    second = post("request-2")
+    first.join(2)
+
+    assert replies["first"].status_code == 499
+    assert second.status_code == 200
+    assert second.get_json()["report_id"] == "report_2"
@@ -0,0 +1,112 @@
+import threading
+import time
+
+import pytest
+
+from agent_registry import AgentSpec
+from cancellation import CancelToken
+from dag_scheduler import DAGScheduler, NodeCache
+
+
+def spec(agent_id, depends_on=(), timeout=None):
+    return AgentSpec(agent_id, agent_id.title(), f"{agent_id}_report", agent_id, agent_id.upper(),
+                     f"You are the {agent_id} agent.", "Analyze:", "Be brief.", depends_on=depends_on, timeout=timeout)
+
+
+CONTEXT = {"deal_content": "Sunset Plaza, 120 units, Austin TX"}
+
+
+def run_with(delays, specs, cancel_token=None):
+    """Each node sleeps for its delay (in small steps, so a cancelled node stops) and returns its prompt"""
+    def run_node(node, user_prompt, timeout):
+        deadline = time.monotonic() + delays.get(node.agent_id, 0)
+        while time.monotonic() < deadline:
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+            time.sleep(0.01)
+        return f"{node.agent_id} report for: {user_prompt}"
+    return run_node
+
+
+def test_independent_nodes_run_in_parallel_and_dependents_see_their_reports():
+    specs = [spec("market"), spec("legal"), spec("financial", depends_on=("market",))]
+    scheduler = DAGScheduler(specs, run_with({"market": 0.2, "legal": 0.2}, specs))
+    start = time.monotonic()
+    reports, status, _ = scheduler.run(CONTEXT)
+    assert time.monotonic() - start < 0.35
+    assert status == {"market": "completed", "legal": "completed", "financial": "completed"}
+    assert "RELATED ANALYSES FROM OTHER AGENTS" in reports["financial"]
+    assert "market report for" in reports["financial"]
+
+
+def test_cycles_and_unknown_dependencies_are_rejected():
+    with pytest.raises(ValueError):
+        DAGScheduler([spec("a", depends_on=("b",)), spec("b", depends_on=("a",))], lambda *args: "")
+    with pytest.raises(ValueError):
+        DAGScheduler([spec("a", depends_on=("missing",))], lambda *args: "")
+
+
+def test_deadline_times_out_slow_nodes_and_saves_their_late_result():
+    specs = [spec("market"), spec("legal")]
+    late = {}
+    finished = threading.Event()
+
+    def on_late_result(agent_id, report):
+        late[agent_id] = report
+        finished.set()
+
+    scheduler = DAGScheduler(specs, run_with({"legal": 0.4}, specs))
+    reports, status, _ = scheduler.run(CONTEXT, deadline_at=time.monotonic() + 0.15, on_late_result=on_late_result)
+    assert status == {"market": "completed", "legal": "timed_out"}
+    assert reports["legal"].startswith("TIMED OUT")
+    assert finished.wait(2)
+    assert late["legal"].startswith("legal report")
+
+
+def test_dependents_of_a_timed_out_node_run_without_its_report():
+    specs = [spec("market", timeout=0.1), spec("financial", depends_on=("market",))]
+    scheduler = DAGScheduler(specs, run_with({"market": 0.4}, specs))
+    reports, status, _ = scheduler.run(CONTEXT)
+    assert status == {"market": "timed_out", "financial": "completed"}
+    assert "unavailable: market" in reports["financial"]
+
+
+def test_cancellation_stops_running_and_pending_nodes():
+    token = CancelToken()
+    specs = [spec("market"), spec("financial", depends_on=("market",))]
+    scheduler = DAGScheduler(specs, run_with({"market": 5}, specs, cancel_token=token))
+    threading.Timer(0.1, token.cancel).start()
+    start = time.monotonic()
+    reports, status, _ = scheduler.run(CONTEXT, cancel_token=token)
+    assert time.monotonic() - start < 1
+    assert status == {"market": "cancelled", "financial": "cancelled"}
+    assert reports["financial"].startswith("CANCELLED")
+
+
+def test_cached_and_precomputed_nodes_are_not_run_again(tmp_path):
+    specs = [spec("market"), spec("legal")]
+    calls = []
+
+    def run_node(node, user_prompt, timeout):
+        calls.append(node.agent_id)
+        return f"{node.agent_id} report"
+
+    cache = NodeCache(str(tmp_path))
+    DAGScheduler(specs, run_node, cache=cache).run(CONTEXT)
+    reports, status, _ = DAGScheduler(specs, run_node, cache=cache).run(CONTEXT, precomputed={"legal": "stored legal report"})
+    assert sorted(calls) == ["legal", "market"]
+    assert status == {"market": "cached", "legal": "resumed"}
+    assert reports["legal"] == "stored legal report"
+
+
+def test_failed_node_is_reported_without_stopping_the_others():
+    specs = [spec("market"), spec("legal")]
+
+    def run_node(node, user_prompt, timeout):
+        if node.agent_id == "legal":
+            raise RuntimeError("rate limited")
+        return "market report"
+
+    reports, status, _ = DAGScheduler(specs, run_node).run(CONTEXT)
+    assert status == {"market": "completed", "legal": "failed"}
+    assert "rate limited" in reports["legal"]
@@ -0,0 +1,79 @@
+import os
+import threading
+import time
+import types
+
+import pytest
+
+EXAMPLE_DEAL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "example_deal.txt")
+LEGAL_PROMPT = "You are a specialized real estate legal"
+
+
+class SlowLegalClient:
+    """Answers every chat completion at once, except the legal agent's, which takes legal_seconds"""
+
+    def __init__(self, legal_seconds):
+        self.legal_seconds = legal_seconds
+        self.chat = types.SimpleNamespace(completions=types.SimpleNamespace(create=self.create))
+
+    def create(self, model=None, messages=None, temperature=None, **kwargs):
+        if messages[0]["content"].startswith(LEGAL_PROMPT):
+            time.sleep(self.legal_seconds)
+        text = f"Report from {model}. " + "The deal is analysed in detail. " * 20
+        return types.SimpleNamespace(
+            choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=text), finish_reason="stop")],
+            usage=types.SimpleNamespace(prompt_tokens=1000, completion_tokens=len(text) // 4),
+        )
+
+
+@pytest.fixture
+def make_pipeline(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+
+    def make(legal_seconds, **env):
+        for key, value in env.items():
+            monkeypatch.setenv(key, value)
+        from investment_pipeline import InvestmentAnalysisPipeline
+        pipeline = InvestmentAnalysisPipeline()
+        pipeline.client = SlowLegalClient(legal_seconds)
+        return pipeline
+    return make
+
+
+def test_orchestrator_runs_on_the_reports_that_finished_in_time(make_pipeline):
+    pipeline = make_pipeline(1.5, ORCHESTRATOR_RESERVE_SECONDS="0.2")
+    late = {}
+    finished = threading.Event()
+
+    def on_late_result(agent_id, report):
+        late[agent_id] = report
+        finished.set()
+
+    start = time.monotonic()
+    results = pipeline.analyze(EXAMPLE_DEAL, deadline_seconds=0.8, on_late_result=on_late_result)
+    assert time.monotonic() - start < 1.4
+    assert results["agent_status"]["legal"] == "timed_out"
+    assert results["agent_status"]["orchestrator"] == "completed"
+    assert results["partial"]
+    assert results["real_estate_report"].startswith("Report from")
+    assert finished.wait(3)
+    assert late["legal"].startswith("Report from")
+
+
+def test_without_a_deadline_every_agent_is_waited_for(make_pipeline):
+    pipeline = make_pipeline(0.3)
+    results = pipeline.analyze(EXAMPLE_DEAL)
+    assert set(results["agent_status"].values()) == {"completed"}
+    assert not results["partial"]
+
+
+def test_reserve_is_capped_to_a_share_of_a_short_deadline(make_pipeline):
+    # The default 45 s reserve would leave no time for specialists within a 1 s deadline
+    pipeline = make_pipeline(1.5)
+    finished = threading.Event()
+    results = pipeline.analyze(EXAMPLE_DEAL, deadline_seconds=1, on_late_result=lambda agent_id, report: finished.set())
+    assert results["agent_status"]["real_estate"] == "completed"
+    assert results["agent_status"]["legal"] == "timed_out"
+    assert results["agent_status"]["orchestrator"] == "completed"
+    assert finished.wait(3)
@@ -0,0 +1,75 @@
+import io
+import zipfile
+
+import pytest
+
+from file_processor import FileProcessor, build_package, document_role
+
+
+@pytest.mark.parametrize("filename, role", [
+    ("Sunset Plaza OM.pdf", "Offering Memorandum"),
+    ("sunset_plaza_rent_roll_2025.xlsx", "Rent Roll"),
+    ("T12-operating-statement.pdf", "T-12 Operating Statement"),
+    ("Executed PSA.docx", "Purchase and Sale Agreement"),
+    ("site photos.txt", "Supporting Document"),
+])
+def test_documents_are_recognised_by_file_name(filename, role):
+    assert document_role(filename) == role
+
+
+def test_the_same_documents_always_build_the_same_package():
+    documents = [("rent_roll.txt", b"Unit 101"), ("om.txt", b"Sunset Plaza"), ("om.txt", b"Second copy")]
+    package = build_package(documents)
+    assert package == build_package(list(reversed(documents[:2])) + documents[2:])
+    assert zipfile.ZipFile(io.BytesIO(package)).namelist() == ["om.txt", "om-2.txt", "rent_roll.txt"]
+
+
+@pytest.fixture
+def processor(monkeypatch):
+    monkeypatch.setenv("EXTRACT_WORKERS", "1")
+    return FileProcessor()
+
+
+def write_package(tmp_path, documents):
+    path = tmp_path / "deal.zip"
+    path.write_bytes(build_package(documents))
+    return str(path)
+
+
+def test_package_documents_are_merged_in_role_order(tmp_path, processor):
+    path = write_package(tmp_path, [
+        ("rent_roll.txt", b"Unit 101 leased at $1,450 per month"),
+        ("offering_memorandum.txt", b"Sunset Plaza, 120 units"),
+        ("photos.jpg", b"\xff\xd8"),
+        ("notes.txt", b"   "),
+    ])
+    text, files = processor.process_package(path)
+
+    pages = text.split("\f")
+    assert pages[0].startswith("DEAL PACKAGE: 2 documents")
+    assert pages[1] == "# DOCUMENT 1 OF 2 - offering_memorandum.txt (Offering Memorandum)\n\nSunset Plaza, 120 units"
+    assert pages[2].startswith("# DOCUMENT 2 OF 2 - rent_roll.txt (Rent Roll)")
+    status = {entry["name"]: entry["status"] for entry in files}
+    assert status == {"notes.txt": "failed", "offering_memorandum.txt": "extracted",
+                      "photos.jpg": "skipped", "rent_roll.txt": "extracted"}
+    assert all("text" not in entry for entry in files)
+
+
+def test_documents_beyond_the_file_limit_are_skipped(tmp_path, processor):
+    processor.package_max_files = 2
+    path = write_package(tmp_path, [(f"lease_{n}.txt", b"Lease term 10 years") for n in range(3)])
+    text, files = processor.process_package(path)
+    assert text.startswith("DEAL PACKAGE: 2 documents")
+    assert files[2]["status"] == "skipped"
+    assert "limit of 2 documents" in files[2]["reason"]
+
+
+def test_oversized_or_empty_packages_are_rejected(tmp_path, processor):
+    processor.package_max_bytes = 10
+    with pytest.raises(ValueError, match="exceed 10 bytes"):
+        processor.process_package(write_package(tmp_path, [("om.txt", b"Sunset Plaza, 120 units")]))
+    with pytest.raises(ValueError, match="No documents could be extracted"):
+        processor.process_package(write_package(tmp_path, [("photos.jpg", b"\xff\xd8")]))
+    (tmp_path / "fake.zip").write_text("not a zip")
+    with pytest.raises(ValueError, match="not a valid ZIP file"):
+        processor.process_package(str(tmp_path / "fake.zip"))
@@ -0,0 +1,65 @@
+from agent_registry import AGENT_SPECS
+from deal_facts import extract_deal_facts
+from deal_revision import diff_sections, plan_reanalysis
+
+ORIGINAL = (
+    "Sunset Plaza is offered for sale.\n\n"
+    "FINANCIAL SUMMARY\nAsking Price: $10,000,000\nNOI: $600,000\n\n"
+    "MARKET OVERVIEW\nAustin is growing quickly.\n\n"
+    "LEGAL\nNo liens."
+)
+
+
+def test_identical_documents_have_no_changes():
+    diff = diff_sections(ORIGINAL, ORIGINAL)
+    assert diff["sections"] == []
+    assert diff["unchanged_sections"] == diff["total_sections"] == 4
+    assert diff["changed_share"] == 0.0
+
+
+def test_price_change_is_attributed_to_the_pricing_topics():
+    diff = diff_sections(ORIGINAL, ORIGINAL.replace("$10,000,000", "$9,500,000"))
+    [change] = diff["sections"]
+    assert change["heading"] == "FINANCIAL SUMMARY"
+    assert change["change"] == "modified"
+    assert change["topics"] == ["financial", "market"]
+    assert "price" in change["facts"]
+    assert change["lines"] == ["-Asking Price: $10,000,000", "+Asking Price: $9,500,000"]
+    assert diff["unchanged_sections"] == 3
+
+
+def test_added_section_is_reported_as_added():
+    diff = diff_sections(ORIGINAL, ORIGINAL + "\n\nENVIRONMENTAL\nA Phase I was completed in 2024.")
+    [change] = diff["sections"]
+    assert (change["heading"], change["change"], change["topics"]) == ("ENVIRONMENTAL", "added", ["environmental"])
+
+
+def test_moving_a_section_does_not_change_it():
+    moved = ORIGINAL.replace("MARKET OVERVIEW\nAustin is growing quickly.\n\n", "") + \
+        "\n\nMARKET OVERVIEW\nAustin is growing quickly."
+    assert diff_sections(ORIGINAL, moved)["sections"] == []
+
+
+def previous_analysis(deal_content):
+    previous = {"report_id": "report_1", "deal_content": deal_content, "deal_facts": extract_deal_facts(deal_content),
+                "stage_context": {}, "agent_status": {spec.agent_id: "completed" for spec in AGENT_SPECS}}
+    previous.update({spec.result_key: "Report" for spec in AGENT_SPECS})
+    return previous
+
+
+def rerun_agents(original, old, new):
+    revised = original.replace(old, new)
+    revision = plan_reanalysis(previous_analysis(original), revised, extract_deal_facts(revised), {}, AGENT_SPECS)
+    return {agent_id for agent_id, agent in revision["agents"].items() if agent["rerun"]}
+
+
+def test_price_change_reruns_every_agent_that_works_with_price_noi_or_cap_rate():
+    rerun = rerun_agents(ORIGINAL, "$10,000,000", "$9,500,000")
+    assert {"real_estate", "financial_modeling", "market_analysis", "risk", "liquidity"} <= rerun
+    assert "compliance" not in rerun
+
+
+def test_noi_and_cap_rate_changes_rerun_the_real_estate_agent():
+    original = ORIGINAL.replace("NOI: $600,000", "NOI: $600,000\nCap Rate: 6.0%")
+    for old, new in (("$600,000", "$550,000"), ("6.0%", "6.5%")):
+        assert {"real_estate", "financial_modeling"} <= rerun_agents(original, old, new)
@@ -0,0 +1,64 @@
+import pytest
+
+from deal_facts import extract_deal_facts
+from deal_screen import DealScreen, format_screen_summary
+
+DEAL = """
+Property Type: Multifamily
+Asking Price: $24,000,000
+Net Operating Income: $1,320,000
+Cap Rate: 5.5%
+DSCR: 1.18x
+Loan-to-Value: 70%
+Occupancy: 94%
+"""
+
+
+def test_facts_are_extracted_as_ratios():
+    facts = extract_deal_facts(DEAL)
+    assert facts["asset_class"] == "multifamily"
+    assert facts["price"] == 24_000_000
+    assert facts["cap_rate"] == pytest.approx(0.055)
+    assert facts["dscr"] == pytest.approx(1.18)
+    assert facts["ltv"] == pytest.approx(0.70)
+
+
+def test_deal_inside_the_buy_box_passes():
+    screen = DealScreen({"min_dscr": 1.1, "min_cap_rate": 5, "max_ltv": 75, "allowed_asset_classes": "multifamily,industrial"})
+    result = screen.screen(extract_deal_facts(DEAL))
+    assert (result["passed"], result["failures"], result["missing_metrics"]) == (True, [], [])
+
+
+def test_every_violated_threshold_is_reported():
+    screen = DealScreen({"min_dscr": 1.25, "min_cap_rate": 6, "max_ltv": 65, "allowed_asset_classes": ["office"]})
+    result = screen.screen(extract_deal_facts(DEAL))
+    assert not result["passed"]
+    assert len(result["failures"]) == 4
+    assert "Cap rate of 5.50% is below the minimum of 6.00%" in result["failures"]
+    assert "Cap rate of 5.50%" in format_screen_summary(result)
+
+
+def test_missing_metrics_never_fail_the_deal():
+    screen = DealScreen({"min_dscr": 1.25, "min_occupancy": 90})
+    result = screen.screen(extract_deal_facts("Property Type: Office\nAsking Price: $10M"))
+    assert result["passed"]
+    assert result["missing_metrics"] == ["dscr", "occupancy"]
+
+
+def test_percentage_thresholds_are_never_read_as_ratios():
+    screen = DealScreen({"min_cap_rate": 1, "max_ltv": "75", "min_occupancy": 100})
+    assert screen.min_cap_rate == pytest.approx(0.01)
+    assert screen.max_ltv == pytest.approx(0.75)
+    assert screen.min_occupancy == pytest.approx(1.0)
+    assert screen.screen(extract_deal_facts(DEAL))["failures"] == ["Occupancy of 94.0% is below the minimum of 100.0%"]
+
+
+@pytest.mark.parametrize("config", [{"min_cap_rate": 0.055}, {"max_ltv": "0.75"}, {"min_occupancy": 120}])
+def test_ambiguous_or_out_of_range_percentages_are_rejected(config):
+    with pytest.raises(ValueError, match="percentage"):
+        DealScreen(config)
+
+
+def test_invalid_mode_is_rejected():
+    with pytest.raises(ValueError):
+        DealScreen({"mode": "warn"})
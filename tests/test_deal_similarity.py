@@ -0,0 +1,26 @@
+from deal_similarity import DealSimilarityIndex
+
+AUSTIN = "Sunset Plaza, a 120 unit multifamily property in Austin, Texas, offered at a 5.5% cap rate."
+DALLAS = "Oak Ridge, a 96 unit multifamily property in Dallas, Texas, offered at a 6.0% cap rate."
+OFFICE = "Harbor Point, a downtown office tower in Boston leased to law firms."
+
+
+def test_most_similar_deal_comes_first(tmp_path):
+    index = DealSimilarityIndex(str(tmp_path), dimensions=256)
+    index.add_deal("report_dallas", DALLAS, {"asset_class": "multifamily", "state": "TX"})
+    index.add_deal("report_office", OFFICE, {"asset_class": "office", "state": "MA"})
+    matches = index.query(AUSTIN, {"asset_class": "multifamily", "state": "TX"}, top_k=2)
+    assert matches[0]["deal_id"] == "report_dallas"
+
+
+def test_earlier_uploads_of_the_same_document_are_skipped(tmp_path):
+    index = DealSimilarityIndex(str(tmp_path), dimensions=256)
+    index.add_deal("report_first_upload", AUSTIN)
+    index.add_deal("report_dallas", DALLAS)
+    assert [match["deal_id"] for match in index.query(AUSTIN)] == ["report_dallas"]
+    assert [match["deal_id"] for match in index.query(AUSTIN, exclude_ids=["report_dallas"])] == []
+
+
+def test_deals_added_by_another_process_are_loaded(tmp_path):
+    DealSimilarityIndex(str(tmp_path), dimensions=256).add_deal("report_dallas", DALLAS)
+    assert len(DealSimilarityIndex(str(tmp_path), dimensions=256)) == 1
@@ -0,0 +1,124 @@
+import json
+import os
+import shutil
+import threading
+import types
+
+import pytest
+
+from batch_backend import LocalBatchBackend
+
+EXAMPLE_DEAL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "example_deal.txt")
+
+
+class FakeCompletions:
+    """Answers every chat completion with a report long enough to pass the quality check"""
+
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def create(self, model=None, messages=None, temperature=None, **kwargs):
+        with self._lock:
+            self.calls.append(messages[0]["content"])
+        text = f"Report from {model}. " + "The deal is analysed in detail. " * 20
+        return types.SimpleNamespace(
+            choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=text), finish_reason="stop")],
+            usage=types.SimpleNamespace(prompt_tokens=1000, completion_tokens=len(text) // 4),
+        )
+
+
+class FakeClient:
+    def __init__(self):
+        self.chat = types.SimpleNamespace(completions=FakeCompletions())
+
+
+class LossyBackend(LocalBatchBackend):
+    """Local backend whose batches lose the first result, like an expired batch request"""
+
+    def results(self, batch_id):
+        results = super().results(batch_id)
+        results.pop(sorted(results)[0])
+        return results
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("NODE_CACHE", "false")
+    from investment_pipeline import InvestmentAnalysisPipeline
+    pipeline = InvestmentAnalysisPipeline()
+    pipeline.client = FakeClient()
+    return pipeline
+
+
+@pytest.fixture
+def deals(tmp_path):
+    paths = []
+    for index in range(2):
+        path = tmp_path / f"deal_{index}.txt"
+        shutil.copyfile(EXAMPLE_DEAL, path)
+        paths.append(str(path))
+    return paths
+
+
+def test_specialists_run_in_batches_and_orchestrators_interactively(pipeline, deals):
+    backend = LocalBatchBackend(pipeline.client, workers=2)
+    outcomes, stats = pipeline.analyze_deferred(deals, backend=backend, poll_seconds=0.05)
+
+    specialists = len(pipeline.agent_specs)
+    assert [error for _, _, error in outcomes] == [None, None]
+    for _, results, _ in outcomes:
+        assert set(results["agent_status"].values()) == {"completed"}
+        assert results["orchestrator_report"].startswith("Report from")
+    assert stats["fallback_calls"] == 0
+    assert sum(batch["requests"] for batch in stats["batches"]) == specialists * len(deals)
+    assert len(pipeline.client.chat.completions.calls) == (specialists + 1) * len(deals)
+
+
+def test_model_usage_is_totalled_per_model(pipeline, deals):
+    outcomes, _ = pipeline.analyze_deferred(deals[:1], backend=LocalBatchBackend(pipeline.client), poll_seconds=0.05)
+    usage = outcomes[0][1]["model_usage"]
+    per_model = usage["per_model"]
+    assert sum(totals["calls"] for totals in per_model.values()) == len(usage["calls"]) == len(pipeline.agent_specs) + 1
+    assert sum(totals["batch_calls"] for totals in per_model.values()) == len(pipeline.agent_specs)
+    for model, totals in per_model.items():
+        assert totals["prompt_tokens"] == sum(call["prompt_tokens"] for call in usage["calls"] if call["model"] == model)
+
+
+def test_lost_batch_results_are_retried_interactively(pipeline, deals):
+    backend = LossyBackend(pipeline.client, workers=2)
+    outcomes, stats = pipeline.analyze_deferred(deals, backend=backend, poll_seconds=0.05)
+
+    assert all(set(results["agent_status"].values()) == {"completed"} for _, results, _ in outcomes)
+    assert stats["fallback_calls"] == len(stats["batches"])
+
+
+def test_local_backend_keeps_finished_results_when_cancelled(tmp_path):
+    client = FakeClient()
+    release = threading.Event()
+    original = client.chat.completions.create
+
+    def slow_create(**kwargs):
+        if kwargs["messages"][1]["content"] != "first":
+            release.wait(5)
+        return original(**kwargs)
+
+    client.chat.completions.create = slow_create
+    requests_path = tmp_path / "requests.jsonl"
+    requests_path.write_text("".join(json.dumps({
+        "custom_id": f"r{index}", "method": "POST", "url": "/v1/chat/completions",
+        "body": {"model": "gpt-4o-mini", "messages": [{"role": "system", "content": "s"},
+                                                      {"role": "user", "content": "first" if index == 0 else "later"}]}
+    }) + "\n" for index in range(4)))
+    backend = LocalBatchBackend(client, directory=str(tmp_path), workers=1)
+    batch_id = backend.submit(str(requests_path))
+    while backend.status(batch_id)["completed"] < 1:
+        threading.Event().wait(0.01)
+    threading.Timer(0.1, release.set).start()
+    backend.cancel(batch_id)
+
+    assert backend.status(batch_id)["status"] == "cancelled"
+    assert "r0" in backend.results(batch_id)
+    assert len(backend.results(batch_id)) < 4
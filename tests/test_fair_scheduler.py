@@ -0,0 +1,77 @@
+import threading
+import time
+
+import pytest
+
+from fair_scheduler import FairShareScheduler
+
+
+def wait_until(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def grant_order(scheduler, calls):
+    """
+    Queue (tenant, priority) calls behind a call holding the only slot, release it and
+    return the tenants in the order the scheduler granted them a slot.
+    """
+    order = []
+    scheduler.acquire("blocker")
+
+    def call(tenant, priority):
+        with scheduler.slot(tenant, priority):
+            order.append(tenant)
+
+    threads = []
+    for tenant, priority in calls:
+        thread = threading.Thread(target=call, args=(tenant, priority))
+        thread.start()
+        threads.append(thread)
+        # Queue the calls in list order
+        wait_until(lambda: scheduler.stats()["queued"] == len(threads))
+    scheduler.release("blocker")
+    for thread in threads:
+        thread.join(2)
+    return order
+
+
+def test_a_tenant_bulk_submitting_does_not_starve_the_others():
+    scheduler = FairShareScheduler(max_concurrency=1, tenant_weights={})
+    order = grant_order(scheduler, [("bulk", "interactive")] * 6 + [("analyst", "interactive")] * 2)
+    assert order == ["bulk", "analyst", "bulk", "analyst", "bulk", "bulk", "bulk", "bulk"]
+
+
+def test_weights_set_each_tenants_share_of_the_slots():
+    scheduler = FairShareScheduler(max_concurrency=1, tenant_weights={"research": 2})
+    order = grant_order(scheduler, [("research", "interactive")] * 4 + [("acquisitions", "interactive")] * 4)
+    assert order[:6] == ["research", "acquisitions", "research", "research", "acquisitions", "research"]
+
+
+def test_interactive_calls_go_ahead_of_batch_work():
+    scheduler = FairShareScheduler(max_concurrency=1, tenant_weights={})
+    order = grant_order(scheduler, [("bulk", "batch"), ("bulk", "batch"), ("analyst", "interactive")])
+    assert order == ["analyst", "bulk", "bulk"]
+
+
+def test_waiting_for_a_slot_times_out_and_leaves_the_queue():
+    scheduler = FairShareScheduler(max_concurrency=1, tenant_weights={})
+    scheduler.acquire("blocker")
+    with pytest.raises(TimeoutError):
+        scheduler.acquire("analyst", timeout=0.1)
+    assert scheduler.stats()["queued"] == 0
+    scheduler.release("blocker")
+    assert scheduler.acquire("analyst", timeout=0.1) < 0.1
+
+
+def test_wait_statistics_are_kept_per_tenant():
+    scheduler = FairShareScheduler(max_concurrency=2, tenant_weights={"research": 3})
+    with scheduler.slot("research", "batch"):
+        pass
+    stats = scheduler.stats()
+    assert stats["tenants"]["research"]["calls"] == 1
+    assert stats["tenants"]["research"]["weight"] == 3
+    assert stats["tenants"]["research"]["calls_by_priority"] == {"batch": 1}
+    assert stats["active"] == 0
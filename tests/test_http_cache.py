@@ -0,0 +1,69 @@
+import gzip
+import os
+import re
+
+import pytest
+
+REPORT = "Legal analysis of Sunset Plaza. No material title exceptions were found. " * 40
+
+
+@pytest.fixture
+def client(web):
+    return web.app.test_client()
+
+
+def write_report(web, name, content):
+    with open(os.path.join(web.app.config['REPORTS_FOLDER'], name), 'w') as f:
+        f.write(content)
+    return f"/reports/{name}"
+
+
+def test_report_is_gzipped_and_revalidated_with_its_etag(web, client):
+    url = write_report(web, "report_20250101_120000_legal.txt", REPORT)
+    response = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert gzip.decompress(response.data).decode() == REPORT
+    assert response.headers["ETag"].endswith('-gzip"')
+
+    revalidated = client.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["ETag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.data == b""
+
+
+def test_uncompressed_report_is_revalidated_and_changes_its_etag(web, client):
+    url = write_report(web, "report_20250101_120000_market.txt", REPORT)
+    response = client.get(url)
+    assert "Content-Encoding" not in response.headers
+    assert response.get_data(as_text=True) == REPORT
+    assert client.get(url, headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+
+    write_report(web, "report_20250101_120000_market.txt", REPORT + "Updated.")
+    assert client.get(url, headers={"If-None-Match": response.headers["ETag"]}).status_code == 200
+
+
+def test_reports_are_always_revalidated(web, client):
+    # Late results and stage re-runs rewrite report files in place
+    for content in (REPORT, "TIMED OUT: the agent is still running"):
+        response = client.get(write_report(web, "report_20250101_120000_financial.txt", content))
+        assert response.cache_control.private
+        assert response.cache_control.no_cache
+        assert response.cache_control.max_age is None
+
+
+def test_page_references_fingerprinted_assets_that_are_cached_for_a_year(client):
+    page = client.get("/")
+    assert page.cache_control.no_cache
+    assert client.get("/", headers={"If-None-Match": page.headers["ETag"]}).status_code == 304
+
+    asset = re.search(r'src="(/static/script\.js\?v=[0-9a-f]+)"', page.get_data(as_text=True)).group(1)
+    current = client.get(asset)
+    assert current.cache_control.immutable
+    assert current.cache_control.max_age == 365 * 24 * 3600
+    assert not client.get("/static/script.js?v=outdated").cache_control.immutable
+
+
+def test_small_responses_are_not_compressed(client):
+    response = client.get("/health", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
@@ -0,0 +1,76 @@
+import time
+
+import pytest
+
+from job_queue import JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.db"), max_attempts=2)
+
+
+def expire_lease():
+    time.sleep(0.05)
+
+
+def test_interactive_jobs_are_claimed_first(queue):
+    batch_job = queue.enqueue("report_1", "uploads/a.txt", "a.txt")
+    interactive_job = queue.enqueue("report_2", "uploads/b.txt", "b.txt", priority="interactive")
+    assert queue.claim("worker-1")["id"] == interactive_job
+    assert queue.claim("worker-1")["id"] == batch_job
+    assert queue.claim("worker-1") is None
+
+
+def test_expired_lease_is_taken_over_and_stage_results_are_kept(queue):
+    job_id = queue.enqueue("report_1", "uploads/a.txt", "a.txt")
+    queue.claim("worker-1", lease_seconds=0.01)
+    queue.save_stage(job_id, "legal", "completed", "Legal report")
+    expire_lease()
+
+    job = queue.claim("worker-2")
+    assert (job["id"], job["attempts"], job["lease_owner"]) == (job_id, 2, "worker-2")
+    assert queue.stage_reports(job_id) == {"legal": "Legal report"}
+    # The first worker lost the job and can no longer renew or finish it
+    assert not queue.heartbeat(job_id, "worker-1")
+    assert not queue.complete(job_id, "worker-1", {"status": "success"})
+    assert queue.complete(job_id, "worker-2", {"status": "success"})
+    assert queue.get(job_id)["status"] == "completed"
+
+
+def test_heartbeat_keeps_the_lease(queue):
+    job_id = queue.enqueue("report_1", "uploads/a.txt", "a.txt")
+    queue.claim("worker-1", lease_seconds=0.2)
+    time.sleep(0.1)
+    assert queue.heartbeat(job_id, "worker-1", lease_seconds=60)
+    time.sleep(0.15)
+    assert queue.claim("worker-2") is None
+
+
+def test_failed_job_is_retried_up_to_max_attempts(queue):
+    job_id = queue.enqueue("report_1", "uploads/a.txt", "a.txt")
+    queue.claim("worker-1")
+    assert queue.fail(job_id, "worker-1", "boom")
+    assert queue.get(job_id)["status"] == "queued"
+    queue.claim("worker-1")
+    queue.fail(job_id, "worker-1", "boom again")
+    job = queue.get(job_id)
+    assert (job["status"], job["error"]) == ("failed", "boom again")
+    assert queue.claim("worker-1") is None
+
+
+def test_expired_lease_on_the_last_attempt_fails_the_job(queue):
+    job_id = queue.enqueue("report_1", "uploads/a.txt", "a.txt")
+    queue.claim("worker-1", lease_seconds=0.01)
+    expire_lease()
+    queue.claim("worker-2", lease_seconds=0.01)
+    expire_lease()
+
+    assert queue.claim("worker-3") is None
+    job = queue.get(job_id)
+    assert (job["status"], job["attempts"], job["lease_owner"]) == ("failed", 2, None)
+
+
+def test_unknown_priority_is_rejected(queue):
+    with pytest.raises(ValueError):
+        queue.enqueue("report_1", "uploads/a.txt", "a.txt", priority="urgent")
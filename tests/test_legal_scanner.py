@@ -0,0 +1,39 @@
+from legal_scanner import LegalScanner
+
+DOCUMENT = (
+    "Title Report\n"
+    "There is no pending litigation.\n"
+    "A utility easement runs along the north line.\n"
+    "The Phase I found a Flood Zone AE and Case No. 2023-CV-114.\n"
+    "The tenant's alienation clause and the uneasement are not issues.\n"
+)
+
+
+def test_terms_and_patterns_are_found_with_their_line():
+    hits, stats = LegalScanner({}).scan(DOCUMENT)
+    found = [(hit["category"], hit["term"], hit["line"]) for hit in hits]
+    assert found == [
+        ("litigation", "pending litigation", 2),
+        ("easements", "utility easement", 3),
+        ("environmental", "phase i", 4),
+        ("environmental", "flood zone ae", 4),
+        ("litigation", "case no. 2023-cv-114", 4),
+    ]
+    assert stats["hits_by_category"] == {"litigation": 2, "environmental": 2, "easements": 1}
+
+
+def test_negated_mentions_are_flagged():
+    hits, stats = LegalScanner({}).scan(DOCUMENT)
+    assert [hit["term"] for hit in hits if hit["negated"]] == ["pending litigation"]
+    assert stats["negated_hits"] == 1
+
+
+def test_extra_categories_extend_the_dictionary():
+    scanner = LegalScanner({"terms": {"tax": {"severity": "low", "terms": ["tax abatement"]}}})
+    hits, _ = scanner.scan("The property benefits from a TAX  ABATEMENT until 2030.")
+    assert [(hit["category"], hit["severity"], hit["term"]) for hit in hits] == [("tax", "low", "tax abatement")]
+
+
+def test_disabled_scanner_finds_nothing():
+    hits, stats = LegalScanner({"enabled": "false"}).scan(DOCUMENT)
+    assert hits == [] and stats["hits"] == 0
@@ -0,0 +1,62 @@
+import os
+import threading
+import time
+
+import pytest
+
+from market_data import MarketDataStore, MarketDataSnapshot, _parse_metric_column, period_key
+
+
+def test_percent_scale_is_decided_per_column():
+    assert _parse_metric_column("rent_growth", ["5.2", "1.0", "0.8"]) == pytest.approx([0.052, 0.01, 0.008])
+    assert _parse_metric_column("cap_rate", ["0.055", "0.06"]) == pytest.approx([0.055, 0.06])
+    assert _parse_metric_column("vacancy_rate", ["0.8%", "0.05"]) == pytest.approx([0.008, 0.05])
+
+
+def test_non_percent_metrics_keep_their_value():
+    assert _parse_metric_column("asking_rent", ["$58.40", "(45,000)", ""])[:2] == [58.4, -45000.0]
+
+
+def test_periods_sort_chronologically():
+    labels = ["Q4 2023", "Q1 2024", "2023-06", "Mar 2023"]
+    assert sorted(labels, key=period_key) == ["Mar 2023", "2023-06", "Q4 2023", "Q1 2024"]
+    assert period_key("2024Q1") == period_key("1Q24") == period_key("Q1 2024")
+
+
+def test_lookup_returns_newest_period_first(tmp_path):
+    (tmp_path / "austin.csv").write_text(
+        "msa,submarket,asset_class,period,asking_rent,vacancy_rate\n"
+        "\"Austin-Round Rock, TX\",Downtown,multifamily,Q4 2023,1800,5.5\n"
+        "\"Austin-Round Rock, TX\",Downtown,multifamily,Q1 2024,1850,6.0\n"
+        "\"Austin-Round Rock, TX\",Downtown,multifamily,Q3 2023,1790,5.1\n"
+    )
+    store = MarketDataStore(str(tmp_path), reload_seconds=0)
+    result = store.lookup(msa="Austin-Round Rock, Texas", submarket="Downtown", asset_class="multifamily")
+    assert [row["period"] for row in result["submarket_rows"]] == ["Q1 2024", "Q4 2023", "Q3 2023"]
+    assert result["submarket_rows"][0]["vacancy_rate"] == pytest.approx(0.06)
+
+
+def test_empty_snapshot():
+    snapshot = MarketDataSnapshot([])
+    assert snapshot.size == 0
+
+
+def test_concurrent_first_snapshots_start_one_watcher(tmp_path, monkeypatch):
+    store = MarketDataStore(str(tmp_path), reload_seconds=3600)
+    store.reload()
+    getpid = os.getpid
+
+    def slow_getpid():
+        # Widens the window between checking for a watcher and recording it
+        time.sleep(0.01)
+        return getpid()
+
+    monkeypatch.setattr(os, "getpid", slow_getpid)
+    started = []
+    monkeypatch.setattr(store, "_watch", lambda: started.append(threading.current_thread().name))
+    threads = [threading.Thread(target=store.snapshot) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(2)
+    assert started == ["market-data-reload"]
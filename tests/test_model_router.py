@@ -0,0 +1,94 @@
+import json
+import threading
+import types
+
+import pytest
+
+from fair_scheduler import FairShareScheduler
+from model_router import ModelRouter
+
+GOOD = "The property is a stabilised multifamily asset. " * 20
+
+
+class FakeClient:
+    """Answers chat completions with the scripted texts in order and records the model of each call"""
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.models = []
+        self.timeout = None
+        self.chat = types.SimpleNamespace(completions=types.SimpleNamespace(create=self.create))
+
+    def create(self, model=None, messages=None, temperature=None, **kwargs):
+        self.models.append(model)
+        self.timeout = kwargs.get("timeout")
+        text, finish_reason = self.answers.pop(0)
+        return types.SimpleNamespace(
+            choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=text), finish_reason=finish_reason)],
+            usage=types.SimpleNamespace(prompt_tokens=500, completion_tokens=len(text) // 4),
+        )
+
+
+@pytest.fixture
+def router(tmp_path):
+    return ModelRouter({"tiers": ["small", "medium", "large"], "usage_log": str(tmp_path / "model_usage.jsonl")})
+
+
+def test_models_are_chosen_by_agent_and_prompt_size():
+    router = ModelRouter({"tiers": "small,large", "agents": {"LEGAL": "pinned"}, "usage_log": None})
+    assert router.select_model("market", 1000) == ("small", 0)
+    assert router.select_model("orchestrator", 1000) == ("large", 1)
+    assert router.select_model("market", 50000) == ("large", 1)
+    assert router.select_model("legal", 1000) == ("pinned", None)
+
+
+def test_failed_answers_escalate_one_tier_at_a_time(router, tmp_path):
+    client = FakeClient(("Too short.", "stop"), ("I'm sorry, I cannot help with that. " * 20, "stop"), (GOOD, "stop"))
+    assert router.complete(client, "market", "You are a market analyst.", "Analyze:") == GOOD
+    assert client.models == ["small", "medium", "large"]
+
+    with open(tmp_path / "model_usage.jsonl") as f:
+        logged = [json.loads(line) for line in f]
+    assert [(entry["model"], entry["passed_quality_check"], entry["escalated"]) for entry in logged] == [
+        ("small", False, True), ("medium", False, True), ("large", True, False)
+    ]
+    summary = router.summary()
+    assert {model: totals["calls"] for model, totals in summary["per_model"].items()} == {"small": 1, "medium": 1, "large": 1}
+    assert summary["per_model"]["small"]["escalations"] == 1
+
+
+def test_truncated_answer_on_the_top_tier_is_returned(router):
+    client = FakeClient((GOOD, "length"))
+    assert router.complete(client, "orchestrator", "You are the orchestrator.", "Synthesize:") == GOOD
+    assert client.models == ["large"]
+
+
+def test_pinned_model_outside_the_tiers_is_not_escalated(tmp_path):
+    router = ModelRouter({"tiers": ["small", "large"], "agents": {"legal": "custom"}, "usage_log": None})
+    client = FakeClient(("Too short.", "stop"))
+    assert router.complete(client, "legal", "You are a lawyer.", "Review:") == "Too short."
+    assert client.models == ["custom"]
+
+
+def test_only_registered_agents_can_be_pinned_from_the_environment(monkeypatch):
+    monkeypatch.setenv("MODEL_LEGAL", "gpt-4o")
+    monkeypatch.setenv("MODEL_ORCHESTRATOR", "o1")
+    monkeypatch.setenv("MODEL_NAME", "unrelated")
+    router = ModelRouter()
+    assert router.agent_models == {"legal": "gpt-4o", "orchestrator": "o1"}
+
+
+def test_timeout_covers_the_slot_wait_and_the_api_call():
+    scheduler = FairShareScheduler(max_concurrency=1, tenant_weights={})
+    router = ModelRouter({"usage_log": None}, scheduler=scheduler)
+    scheduler.acquire("other")
+    threading.Timer(0.3, scheduler.release, ("other",)).start()
+    client = FakeClient((GOOD, "stop"))
+    assert router.complete(client, "market", "You are a market analyst.", "Analyze:", timeout=1.0) == GOOD
+    assert client.timeout <= 0.75
+
+    scheduler.acquire("other")
+    with pytest.raises(TimeoutError):
+        router.complete(client, "market", "You are a market analyst.", "Analyze:", timeout=0.1)
+    scheduler.release("other")
+    assert client.models == ["gpt-4o-mini"]
@@ -0,0 +1,49 @@
+from portfolio_compare import deal_metrics, rank_deals
+
+
+def row(report_id, **metrics):
+    return {"report_id": report_id, **metrics}
+
+
+def test_deals_are_ranked_by_mean_percentile():
+    ranked = rank_deals([
+        row("report_a", cap_rate=0.05, ltv=0.70),
+        row("report_b", cap_rate=0.07, ltv=0.60),
+        row("report_c", cap_rate=0.06, ltv=0.65),
+    ])
+    assert [entry["report_id"] for entry in ranked] == ["report_b", "report_c", "report_a"]
+    assert [entry["score"] for entry in ranked] == [1.0, 0.5, 0.0]
+    assert [entry["rank"] for entry in ranked] == [1, 2, 3]
+
+
+def test_ties_share_the_average_percentile():
+    ranked = rank_deals([row("report_a", cap_rate=0.06), row("report_b", cap_rate=0.06), row("report_c", cap_rate=0.05)])
+    assert [entry["score"] for entry in ranked] == [0.75, 0.75, 0.0]
+    # Equal scores are ordered by report id so the ranking is deterministic
+    assert [entry["report_id"] for entry in ranked] == ["report_a", "report_b", "report_c"]
+
+
+def test_missing_metrics_are_not_penalised():
+    ranked = rank_deals([
+        row("report_a", cap_rate=0.07, irr=None),
+        row("report_b", cap_rate=0.05, irr=0.12),
+        row("report_c", cap_rate=0.06, irr=0.18),
+        row("report_d"),
+    ])
+    by_id = {entry["report_id"]: entry for entry in ranked}
+    assert (by_id["report_a"]["score"], by_id["report_a"]["coverage"]) == (1.0, 1)
+    assert (by_id["report_d"]["score"], by_id["report_d"]["coverage"], by_id["report_d"]["rank"]) == (None, 0, 4)
+
+
+def test_deal_metrics_derives_ratios_and_missing_agents():
+    metrics = deal_metrics({
+        "report_id": "report_a",
+        "deal_facts": {"noi": 600000, "loan_amount": 6000000, "operating_expenses": 400000, "gross_income": 1000000,
+                       "city": "Austin", "state": "TX"},
+        "agent_status": {"financial_modeling": "completed", "legal": "timed_out"},
+        "partial": True,
+    })
+    assert metrics["debt_yield"] == 0.1
+    assert metrics["expense_ratio"] == 0.4
+    assert metrics["location"] == "Austin, TX"
+    assert metrics["missing_agents"] == ["legal"]
@@ -0,0 +1,18 @@
+import os
+
+import pytest
+
+
+@pytest.fixture
+def client(web):
+    return web.app.test_client()
+
+
+def test_only_report_files_are_served(web, client):
+    for name in ("report_20250101_120000_legal.txt", "comparison_20250101_120000_0a1b2c3d.txt", "notes.txt"):
+        with open(os.path.join(web.app.config['REPORTS_FOLDER'], name), 'w') as f:
+            f.write("Sunset Plaza")
+    assert client.get("/reports/report_20250101_120000_legal.txt").status_code == 200
+    assert client.get("/reports/comparison_20250101_120000_0a1b2c3d.txt").status_code == 200
+    assert client.get("/reports/notes.txt").status_code == 404
+    assert client.get("/reports/search_index.db").status_code == 404
@@ -0,0 +1,198 @@
+import io
+import threading
+import time
+import uuid
+
+import pytest
+
+from request_dedup import IdempotencyConflict, IdempotencyStore, SingleFlight
+
+
+def test_concurrent_calls_with_the_same_key_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def analyze():
+        calls.append(1)
+        release.wait(2)
+        return {"status": "success"}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("deal", analyze))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(2)
+
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert all(result == {"status": "success"} for result, _ in results)
+    # A call after the execution finished runs again
+    assert flight.do("deal", lambda: "fresh") == ("fresh", False)
+
+
+def test_waiters_receive_the_leaders_error():
+    flight = SingleFlight()
+    started = threading.Event()
+    errors = []
+
+    def failing():
+        started.set()
+        time.sleep(0.1)
+        raise RuntimeError("extraction failed")
+
+    def call():
+        try:
+            flight.do("deal", failing)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(1)
+    call()
+    leader.join(1)
+    assert errors == ["extraction failed", "extraction failed"]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return IdempotencyStore(str(tmp_path / "idempotency.db"))
+
+
+def test_completed_key_replays_the_stored_response(store):
+    assert store.claim("key-1", "sha-a") is None
+    store.complete("key-1", 200, {"report_id": "report_1"})
+    assert store.claim("key-1", "sha-a") == (200, {"report_id": "report_1"})
+
+
+def test_key_reused_for_another_document_is_a_conflict(store):
+    store.claim("key-1", "sha-a")
+    store.complete("key-1", 200, {})
+    with pytest.raises(IdempotencyConflict):
+        store.claim("key-1", "sha-b")
+
+
+def test_released_key_runs_again(store):
+    store.claim("key-1", "sha-a")
+    store.release("key-1")
+    assert store.claim("key-1", "sha-a") is None
+
+
+def test_retry_waits_for_the_running_request(store):
+    store.claim("key-1", "sha-a")
+    threading.Timer(0.2, store.complete, ("key-1", 200, {"report_id": "report_1"})).start()
+    assert store.wait_for("key-1", "sha-a", timeout=2, poll_interval=0.05) == (200, {"report_id": "report_1"})
+    store.claim("key-2", "sha-a")
+    with pytest.raises(TimeoutError):
+        store.wait_for("key-2", "sha-a", timeout=0.2, poll_interval=0.05)
+
+
+
+def test_one_waiter_takes_over_a_stale_claim(tmp_path):
+    store = IdempotencyStore(str(tmp_path / "idempotency.db"), stale_seconds=0.1)
+    store.claim("key-1", "sha-a")
+    time.sleep(0.15)
+    results = []
+
+    def retry():
+        stored = store.claim("key-1", "sha-a", timeout=3)
+        if stored is None:
+            store.complete("key-1", 200, {"report_id": "report_2"})
+        results.append(stored)
+
+    threads = [threading.Thread(target=retry) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert results.count(None) == 1
+    assert results.count((200, {"report_id": "report_2"})) == 4
+
+
+class StubAnalysis:
+    """Stands in for app.run_analysis: counts runs and holds each run until released"""
+
+    def __init__(self):
+        self.runs = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, *args, **kwargs):
+        self.runs += 1
+        self.started.set()
+        self.release.wait(2)
+        return {"status": "success", "report_id": f"report_{self.runs}"}
+
+
+@pytest.fixture
+def client(web, monkeypatch):
+    stub = StubAnalysis()
+    monkeypatch.setattr(web, "run_analysis", stub)
+    monkeypatch.setattr(web, "analysis_flights", SingleFlight())
+    client = web.app.test_client()
+    client.stub = stub
+    return client
+
+
+def post(client, content=b"Sunset Plaza, 120 units", headers=None):
+    return client.post("/analyze", data={"file": (io.BytesIO(content), "deal.txt")}, headers=headers or {})
+
+
+def test_duplicate_submission_joins_the_running_analysis(client):
+    client.stub.release.clear()
+    replies = []
+    first = threading.Thread(target=lambda: replies.append(post(client)))
+    first.start()
+    client.stub.started.wait(2)
+    second = threading.Thread(target=lambda: replies.append(post(client)))
+    second.start()
+    time.sleep(0.2)
+    client.stub.release.set()
+    first.join(2)
+    second.join(2)
+
+    assert client.stub.runs == 1
+    assert {reply.get_json()["report_id"] for reply in replies} == {"report_1"}
+    assert sorted(reply.headers.get("X-Coalesced", "") for reply in replies) == ["", "true"]
+
+
+def test_idempotency_key_replays_the_first_response(client):
+    key = {"Idempotency-Key": uuid.uuid4().hex}
+    assert post(client, headers=key).status_code == 200
+    replay = post(client, headers=key)
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert replay.get_json()["report_id"] == "report_1"
+    assert client.stub.runs == 1
+    assert post(client, b"Another deal", headers=key).status_code == 422
+
+
+def test_tenants_do_not_share_runs_or_idempotency_keys(client):
+    key = uuid.uuid4().hex
+    first = post(client, headers={"Idempotency-Key": key, "X-Tenant-ID": "research"})
+    second = post(client, headers={"Idempotency-Key": key, "X-Tenant-ID": "acquisitions"})
+    assert "Idempotent-Replayed" not in second.headers
+    assert (first.get_json()["report_id"], second.get_json()["report_id"]) == ("report_1", "report_2")
+    assert post(client, b"Another deal", headers={"Idempotency-Key": key, "X-Tenant-ID": "acquisitions"}).status_code == 422
+
+
+def test_retry_gets_409_when_the_original_outlasts_its_wait(web, client, monkeypatch):
+    monkeypatch.setattr(web, "IDEMPOTENCY_WAIT_SECONDS", 0.3)
+    key = {"Idempotency-Key": uuid.uuid4().hex}
+    client.stub.release.clear()
+    first = threading.Thread(target=post, args=(client,), kwargs={"headers": key})
+    first.start()
+    client.stub.started.wait(2)
+    retry = post(client, headers=key)
+    client.stub.release.set()
+    first.join(2)
+
+    assert retry.status_code == 409
+    assert retry.get_json()["status"] == "in_progress"
+    assert "Retry-After" in retry.headers
+    assert client.stub.runs == 1
+    assert post(client, headers=key).headers["Idempotent-Replayed"] == "true"
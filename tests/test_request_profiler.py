@@ -0,0 +1,98 @@
+import io
+import os
+import threading
+import time
+
+import pytest
+
+from request_dedup import SingleFlight
+from request_profiler import ProfileStore, SamplingProfiler, categorize, render_flamegraph
+
+ADMIN = {"X-Admin-Token": "secret"}
+
+
+def wait_on_agent(seconds):
+    time.sleep(seconds)
+
+
+def test_request_and_agent_threads_are_sampled():
+    with SamplingProfiler(interval=0.005) as profiler:
+        agent = threading.Thread(target=wait_on_agent, args=(0.1,), name="agent_1")
+        agent.start()
+        agent.join()
+    assert profiler.samples >= 5
+    assert {"request", "agent"} <= set(profiler.summary()["threads"])
+    agent_stacks = [stack for (label, stack) in profiler.stacks if label == "agent"]
+    assert any(stack and stack[0].endswith(":wait_on_agent") for stack in agent_stacks)
+    assert "request;" in profiler.folded()
+
+
+def test_stacks_are_categorised_by_their_first_matching_rule():
+    assert categorize(("app:analyze_deal", "fair_scheduler:FairShareScheduler.acquire", "threading:Condition.wait")) == "llm_slot_wait"
+    assert categorize(("app:analyze_deal", "openai._client:create", "json:loads")) == "network"
+    assert categorize(("app:save_reports", "builtins:open")) == "file_io"
+    assert categorize(("app:analyze_deal",)) == "python"
+
+
+def test_flamegraph_escapes_frame_names():
+    svg = render_flamegraph({("request", ("app:<lambda>",)): [0.5, 0.1]}, title="Deal & profile")
+    assert svg.startswith("<svg")
+    assert "app:&lt;lambda&gt;" in svg
+    assert "Deal &amp; profile" in svg
+
+
+def test_store_keeps_the_newest_profiles(tmp_path):
+    store = ProfileStore(str(tmp_path), keep=2)
+    ids = []
+    for _ in range(3):
+        with SamplingProfiler(interval=0.005) as profiler:
+            time.sleep(0.01)
+        ids.append(store.save(profiler, {"path": "/analyze", "status": 200}))
+    assert [profile["id"] for profile in store.list()] == sorted(ids, reverse=True)[:2]
+    newest = store.list()[0]["id"]
+    assert store.get(newest)["status"] == 200
+    assert store.path(newest, "flamegraph.svg").endswith("flamegraph.svg")
+    assert store.path(newest, "../../app.py") is None
+    assert store.path("../" + newest, "profile.json") is None
+
+
+@pytest.fixture
+def client(web, tmp_path, monkeypatch):
+    monkeypatch.setattr(web, "ADMIN_TOKEN", "secret")
+    monkeypatch.setattr(web, "PROFILE_REQUESTS", False)
+    monkeypatch.setattr(web, "profile_store", ProfileStore(str(tmp_path / "profiles")))
+    monkeypatch.setattr(web, "analysis_flights", SingleFlight())
+    monkeypatch.setattr(web, "run_analysis", lambda *args, **kwargs: {"status": "success", "report_id": "report_1"})
+    return web.app.test_client()
+
+
+def post(client, headers):
+    data = {"file": (io.BytesIO(os.urandom(16).hex().encode()), "deal.txt")}
+    return client.post("/analyze", data=data, headers=headers)
+
+
+def test_profiled_request_saves_a_profile_for_admins(client):
+    reply = post(client, {"X-Profile": "true", **ADMIN})
+    assert reply.status_code == 200
+    profile_id = reply.headers["X-Profile-ID"]
+
+    listing = client.get("/admin/profiles", headers=ADMIN).get_json()
+    assert [profile["id"] for profile in listing["profiles"]] == [profile_id]
+    profile = client.get(f"/admin/profiles/{profile_id}", headers=ADMIN).get_json()
+    assert profile["path"] == "/analyze"
+    assert profile["report_id"] == "report_1"
+    assert client.get(f"/admin/profiles/{profile_id}/flamegraph.svg", headers=ADMIN).mimetype == "image/svg+xml"
+
+
+def test_profiling_and_admin_endpoints_require_the_token(client):
+    assert "X-Profile-ID" not in post(client, {"X-Profile": "true"}).headers
+    assert "X-Profile-ID" not in post(client, {"X-Profile": "true", "X-Admin-Token": "wrong"}).headers
+    assert client.get("/admin/profiles").status_code == 403
+    assert client.get("/admin/profiles", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert client.get("/admin/profiles/profile_20250101_000000_abcdef", headers=ADMIN).status_code == 404
+
+
+def test_admin_token_is_not_accepted_in_the_url(client):
+    assert "X-Profile-ID" not in client.post("/analyze?token=secret", data={
+        "file": (io.BytesIO(b"Sunset Plaza"), "deal.txt")}, headers={"X-Profile": "true"}).headers
+    assert client.get("/admin/profiles?token=secret").status_code == 403
@@ -0,0 +1,63 @@
+import pytest
+
+from search_index import ReportSearchIndex
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = ReportSearchIndex(str(tmp_path / "search_index.db"))
+    index.index_reports("report_20250110_090000", {
+        "legal": "The title report shows a utility easement along the northern boundary.",
+        "financial": "NOI of $1.2M supports the asking price at a 5.5% cap rate.",
+    })
+    index.index_reports("report_20250301_140000", {
+        "legal": "An access easement and an easement for drainage burden the parcel.",
+        "market": "Rents in the submarket grew 3% last year.",
+        "orchestrator": "Proceed to a letter of intent.",
+    })
+    return index
+
+
+def test_results_are_ranked_with_highlighted_snippets(index):
+    results = index.search("easement")
+    assert [result["report_id"] for result in results] == ["report_20250301_140000", "report_20250110_090000"]
+    assert "[easement]" in results[0]["snippet"]
+    assert results[0]["score"] > results[1]["score"]
+
+
+def test_results_are_filtered_by_agent_and_date(index):
+    assert index.search("cap rate", agent="legal") == []
+    assert [result["agent"] for result in index.search("cap rate", agent=["legal", "financial"])] == ["financial"]
+    assert [result["report_id"] for result in index.search("easement", since="2025-02-01")] == ["report_20250301_140000"]
+    assert [result["report_id"] for result in index.search("easement", until="2025-01-10")] == ["report_20250110_090000"]
+
+
+def test_reindexing_a_document_replaces_it(index):
+    index.index_document("report_20250110_090000", "legal", "No encumbrances were found.")
+    assert [result["report_id"] for result in index.search("easement")] == ["report_20250301_140000"]
+    assert len(index.search("encumbrances")) == 1
+
+
+def test_query_syntax_in_user_input_is_treated_as_text(index):
+    assert [result["agent"] for result in index.search('easement" -drainage*')] == ["legal"]
+    assert index.search("***") == []
+
+
+def test_report_files_are_indexed_once(index, tmp_path):
+    reports = tmp_path / "reports"
+    reports.mkdir()
+    (reports / "report_20250401_100000_market.txt").write_text("Vacancy in the submarket is 4%.")
+    (reports / "notes.txt").write_text("Vacancy notes that are not a report.")
+    assert index.index_reports_folder(str(reports)) == 1
+    assert index.index_reports_folder(str(reports)) == 0
+    assert [result["agent"] for result in index.search("vacancy")] == ["market"]
+
+
+def test_search_endpoint_validates_and_clamps_the_limit(web, index, monkeypatch):
+    monkeypatch.setattr(web, "search_index", index)
+    client = web.app.test_client()
+    invalid = client.get("/search?q=easement&limit=abc")
+    assert invalid.status_code == 400
+    assert "limit" in invalid.get_json()["error"]
+    assert client.get("/search?q=easement&limit=-5").get_json()["count"] == 1
+    assert client.get("/search?q=easement&limit=500").get_json()["count"] == 2
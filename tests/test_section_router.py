@@ -0,0 +1,58 @@
+import time
+
+from agent_registry import AGENT_SPECS
+from section_router import SectionRouter, classify_section, segment_sections
+
+
+def section(heading, text, position=3):
+    return {"heading": heading, "text": text, "position": position}
+
+
+def test_keywords_match_whole_words():
+    assert classify_section(section("Release Notes", "The syntax of the release was updated.")) == []
+
+
+def test_plurals_and_word_forms_match():
+    assert classify_section(section("Rent Roll", "Tenants and leases expire in 2027."))[0] == "tenancy"
+    assert "capital" in classify_section(section("Debt", "Refinancing risk; the loan is refinanced in 2027."))
+
+
+def test_first_section_is_overview():
+    assert "overview" in classify_section(section(None, "Sunset Plaza is offered for sale.", position=0))
+
+
+def test_segment_sections_splits_at_headings():
+    text = "Sunset Plaza is offered for sale.\n\nFINANCIAL SUMMARY\nNOI: $1,000,000\n\n## Market Overview\nAustin is growing."
+    sections = segment_sections(text)
+    assert [entry["heading"] for entry in sections] == [None, "FINANCIAL SUMMARY", "Market Overview"]
+    assert [entry["position"] for entry in sections] == [0, 1, 2]
+
+
+def build_deal(sections):
+    parts = ["Sunset Plaza is offered for sale. NOI: $1,000,000"]
+    for number in range(sections):
+        if number % 3 == 0:
+            parts.append(f"RENT ROLL {number}\nTenants and leases: unit {number} is leased at $1,450, lease expiration 2027.")
+        elif number % 3 == 1:
+            parts.append(f"NET OPERATING INCOME {number}\nNOI and operating expenses for year {number}; cap rate 6.1%.")
+        else:
+            parts.append(f"TITLE AND ZONING {number}\nThe title commitment lists an easement and a zoning permit.")
+    return "\n\n".join(parts)
+
+
+def test_real_estate_excerpt_includes_the_rent_roll_and_noi():
+    documents, stats = SectionRouter({"min_tokens": 0}).route(build_deal(6), {}, AGENT_SPECS)
+    excerpt = documents["real_estate"]
+    assert "RENT ROLL 3" in excerpt
+    assert "NET OPERATING INCOME 4" in excerpt
+    assert "TITLE AND ZONING 5" not in excerpt.split("RELEVANT SECTIONS")[1]
+    assert stats["agents"]["real_estate"]["sections_omitted"] == 2
+
+
+def test_thousands_of_sections_are_routed_quickly():
+    deal = build_deal(20000)
+    start = time.perf_counter()
+    documents, stats = SectionRouter({"min_tokens": 0}).route(deal, {}, AGENT_SPECS)
+    assert time.perf_counter() - start < 10
+    assert len(stats["sections"]) == 20001
+    assert stats["agents"]["legal"]["sections_sent"] + stats["agents"]["legal"]["sections_omitted"] == 20001
@@ -0,0 +1,31 @@
+from spreadsheet_ingest import summarize_rows, _to_float
+
+
+def rent_roll(statuses):
+    rows = [["Unit", "Unit Type", "SF", "Status", "Market Rent", "Current Rent", "Lease End"]]
+    for index, status in enumerate(statuses):
+        rows.append([f"{101 + index}", "1BR", "750", status, "1500", "1450" if status != "Vacant" else "", "2026-06-30"])
+    return rows
+
+
+def test_notice_units_count_as_occupied():
+    summary = summarize_rows(rent_roll(["Occupied", "Occupied - Notice", "Vacant"]), "roll.csv")
+    assert "66.7% (2 of 3 units occupied)" in summary
+
+
+def test_statuses_match_whole_words():
+    summary = summarize_rows(rent_roll(["Occupied", "NTV", "Vacant - Down", "Unoccupied", "Downtown Lease"]), "roll.csv")
+    assert "60.0% (3 of 5 units occupied)" in summary
+
+
+def test_totals_rows_are_not_units():
+    rows = rent_roll(["Occupied", "Occupied"]) + [["Total", "", "1500", "", "3000", "2900", ""]]
+    summary = summarize_rows(rows, "roll.csv")
+    assert "2 units" in summary
+
+
+def test_to_float_formats():
+    assert _to_float("$1,450.00") == 1450.0
+    assert _to_float("(2,300)") == -2300.0
+    assert _to_float(12) == 12.0
+    assert _to_float("n/a") != _to_float("n/a")
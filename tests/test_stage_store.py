@@ -0,0 +1,89 @@
+import os
+import types
+
+import pytest
+
+from stage_store import StageStore
+
+EXAMPLE_DEAL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "example_deal.txt")
+LEGAL_PROMPT = "You are a specialized real estate legal"
+
+
+class CountingClient:
+    """Answers every chat completion at once and counts the legal agent's calls apart from the others"""
+
+    def __init__(self):
+        self.legal_calls = 0
+        self.other_calls = 0
+        self.chat = types.SimpleNamespace(completions=types.SimpleNamespace(create=self.create))
+
+    def create(self, model=None, messages=None, temperature=None, **kwargs):
+        if messages[0]["content"].startswith(LEGAL_PROMPT):
+            self.legal_calls += 1
+            text = f"Legal review {self.legal_calls}. " + "No material title exceptions. " * 20
+        else:
+            self.other_calls += 1
+            text = f"Report from {model}. " + "The deal is analysed in detail. " * 20
+        return types.SimpleNamespace(
+            choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=text), finish_reason="stop")],
+            usage=types.SimpleNamespace(prompt_tokens=1000, completion_tokens=len(text) // 4),
+        )
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    from investment_pipeline import InvestmentAnalysisPipeline
+    pipeline = InvestmentAnalysisPipeline()
+    pipeline.client = CountingClient()
+    return pipeline
+
+
+def test_rerun_executes_only_the_selected_stage(tmp_path, pipeline):
+    store = StageStore(str(tmp_path / "stages.db"))
+    assert store.save("report_20250101_120000", pipeline.analyze(EXAMPLE_DEAL)) == 0
+    client = pipeline.client
+    assert client.legal_calls == 1
+    calls_before = client.other_calls
+
+    stored = store.load("report_20250101_120000")
+    assert stored["stage_inputs"]["legal"]["system_prompt"].startswith(LEGAL_PROMPT)
+    results = pipeline.rerun(stored, stages=["legal"], use_cache=False)
+    assert client.legal_calls == 2
+    assert client.other_calls == calls_before
+    assert results["legal_report"].startswith("Legal review 2")
+    assert results["agent_status"]["legal"] == "completed"
+    assert results["agent_status"]["real_estate"] == "reused"
+    assert results["rerun"]["stages"] == ["legal"]
+    assert "orchestrator" in results["rerun"]["stale"]
+
+    assert store.save("report_20250101_120000", results) == 1
+    assert [run["run"] for run in store.runs("report_20250101_120000", "legal")] == [0, 1]
+    assert [run["run"] for run in store.runs("report_20250101_120000", "real_estate")] == [0]
+    assert store.stage_run("report_20250101_120000", "legal", run=0)["output"].startswith("Legal review 1")
+    assert store.load("report_20250101_120000")["legal_report"].startswith("Legal review 2")
+
+
+def test_late_output_replaces_the_timed_out_placeholder(tmp_path, pipeline):
+    store = StageStore(str(tmp_path / "stages.db"))
+    results = pipeline.analyze(EXAMPLE_DEAL)
+    results["agent_status"]["legal"] = "timed_out"
+    results["legal_report"] = "TIMED OUT"
+    store.save("report_20250101_120000", results)
+
+    assert store.record_late_output("report_20250101_120000", "legal", "Legal review finished late")
+    assert not store.record_late_output("report_20250102_120000", "legal", "Unknown analysis")
+    stored = store.load("report_20250101_120000")
+    assert stored["legal_report"] == "Legal review finished late"
+    assert stored["agent_status"]["legal"] == "completed"
+    assert store.stage_run("report_20250101_120000", "legal")["status"] == "completed"
+
+
+def test_report_ids_are_listed_from_a_date(tmp_path):
+    store = StageStore(str(tmp_path / "stages.db"))
+    for report_id in ("report_20250101_120000", "report_20250301_120000"):
+        store.save(report_id, {"stage_context": {"deal_content": "deal"}, "deal_content": "deal", "agents": []})
+    assert store.report_ids() == ["report_20250101_120000", "report_20250301_120000"]
+    assert store.report_ids(since="2025-02-01") == ["report_20250301_120000"]
+    assert store.save("report_20250401_120000", {"status": "screened_out"}) is None
@@ -0,0 +1,45 @@
+from text_normalizer import TextNormalizer, PAGE_BREAK
+
+
+def normalize(text):
+    return TextNormalizer({}).normalize(text)
+
+
+def test_numeric_table_survives():
+    rent_roll = "Unit\nRent\n101\n1450\n102\n1500\nYear Built\n2018\nTotal Units\n120"
+    text, stats = normalize(rent_roll)
+    assert text.split("\n") == rent_roll.split("\n")
+    assert stats["page_numbers_removed"] == 0
+
+
+def test_numeric_table_survives_across_pages():
+    page = "RENT ROLL\nUnit\nRent\n101\n1450\n102\n1500\nTotal Units\n120\nSummary follows"
+    text, _ = normalize(PAGE_BREAK.join([page] * 4))
+    assert text.count("1450") == 4
+    assert text.count("120") == 4
+
+
+def test_page_furniture_is_removed():
+    pages = []
+    for number in range(1, 5):
+        body = "\n".join(f"Paragraph {line} of section {number} describes the property." for line in range(8))
+        pages.append(f"Sunset Plaza Offering Memorandum\nPage {number} of 4\n{body}\n{number}")
+    text, stats = normalize(PAGE_BREAK.join(pages))
+    assert "Sunset Plaza Offering Memorandum" not in text
+    assert "Page 2 of 4" not in text
+    assert "Paragraph 4 of section 3 describes the property." in text
+    assert not any(line.strip().isdigit() for line in text.split("\n"))
+    assert stats["page_numbers_removed"] == 4
+
+
+def test_hyphenation_and_boilerplate():
+    text, stats = normalize("The prop-\nerty is leased.\n\nThis page intentionally left blank")
+    assert text == "The property is leased."
+    assert stats["hyphenations_joined"] == 1
+    assert stats["boilerplate_paragraphs_removed"] == 1
+
+
+def test_compound_words_keep_their_hyphen_across_a_line_break():
+    text, stats = normalize("The owner-\noccupied building is on a triple-\nnet lease-\nhold; the ten-\nant has an option.")
+    assert text == "The owner-occupied building is on a triple-net leasehold; the tenant has an option."
+    assert stats["hyphenations_joined"] == 2
@@ -0,0 +1,77 @@
+import hashlib
+import io
+import os
+
+import pytest
+
+from upload_sessions import UploadSessionStore, UploadSessionNotFound, UploadError
+
+DATA = bytes(range(256)) * 10
+
+
+@pytest.fixture
+def store(tmp_path):
+    return UploadSessionStore(str(tmp_path / "uploads.db"), str(tmp_path / "sessions"), chunk_size=1000)
+
+
+def send(store, upload_id, index, sha256=True):
+    chunk = DATA[index * 1000:(index + 1) * 1000]
+    return store.write_chunk(upload_id, index, io.BytesIO(chunk), hashlib.sha256(chunk).hexdigest() if sha256 else None)
+
+
+def test_chunks_in_any_order_assemble_to_the_file(store):
+    session = store.create("deal.pdf", len(DATA), hashlib.sha256(DATA).hexdigest())
+    assert session["total_chunks"] == 3
+    for index in (2, 0, 1):
+        send(store, session["id"], index)
+    path, sha256 = store.assemble(session["id"])
+    with open(path, 'rb') as f:
+        assert f.read() == DATA
+    assert sha256 == hashlib.sha256(DATA).hexdigest()
+    assert store.assemble(session["id"]) == (path, sha256)
+
+
+def test_missing_chunks_are_reported_for_resuming(store):
+    session = store.create("deal.pdf", len(DATA))
+    send(store, session["id"], 1)
+    session = store.get(session["id"])
+    assert (session["received_chunks"], session["missing_chunks"]) == ([1], [0, 2])
+    with pytest.raises(UploadError):
+        store.assemble(session["id"])
+
+
+def test_bad_chunks_are_rejected(store):
+    session = store.create("deal.pdf", len(DATA))
+    with pytest.raises(UploadError):
+        store.write_chunk(session["id"], 0, io.BytesIO(DATA[:1000]), "0" * 64)
+    with pytest.raises(UploadError):
+        store.write_chunk(session["id"], 2, io.BytesIO(DATA[:1000]))
+    with pytest.raises(UploadError):
+        store.write_chunk(session["id"], 3, io.BytesIO(b""))
+    assert store.get(session["id"])["received_chunks"] == []
+
+
+def test_sessions_are_scoped_to_their_tenant(store):
+    session = store.create("deal.pdf", len(DATA), tenant="research")
+    assert store.get(session["id"], tenant="research")["id"] == session["id"]
+    with pytest.raises(UploadSessionNotFound):
+        store.get(session["id"], tenant="acquisitions")
+
+
+def test_path_like_ids_are_not_found(store, tmp_path):
+    session = store.create("deal.pdf", len(DATA))
+    for upload_id in ("..", "../sessions", session["id"] + "/.."):
+        with pytest.raises(UploadSessionNotFound):
+            store.get(upload_id)
+        with pytest.raises(UploadSessionNotFound):
+            store.delete(upload_id)
+    assert os.path.isdir(tmp_path / "sessions" / session["id"])
+
+
+def test_delete_removes_the_session(store, tmp_path):
+    session = store.create("deal.pdf", len(DATA))
+    send(store, session["id"], 0)
+    store.delete(session["id"])
+    assert not os.path.exists(tmp_path / "sessions" / session["id"])
+    with pytest.raises(UploadSessionNotFound):
+        store.get(session["id"])
@@ -0,0 +1,198 @@
+import os
+import re
+import time
+from collections import Counter
+
+from model_router import estimate_tokens
+
+# Page break character written between PDF pages by FileProcessor
+PAGE_BREAK = "\f"
+
+# Paragraphs that carry no information for the analysis; extend with NORMALIZE_BOILERPLATE_FILE
+DEFAULT_BOILERPLATE_PATTERNS = [
+    r"^this page (has been )?(intentionally )?left blank\.?$",
+    r"^(copyright )?(©|\(c\)) ?\d{4}.{0,120}all rights reserved\.?$",
+    r"^all rights reserved\.?$",
+]
+
+PAGE_NUMBER_PATTERN = re.compile(r"^[\s\-–—]*(page\s*)?\d{1,4}(\s*(of|/)\s*\d{1,4})?[\s\-–—]*$", re.IGNORECASE)
+HYPHENATION_PATTERN = re.compile(r"([A-Za-z]*[a-z])-[ \t]*\n[ \t]*([a-z][A-Za-z]*)")
+
+# First words of hyphenated compounds common in deal documents ("owner-occupied", "triple-net"). A line
+# break after one of them keeps the hyphen, unless the next line starts with a word ending that makes
+# one word of it ("owner-\nship", "lease-\nhold").
+COMPOUND_FIRST_WORDS = {
+    "owner", "tenant", "triple", "double", "single", "multi", "mixed", "non", "self", "long", "short", "mid",
+    "high", "low", "full", "year", "month", "value", "lease", "sale", "market", "credit", "cash", "first",
+    "second", "third", "build", "break", "fixed", "floating", "well",
+}
+WORD_ENDINGS = {
+    "s", "es", "ed", "er", "ers", "ing", "ings", "ly", "ship", "ships", "ness", "age", "able", "ible", "ary",
+    "way", "ways", "cy", "hold", "holds", "holder", "holders", "ment", "ments", "tion", "ward", "wise", "ity",
+}
+
+SPACES_PATTERN = re.compile(r"[ \t\u00a0\u2000-\u200b]+")
+BLANK_LINES_PATTERN = re.compile(r"\n{3,}")
+DIGITS_PATTERN = re.compile(r"\d+")
+
+
+class TextNormalizer:
+    """
+    Shrinks extracted deal text before it is sent to every agent prompt.
+
+    PDF pages (separated by form feeds) are scanned for header and footer lines that repeat
+    across pages, such as property names, confidentiality notices and "Page 3 of 40", and
+    those lines are removed. A page number on the first or last line of a page is dropped;
+    numbers elsewhere (e.g. the figures of a table) are kept. Words hyphenated across
+    line breaks are re-joined (compounds such as "triple-net" keep the hyphen), runs of spaces and blank lines are collapsed, and paragraphs
+    matching boilerplate patterns are removed. Every step is a single pass over the text,
+    so the cost is linear in the document size.
+
+    Configuration (environment variables):
+        NORMALIZE_TEXT               true | false (default true)
+        NORMALIZE_EDGE_LINES         lines at the top and bottom of each page checked for repeats (default 3)
+        NORMALIZE_MIN_REPEAT_PAGES   a header/footer must appear on at least this many pages (default 3)
+        NORMALIZE_REPEAT_FRACTION    ... and on at least this share of all pages (default 0.5)
+        NORMALIZE_BOILERPLATE_FILE   file with extra boilerplate regular expressions, one per line
+    """
+
+    def __init__(self, config=None):
+        config = config if config is not None else self._load_config()
+        self.enabled = str(config.get("enabled", "true")).lower() == "true"
+        self.edge_lines = int(config.get("edge_lines", 3))
+        self.min_repeat_pages = int(config.get("min_repeat_pages", 3))
+        self.repeat_fraction = float(config.get("repeat_fraction", 0.5))
+        patterns = list(DEFAULT_BOILERPLATE_PATTERNS) + list(config.get("boilerplate_patterns") or [])
+        # One combined expression so each paragraph is scanned once regardless of the number of patterns
+        self.boilerplate = re.compile("|".join(f"(?:{pattern})" for pattern in patterns), re.IGNORECASE | re.DOTALL)
+
+    def _load_config(self):
+        config = {}
+        for key in ("enabled", "edge_lines", "min_repeat_pages", "repeat_fraction"):
+            env_key = "NORMALIZE_TEXT" if key == "enabled" else f"NORMALIZE_{key.upper()}"
+            value = os.environ.get(env_key)
+            if value:
+                config[key] = value
+        boilerplate_file = os.environ.get("NORMALIZE_BOILERPLATE_FILE")
+        if boilerplate_file:
+            with open(boilerplate_file, 'r') as f:
+                config["boilerplate_patterns"] = [
+                    line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")
+                ]
+        return config
+
+    def normalize(self, text):
+        """
+        Normalise extracted document text.
+
+        Args:
+            text: Text from FileProcessor.process_file (PDF pages separated by form feeds)
+
+        Returns:
+            Tuple of (normalised text, stats dictionary with the tokens saved)
+        """
+        start = time.perf_counter()
+        text = text or ""
+        stats = {
+            "enabled": self.enabled,
+            "pages": text.count(PAGE_BREAK) + 1,
+            "repeated_lines_removed": 0,
+            "page_numbers_removed": 0,
+            "hyphenations_joined": 0,
+            "boilerplate_paragraphs_removed": 0,
+        }
+        if self.enabled:
+            normalized = self._normalize(text, stats)
+        else:
+            normalized = text.replace(PAGE_BREAK, "\n\n")
+
+        original_tokens = estimate_tokens(text)
+        normalized_tokens = estimate_tokens(normalized)
+        stats.update({
+            "original_chars": len(text),
+            "normalized_chars": len(normalized),
+            "original_tokens": original_tokens,
+            "normalized_tokens": normalized_tokens,
+            "tokens_saved": original_tokens - normalized_tokens,
+            "percent_saved": round(100.0 * (original_tokens - normalized_tokens) / original_tokens, 1) if original_tokens else 0.0,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 3)
+        })
+        return normalized, stats
+
+    def _normalize(self, text, stats):
+        pages = [page.split("\n") for page in text.split(PAGE_BREAK)]
+        repeated = self._repeated_edge_lines(pages)
+
+        kept_pages = []
+        for lines in pages:
+            edge = self._edge_indexes(lines)
+            # Text without page breaks has no page numbers to remove
+            ends = self._page_ends(lines) if len(pages) > 1 else set()
+            kept = []
+            for index, line in enumerate(lines):
+                line = SPACES_PATTERN.sub(" ", line).strip()
+                if line and PAGE_NUMBER_PATTERN.match(line):
+                    if index in ends:
+                        stats["page_numbers_removed"] += 1
+                        continue
+                    # A bare number is a page number only on the first or last line of a page; elsewhere it
+                    # is a figure (a rent roll, a table) even when it repeats across pages
+                    if line.strip(" -–—").isdigit():
+                        kept.append(line)
+                        continue
+                if index in edge and line and self._line_key(line) in repeated:
+                    stats["repeated_lines_removed"] += 1
+                    continue
+                kept.append(line)
+            kept_pages.append("\n".join(kept))
+        text = "\n\n".join(kept_pages)
+
+        joined = 0
+
+        def join_hyphenation(match):
+            nonlocal joined
+            if match.group(1).lower() in COMPOUND_FIRST_WORDS and match.group(2).lower() not in WORD_ENDINGS:
+                return f"{match.group(1)}-{match.group(2)}"
+            joined += 1
+            return match.group(1) + match.group(2)
+
+        text = HYPHENATION_PATTERN.sub(join_hyphenation, text)
+        stats["hyphenations_joined"] = joined
+
+        paragraphs = []
+        for paragraph in BLANK_LINES_PATTERN.sub("\n\n", text).split("\n\n"):
+            paragraph = paragraph.strip("\n")
+            if not paragraph.strip():
+                continue
+            if self.boilerplate.search(paragraph.strip()):
+                stats["boilerplate_paragraphs_removed"] += 1
+                continue
+            paragraphs.append(paragraph)
+        return "\n\n".join(paragraphs)
+
+    def _line_key(self, line):
+        """Compare header/footer lines ignoring case and numbers (page numbers, dates)"""
+        return DIGITS_PATTERN.sub("#", line.lower())
+
+    def _edge_indexes(self, lines):
+        """Indexes of the first and last edge_lines non-empty lines of a page"""
+        non_empty = [index for index, line in enumerate(lines) if line.strip()]
+        return set(non_empty[:self.edge_lines] + non_empty[-self.edge_lines:])
+
+    def _page_ends(self, lines):
+        """Indexes of the first and last non-empty line of a page, where page numbers are printed"""
+        non_empty = [index for index, line in enumerate(lines) if line.strip()]
+        return {non_empty[0], non_empty[-1]} if non_empty else set()
+
+    def _repeated_edge_lines(self, pages):
+        """Keys of header/footer lines that appear on enough pages to be page furniture"""
+        if len(pages) < self.min_repeat_pages:
+            return set()
+        counts = Counter()
+        for lines in pages:
+            counts.update({
+                self._line_key(SPACES_PATTERN.sub(" ", lines[index]).strip())
+                for index in self._edge_indexes(lines)
+            })
+        threshold = max(self.min_repeat_pages, self.repeat_fraction * len(pages))
+        return {key for key, count in counts.items() if count >= threshold and key}
@@ -0,0 +1,292 @@
+import hashlib
+import math
+import os
+import re
+import shutil
+import sqlite3
+import time
+import uuid
+
+# Chunks are streamed to disk in blocks of this size, so memory use does not depend on the chunk size
+STREAM_BLOCK_SIZE = 1024 * 1024
+
+# Upload ids are uuid4 hex strings; anything else never names a session (or a directory)
+UPLOAD_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+class UploadSessionNotFound(Exception):
+    """Raised for an unknown or expired upload session"""
+    pass
+
+
+class UploadError(Exception):
+    """Raised when a chunk or an assembled upload fails validation (size, checksum, missing chunks)"""
+    pass
+
+
+class UploadSessionStore:
+    """
+    Chunked, resumable uploads for documents larger than a single request allows.
+
+    A client creates a session with the file name, size and (optionally) its SHA-256, then sends
+    the chunks in any order and in parallel. Each chunk is streamed to its own file and checked
+    against its length and the SHA-256 sent with it. Sessions are kept in SQLite, so a client that
+    lost its connection asks which chunks were received and only sends the missing ones. Once
+    every chunk is in, assemble() concatenates them into a single file block by block while
+    hashing it, and verifies the whole-file checksum.
+
+    Configuration (environment variables):
+        UPLOAD_SESSION_DB         session database (default data/uploads.db)
+        UPLOAD_CHUNK_DIR          directory for chunk files (default uploads/sessions)
+        UPLOAD_CHUNK_SIZE         chunk size in bytes offered to clients (default 4 MB, max 8 MB)
+        UPLOAD_MAX_BYTES          largest accepted upload (default 500 MB)
+        UPLOAD_SESSION_TTL_HOURS  unfinished sessions are deleted after this long (default 24)
+    """
+
+    MAX_CHUNK_SIZE = 8 * 1024 * 1024
+
+    def __init__(self, db_path=None, chunk_dir=None, chunk_size=None, max_bytes=None, ttl_hours=None):
+        self.db_path = db_path or os.environ.get("UPLOAD_SESSION_DB", os.path.join("data", "uploads.db"))
+        self.chunk_dir = chunk_dir or os.environ.get("UPLOAD_CHUNK_DIR", os.path.join("uploads", "sessions"))
+        self.chunk_size = min(int(chunk_size or os.environ.get("UPLOAD_CHUNK_SIZE", 4 * 1024 * 1024)), self.MAX_CHUNK_SIZE)
+        self.max_bytes = int(max_bytes or os.environ.get("UPLOAD_MAX_BYTES", 500 * 1024 * 1024))
+        self.ttl_seconds = float(ttl_hours or os.environ.get("UPLOAD_SESSION_TTL_HOURS", 24)) * 3600
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        os.makedirs(self.chunk_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS upload_sessions (
+                    id TEXT PRIMARY KEY,
+                    filename TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    chunk_size INTEGER NOT NULL,
+                    total_chunks INTEGER NOT NULL,
+                    sha256 TEXT,
+                    tenant TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    assembled_path TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS upload_chunks (
+                    upload_id TEXT NOT NULL,
+                    chunk_index INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    sha256 TEXT NOT NULL,
+                    PRIMARY KEY (upload_id, chunk_index)
+                );
+            """)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _session_dir(self, upload_id):
+        if not UPLOAD_ID_PATTERN.match(upload_id or ""):
+            raise UploadSessionNotFound(f"Upload session '{upload_id}' not found")
+        root = os.path.realpath(self.chunk_dir)
+        path = os.path.realpath(os.path.join(root, upload_id))
+        if os.path.dirname(path) != root:
+            raise UploadSessionNotFound(f"Upload session '{upload_id}' not found")
+        return path
+
+    def _chunk_path(self, upload_id, index):
+        return os.path.join(self._session_dir(upload_id), f"{index:06d}.part")
+
+    def create(self, filename, size, sha256=None, tenant="default"):
+        """
+        Start an upload session.
+
+        Args:
+            filename: Sanitised file name of the upload
+            size: Total size in bytes
+            sha256: Optional hex SHA-256 of the whole file, verified on assembly
+            tenant: Tenant the upload belongs to
+
+        Returns:
+            Session dictionary (see get)
+        """
+        size = int(size)
+        if size <= 0:
+            raise UploadError("Upload size must be positive")
+        if size > self.max_bytes:
+            raise UploadError(f"Upload of {size} bytes exceeds the limit of {self.max_bytes} bytes")
+        self.purge_expired()
+        upload_id = uuid.uuid4().hex
+        now = time.time()
+        os.makedirs(self._session_dir(upload_id), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO upload_sessions (id, filename, size, chunk_size, total_chunks, sha256, tenant, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, 'uploading', ?, ?)",
+                (upload_id, filename, size, self.chunk_size, math.ceil(size / self.chunk_size),
+                 sha256.lower() if sha256 else None, tenant, now, now)
+            )
+        return self.get(upload_id)
+
+    def get(self, upload_id, tenant=None):
+        """
+        Look up a session and the chunks received so far.
+
+        Args:
+            upload_id: Session id
+            tenant: If given, sessions of other tenants are reported as not found
+
+        Returns:
+            Dictionary with the session fields, received and missing chunk indexes and bytes received
+
+        Raises:
+            UploadSessionNotFound: if the id is malformed, or the session does not exist, has expired
+                or belongs to another tenant
+        """
+        if not UPLOAD_ID_PATTERN.match(upload_id or ""):
+            raise UploadSessionNotFound(f"Upload session '{upload_id}' not found")
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM upload_sessions WHERE id = ?", (upload_id,)).fetchone()
+            if row is None or row["updated_at"] < time.time() - self.ttl_seconds or \
+                    (tenant is not None and row["tenant"] != tenant):
+                raise UploadSessionNotFound(f"Upload session '{upload_id}' not found")
+            chunks = conn.execute(
+                "SELECT chunk_index, size FROM upload_chunks WHERE upload_id = ? ORDER BY chunk_index", (upload_id,)
+            ).fetchall()
+        session = dict(row)
+        received = [chunk["chunk_index"] for chunk in chunks]
+        received_set = set(received)
+        session["received_chunks"] = received
+        session["missing_chunks"] = [index for index in range(session["total_chunks"]) if index not in received_set]
+        session["bytes_received"] = sum(chunk["size"] for chunk in chunks)
+        return session
+
+    def expected_chunk_size(self, session, index):
+        """Every chunk has the session's chunk size except the last one, which holds the remainder"""
+        if index < session["total_chunks"] - 1:
+            return session["chunk_size"]
+        return session["size"] - session["chunk_size"] * (session["total_chunks"] - 1)
+
+    def write_chunk(self, upload_id, index, stream, sha256=None):
+        """
+        Stream one chunk to disk and record it. Re-sending a chunk replaces the earlier copy,
+        so retries after a lost acknowledgement are safe.
+
+        Args:
+            upload_id: Session id
+            index: Zero-based chunk index
+            stream: File-like object with the chunk bytes (e.g. request.stream)
+            sha256: Optional hex SHA-256 of the chunk sent by the client
+
+        Returns:
+            Dictionary with the chunk index, size and SHA-256
+
+        Raises:
+            UploadError: if the index, size or checksum is wrong, or the session is already assembled
+        """
+        session = self.get(upload_id)
+        if session["status"] != "uploading":
+            raise UploadError(f"Upload session '{upload_id}' is already {session['status']}")
+        if not 0 <= index < session["total_chunks"]:
+            raise UploadError(f"Chunk index {index} is out of range (0-{session['total_chunks'] - 1})")
+        expected = self.expected_chunk_size(session, index)
+
+        path = self._chunk_path(upload_id, index)
+        # Each request writes its own temporary file, so parallel retries of one chunk cannot interleave
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        digest = hashlib.sha256()
+        written = 0
+        try:
+            with open(temp_path, 'wb') as f:
+                while True:
+                    block = stream.read(min(STREAM_BLOCK_SIZE, expected - written + 1))
+                    if not block:
+                        break
+                    written += len(block)
+                    if written > expected:
+                        raise UploadError(f"Chunk {index} is larger than the expected {expected} bytes")
+                    digest.update(block)
+                    f.write(block)
+            if written != expected:
+                raise UploadError(f"Chunk {index} has {written} bytes, expected {expected}")
+            if sha256 and digest.hexdigest() != sha256.lower():
+                raise UploadError(f"Checksum mismatch for chunk {index}")
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO upload_chunks (upload_id, chunk_index, size, sha256) VALUES (?, ?, ?, ?)",
+                (upload_id, index, written, digest.hexdigest())
+            )
+            conn.execute("UPDATE upload_sessions SET updated_at = ? WHERE id = ?", (time.time(), upload_id))
+        return {"index": index, "size": written, "sha256": digest.hexdigest()}
+
+    def assemble(self, upload_id):
+        """
+        Concatenate the chunks into the uploaded file, streaming them block by block.
+        Calling it again for an assembled session returns the same file.
+
+        Returns:
+            Tuple of (path of the assembled file, hex SHA-256 of the file)
+
+        Raises:
+            UploadError: if chunks are missing or the file checksum does not match
+        """
+        session = self.get(upload_id)
+        if session["status"] == "assembled":
+            return session["assembled_path"], session["sha256"]
+        if session["missing_chunks"]:
+            raise UploadError(f"Upload is missing {len(session['missing_chunks'])} of {session['total_chunks']} chunks")
+
+        path = os.path.join(self._session_dir(upload_id), "assembled")
+        digest = hashlib.sha256()
+        with open(path, 'wb') as out:
+            for index in range(session["total_chunks"]):
+                with open(self._chunk_path(upload_id, index), 'rb') as chunk:
+                    while True:
+                        block = chunk.read(STREAM_BLOCK_SIZE)
+                        if not block:
+                            break
+                        digest.update(block)
+                        out.write(block)
+        sha256 = digest.hexdigest()
+        if session["sha256"] and sha256 != session["sha256"]:
+            os.remove(path)
+            raise UploadError("Checksum mismatch for the assembled file; re-send the upload")
+
+        # The chunks are no longer needed once the file is assembled
+        for index in range(session["total_chunks"]):
+            os.remove(self._chunk_path(upload_id, index))
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE upload_sessions SET status = 'assembled', assembled_path = ?, sha256 = ?, updated_at = ? WHERE id = ?",
+                (path, sha256, time.time(), upload_id)
+            )
+            conn.execute("DELETE FROM upload_chunks WHERE upload_id = ?", (upload_id,))
+        return path, sha256
+
+    def delete(self, upload_id):
+        """
+        Remove a session and its files.
+
+        Raises:
+            UploadSessionNotFound: if the id is malformed
+        """
+        shutil.rmtree(self._session_dir(upload_id), ignore_errors=True)
+        with self._connect() as conn:
+            conn.execute("DELETE FROM upload_chunks WHERE upload_id = ?", (upload_id,))
+            conn.execute("DELETE FROM upload_sessions WHERE id = ?", (upload_id,))
+
+    def purge_expired(self):
+        """Delete sessions that have not been touched within the TTL"""
+        with self._connect() as conn:
+            expired = [row["id"] for row in conn.execute(
+                "SELECT id FROM upload_sessions WHERE updated_at < ?", (time.time() - self.ttl_seconds,)
+            )]
+        for upload_id in expired:
+            self.delete(upload_id)
+        return len(expired)
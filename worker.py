@@ -0,0 +1,118 @@
+"""
+Worker process for queued analysis jobs (see job_queue.JobQueue and POST /jobs).
+
+Run as many workers as needed, on one or more hosts sharing the queue database:
+
+    python worker.py                 # process jobs until interrupted
+    python worker.py --once          # process at most one job and exit
+"""
+import argparse
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import report_storage as storage
+from investment_pipeline import InvestmentAnalysisPipeline
+from job_queue import JobQueue, default_worker_id
+
+
+class LeaseKeeper:
+    """Renews a job lease in the background while the worker is processing it"""
+
+    def __init__(self, queue, job_id, worker_id, lease_seconds):
+        self.queue = queue
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.lease_seconds / 3):
+            try:
+                if not self.queue.heartbeat(self.job_id, self.worker_id, self.lease_seconds):
+                    print(f"Warning: Lost the lease on job {self.job_id}; another worker has taken it over")
+                    self.lost = True
+                    return
+            except Exception as e:
+                print(f"Warning: Heartbeat for job {self.job_id} failed: {e}")
+
+
+def process_job(queue, job, worker_id, lease_seconds):
+    """
+    Run the analysis pipeline for a claimed job, resuming from any stage results stored by
+    earlier attempts and recording each specialist report as soon as it is available.
+    """
+    job_id = job["id"]
+    report_id = job["report_id"]
+    precomputed = queue.stage_reports(job_id)
+    print(f"Processing job {job_id} ({job['filename']}), attempt {job['attempts']}"
+          + (f", resuming with {', '.join(sorted(precomputed))}" if precomputed else ""))
+
+    with LeaseKeeper(queue, job_id, worker_id, lease_seconds) as lease:
+        try:
+            pipeline = InvestmentAnalysisPipeline(
+                similarity_index=storage.similarity_index, tenant=job["tenant"], priority=job["priority"]
+            )
+            results = pipeline.analyze(
+                job["filepath"],
+                deadline_seconds=job["deadline_seconds"],
+                on_late_result=lambda agent_id, report: storage.save_late_report(report_id, agent_id, report),
+                precomputed_reports=precomputed,
+                on_agent_complete=lambda agent_id, status, report, elapsed: queue.save_stage(job_id, agent_id, status, report, elapsed)
+            )
+            if lease.lost:
+                return False
+            storage.save_reports(report_id, results)
+            response = storage.build_response(report_id, results)
+        except Exception as e:
+            print(f"Warning: Job {job_id} failed: {e}")
+            queue.fail(job_id, worker_id, e)
+            return False
+
+    if not queue.complete(job_id, worker_id, response):
+        print(f"Warning: Job {job_id} was taken over by another worker; discarding this result")
+        return False
+    print(f"Job {job_id} completed as {report_id}")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process queued investment analysis jobs")
+    parser.add_argument("--once", action="store_true", help="Process at most one job and exit")
+    parser.add_argument("--worker-id", default=default_worker_id(), help="Identifier recorded on claimed jobs")
+    parser.add_argument("--lease-seconds", type=float, default=float(os.environ.get("JOB_LEASE_SECONDS", 60)),
+                        help="Lease length; a job is taken over when its worker misses heartbeats for this long")
+    parser.add_argument("--poll-seconds", type=float, default=float(os.environ.get("JOB_POLL_SECONDS", 2)),
+                        help="Delay between polls when the queue is empty")
+    args = parser.parse_args()
+
+    queue = storage.job_queue
+    print(f"Worker {args.worker_id} polling {queue.db_path}")
+    while True:
+        job = queue.claim(args.worker_id, args.lease_seconds)
+        if job is not None:
+            process_job(queue, job, args.worker_id, args.lease_seconds)
+        elif args.once:
+            break
+        else:
+            time.sleep(args.poll_seconds)
+        if args.once:
+            break
+
+
+if __name__ == '__main__':
+    main()